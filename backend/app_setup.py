@@ -1,6 +1,7 @@
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 import socketio
 import asyncio
 
@@ -11,9 +12,19 @@ from database.database import init_db
 from routers.auth import router as auth_router
 from routers.rooms import router as rooms_router
 from routers.friends import router as friends_router
+from routers.admin import router as admin_router
+from http_cache import ETagMiddleware
+import metrics
+from shared import client_rooms, last_heartbeat, pending_leaves
+from database.database import engine
+import tracing
 from helpers import check_heartbeats # check_heartbeats is now in helpers.py
+from loop_watchdog import LoopWatchdog
+from profiler import profiler
+from services.voice import FORWARDING_AVAILABLE
 # Importing sio_events registers the SIO event handlers with the sio object from shared.py
 import sio_events 
+import webrtc_signaling
 
 @asynccontextmanager
 async def lifespan(app_instance: FastAPI):
@@ -23,10 +34,26 @@ async def lifespan(app_instance: FastAPI):
     
     heartbeat_task = asyncio.create_task(check_heartbeats())
     logger.info("Started heartbeat monitor task")
+
+    watchdog = None
+    if settings.LOOP_WATCHDOG_ENABLED:
+        watchdog = LoopWatchdog()
+        watchdog.start()
+        logger.info("Started event loop watchdog")
+
+    if not FORWARDING_AVAILABLE:
+        logger.warning(
+            "Voice forwarding unavailable (aiortc, av or numpy not installed): rooms above "
+            f"{settings.VOICE_FORWARDING_THRESHOLD} voice members stay in mesh mode"
+        )
     
     yield
     
     logger.info("Shutting down application...")
+    if watchdog:
+        await watchdog.stop()
+    if profiler.running:
+        await asyncio.to_thread(profiler.stop)
     heartbeat_task.cancel()
     try:
         await heartbeat_task
@@ -50,10 +77,35 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# ETags on JSON GET responses; inside GZip so the tag is computed on the uncompressed body
+app.add_middleware(ETagMiddleware)
+
+# Compress larger JSON responses (room and friend lists) for clients that accept gzip
+app.add_middleware(GZipMiddleware, minimum_size=1024)
+
+# Latency per route template; outermost so compression and ETag time is included
+app.add_middleware(metrics.MetricsMiddleware)
+
+# Root span per request; SQL statements and VPN commands become its children
+app.add_middleware(tracing.TracingMiddleware)
+tracing.instrument_engine(engine)
+tracing.install_log_correlation()
+
 # Mount the routers
 app.include_router(auth_router, prefix="/auth", tags=["Authentication"])
 app.include_router(rooms_router, prefix="/rooms", tags=["Rooms"])
 app.include_router(friends_router, prefix="/friends", tags=["Friends"])
+app.include_router(admin_router, prefix="/admin", tags=["Admin"])
+app.include_router(metrics.router)
+
+# Gauges read from the live state when /metrics is scraped
+metrics.sio_connected.set_function(lambda: len(last_heartbeat))
+metrics.players_connected.set_function(lambda: len(client_rooms))
+metrics.rooms_active.set_function(lambda: len(client_rooms.by_room))
+metrics.players_reconnecting.set_function(lambda: len(pending_leaves))
+metrics.db_pool_size.set_function(lambda: engine.sync_engine.pool.size())
+metrics.db_pool_checked_out.set_function(lambda: engine.sync_engine.pool.checkedout())
+metrics.db_pool_overflow.set_function(lambda: max(engine.sync_engine.pool.overflow(), 0))
 
 # Create socketio app, using the sio instance imported from shared.py
 socket_app = socketio.ASGIApp(sio, app) 
\ No newline at end of file
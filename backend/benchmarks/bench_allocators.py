@@ -0,0 +1,27 @@
+# bench_allocators.py
+# vpnserver/genrator.py: every room creation and every VPN join runs these.
+from benchmarks.harness import benchmark
+from vpnserver.genrator import (
+    generate_new_network_range, get_next_subnet, generate_new_port, generate_allowed_ips
+)
+
+
+@benchmark("generate_new_network_range")
+async def new_network_range(ctx, db):
+    await generate_new_network_range(db)
+
+
+@benchmark("get_next_subnet")
+async def next_subnet(ctx, db):
+    await get_next_subnet(db)
+
+
+@benchmark("generate_new_port")
+async def new_port(ctx, db):
+    await generate_new_port(db)
+
+
+@benchmark("generate_allowed_ips")
+async def allowed_ips(ctx, db):
+    room_id = ctx.random_room()
+    await generate_allowed_ips(db, f"10.{room_id % 253 + 1}.0.1/24")
@@ -0,0 +1,26 @@
+# bench_auth.py
+# Token issue and check; get_current_user runs on every authenticated request.
+from jose import jwt
+
+from benchmarks.harness import benchmark
+from config import settings
+from routers.auth import create_access_token, get_current_user
+
+
+@benchmark("create_access_token")
+async def access_token(ctx, db):
+    create_access_token(data={"sub": f"user{ctx.random_user()}@bench.invalid"})
+
+
+async def token_for_random_user(ctx, db):
+    return (create_access_token(data={"sub": f"user{ctx.random_user()}@bench.invalid"}),)
+
+
+@benchmark("jwt_decode", setup=token_for_random_user)
+async def decode(ctx, db, token):
+    jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+
+
+@benchmark("get_current_user", setup=token_for_random_user)
+async def current_user(ctx, db, token):
+    await get_current_user(token=token, db=db)
@@ -0,0 +1,57 @@
+# bench_rooms.py
+# Room paths that run on every join / leave.
+from fastapi.responses import JSONResponse
+from sqlalchemy import select
+
+from benchmarks.harness import benchmark
+from benchmarks.seed import ROOM_SIZE, SPARE_USER
+from helpers import get_players_for_room, handle_player_leave
+from models import User, Room, RoomPlayer, network_config_user
+from routers import rooms
+
+
+class JsonRequest:
+    """The part of starlette's Request the room endpoints use"""
+
+    def __init__(self, data):
+        self._data = data
+
+    async def json(self):
+        return self._data
+
+
+@benchmark("get_players_for_room")
+async def players_for_room(ctx, db):
+    await get_players_for_room(db, ctx.random_room())
+
+
+async def add_spare_player(ctx, db):
+    """The spare user sits in a random room (and its network) so there is someone to remove"""
+    room_id = ctx.random_room()
+    room = await db.get(Room, room_id)
+    ctx.ensure_interface(room.network_name)
+    db.add(RoomPlayer(room_id=room_id, player_username=SPARE_USER, username=SPARE_USER, is_host=False))
+    db.add(network_config_user(network_config_id=room_id, user_id=ctx.ids["spare_user_id"],
+                               allowed_ips=f"10.{room_id % 253 + 1}.0.{ROOM_SIZE + 2}/32"))
+    room.current_players += 1
+    await db.commit()
+    return (room_id,)
+
+
+@benchmark("handle_player_leave", setup=add_spare_player)
+async def player_leave(ctx, db, room_id):
+    await handle_player_leave(SPARE_USER, room_id, db)
+
+
+async def load_member(ctx, db):
+    room_id = ctx.random_room()
+    username = f"user{(room_id - 1) * ROOM_SIZE + 1}"
+    user = (await db.execute(select(User).filter_by(username=username))).scalars().first()
+    return JsonRequest({"room_id": room_id}), user
+
+
+@benchmark("join_room_payload", setup=load_member)
+async def join_room_payload(ctx, db, request, user):
+    # A member re-joining: network and address lookups plus the JSON body
+    payload = await rooms.join_room(request, current_user=user, db=db)
+    JSONResponse(payload).body
@@ -0,0 +1,22 @@
+# bench_socketio.py
+# Server-side dispatch of the most frequent /game events, through
+# python-socketio's handler lookup and @instrument_event, without a transport.
+import sio_events  # noqa: F401  (registers the handlers)
+from benchmarks.harness import benchmark
+from shared import sio, room_player_versions
+
+NAMESPACE = "/game"
+
+
+@benchmark("sio_heartbeat")
+async def heartbeat(ctx, db):
+    user = ctx.random_user()
+    await sio._trigger_event("heartbeat", NAMESPACE, f"sid{user}", {"room_id": 1, "username": f"user{user}"})
+
+
+@benchmark("sio_sync_players_current")
+async def sync_players_current(ctx, db):
+    # A client already at the current version: the common, no-reply case
+    sio_events.client_rooms["sid-sync"] = {"username": "user1", "room_id": 1}
+    await sio._trigger_event("sync_players", NAMESPACE, "sid-sync",
+                             {"room_id": 1, "version": room_player_versions.get(1, 0)})
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Compare two benchmarks/run.py result files
+------------------------------------------
+Prints the median change for every benchmark and scale both runs have,
+marks changes beyond --threshold as REGRESSION / faster, and exits with
+status 1 if anything regressed (for CI).
+
+Usage:
+    python benchmarks/compare.py benchmarks/results/abc1234.json benchmarks/results/def5678.json --threshold 0.10
+"""
+
+import argparse
+import json
+import sys
+
+
+def compare(base, new, threshold, metric="median_us"):
+    rows = []
+    for key, stats in new["results"].items():
+        before = base["results"].get(key)
+        if not before:
+            continue
+        ratio = stats[metric] / before[metric] if before[metric] else 1.0
+        if ratio > 1 + threshold:
+            verdict = "REGRESSION"
+        elif ratio < 1 - threshold:
+            verdict = "faster"
+        else:
+            verdict = ""
+        rows.append((key, before[metric], stats[metric], ratio, verdict))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare benchmark results")
+    parser.add_argument("base")
+    parser.add_argument("new")
+    parser.add_argument("--threshold", type=float, default=0.10, help="relative change that counts (0.10 = 10%%)")
+    parser.add_argument("--metric", default="median_us", choices=("median_us", "min_us", "p95_us", "mean_us"))
+    args = parser.parse_args()
+
+    with open(args.base) as f:
+        base = json.load(f)
+    with open(args.new) as f:
+        new = json.load(f)
+    if base.get("database") != new.get("database") or base.get("machine") != new.get("machine"):
+        print(f"warning: comparing {base.get('database')}/{base.get('machine')} "
+              f"with {new.get('database')}/{new.get('machine')}")
+
+    rows = compare(base, new, args.threshold, args.metric)
+    print(f"{base.get('commit')} -> {new.get('commit')}  ({args.metric}, threshold {args.threshold:.0%})")
+    print(f"{'benchmark@scale':<36}{'before':>12}{'after':>12}{'change':>9}")
+    for key, before, after, ratio, verdict in rows:
+        print(f"{key:<36}{before:>12.1f}{after:>12.1f}{(ratio - 1) * 100:>+8.1f}%  {verdict}")
+    regressions = [row for row in rows if row[4] == "REGRESSION"]
+    if regressions:
+        print(f"{len(regressions)} regression(s) beyond {args.threshold:.0%}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
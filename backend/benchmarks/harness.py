@@ -0,0 +1,68 @@
+# harness.py
+# Registry and timing loop for the backend microbenchmarks. A benchmark is
+# an async function bench(ctx, db, *args); `setup(ctx, db)` (optional) runs
+# untimed before every round and returns the args. Each round gets a fresh
+# session, like a request does.
+import asyncio
+import platform
+import statistics
+import subprocess
+import time
+
+BENCHMARKS = []
+
+
+def benchmark(name, setup=None):
+    def register(fn):
+        BENCHMARKS.append({"name": name, "fn": fn, "setup": setup})
+        return fn
+    return register
+
+
+async def measure(ctx, bench, min_time=0.3, min_rounds=5, max_rounds=2000, warmup=2):
+    times = []
+    deadline = None
+    rounds = 0
+    while rounds < max_rounds:
+        async with ctx.session() as db:
+            args = await bench["setup"](ctx, db) if bench["setup"] else ()
+            start = time.perf_counter_ns()
+            await bench["fn"](ctx, db, *args)
+            elapsed = time.perf_counter_ns() - start
+        if warmup:
+            warmup -= 1
+            continue
+        if deadline is None:
+            deadline = time.perf_counter() + min_time
+        times.append(elapsed / 1e3)
+        rounds += 1
+        if rounds >= min_rounds and time.perf_counter() >= deadline:
+            break
+    return summarize(times)
+
+
+def summarize(times_us):
+    ordered = sorted(times_us)
+    return {
+        "rounds": len(ordered),
+        "min_us": round(ordered[0], 2),
+        "median_us": round(statistics.median(ordered), 2),
+        "mean_us": round(statistics.fmean(ordered), 2),
+        "p95_us": round(ordered[min(int(0.95 * len(ordered)), len(ordered) - 1)], 2),
+        "stdev_us": round(statistics.stdev(ordered), 2) if len(ordered) > 1 else 0.0,
+        "ops_per_s": round(1e6 / statistics.median(ordered), 1),
+    }
+
+
+def environment():
+    try:
+        commit = subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "loop": type(asyncio.get_event_loop_policy()).__name__,
+    }
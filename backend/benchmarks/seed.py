@@ -0,0 +1,77 @@
+# seed.py
+# Seeded data for a scale N: N users, N / ROOM_SIZE rooms with ROOM_SIZE
+# players each, one WireGuard network per room with an address for every
+# player. Rows go in with Core executemany, so 100k users take seconds.
+# Ports and subnets repeat across rooms but leave one of each free, so
+# the allocators scan everything and still succeed.
+import base64
+import hashlib
+from datetime import datetime
+
+from sqlalchemy import insert
+
+from database.base import Base
+from models import User, Room, RoomPlayer, network_config, network_config_user
+
+ROOM_SIZE = 4
+CHUNK = 10000
+PASSWORD = "bench-password"
+# bcrypt of PASSWORD, shared by every user; hashing 100k passwords would dominate seeding
+PASSWORD_HASH = "$2b$12$4BoZqomxS9X8mBKqmoDyNubowQvkiCHUaGVcgWaogaqi1Snuvoh1."
+SPARE_USER = "bench_spare"
+
+
+def key_for(i):
+    return base64.b64encode(hashlib.sha256(str(i).encode()).digest())
+
+
+def parse_scale(text):
+    text = text.strip().lower()
+    if text.endswith("k"):
+        return int(float(text[:-1]) * 1000)
+    return int(text)
+
+
+async def _insert(conn, table, rows):
+    for start in range(0, len(rows), CHUNK):
+        await conn.execute(insert(table), rows[start:start + CHUNK])
+
+
+async def seed(engine, scale):
+    """Drops and recreates every table; returns the ids the benchmarks pick from"""
+    now = datetime.utcnow()
+    rooms = max(1, scale // ROOM_SIZE)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+
+        users = [{"id": i, "username": f"user{i}", "email": f"user{i}@bench.invalid", "password_hash": PASSWORD_HASH,
+                  "private_key": key_for(i), "public_key": key_for(-i), "is_active": True,
+                  "created_at": now, "updated_at": now} for i in range(1, scale + 1)]
+        users.append({"id": scale + 1, "username": SPARE_USER, "email": f"{SPARE_USER}@bench.invalid",
+                      "password_hash": PASSWORD_HASH, "private_key": key_for(0), "public_key": key_for(-scale - 1),
+                      "is_active": True, "created_at": now, "updated_at": now})
+        await _insert(conn, User.__table__, users)
+
+        await _insert(conn, network_config.__table__, [
+            {"id": r, "network_name": f"wg-room-{r}", "server_ip": f"10.{r % 253 + 1}.0.1/24",
+             "port": 51820 + r % 79, "is_active": True, "private_key": key_for(10 ** 9 + r),
+             "public_key": key_for(-10 ** 9 - r)} for r in range(1, rooms + 1)])
+
+        await _insert(conn, Room.__table__, [
+            {"id": r, "name": f"room{r}", "owner_username": f"user{(r - 1) * ROOM_SIZE + 1}", "description": "",
+             "is_private": False, "password": "", "max_players": 8,
+             "current_players": min(ROOM_SIZE, scale - (r - 1) * ROOM_SIZE), "network_name": f"wg-room-{r}",
+             "created_at": now, "updated_at": now} for r in range(1, rooms + 1)])
+
+        players, addresses = [], []
+        for i in range(1, min(scale, rooms * ROOM_SIZE) + 1):
+            r, slot = (i - 1) // ROOM_SIZE + 1, (i - 1) % ROOM_SIZE
+            players.append({"id": i, "room_id": r, "player_username": f"user{i}", "username": f"user{i}",
+                            "is_host": slot == 0, "joined_at": now})
+            addresses.append({"id": i, "network_config_id": r, "user_id": i,
+                              "allowed_ips": f"10.{r % 253 + 1}.0.{slot + 2}/32"})
+        await _insert(conn, RoomPlayer.__table__, players)
+        await _insert(conn, network_config_user.__table__, addresses)
+
+    return {"users": scale, "rooms": rooms, "spare_user_id": scale + 1}
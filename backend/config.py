@@ -29,6 +29,7 @@ class Settings(BaseSettings):
     SOFTETHER_SERVER_PORT: int = 5555  # تحديث المنفذ
     VPNCMD_PATH: str = "/root/vpnserver/vpncmd"
     CONFIG_DIR: str = "/projckt/APP_CLEN/backend/ROOM_CONFIG"
+    VPN_COMMAND_RUNNER: str = "subprocess"  # "simulated": wg / wg-quick / vpncmd in memory (tests, benchmarks)
     
     # VPN Network Settings
     VPN_NETWORK: str = "10.0.0.0"  # شبكة VPN الأساسية
@@ -37,6 +38,47 @@ class Settings(BaseSettings):
     VPN_END_IP: str = "10.0.0.254"  # آخر عنوان IP متاح
     VPN_MAC_PREFIX: str = "02:"  # بادئة عنوان MAC
     
+    # Logging Settings
+    LOG_LEVEL: str = "INFO"
+    SOCKET_LOG_FILE: str = ""  # default: logs/socket_events.log
+    SOCKET_LOG_LEVEL: str = "INFO"  # DEBUG adds per-step join/leave detail and sampled heartbeats
+    SOCKET_LOG_MAX_BYTES: int = 10 * 1024 * 1024
+    SOCKET_LOG_BACKUPS: int = 5
+    HEARTBEAT_LOG_SAMPLE: int = 100  # log one heartbeat in this many
+    SOCKETIO_DEBUG_LOGS: bool = False  # python-socketio / engine.io packet logs
+
+    # Event-loop watchdog Settings
+    LOOP_WATCHDOG_ENABLED: bool = True
+    LOOP_LAG_INTERVAL: float = 0.05  # seconds between loop lag probes
+    LOOP_STALL_THRESHOLD: float = 0.1  # a loop blocked longer than this is reported with its stack
+    LOOP_STALL_LOG_FILE: str = ""  # default: logs/loop_stalls.log
+    LOOP_ASYNCIO_DEBUG: bool = False  # asyncio debug mode: names every slow callback, but too costly to leave on
+
+    # Tracing Settings
+    TRACING_ENABLED: bool = True
+    TRACE_SAMPLE_RATE: float = 0.01  # share of requests / events traced; an incoming traceparent decides for itself
+    TRACE_EXPORTER: str = "file"  # "file" (OTLP/JSON lines) or "otlp" (POST to TRACE_OTLP_ENDPOINT)
+    TRACE_FILE: str = ""  # default: logs/traces.jsonl
+    TRACE_OTLP_ENDPOINT: str = "http://localhost:4318/v1/traces"
+
+    # Profiler Settings (started on demand through /admin/profile)
+    PROFILER_HZ: int = 97  # samples per second; not a divisor of common timer periods, so periodic work is not over- or under-counted
+    PROFILER_MAX_HZ: int = 500
+    PROFILER_DEFAULT_SECONDS: int = 30
+    PROFILER_MAX_SECONDS: int = 300
+    PROFILE_DIR: str = ""  # default: logs/profiles
+
+    # Socket Settings
+    RECONNECT_GRACE_SECONDS: int = 20  # a disconnected player keeps their seat this long; 0 removes them at once
+    CHAT_RESYNC_LIMIT: int = 50  # missed messages returned on re-join
+
+    # Voice Settings
+    VOICE_FORWARDING_THRESHOLD: int = 5  # rooms with more voice members use the server forwarder
+    VOICE_FORWARDED_SPEAKERS: int = 3  # streams each listener receives in forwarding mode
+    
+    # Admin Settings
+    ADMIN_USERNAMES: list = []  # accounts allowed to use /admin; empty disables the admin API
+
     # Other Settings
     NM_API_URL: str = "https://api.example.com"
     MASTER_KEY: str = "your-master-key"
@@ -4,10 +4,13 @@ import time
 from sqlalchemy.future import select
 
 # Local imports from this new structure
-from shared import logger, sio, client_rooms, last_heartbeat, NAMESPACE
+from shared import logger, sio, client_rooms, last_heartbeat, room_player_versions, pending_leaves, NAMESPACE
 from database.database import create_session, get_session # Added get_session as it might be used by helpers indirectly or directly
 from models import Room, RoomPlayer, ChatMessage
 from services.Wiregruad import WiregruadVPN
+import metrics
+
+HEARTBEAT_TIMEOUT = 40  # seconds without a heartbeat before a client is treated as gone
 
 async def get_players_for_room(db, room_id):
     """Get all players in a room as a list of dicts with player_username and is_host"""
@@ -22,6 +25,74 @@ async def get_players_for_room(db, room_id):
         for player in players
     ]
 
+def bump_players_version(room_id):
+    """Each change to a room's player list gets the next version, so clients can tell when they missed one"""
+    version = room_player_versions.get(room_id, 0) + 1
+    room_player_versions[room_id] = version
+    return version
+
+async def emit_player_delta(event, room_id, payload):
+    """Broadcast one player list change (player_joined / player_left / host_changed) with its version"""
+    payload = dict(payload, room_id=room_id, version=bump_players_version(room_id))
+    await sio.emit(event, payload, room=str(room_id), namespace=NAMESPACE)
+
+def message_to_dict(message):
+    return {
+        "id": message.id,
+        "username": message.username,
+        "message": message.message,
+        "created_at": message.created_at.isoformat()
+    }
+
+async def get_messages_after(db, room_id, after_id, limit):
+    """Up to `limit` messages newer than after_id, oldest first, and whether more were left out"""
+    rows = (await db.execute(
+        select(ChatMessage)
+        .filter(ChatMessage.room_id == room_id, ChatMessage.id > after_id)
+        .order_by(ChatMessage.id.desc())
+        .limit(limit + 1)
+    )).scalars().all()
+    # The newest ones matter most; anything older is reported as truncated
+    return [message_to_dict(m) for m in reversed(rows[:limit])], len(rows) > limit
+
+def has_other_session(username, room_id, sid=None):
+    """True if `username` is in the room on a sid other than `sid`, e.g. a reconnect that beat the old disconnect"""
+    return any(
+        other != sid and client_rooms.get(other, {}).get('username') == username
+        for other in client_rooms.by_room.get(room_id, ())
+    )
+
+def schedule_player_leave(username, room_id, delay):
+    """Remove a disconnected player after `delay` seconds unless they re-join first (cancel_player_leave)"""
+    key = (room_id, username)
+    if key in pending_leaves:
+        return
+
+    async def leave_later():
+        await asyncio.sleep(delay)
+        # From here on a re-join no longer cancels this leave
+        pending_leaves.pop(key, None)
+        if has_other_session(username, room_id):
+            logger.info(f"Deferred leave of {username} from room {room_id} dropped: joined again on a new sid")
+            return
+        db = await create_session()
+        try:
+            await handle_player_leave(username, room_id, db)
+        except Exception:
+            logger.exception(f"Deferred leave of {username} from room {room_id} failed")
+        finally:
+            await db.close()
+
+    pending_leaves[key] = asyncio.create_task(leave_later())
+
+def cancel_player_leave(username, room_id):
+    """True if the player was waiting out the grace period and keeps their seat"""
+    task = pending_leaves.pop((room_id, username), None)
+    if task is None:
+        return False
+    task.cancel()
+    return True
+
 async def handle_player_leave(username, room_id, db, sid=None):
     logger.info(f"[LEAVE] Handling player leave: {username} from room {room_id}")
     
@@ -78,8 +149,9 @@ async def handle_player_leave(username, room_id, db, sid=None):
             
             await db.execute(ChatMessage.__table__.delete().where(ChatMessage.room_id == room.id))
             await db.delete(room)
+            room_player_versions.pop(room_id, None)
             logger.info("✅ Room and chat deleted")
-            await sio.emit('room_closed', {'room_id': room_id}, room=str(room_id))
+            await sio.emit('room_closed', {'room_id': room_id}, room=str(room_id), namespace=NAMESPACE)
             await sio.emit('update_rooms', {}, namespace=NAMESPACE)
         else:
             # إعادة تعيين الهوست إذا كان المضيف هو من خرج
@@ -88,20 +160,11 @@ async def handle_player_leave(username, room_id, db, sid=None):
                 new_host.is_host = True
                 room.owner_username = new_host.player_username
                 logger.info(f"👑 New host assigned: {new_host.player_username}")
-                await sio.emit('host_changed', {
-                    'new_host': new_host.player_username,
-                    'room_id': room_id
-                }, room=str(room_id))
-
-            # إرسال التحديثات
-            players = await get_players_for_room(db, room_id)
-            await sio.emit('update_players', {
-                'players': players
-            }, room=str(room_id))
-            await sio.emit('user_left', {
-                'username': username,
-                'room_id': room_id
-            }, room=str(room_id))
+
+            # إرسال التغييرات فقط بدلاً من القائمة الكاملة
+            await emit_player_delta('player_left', room_id, {'username': username})
+            if is_host_leaving:
+                await emit_player_delta('host_changed', room_id, {'new_host': new_host.player_username})
             await sio.emit('update_rooms', {}, namespace=NAMESPACE)
             logger.info("✅ Updates emitted")
 
@@ -126,28 +189,32 @@ async def check_heartbeats():
             stale_clients = []
             
             for sid, last_time in list(last_heartbeat.items()):
-                if current_time - last_time > 40:  # 40 seconds timeout
+                if current_time - last_time > HEARTBEAT_TIMEOUT:
                     stale_clients.append(sid)
             
             for sid in stale_clients:
                 logger.warning(f"Client {sid} detected as stale (no heartbeat)")
+                metrics.heartbeat_expired.inc()
                 
                 if sid in client_rooms:
                     client_data = client_rooms[sid]
-                    db = await create_session()
-                    try:
-                        await handle_player_leave(
-                            client_data['username'], 
-                            client_data['room_id'],
-                            db,
-                            sid
-                        )
-                    except Exception as e:
-                        logger.error(f"Error handling stale client leave: {e}")
-                    finally:
-                        await db.close()
+                    if has_other_session(client_data['username'], client_data['room_id'], sid):
+                        logger.info(f"Stale sid {sid} dropped; {client_data['username']} is connected on another sid")
+                    else:
+                        db = await create_session()
+                        try:
+                            await handle_player_leave(
+                                client_data['username'], 
+                                client_data['room_id'],
+                                db,
+                                sid
+                            )
+                        except Exception as e:
+                            logger.error(f"Error handling stale client leave: {e}")
+                        finally:
+                            await db.close()
                     
-                    del client_rooms[sid]
+                    client_rooms.pop(sid, None)
                 
                 if sid in last_heartbeat:
                     del last_heartbeat[sid]
@@ -0,0 +1,84 @@
+# http_cache.py
+# ETag / If-None-Match support for the JSON GET endpoints (room list, friends,
+# pending requests). The desktop client's APIClient cache revalidates with
+# If-None-Match, and an unchanged resource costs a 304 with no body.
+import hashlib
+
+
+def _header(scope, name):
+    for key, value in scope.get("headers", []):
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+
+def etag_for(body: bytes) -> str:
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def etag_matches(if_none_match, etag):
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return etag in candidates or f"W/{etag}" in candidates
+
+
+class ETagMiddleware:
+    """
+    Adds a strong ETag to 200 JSON responses of GET requests and answers a
+    matching If-None-Match with 304. The handler still runs; what is saved is
+    the response body on the wire and the client's JSON decoding.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "GET":
+            await self.app(scope, receive, send)
+            return
+
+        if_none_match = _header(scope, b"if-none-match")
+        start = None
+        chunks = []
+
+        async def send_with_etag(message):
+            nonlocal start
+            if message["type"] == "http.response.start":
+                headers = dict(message.get("headers", []))
+                content_type = headers.get(b"content-type", b"")
+                if message["status"] == 200 and content_type.startswith(b"application/json") \
+                        and b"etag" not in headers:
+                    # Hold the response until the whole body is known
+                    start = message
+                    return
+                await send(message)
+                return
+
+            if start is None:
+                await send(message)
+                return
+
+            chunks.append(message.get("body", b""))
+            if message.get("more_body", False):
+                return
+
+            body = b"".join(chunks)
+            etag = etag_for(body)
+            headers = [(k, v) for k, v in start.get("headers", []) if k != b"cache-control"]
+            headers.append((b"etag", etag.encode("latin-1")))
+            # The client may keep the body but must revalidate before reusing it
+            headers.append((b"cache-control", b"private, no-cache"))
+
+            if etag_matches(if_none_match, etag):
+                headers = [(k, v) for k, v in headers if k not in (b"content-length", b"content-type")]
+                await send({"type": "http.response.start", "status": 304, "headers": headers})
+                await send({"type": "http.response.body", "body": b""})
+                return
+
+            await send({**start, "headers": headers})
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_with_etag)
@@ -0,0 +1,143 @@
+# loop_watchdog.py
+# Finds what blocks the event loop (wg-quick through subprocess.run, bcrypt,
+# synchronous I/O inside async def). A probe coroutine wakes every
+# LOOP_LAG_INTERVAL and records how late it was; a watcher thread notices
+# when the probe stops waking up and samples the loop thread's stack while
+# it is blocked. Lag goes to /metrics, stalls to logs/loop_stalls.log.
+import asyncio
+import collections
+import logging
+import logging.handlers
+import os
+import sys
+import threading
+import time
+import traceback
+
+import metrics
+from config import settings
+from socket_logger import JsonFormatter, logs_dir
+
+logger = logging.getLogger(__name__)
+
+stall_file = settings.LOOP_STALL_LOG_FILE or os.path.join(logs_dir, 'loop_stalls.log')
+# Written from the watcher thread, never from the loop; delay: no file until the first stall
+stall_handler = logging.handlers.RotatingFileHandler(
+    stall_file, maxBytes=settings.SOCKET_LOG_MAX_BYTES, backupCount=settings.SOCKET_LOG_BACKUPS,
+    encoding="utf-8", delay=True)
+stall_handler.setFormatter(JsonFormatter())
+
+stall_logger = logging.getLogger('loop_stalls')
+stall_logger.setLevel(logging.INFO)
+stall_logger.addHandler(stall_handler)
+stall_logger.propagate = False
+
+QUANTILES = (0.5, 0.9, 0.99, 1.0)
+QUANTILE_WINDOW_SECONDS = 60
+QUANTILE_PUBLISH_SECONDS = 5
+MAX_STACKS = 5  # distinct stacks kept per stall
+STACK_DEPTH = 30
+LONG_STALL_SECONDS = 5  # reported while still blocked, in case the loop never comes back
+
+
+class LoopWatchdog:
+    """
+    Started from the lifespan on the running loop. Costs one short wakeup
+    per interval on the loop and one per half threshold on the watcher
+    thread; stacks are only taken while the loop is actually blocked.
+    """
+
+    def __init__(self, interval=None, threshold=None, stall_logger=stall_logger):
+        self.interval = interval if interval is not None else settings.LOOP_LAG_INTERVAL
+        self.threshold = threshold if threshold is not None else settings.LOOP_STALL_THRESHOLD
+        self.stall_logger = stall_logger
+        self._lags = collections.deque(maxlen=max(1, int(QUANTILE_WINDOW_SECONDS / self.interval)))
+        self._last_beat = None
+        self._loop_thread = None
+        self._task = None
+        self._thread = None
+        self._stop = threading.Event()
+
+    def start(self):
+        loop = asyncio.get_running_loop()
+        if settings.LOOP_ASYNCIO_DEBUG:
+            # asyncio then logs "Executing <Handle ...> took N seconds" with the callback's name
+            loop.set_debug(True)
+            loop.slow_callback_duration = self.threshold
+            logging.getLogger("asyncio").addHandler(stall_handler)
+        self._loop_thread = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._stop.clear()
+        self._task = loop.create_task(self._probe())
+        self._thread = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._thread.start()
+
+    async def stop(self):
+        self._stop.set()
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        if self._thread:
+            self._thread.join(timeout=1)
+
+    def lag_quantiles(self):
+        lags = sorted(self._lags)
+        if not lags:
+            return {}
+        return {q: lags[min(int(q * len(lags)), len(lags) - 1)] for q in QUANTILES}
+
+    async def _probe(self):
+        expected = time.monotonic() + self.interval
+        publish_at = time.monotonic() + QUANTILE_PUBLISH_SECONDS
+        while True:
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            lag = max(now - expected, 0.0)
+            self._last_beat = now
+            self._lags.append(lag)
+            metrics.loop_lag_seconds.observe(lag)
+            if now >= publish_at:
+                for q, value in self.lag_quantiles().items():
+                    metrics.loop_lag_quantile.set(value, quantile=q)
+                publish_at = now + QUANTILE_PUBLISH_SECONDS
+            expected = now + self.interval
+
+    def _watch(self):
+        budget = self.interval + self.threshold
+        stall = None
+        while not self._stop.wait(self.threshold / 2):
+            beat = self._last_beat
+            blocked = time.monotonic() - beat
+            if blocked > budget:
+                if stall is None or stall["beat"] != beat:
+                    stall = {"beat": beat, "stacks": [], "announced": False}
+                self._sample_stack(stall["stacks"])
+                if blocked > LONG_STALL_SECONDS and not stall["announced"]:
+                    stall["announced"] = True
+                    self._report(stall, blocked, ongoing=True)
+            elif stall is not None and beat != stall["beat"]:
+                self._report(stall, beat - stall["beat"] - self.interval, ongoing=False)
+                stall = None
+
+    def _sample_stack(self, stacks):
+        if len(stacks) >= MAX_STACKS:
+            return
+        frame = sys._current_frames().get(self._loop_thread)
+        if frame is None:
+            return
+        stack = "".join(traceback.format_stack(frame, limit=STACK_DEPTH))
+        if stack not in stacks:
+            stacks.append(stack)
+
+    def _report(self, stall, blocked, ongoing):
+        blocked_ms = round(blocked * 1000)
+        if not ongoing:
+            metrics.loop_stalls.inc()
+        self.stall_logger.warning("Event loop still blocked" if ongoing else "Event loop blocked", extra={
+            "event": "loop_stall", "blocked_ms": blocked_ms, "ongoing": ongoing,
+            "threshold_ms": round(self.threshold * 1000), "stacks": list(stall["stacks"]),
+        })
+        logger.warning(f"Event loop {'still ' if ongoing else ''}blocked for {blocked_ms} ms; stacks in {stall_file}")
@@ -0,0 +1,258 @@
+# metrics.py
+# Runtime metrics in the Prometheus text exposition format (version 0.0.4),
+# served at /metrics. Counters, gauges and histograms are kept in plain
+# dicts updated on the event loop; rendering happens only when /metrics is
+# scraped. Instrumentation: MetricsMiddleware for HTTP routes,
+# @instrument_event for Socket.IO handlers, wg_command_* around the wg /
+# wg-quick calls in services/Wiregruad.py.
+import functools
+import inspect
+import math
+import time
+from bisect import bisect_left
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+import tracing
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds; covers a cached GET (sub-ms) up to a slow wg-quick (seconds)
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+REGISTRY = []
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels_text(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value):
+    if value == math.inf:
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._labelset = frozenset(self.labelnames)
+        self._values = {}
+        REGISTRY.append(self)
+
+    def _key(self, labels):
+        if labels.keys() != self._labelset:
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return "\n".join(lines)
+
+    def _samples(self):
+        for key, value in sorted(self._values.items()):
+            yield f"{self.name}{_labels_text(self.labelnames, key)} {_number(value)}"
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        if not self.labelnames:
+            self._values[()] = 0
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._function = None
+
+    def set(self, value, **labels):
+        self._values[self._key(labels)] = value
+
+    def set_function(self, function):
+        """Read the value when scraped; for state that already lives elsewhere (dicts, the DB pool)"""
+        self._function = function
+
+    def _samples(self):
+        if self._function is not None:
+            try:
+                self._values[()] = self._function()
+            except Exception:
+                return
+        yield from super()._samples()
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        series = self._values.get(key)
+        if series is None:
+            # per-bucket counts (not cumulative), then +Inf, sum
+            series = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def count(self, **labels):
+        series = self._values.get(self._key(labels))
+        return sum(series[:-1]) if series else 0
+
+    def _samples(self):
+        for key, series in sorted(self._values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), series):
+                cumulative += count
+                labels = _labels_text(self.labelnames, key, f'le="{_number(bound)}"')
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = _labels_text(self.labelnames, key)
+            yield f"{self.name}_sum{labels} {_number(series[-1])}"
+            yield f"{self.name}_count{labels} {cumulative}"
+
+
+def render():
+    return "\n".join(metric.render() for metric in REGISTRY) + "\n"
+
+
+# --- HTTP ---
+http_request_seconds = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template", ("method", "route", "status"))
+
+# --- Socket.IO ---
+sio_event_seconds = Histogram(
+    "socketio_event_duration_seconds", "Socket.IO event handler latency", ("namespace", "event"))
+sio_event_errors = Counter(
+    "socketio_event_errors_total", "Socket.IO event handlers that raised", ("namespace", "event"))
+sio_connected = Gauge("socketio_connected_sids", "Connected /game sids")
+rooms_active = Gauge("rooms_active", "Rooms with at least one connected player")
+players_connected = Gauge("room_players_connected", "Players joined to a room over Socket.IO")
+players_reconnecting = Gauge("room_players_reconnecting", "Disconnected players still inside the reconnect grace period")
+heartbeat_expired = Counter("heartbeat_expired_total", "Clients dropped for missing heartbeats")
+
+# --- Database ---
+db_pool_size = Gauge("db_pool_size", "Connections the DB pool keeps open")
+db_pool_checked_out = Gauge("db_pool_checked_out", "DB connections currently in use")
+db_pool_overflow = Gauge("db_pool_overflow", "DB connections opened beyond the pool size")
+
+# --- Event loop ---
+loop_lag_seconds = Histogram(
+    "event_loop_lag_seconds", "How late the loop lag probe woke up",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0))
+loop_lag_quantile = Gauge(
+    "event_loop_lag_quantile_seconds", "Loop lag percentiles over the last minute", ("quantile",))
+loop_stalls = Counter("event_loop_stalls_total", "Times the loop was blocked past the stall threshold")
+
+# --- WireGuard ---
+wg_command_seconds = Histogram(
+    "wireguard_command_duration_seconds", "wg / wg-quick call duration", ("command",))
+wg_command_failures = Counter(
+    "wireguard_command_failures_total", "wg / wg-quick calls that failed or could not start", ("command",))
+
+
+class MetricsMiddleware:
+    """
+    Times every HTTP request. The route label is the matched path template
+    (/rooms/{room_id}/messages), never the raw path, so the number of series
+    stays bounded; requests that match no route are counted as "unmatched".
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        start = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = scope.get("route")
+            http_request_seconds.observe(
+                time.perf_counter() - start,
+                method=scope["method"], route=getattr(route, "path", "unmatched"), status=status)
+
+
+def instrument_event(namespace):
+    """
+    Times a Socket.IO handler, counts the ones that raise and runs it in a
+    root trace span. Goes under @sio.event so python-socketio registers the
+    wrapper under the handler's name.
+    """
+    def decorator(handler):
+        event = handler.__name__
+        params = inspect.signature(handler).parameters.values()
+        # python-socketio retries connect without `auth` on TypeError; pass only what the handler takes
+        accepts = None if any(p.kind == p.VAR_POSITIONAL for p in params) else len(params)
+
+        span_name = f"socketio {namespace} {event}"
+
+        @functools.wraps(handler)
+        async def wrapper(*args):
+            start = time.perf_counter()
+            span, token = tracing.start_span(span_name, "server", root=True)
+            error = None
+            try:
+                return await handler(*args[:accepts])
+            except Exception as e:
+                error = e
+                sio_event_errors.inc(namespace=namespace, event=event)
+                raise
+            finally:
+                sio_event_seconds.observe(time.perf_counter() - start, namespace=namespace, event=event)
+                tracing.end_span(span, token, error)
+        return wrapper
+    return decorator
+
+
+def command_label(args):
+    """'wg-quick up', 'wg set', ... without interface names or keys"""
+    args = [arg for arg in args if arg != "sudo"]
+    return " ".join(args[:2])
+
+
+router = APIRouter()
+
+
+@router.get("/metrics", include_in_schema=False)
+async def metrics_endpoint():
+    return PlainTextResponse(render(), media_type=CONTENT_TYPE)
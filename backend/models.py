@@ -5,6 +5,7 @@ from database.base import Base
 import re
 from passlib.context import CryptContext
 from typing import Optional, Tuple, Union
+import tracing
 
 # سياق تشفير كلمات المرور
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
@@ -31,10 +32,12 @@ class User(Base):
     network_config_user = relationship('network_config_user', back_populates='user')
 
     def set_password(self, password: str):
-        self.password_hash = pwd_context.hash(password)
+        with tracing.span("password.hash"):
+            self.password_hash = pwd_context.hash(password)
 
     def check_password(self, password: str) -> bool:
-        return pwd_context.verify(password, self.password_hash)
+        with tracing.span("password.verify"):
+            return pwd_context.verify(password, self.password_hash)
 
     @staticmethod
     def validate_username(username: str) -> bool:
@@ -0,0 +1,173 @@
+# profiler.py
+# On-demand sampling profiler for the running server. An admin starts it
+# for a bounded window (POST /admin/profile); a daemon thread then takes
+# the stack of every thread (event loop, thread pool workers, exporter,
+# watchdog) PROFILER_HZ times a second through sys._current_frames() and
+# counts identical stacks. When the window ends the counts are written as
+# collapsed stacks ("thread;outer;...;inner count" per line), which
+# flamegraph.pl, speedscope and inferno read directly.
+#
+# Nothing is installed while no profile is running: no thread, no hooks,
+# no sys.setprofile, so the disabled cost is zero. While running, each
+# sample holds the GIL for one walk over the live frames; the time spent
+# sampling is measured and reported as the profile's overhead.
+import collections
+import logging
+import os
+import re
+import sys
+import threading
+import time
+
+from config import settings
+from socket_logger import logs_dir
+
+logger = logging.getLogger(__name__)
+
+profile_dir = settings.PROFILE_DIR or os.path.join(logs_dir, 'profiles')
+
+STACK_DEPTH = 64  # frames kept per stack, innermost first
+MAX_STACKS = 20000  # distinct stacks per profile; further new stacks are counted under "[other]"
+KEEP_PROFILES = 10  # older collapsed files are removed
+# A thread whose innermost Python frame is in one of these modules is waiting, not working
+IDLE_MODULES = ("selectors.py", "threading.py", "queue.py")
+
+
+def thread_label(name):
+    """'ThreadPoolExecutor-0_3' -> 'ThreadPoolExecutor', so workers of one pool add up"""
+    return re.sub(r"-\d+(_\d+)?", "", name) or "thread"
+
+
+def frame_label(code):
+    path = code.co_filename.replace("\\", "/").split("/")
+    return f"{code.co_name} ({'/'.join(path[-2:])}:{code.co_firstlineno})"
+
+
+class Profile:
+    def __init__(self, hz, seconds, include_idle):
+        self.hz = hz
+        self.seconds = seconds
+        self.include_idle = include_idle
+        self.started = time.time()
+        self.finished = None
+        self.samples = 0
+        self.sampling_seconds = 0.0
+        self.counts = collections.Counter()
+        self.path = None
+
+    def status(self):
+        elapsed = (self.finished or time.time()) - self.started
+        return {
+            "running": self.finished is None,
+            "hz": self.hz,
+            "seconds": self.seconds,
+            "include_idle": self.include_idle,
+            "elapsed": round(elapsed, 3),
+            "samples": self.samples,
+            "stacks": len(self.counts),
+            "overhead": round(self.sampling_seconds / elapsed, 5) if elapsed > 0 else 0.0,
+            "file": os.path.basename(self.path) if self.path else None,
+        }
+
+    def collapsed(self):
+        return "".join(f"{stack} {count}\n" for stack, count in self.counts.most_common())
+
+
+class SamplingProfiler:
+    """
+    One profile at a time. start() is called on the event loop, so the
+    calling thread is the one labelled "event-loop" in the stacks.
+    """
+
+    def __init__(self):
+        self.current = None
+        self._thread = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._loop_thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, seconds=None, hz=None, include_idle=False):
+        seconds = min(seconds or settings.PROFILER_DEFAULT_SECONDS, settings.PROFILER_MAX_SECONDS)
+        hz = min(hz or settings.PROFILER_HZ, settings.PROFILER_MAX_HZ)
+        with self._lock:
+            if self.running:
+                raise RuntimeError("A profile is already running")
+            self._loop_thread = threading.get_ident()
+            self._stop.clear()
+            self.current = Profile(hz, seconds, include_idle)
+            self._thread = threading.Thread(target=self._run, args=(self.current,), name="profiler", daemon=True)
+            self._thread.start()
+        logger.info(f"Sampling profiler started: {hz} Hz for {seconds} s")
+        return self.current
+
+    def stop(self, timeout=5):
+        """Ends the window early; the profile is still written"""
+        self._stop.set()
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+        return self.current
+
+    def _run(self, profile):
+        interval = 1.0 / profile.hz
+        own = threading.get_ident()
+        deadline = time.monotonic() + profile.seconds
+        next_sample = time.monotonic()
+        try:
+            while not self._stop.is_set():
+                now = time.monotonic()
+                if now >= deadline:
+                    break
+                self._sample(profile, own)
+                profile.sampling_seconds += time.monotonic() - now
+                # Fixed schedule, so a slow sample does not shift the rate; missed ticks are skipped
+                next_sample += interval
+                if next_sample < time.monotonic():
+                    next_sample = time.monotonic() + interval
+                self._stop.wait(next_sample - time.monotonic())
+        except Exception:
+            logger.exception("Sampling profiler failed")
+        finally:
+            try:
+                self._write(profile)
+            except OSError as e:
+                logger.error(f"Could not write profile: {e}")
+            profile.finished = time.time()
+
+    def _sample(self, profile, own):
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        profile.samples += 1
+        for ident, frame in sys._current_frames().items():
+            if ident == own:
+                continue
+            if not profile.include_idle and os.path.basename(frame.f_code.co_filename) in IDLE_MODULES:
+                continue
+            stack = []
+            while frame is not None and len(stack) < STACK_DEPTH:
+                stack.append(frame_label(frame.f_code))
+                frame = frame.f_back
+            thread = "event-loop" if ident == self._loop_thread else thread_label(names.get(ident, "thread"))
+            stack.append(thread)
+            key = ";".join(reversed(stack))
+            if key not in profile.counts and len(profile.counts) >= MAX_STACKS:
+                key = f"{thread};[other]"
+            profile.counts[key] += 1
+
+    def _write(self, profile):
+        os.makedirs(profile_dir, exist_ok=True)
+        stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(profile.started))
+        path = os.path.join(profile_dir, f"profile-{stamp}-{int(profile.started * 1000) % 1000:03d}.collapsed")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(profile.collapsed())
+        profile.path = path
+        old = sorted(name for name in os.listdir(profile_dir) if name.endswith(".collapsed"))
+        for name in old[:-KEEP_PROFILES]:
+            os.remove(os.path.join(profile_dir, name))
+        logger.info(f"Sampling profiler wrote {profile.samples} samples, {len(profile.counts)} stacks to {path}")
+
+
+profiler = SamplingProfiler()
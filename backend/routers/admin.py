@@ -0,0 +1,280 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import PlainTextResponse
+from sqlalchemy import func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from typing import Optional
+import asyncio
+import heapq
+import logging
+import os
+import subprocess
+import time
+
+from config import settings
+from database.database import get_session, engine
+from models import Room, User, network_config, network_config_user
+from routers.friends import get_current_user
+from services.Wiregruad import WiregruadVPN
+from shared import client_rooms, last_heartbeat, pending_leaves, webrtc_rooms, webrtc_room_modes
+from helpers import HEARTBEAT_TIMEOUT
+from vpnserver.genrator import SUBNET_RANGE, PORT_RANGE, HOST_RANGE
+from profiler import profiler
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+vpn = WiregruadVPN()
+
+MAX_PAGE_SIZE = 200
+
+
+async def require_admin(current_user: User = Depends(get_current_user)) -> User:
+    # لا توجد أدوار في نموذج المستخدم، فالمشرفون هم الحسابات المذكورة في ADMIN_USERNAMES
+    if current_user.username not in settings.ADMIN_USERNAMES:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin access required")
+    return current_user
+
+
+def _key(value):
+    return value.decode() if isinstance(value, bytes) else value
+
+
+def _pool_state():
+    # بعض أنواع الـ pool (مثل NullPool في sqlite) لا تملك size / overflow
+    pool = engine.sync_engine.pool
+    state = {"class": type(pool).__name__}
+    for name in ("size", "checkedout", "overflow"):
+        if hasattr(pool, name):
+            state[name] = getattr(pool, name)()
+    return state
+
+
+@router.get("/overview")
+async def overview(admin: User = Depends(require_admin), db: AsyncSession = Depends(get_session)):
+    """أرقام إجمالية من الحالة في الذاكرة وعدد قليل من استعلامات COUNT، دون جلب الصفوف"""
+    now = time.time()
+    ages = [now - beat for beat in last_heartbeat.values()]
+
+    networks = dict((await db.execute(
+        select(network_config.is_active, func.count(network_config.id)).group_by(network_config.is_active)
+    )).all())
+    ports_used = (await db.execute(select(func.count(func.distinct(network_config.port))))).scalar() or 0
+    peers = (await db.execute(select(func.count(network_config_user.id)))).scalar() or 0
+    busiest = (await db.execute(
+        select(func.count(network_config_user.id))
+        .group_by(network_config_user.network_config_id)
+        .order_by(func.count(network_config_user.id).desc())
+        .limit(1)
+    )).scalar() or 0
+
+    return {
+        "sessions": len(client_rooms),
+        "rooms_with_sessions": len(client_rooms.by_room),
+        "reconnecting": len(pending_leaves),
+        "webrtc_rooms": len(webrtc_rooms),
+        "webrtc_peers": sum(len(members) for members in webrtc_rooms.values()),
+        "heartbeats": {
+            "clients": len(ages),
+            "max_age": round(max(ages), 3) if ages else None,
+            "stale": sum(1 for age in ages if age > HEARTBEAT_TIMEOUT),
+            "timeout": HEARTBEAT_TIMEOUT,
+        },
+        "db_pool": _pool_state(),
+        "allocators": {
+            "subnets": {"used": sum(networks.values()), "capacity": len(SUBNET_RANGE)},
+            "ports": {"used": ports_used, "capacity": len(PORT_RANGE)},
+            "hosts": {"busiest_network": busiest, "capacity_per_network": len(HOST_RANGE)},
+        },
+        "networks": {"active": networks.get(True, 0), "inactive": networks.get(False, 0) + networks.get(None, 0)},
+        "vpn_peers": peers,
+    }
+
+
+@router.get("/sessions")
+async def sessions(
+    after: Optional[int] = None,
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    admin: User = Depends(require_admin),
+):
+    """
+    الجلسات المتصلة مجمّعة حسب الغرفة، صفحة بعد صفحة بترتيب room_id.
+    تُقرأ من client_rooms.by_room فلا نمر على كل الجلسات لكل غرفة.
+    """
+    now = time.time()
+    candidates = (room_id for room_id in client_rooms.by_room if after is None or room_id > after)
+    page = heapq.nsmallest(limit + 1, candidates)
+    has_more = len(page) > limit
+    page = page[:limit]
+
+    reconnecting = {}
+    if pending_leaves:
+        wanted = set(page)
+        for room_id, username in list(pending_leaves):
+            if room_id in wanted:
+                reconnecting.setdefault(room_id, []).append(username)
+
+    rooms = []
+    for room_id in page:
+        voice = webrtc_rooms.get(room_id, {})
+        members = []
+        for sid in sorted(client_rooms.by_room.get(room_id, ())):
+            entry = client_rooms.get(sid)
+            if entry is None:
+                continue
+            beat = last_heartbeat.get(sid)
+            members.append({
+                "sid": sid,
+                "username": entry.get("username"),
+                "heartbeat_age": round(now - beat, 3) if beat is not None else None,
+                "stale": beat is None or now - beat > HEARTBEAT_TIMEOUT,
+                "voice": entry.get("username") in voice,
+            })
+        rooms.append({
+            "room_id": room_id,
+            "sessions": members,
+            "reconnecting": sorted(reconnecting.get(room_id, [])),
+            "voice_mode": webrtc_room_modes.get(room_id),
+        })
+
+    return {"rooms": rooms, "next_after": page[-1] if has_more else None}
+
+
+@router.get("/rooms")
+async def rooms(
+    after: int = 0,
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    admin: User = Depends(require_admin),
+    db: AsyncSession = Depends(get_session),
+):
+    """
+    الغرف من قاعدة البيانات (keyset على Room.id) مع شبكتها وعدد نظرائها،
+    والفرق بين النظراء المسجلين في القاعدة والموجودين فعلاً في النواة
+    """
+    result = await db.execute(
+        select(Room, network_config)
+        .outerjoin(network_config, Room.network_name == network_config.network_name)
+        .where(Room.id > after)
+        .order_by(Room.id)
+        .limit(limit + 1)
+    )
+    page = result.all()
+    has_more = len(page) > limit
+    page = page[:limit]
+
+    # مفاتيح نظراء شبكات هذه الصفحة فقط، باستعلام واحد
+    config_ids = [config.id for _, config in page if config is not None]
+    db_keys = {config_id: set() for config_id in config_ids}
+    if config_ids:
+        rows = await db.execute(
+            select(network_config_user.network_config_id, User.public_key)
+            .join(User, User.id == network_config_user.user_id)
+            .where(network_config_user.network_config_id.in_(config_ids))
+        )
+        for config_id, public_key in rows.all():
+            if public_key:
+                db_keys[config_id].add(_key(public_key))
+
+    kernel, kernel_error = None, None
+    if config_ids:
+        try:
+            kernel = await vpn.kernel_peers()
+        except (subprocess.CalledProcessError, OSError) as e:
+            kernel_error = str(e)
+            logger.warning(f"Could not read WireGuard peers: {e}")
+
+    rooms_list = []
+    for room, config in page:
+        item = {
+            "room_id": room.id,
+            "room_name": room.name,
+            "current_players": room.current_players,
+            "connected_sids": sorted(client_rooms.by_room.get(room.id, ())),
+            "network": None,
+        }
+        if config is not None:
+            keys = db_keys.get(config.id, set())
+            network = {
+                "network_name": config.network_name,
+                "server_ip": config.server_ip,
+                "port": config.port,
+                "is_active": config.is_active,
+                "peers": len(keys),
+            }
+            if kernel is not None:
+                kernel_keys = kernel.get(config.network_name)
+                network["interface_up"] = kernel_keys is not None
+                network["kernel_peers"] = len(kernel_keys or ())
+                network["missing_in_kernel"] = sorted(keys - (kernel_keys or set()))
+                network["unknown_in_kernel"] = sorted((kernel_keys or set()) - keys)
+            item["network"] = network
+        rooms_list.append(item)
+
+    return {
+        "rooms": rooms_list,
+        "next_after": page[-1][0].id if has_more else None,
+        "kernel_error": kernel_error,
+    }
+
+
+@router.get("/vpn")
+async def vpn_state(admin: User = Depends(require_admin), db: AsyncSession = Depends(get_session)):
+    """واجهات WireGuard في النواة مقارنة بالشبكات المفعلة في قاعدة البيانات"""
+    diagnosis = await vpn.diagnose()
+    active = set((await db.execute(
+        select(network_config.network_name).where(network_config.is_active == True)
+    )).scalars().all())
+    diagnosis["active_networks"] = len(active)
+    if diagnosis["ok"]:
+        interfaces = set(diagnosis["interfaces"])
+        diagnosis["down_in_kernel"] = sorted(active - interfaces)
+        diagnosis["not_active_in_db"] = sorted(interfaces - active)
+    return diagnosis
+
+
+@router.post("/profile", status_code=status.HTTP_202_ACCEPTED)
+async def start_profile(
+    seconds: Optional[int] = Query(None, ge=1),
+    hz: Optional[int] = Query(None, ge=1),
+    include_idle: bool = False,
+    admin: User = Depends(require_admin),
+):
+    """تشغيل الـ sampling profiler لمدة محدودة؛ يُستدعى من حلقة الأحداث فتُعرَّف مكدساتها باسم event-loop"""
+    try:
+        profile = profiler.start(seconds=seconds, hz=hz, include_idle=include_idle)
+    except RuntimeError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    logger.info(f"Profile started by {admin.username}")
+    return profile.status()
+
+
+@router.get("/profile")
+async def profile_status(admin: User = Depends(require_admin)):
+    if profiler.current is None:
+        return {"running": False}
+    return profiler.current.status()
+
+
+@router.post("/profile/stop")
+async def stop_profile(admin: User = Depends(require_admin)):
+    if not profiler.running:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="No profile is running")
+    # الانتظار في thread حتى لا تتوقف الحلقة أثناء كتابة الملف
+    profile = await asyncio.to_thread(profiler.stop)
+    return profile.status()
+
+
+@router.get("/profile/collapsed", response_class=PlainTextResponse)
+async def profile_collapsed(admin: User = Depends(require_admin)):
+    """آخر profile مكتمل بصيغة collapsed stacks (flamegraph.pl / speedscope / inferno)"""
+    profile = profiler.current
+    if profile is None or profile.finished is None or profile.path is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No finished profile")
+    content = await asyncio.to_thread(_read, profile.path)
+    return PlainTextResponse(content, headers={
+        "Content-Disposition": f'attachment; filename="{os.path.basename(profile.path)}"'})
+
+
+def _read(path):
+    with open(path, encoding="utf-8") as f:
+        return f.read()
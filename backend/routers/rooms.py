@@ -9,6 +9,7 @@ import random
 import logging
 from routers.friends import get_current_user
 from shared import sio, NAMESPACE
+from helpers import message_to_dict
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -324,6 +325,36 @@ async def leave_room(request: Request, current_user: User = Depends(get_current_
     await sio.emit('update_rooms', {}, namespace=NAMESPACE)
     return {"message": "left"}
 
+# أقصى عدد رسائل في صفحة سجل المحادثة
+CHAT_HISTORY_PAGE_MAX = 100
+
+@router.get("/{room_id}/messages")
+async def get_chat_history(
+    room_id: int,
+    before_id: int = None,
+    limit: int = 50,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_session)
+):
+    """صفحة من رسائل الغرفة الأقدم من before_id، مرتبة من الأقدم إلى الأحدث"""
+    member = (await db.execute(
+        select(RoomPlayer).filter_by(room_id=room_id, player_username=current_user.username)
+    )).scalars().first()
+    if not member:
+        raise HTTPException(status_code=403, detail="You are not in this room")
+
+    limit = max(1, min(limit, CHAT_HISTORY_PAGE_MAX))
+    query = select(ChatMessage).filter(ChatMessage.room_id == room_id)
+    if before_id is not None:
+        query = query.filter(ChatMessage.id < before_id)
+    # صف إضافي لمعرفة هل توجد رسائل أقدم
+    rows = (await db.execute(query.order_by(ChatMessage.id.desc()).limit(limit + 1))).scalars().all()
+
+    return {
+        "messages": [message_to_dict(m) for m in reversed(rows[:limit])],
+        "has_more": len(rows) > limit
+    }
+
 @router.get("/vpn_status")
 async def vpn_status(current_user: User = Depends(get_current_user)):
     try:
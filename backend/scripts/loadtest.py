@@ -0,0 +1,399 @@
+#!/usr/bin/env python3
+"""
+Load test: how many concurrent players one backend node holds
+-------------------------------------------------------------
+Simulated clients go through what the desktop client does:
+
+    register -> login -> list rooms -> create_room (one host per room) or
+    join_room -> Socket.IO connect / server_ready -> join -> heartbeat
+    every --heartbeat s and chat at --chat-rate messages per minute for
+    --session s -> leave, or (--abrupt fraction) drop the connection
+
+Clients start evenly over --ramp seconds. Latency is measured per
+operation: HTTP round trips; connect to server_ready; join to join_success;
+heartbeat and leave through Socket.IO acks (the handler has finished);
+chat from send_message to the sender receiving its own new_message.
+
+--serve starts the app in this process on a free port with the
+SimulatedRunner from services/command_runner.py in place of wg / wg-quick
+(--wg-latency ms per call, blocking like the real subprocess call) and
+config files in a temp directory, so only the database is real. Without --serve, --url
+points at a running node.
+
+The JSON report (--out) holds the parameters, the git commit and, per
+operation, count, errors, throughput and p50/p95/p99/max; --compare
+prints the change against an earlier report. The server's /metrics
+event-loop lag is included when available.
+
+Needs httpx and aiohttp (python-socketio's asyncio client).
+
+Usage:
+    python scripts/loadtest.py --serve --clients 500 --ramp 60 --session 120 --out lt.json
+    python scripts/loadtest.py --url http://10.0.0.5:5000 --clients 2000 --compare lt.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from collections import defaultdict
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import httpx
+import socketio
+
+NAMESPACE = "/game"
+OPERATIONS = ("register", "login", "list_rooms", "create_room", "join_room", "connect",
+              "join", "heartbeat", "chat", "leave")
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(lambda: defaultdict(int))
+        self.connected = 0
+        self.peak_connected = 0
+
+    def ok(self, op, seconds):
+        self.latencies[op].append(seconds)
+
+    def error(self, op, reason):
+        self.errors[op][str(reason)[:120]] += 1
+
+    def client_connected(self):
+        self.connected += 1
+        self.peak_connected = max(self.peak_connected, self.connected)
+
+    def client_gone(self):
+        self.connected -= 1
+
+    async def time(self, op, awaitable):
+        start = time.perf_counter()
+        try:
+            result = await awaitable
+        except Exception as e:
+            self.error(op, f"{type(e).__name__}: {e}")
+            raise
+        self.ok(op, time.perf_counter() - start)
+        return result
+
+    def report(self, elapsed):
+        operations = {}
+        for op in OPERATIONS:
+            samples = sorted(self.latencies.get(op, ()))
+            errors = sum(self.errors[op].values()) if op in self.errors else 0
+            if not samples and not errors:
+                continue
+            total = len(samples) + errors
+            operations[op] = {
+                "count": len(samples),
+                "errors": errors,
+                "error_rate": round(errors / total, 4),
+                "per_second": round(len(samples) / elapsed, 2),
+                **{name: round(percentile(samples, q) * 1000, 1) for name, q in
+                   (("p50_ms", 0.5), ("p95_ms", 0.95), ("p99_ms", 0.99), ("max_ms", 1.0))},
+                "error_reasons": dict(self.errors[op]) if op in self.errors else {},
+            }
+        return operations
+
+
+def percentile(samples, q):
+    if not samples:
+        return 0.0
+    return samples[min(int(q * len(samples)), len(samples) - 1)]
+
+
+class RoomGroups:
+    """Clients i*room_size .. (i+1)*room_size-1 share a room; the first creates it"""
+
+    def __init__(self, room_size):
+        self.room_size = room_size
+        self._rooms = defaultdict(lambda: asyncio.get_running_loop().create_future())
+
+    def is_host(self, index):
+        return index % self.room_size == 0
+
+    def room(self, index):
+        return self._rooms[index // self.room_size]
+
+
+class SimulatedClient:
+    def __init__(self, index, args, run_id, http, recorder, groups):
+        self.index = index
+        self.args = args
+        self.username = f"lt{run_id}_{index}"
+        self.password = "Load-test-1"
+        self.http = http
+        self.rec = recorder
+        self.groups = groups
+        self.headers = {}
+        self.room_id = None
+        self.sio = None
+        self._join = None
+        self._server_ready = None
+        self._chat_sent = {}
+        self._counted = False
+
+    async def run(self):
+        try:
+            await self._lobby()
+            await self._enter_room()
+            await self._play()
+        except Exception:
+            # Already recorded against the operation that failed
+            pass
+        finally:
+            if self.groups.is_host(self.index) and not self.groups.room(self.index).done():
+                self.groups.room(self.index).set_exception(RuntimeError("host failed"))
+            if self._counted:
+                self.rec.client_gone()
+            if self.sio is not None and self.sio.connected:
+                await self.sio.disconnect()
+
+    async def _http(self, op, method, path, expect=(200, 201), **kwargs):
+        async def call():
+            response = await self.http.request(method, path, headers=self.headers, **kwargs)
+            if response.status_code not in expect:
+                raise RuntimeError(f"HTTP {response.status_code}")
+            return response.json()
+        return await self.rec.time(op, call())
+
+    async def _lobby(self):
+        await self._http("register", "POST", "/auth/register", json={
+            "username": self.username, "email": f"{self.username}@loadtest.invalid", "password": self.password})
+        token = await self._http("login", "POST", "/auth/token",
+                                 data={"username": self.username, "password": self.password})
+        self.headers = {"Authorization": f"Bearer {token['access_token']}"}
+        await self._http("list_rooms", "GET", "/rooms/")
+
+    async def _enter_room(self):
+        room = self.groups.room(self.index)
+        if self.groups.is_host(self.index):
+            created = await self._http("create_room", "POST", "/rooms/create_room",
+                                       json={"name": f"{self.username}-room", "max_players": self.groups.room_size})
+            room.set_result(created["room_id"])
+        try:
+            self.room_id = await asyncio.wait_for(asyncio.shield(room), timeout=self.args.ramp + 60)
+        except Exception as e:
+            self.rec.error("join_room", f"no room: {e}")
+            raise
+        await self._http("join_room", "POST", "/rooms/join_room", json={"room_id": self.room_id})
+
+        loop = asyncio.get_running_loop()
+        self._server_ready = loop.create_future()
+        self._join = loop.create_future()
+        self.sio = socketio.AsyncClient(reconnection=False)
+        self.sio.on("server_ready", self._on_server_ready, namespace=NAMESPACE)
+        self.sio.on("join_success", self._on_join_success, namespace=NAMESPACE)
+        self.sio.on("new_message", self._on_new_message, namespace=NAMESPACE)
+
+        async def connect():
+            await self.sio.connect(self.args.url, namespaces=[NAMESPACE], transports=["websocket"])
+            await asyncio.wait_for(self._server_ready, self.args.timeout)
+        await self.rec.time("connect", connect())
+        self.rec.client_connected()
+        self._counted = True
+
+        async def join():
+            await self.sio.emit("join", {"room_id": self.room_id, "username": self.username}, namespace=NAMESPACE)
+            response = await asyncio.wait_for(self._join, self.args.timeout)
+            if not response.get("success"):
+                raise RuntimeError(response.get("error"))
+        await self.rec.time("join", join())
+
+    async def _play(self):
+        end = time.monotonic() + self.args.session * random.uniform(0.75, 1.25)
+        next_heartbeat = time.monotonic() + random.uniform(0, self.args.heartbeat)
+        chat_gap = 60 / self.args.chat_rate if self.args.chat_rate > 0 else None
+        next_chat = time.monotonic() + random.expovariate(1 / chat_gap) if chat_gap else float("inf")
+        data = {"room_id": self.room_id, "username": self.username}
+        while True:
+            now = time.monotonic()
+            if now >= end:
+                break
+            if now >= next_heartbeat:
+                await self._call("heartbeat", data)
+                next_heartbeat = now + self.args.heartbeat
+            if now >= next_chat:
+                await self._chat()
+                next_chat = now + random.expovariate(1 / chat_gap)
+            await asyncio.sleep(max(0.0, min(next_heartbeat, next_chat, end) - time.monotonic()))
+        # Abrupt clients just close the connection; the server's disconnect path handles them
+        if random.random() >= self.args.abrupt:
+            await self._call("leave", data)
+
+    async def _call(self, op, data):
+        try:
+            await self.rec.time(op, self.sio.call(op, data, namespace=NAMESPACE, timeout=self.args.timeout))
+        except Exception:
+            pass
+
+    async def _chat(self):
+        text = f"{self.username} {uuid.uuid4().hex[:8]}"
+        self._chat_sent[text] = time.perf_counter()
+        await self.sio.emit("send_message", {"room_id": self.room_id, "username": self.username, "message": text},
+                            namespace=NAMESPACE)
+        # Unanswered messages count as errors after the timeout
+        asyncio.get_running_loop().call_later(self.args.timeout, self._chat_timed_out, text)
+
+    def _chat_timed_out(self, text):
+        if self._chat_sent.pop(text, None) is not None:
+            self.rec.error("chat", "no new_message echo")
+
+    async def _on_server_ready(self, data=None):
+        if not self._server_ready.done():
+            self._server_ready.set_result(data)
+
+    async def _on_join_success(self, data):
+        if not self._join.done():
+            self._join.set_result(data)
+
+    async def _on_new_message(self, data):
+        sent = self._chat_sent.pop(data.get("message"), None)
+        if sent is not None:
+            self.rec.ok("chat", time.perf_counter() - sent)
+
+
+async def serve(args):
+    """The real app on a free local port; returns the uvicorn server"""
+    import uvicorn
+
+    os.environ["CONFIG_DIR"] = tempfile.mkdtemp(prefix="loadtest-wg-")
+    from app_setup import socket_app
+    from services.command_runner import SimulatedRunner, set_runner
+    set_runner(SimulatedRunner(latency=args.wg_latency / 1000, seed=args.seed))
+
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    config = uvicorn.Config(socket_app, host="127.0.0.1", port=port, log_level="warning", ws="websockets")
+    server = uvicorn.Server(config)
+    asyncio.get_running_loop().create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+    args.url = f"http://127.0.0.1:{port}"
+    return server
+
+
+async def scrape_server(http):
+    """Loop lag quantiles from /metrics, if the node exposes it"""
+    try:
+        response = await http.get("/metrics")
+    except httpx.HTTPError:
+        return {}
+    if response.status_code != 200:
+        return {}
+    lag = {}
+    for line in response.text.splitlines():
+        if line.startswith("event_loop_lag_quantile_seconds{"):
+            quantile = line.split('quantile="')[1].split('"')[0]
+            lag[f"loop_lag_q{quantile}_ms"] = round(float(line.rsplit(" ", 1)[1]) * 1000, 1)
+        elif line.startswith("event_loop_stalls_total "):
+            lag["loop_stalls"] = int(float(line.rsplit(" ", 1)[1]))
+    return lag
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True,
+                                       cwd=os.path.dirname(os.path.abspath(__file__))).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_report(report):
+    print(f"{report['clients']} clients, {report['elapsed_s']} s, peak {report['peak_connected']} connected, "
+          f"commit {report['commit']}")
+    print(f"{'operation':<12}{'count':>8}{'err %':>8}{'/s':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}  (ms)")
+    for op, row in report["operations"].items():
+        print(f"{op:<12}{row['count']:>8}{row['error_rate'] * 100:>8.2f}{row['per_second']:>9.1f}"
+              f"{row['p50_ms']:>9.1f}{row['p95_ms']:>9.1f}{row['p99_ms']:>9.1f}{row['max_ms']:>9.1f}")
+        for reason, count in row["error_reasons"].items():
+            print(f"    {count:>6} x {reason}")
+    if report.get("server"):
+        print("server: " + ", ".join(f"{key} {value}" for key, value in report["server"].items()))
+
+
+def print_comparison(old, new):
+    print(f"\nvs {old.get('commit')} ({old['clients']} clients):")
+    print(f"{'operation':<12}{'p95 before':>12}{'p95 now':>10}{'change':>9}{'/s before':>11}{'/s now':>9}{'err % now':>11}")
+    for op, row in new["operations"].items():
+        before = old["operations"].get(op)
+        if not before:
+            continue
+        change = (row["p95_ms"] - before["p95_ms"]) / before["p95_ms"] * 100 if before["p95_ms"] else 0.0
+        print(f"{op:<12}{before['p95_ms']:>12.1f}{row['p95_ms']:>10.1f}{change:>+8.0f}%"
+              f"{before['per_second']:>11.1f}{row['per_second']:>9.1f}{row['error_rate'] * 100:>11.2f}")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Backend load test")
+    parser.add_argument("--url", default="http://127.0.0.1:5000")
+    parser.add_argument("--serve", action="store_true", help="run the app in this process with simulated WireGuard")
+    parser.add_argument("--wg-latency", type=float, default=30, help="simulated wg / wg-quick duration, ms (--serve)")
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--room-size", type=int, default=4)
+    parser.add_argument("--ramp", type=float, default=30, help="seconds over which clients start")
+    parser.add_argument("--session", type=float, default=60, help="seconds each client stays in its room (+-25%%)")
+    parser.add_argument("--heartbeat", type=float, default=30, help="heartbeat interval, s")
+    parser.add_argument("--chat-rate", type=float, default=2, help="messages per client per minute")
+    parser.add_argument("--abrupt", type=float, default=0.2, help="fraction of clients that drop instead of leaving")
+    parser.add_argument("--timeout", type=float, default=15, help="per-operation timeout, s")
+    parser.add_argument("--http-connections", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--out", help="write the JSON report here")
+    parser.add_argument("--compare", help="earlier JSON report to compare with")
+    args = parser.parse_args()
+    random.seed(args.seed)
+
+    server = await serve(args) if args.serve else None
+    recorder = Recorder()
+    groups = RoomGroups(args.room_size)
+    run_id = uuid.uuid4().hex[:6]
+    limits = httpx.Limits(max_connections=args.http_connections, max_keepalive_connections=args.http_connections)
+    async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=args.timeout) as http:
+        start = time.perf_counter()
+
+        async def launch(index):
+            await asyncio.sleep(index * args.ramp / max(args.clients, 1))
+            await SimulatedClient(index, args, run_id, http, recorder, groups).run()
+
+        await asyncio.gather(*(launch(i) for i in range(args.clients)))
+        elapsed = time.perf_counter() - start
+        server_stats = await scrape_server(http)
+
+    if server:
+        server.should_exit = True
+        await asyncio.sleep(0.2)
+
+    report = {
+        "commit": git_commit(),
+        "started": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "params": {key: value for key, value in vars(args).items() if key not in ("out", "compare")},
+        "clients": args.clients,
+        "elapsed_s": round(elapsed, 1),
+        "peak_connected": recorder.peak_connected,
+        "operations": recorder.report(elapsed),
+        "server": server_stats,
+    }
+    print_report(report)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            print_comparison(json.load(f), report)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
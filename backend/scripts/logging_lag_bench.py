@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Event-loop lag from socket event logging: previous setup vs queue pipeline
+--------------------------------------------------------------------------
+A coroutine feeds socket events (90% heartbeats, the rest connect / join /
+message / leave) at --rate per second through the socket_logger functions,
+the way the handlers in sio_events.py call them, while a probe coroutine
+sleeps 1 ms at a time and records how late it wakes up.
+
+"before" rebuilds the previous configuration in this process: synchronous
+FileHandler and console handler at DEBUG, f-string messages, the full
+environ on connect and client_rooms / last_heartbeat dumped on every
+connect and disconnect. "after" is socket_logger itself (QueueHandler,
+JSON, rotation, heartbeat sampling) at INFO and at DEBUG. CPU is for the
+whole process, listener thread included. Console output
+goes to /dev/null in all runs, so only formatting and I/O cost is measured.
+
+Usage:
+    python scripts/logging_lag_bench.py --rate 5000 --seconds 5 --clients 2000
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+WORK_DIR = tempfile.mkdtemp()
+os.environ["SOCKET_LOG_FILE"] = os.path.join(WORK_DIR, "after.log")
+sys.stderr = open(os.devnull, "w")
+
+
+def legacy_functions(path):
+    """Previous socket_logger.py, on its own logger"""
+    logger = logging.getLogger("socket_events_before")
+    logger.setLevel(logging.DEBUG)
+    logger.propagate = False
+    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    for handler in (logging.FileHandler(path), logging.StreamHandler(open(os.devnull, "w"))):
+        handler.setLevel(logging.DEBUG)
+        handler.setFormatter(formatter)
+        logger.addHandler(handler)
+
+    def log_connection(sid, environ):
+        logger.info(f"New connection - SID: {sid}")
+        logger.debug(f"Connection environment: {environ}")
+
+    def log_disconnection(sid, client_rooms):
+        logger.info(f"Disconnection - SID: {sid}")
+        logger.debug(f"Client rooms state: {client_rooms}")
+
+    def log_event(name):
+        return lambda sid, data: logger.info(f"{name} - SID: {sid}, Data: {data}")
+
+    def log_heartbeat(sid, data):
+        logger.debug(f"Heartbeat - SID: {sid}, Data: {data}")
+
+    def log_debug(message, data=None):
+        if data:
+            logger.debug(f"{message} - Data: {data}")
+        else:
+            logger.debug(message)
+
+    return {"connection": log_connection, "disconnection": log_disconnection, "heartbeat": log_heartbeat,
+            "join": log_event("Join event"), "message": log_event("New message"),
+            "leave": log_event("Leave event"), "debug": log_debug}
+
+
+def pipeline_functions():
+    import socket_logger
+    return socket_logger, {"connection": socket_logger.log_connection,
+                           "disconnection": socket_logger.log_disconnection,
+                           "heartbeat": socket_logger.log_heartbeat, "join": socket_logger.log_join_event,
+                           "message": socket_logger.log_message, "leave": socket_logger.log_leave_event,
+                           "debug": socket_logger.log_debug}
+
+
+def make_state(clients):
+    client_rooms = {f"sid{i:05d}": {"username": f"user{i}", "room_id": i % 300} for i in range(clients)}
+    last_heartbeat = {sid: time.time() for sid in client_rooms}
+    environ = {f"HTTP_HEADER_{i}": "x" * 40 for i in range(30)}
+    environ.update({"REMOTE_ADDR": "10.0.0.1", "HTTP_USER_AGENT": "python-socketio", "QUERY_STRING": "EIO=4"})
+    return client_rooms, last_heartbeat, environ
+
+
+async def run(log, args, state):
+    client_rooms, last_heartbeat, environ = state
+    sids = list(client_rooms)
+    lags = []
+    stop = asyncio.Event()
+
+    async def probe():
+        while not stop.is_set():
+            start = time.perf_counter()
+            await asyncio.sleep(0.001)
+            lags.append((time.perf_counter() - start - 0.001) * 1000)
+
+    async def feed():
+        tick = 0.01
+        per_tick = max(1, int(args.rate * tick))
+        end = time.perf_counter() + args.seconds
+        n = 0
+        while time.perf_counter() < end:
+            for _ in range(per_tick):
+                sid = sids[n % len(sids)]
+                kind = n % 20
+                if kind < 18:
+                    log["heartbeat"](sid, {"room_id": client_rooms[sid]["room_id"], "username": client_rooms[sid]["username"]})
+                elif n % 40 == 18:
+                    log["connection"](sid, environ)
+                    log["debug"]("Sending server_ready event", {"sid": sid})
+                    if log.get("legacy"):
+                        log["debug"]("Current client_rooms state", client_rooms)
+                        log["debug"]("Current last_heartbeat state", last_heartbeat)
+                    else:
+                        log["debug"]("Current connection counts", {"in_rooms": len(client_rooms), "tracked": len(last_heartbeat)})
+                elif n % 40 == 19:
+                    log["join"](sid, {"room_id": 1, "username": "alice"})
+                    log["message"](sid, {"room_id": 1, "username": "alice", "message": "hello"})
+                elif n % 40 == 38:
+                    log["disconnection"](sid, client_rooms)
+                else:
+                    log["leave"](sid, {"room_id": 1, "username": "alice"})
+                n += 1
+            await asyncio.sleep(tick)
+        stop.set()
+        return n
+
+    cpu = time.process_time()
+    _, events = await asyncio.gather(probe(), feed())
+    cpu = time.process_time() - cpu
+    lags.sort()
+    return events, cpu, statistics.mean(lags), lags[int(len(lags) * 0.99)], lags[-1]
+
+
+def report(label, result, args):
+    events, cpu, mean, p99, worst = result
+    print(f"{label:<26} {events / args.seconds:7.0f} ev/s  CPU {cpu / args.seconds * 100:5.1f}%  "
+          f"loop lag mean {mean:6.2f} ms  p99 {p99:6.2f} ms  max {worst:7.2f} ms", file=sys.stdout)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Socket logging event-loop lag benchmark")
+    parser.add_argument("--rate", type=int, default=5000, help="socket events per second")
+    parser.add_argument("--seconds", type=int, default=5)
+    parser.add_argument("--clients", type=int, default=2000, help="size of client_rooms / last_heartbeat")
+    args = parser.parse_args()
+    state = make_state(args.clients)
+
+    print(f"{args.rate} events/s for {args.seconds} s, {args.clients} connected clients", file=sys.stdout)
+    legacy = legacy_functions(os.path.join(WORK_DIR, "before.log"))
+    legacy["legacy"] = True
+    report("before: sync, DEBUG", asyncio.run(run(legacy, args, state)), args)
+
+    socket_logger, pipeline = pipeline_functions()
+    for level in ("INFO", "DEBUG"):
+        socket_logger.socket_logger.setLevel(level)
+        report(f"after: queue, {level}", asyncio.run(run(pipeline, args, state)), args)
+        # Drain the listener so the next run starts with an empty queue
+        socket_logger._listener.stop()
+        socket_logger._listener.start()
+    for name in ("before.log", "after.log"):
+        print(f"{name}: {os.path.getsize(os.path.join(WORK_DIR, name)) / 2 ** 20:.1f} MB", file=sys.stdout)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Cost of the event-loop watchdog
+-------------------------------
+Runs the same busy loop (--tasks coroutines each doing --switches
+asyncio.sleep(0) round trips, roughly what many small Socket.IO handlers
+look like) without and with LoopWatchdog at the production settings, and
+reports wall time and process CPU for both. Then blocks the loop with
+time.sleep for --stall ms to show the report it produces.
+
+Usage:
+    python scripts/loop_watchdog_bench.py --tasks 2000 --switches 200 --stall 250
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from loop_watchdog import LoopWatchdog
+
+
+class Collect(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+async def workload(tasks, switches):
+    async def worker():
+        for _ in range(switches):
+            await asyncio.sleep(0)
+    await asyncio.gather(*(worker() for _ in range(tasks)))
+
+
+async def timed(args, watchdog):
+    if watchdog:
+        watchdog.start()
+    wall, cpu = time.perf_counter(), time.process_time()
+    await workload(args.tasks, args.switches)
+    wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+    if watchdog:
+        await watchdog.stop()
+    return wall, cpu
+
+
+def handle_stall(stall_ms):
+    time.sleep(stall_ms / 1000)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Loop watchdog overhead benchmark")
+    parser.add_argument("--tasks", type=int, default=2000)
+    parser.add_argument("--switches", type=int, default=200)
+    parser.add_argument("--stall", type=int, default=250, help="blocking call length, ms")
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    stall_logger = logging.getLogger("loop_stalls_bench")
+    stall_logger.propagate = False
+    collect = Collect()
+    stall_logger.addHandler(collect)
+    logging.getLogger("loop_watchdog").disabled = True
+
+    results = {"without": [], "with": []}
+    for _ in range(args.rounds):
+        results["without"].append(await timed(args, None))
+        results["with"].append(await timed(args, LoopWatchdog(stall_logger=stall_logger)))
+    for name, runs in results.items():
+        wall, cpu = min(runs)
+        print(f"{name:<8} watchdog  wall {wall * 1000:7.0f} ms   cpu {cpu * 1000:7.0f} ms")
+    base, watched = min(results["without"])[0], min(results["with"])[0]
+    print(f"overhead {(watched - base) / base * 100:+.1f}% wall")
+
+    watchdog = LoopWatchdog(stall_logger=stall_logger)
+    watchdog.start()
+    await asyncio.sleep(0.2)
+    handle_stall(args.stall)
+    await asyncio.sleep(0.2)
+    await watchdog.stop()
+    for record in collect.records:
+        print(f"stall reported: {record.blocked_ms} ms, {len(record.stacks)} stack(s); innermost frames:")
+        print("".join(record.stacks[0].splitlines(keepends=True)[-4:]), end="")
+    if not collect.records:
+        print("stall not reported")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
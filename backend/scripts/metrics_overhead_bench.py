@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Cost of the /metrics instrumentation
+------------------------------------
+HTTP: GET /rooms/{room_id} on a bare FastAPI app, driven straight through
+ASGI (no sockets, so the middleware is not hidden behind network time),
+with and without MetricsMiddleware. Socket.IO: a trivial handler awaited
+directly, with and without @instrument_event. Scrape: time to render the
+registry once every route / event series exists.
+
+Usage:
+    python scripts/metrics_overhead_bench.py --requests 20000 --events 200000
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from fastapi import FastAPI
+
+import metrics
+
+
+def make_app(instrumented):
+    app = FastAPI()
+
+    @app.get("/rooms/{room_id}")
+    async def room(room_id: int):
+        return {"id": room_id, "name": "room"}
+
+    if instrumented:
+        app.add_middleware(metrics.MetricsMiddleware)
+    return app
+
+
+async def drive_http(app, count):
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    start = time.perf_counter()
+    for i in range(count):
+        scope = {"type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+                 "scheme": "http", "path": f"/rooms/{i % 50}", "raw_path": f"/rooms/{i % 50}".encode(),
+                 "root_path": "", "query_string": b"", "headers": [], "client": ("127.0.0.1", 1),
+                 "server": ("127.0.0.1", 80)}
+        await app(scope, receive, send)
+    return (time.perf_counter() - start) / count * 1e6
+
+
+async def drive_events(handler, count):
+    start = time.perf_counter()
+    for _ in range(count):
+        await handler("sid", {"room_id": 1})
+    return (time.perf_counter() - start) / count * 1e6
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Metrics overhead benchmark")
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--events", type=int, default=200000)
+    args = parser.parse_args()
+
+    plain_app, instrumented_app = make_app(False), make_app(True)
+    await drive_http(plain_app, 1000)
+    await drive_http(instrumented_app, 1000)
+    # alternating rounds, best of each, so drift on the machine hits both sides
+    plain = instrumented = float("inf")
+    for _ in range(5):
+        plain = min(plain, await drive_http(plain_app, args.requests // 5))
+        instrumented = min(instrumented, await drive_http(instrumented_app, args.requests // 5))
+    print(f"HTTP request       plain {plain:7.1f} us   with middleware {instrumented:7.1f} us   "
+          f"overhead {instrumented - plain:5.1f} us ({(instrumented - plain) / plain * 100:4.1f}%)")
+
+    async def heartbeat(sid, data):
+        return None
+
+    timed = metrics.instrument_event("/game")(heartbeat)
+    plain = await drive_events(heartbeat, args.events)
+    instrumented = await drive_events(timed, args.events)
+    print(f"Socket.IO handler  plain {plain:7.2f} us   instrumented    {instrumented:7.2f} us   "
+          f"overhead {instrumented - plain:5.2f} us")
+
+    for event in ("connect", "disconnect", "join", "leave", "heartbeat", "sync_players",
+                  "send_message", "check_player", "start_game"):
+        metrics.sio_event_seconds.observe(0.001, namespace="/game", event=event)
+    for route in range(20):
+        for status in (200, 304, 404):
+            metrics.http_request_seconds.observe(0.001, method="GET", route=f"/route{route}", status=status)
+    start = time.perf_counter()
+    for _ in range(100):
+        body = metrics.render()
+    scrape = (time.perf_counter() - start) / 100 * 1000
+    print(f"/metrics render    {scrape:.2f} ms for {body.count(chr(10))} lines")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Minimal OTLP/HTTP trace collector
+---------------------------------
+Accepts the OTLP/JSON batches tracing.py POSTs (TRACE_EXPORTER=otlp) on
+/v1/traces, and prints every finished trace as an indented span tree with
+durations, so a slow request shows where its time went (SQL, wg, bcrypt)
+without running Jaeger or an OpenTelemetry collector. It can also replay a
+traces.jsonl file written by the file exporter.
+
+Usage:
+    python scripts/trace_collector.py --port 4318
+    TRACE_EXPORTER=otlp TRACE_SAMPLE_RATE=1 uvicorn app_setup:app_sio
+    python scripts/trace_collector.py --file logs/traces.jsonl --min-ms 50
+"""
+
+import argparse
+import json
+import threading
+import time
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+QUIET_SECONDS = 2.0  # a trace is printed once no span has arrived for it for this long
+
+
+def _value(value):
+    return next(iter(value.values()), "")
+
+
+def spans_from(payload):
+    for resource in payload.get("resourceSpans", []):
+        for scope in resource.get("scopeSpans", []):
+            for span in scope.get("spans", []):
+                yield {
+                    "trace_id": span["traceId"],
+                    "span_id": span["spanId"],
+                    "parent_id": span.get("parentSpanId") or None,
+                    "name": span["name"],
+                    "start": int(span["startTimeUnixNano"]),
+                    "ms": (int(span["endTimeUnixNano"]) - int(span["startTimeUnixNano"])) / 1e6,
+                    "attributes": {a["key"]: _value(a["value"]) for a in span.get("attributes", [])},
+                    "error": span.get("status", {}).get("message"),
+                }
+
+
+def render(spans):
+    """Indented tree of one trace, children in start order"""
+    ids = {span["span_id"] for span in spans}
+    children = defaultdict(list)
+    for span in sorted(spans, key=lambda s: s["start"]):
+        children[span["parent_id"] if span["parent_id"] in ids else None].append(span)
+
+    lines = []
+
+    def walk(span, depth):
+        detail = span["attributes"].get("db.statement") or span["attributes"].get("command") or ""
+        detail = " ".join(detail.split())[:100]
+        error = f"  !! {span['error']}" if span["error"] else ""
+        lines.append(f"{'  ' * depth}{span['ms']:9.2f} ms  {span['name']}  {detail}{error}")
+        for child in children[span["span_id"]]:
+            walk(child, depth + 1)
+
+    for root in children[None]:
+        walk(root, 0)
+    return "\n".join(lines)
+
+
+class Collector:
+    def __init__(self, min_ms):
+        self.min_ms = min_ms
+        self.traces = defaultdict(list)
+        self.last_seen = {}
+        self.lock = threading.Lock()
+
+    def add(self, payload):
+        now = time.monotonic()
+        with self.lock:
+            for span in spans_from(payload):
+                self.traces[span["trace_id"]].append(span)
+                self.last_seen[span["trace_id"]] = now
+
+    def print_finished(self, quiet=QUIET_SECONDS):
+        now = time.monotonic()
+        with self.lock:
+            done = [trace_id for trace_id, seen in self.last_seen.items() if now - seen >= quiet]
+            finished = [(trace_id, self.traces.pop(trace_id)) for trace_id in done]
+            for trace_id in done:
+                del self.last_seen[trace_id]
+        for trace_id, spans in finished:
+            total = max(span["ms"] for span in spans)
+            if total >= self.min_ms:
+                print(f"trace {trace_id}  ({len(spans)} spans)\n{render(spans)}\n", flush=True)
+
+
+def serve(collector, port):
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            if self.path != "/v1/traces":
+                self.send_error(404)
+                return
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            try:
+                collector.add(json.loads(body))
+            except (ValueError, KeyError) as e:
+                self.send_error(400, str(e))
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.end_headers()
+            self.wfile.write(b"{}")
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("0.0.0.0", port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"collecting on http://0.0.0.0:{port}/v1/traces", flush=True)
+    try:
+        while True:
+            time.sleep(0.5)
+            collector.print_finished()
+    except KeyboardInterrupt:
+        server.shutdown()
+        collector.print_finished(quiet=0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Print traces exported by tracing.py")
+    parser.add_argument("--port", type=int, default=4318)
+    parser.add_argument("--file", help="replay an OTLP/JSON lines file instead of listening")
+    parser.add_argument("--min-ms", type=float, default=0.0, help="only print traces at least this long")
+    args = parser.parse_args()
+
+    collector = Collector(args.min_ms)
+    if args.file:
+        with open(args.file, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    collector.add(json.loads(line))
+        collector.print_finished(quiet=0)
+    else:
+        serve(collector, args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Client upload bandwidth and CPU against room size, mesh vs forwarding
+----------------------------------------------------------------------
+The measured client runs in this process. The rest of the room (the other
+members, and in "sfu" mode the RoomForwarder from services/voice.py) runs in
+a child process, so the reported CPU time is the client's alone. Every
+simulated member speaks all the time, which is the worst case for both modes.
+
+Reported per room size and mode:
+  - upload kbit/s: outbound-rtp bytesSent from getStats
+  - CPU %: process_time of the client process over wall time
+  - connections: RTCPeerConnections the client keeps open
+
+Usage:
+    python scripts/voice_mode_bench.py --sizes 2 4 6 8 --seconds 10
+"""
+
+import argparse
+import asyncio
+import logging
+import multiprocessing
+import os
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+try:
+    import numpy as np
+    from av import AudioFrame
+    from aiortc import RTCPeerConnection, RTCSessionDescription
+    from aiortc.mediastreams import AudioStreamTrack, MediaStreamError
+except ImportError as e:
+    print(f"Missing dependency ({e}); install numpy, av and aiortc")
+    sys.exit(1)
+
+WARMUP = 2.0
+
+
+class ToneTrack(AudioStreamTrack):
+    """A member that never stops talking: paced 20 ms frames of a 440 Hz tone"""
+
+    async def recv(self):
+        frame = await super().recv()
+        t = (frame.pts + np.arange(frame.samples)) / frame.sample_rate
+        tone = AudioFrame(format="s16", layout="mono", samples=frame.samples)
+        tone.planes[0].update((np.sin(2 * np.pi * 440 * t) * 8000).astype(np.int16).tobytes())
+        tone.pts = frame.pts
+        tone.sample_rate = frame.sample_rate
+        tone.time_base = frame.time_base
+        return tone
+
+
+def drain(pc, tasks):
+    """Decode everything a connection receives, as the client's playback would"""
+    @pc.on("track")
+    def on_track(track):
+        async def consume():
+            try:
+                while True:
+                    await track.recv()
+            except MediaStreamError:
+                pass
+        tasks.append(asyncio.ensure_future(consume()))
+
+
+async def answer(pc, sdp):
+    await pc.setRemoteDescription(RTCSessionDescription(sdp=sdp, type="offer"))
+    await pc.setLocalDescription(await pc.createAnswer())
+    return pc.localDescription.sdp
+
+
+async def remote_room(conn, mode, size):
+    """Child process: everyone in the room except the measured client"""
+    loop = asyncio.get_running_loop()
+    offers = await loop.run_in_executor(None, conn.recv)
+    connections = []
+    tasks = []
+    room = None
+
+    if mode == "mesh":
+        answers = []
+        for sdp in offers:
+            pc = RTCPeerConnection()
+            pc.addTrack(ToneTrack())
+            drain(pc, tasks)
+            connections.append(pc)
+            answers.append(await answer(pc, sdp))
+    else:
+        from services.voice import RoomForwarder
+        room = RoomForwarder("bench")
+        answers = [await room.handle_offer("client", offers[0])]
+        # The other members connect to the forwarder exactly like the client
+        for index in range(size - 1):
+            pc = RTCPeerConnection()
+            pc.addTrack(ToneTrack())
+            for _ in range(room.slots - 1):
+                pc.addTransceiver("audio", direction="recvonly")
+            drain(pc, tasks)
+            connections.append(pc)
+            await pc.setLocalDescription(await pc.createOffer())
+            member_answer = await room.handle_offer(f"member{index}", pc.localDescription.sdp)
+            await pc.setRemoteDescription(RTCSessionDescription(sdp=member_answer, type="answer"))
+
+    conn.send(answers)
+    await loop.run_in_executor(None, conn.recv)
+
+    if room:
+        await room.close()
+    for pc in connections:
+        await pc.close()
+    for task in tasks:
+        task.cancel()
+
+
+def remote_main(conn, mode, size):
+    logging.getLogger("aioice").setLevel(logging.WARNING)
+    asyncio.run(remote_room(conn, mode, size))
+
+
+async def bytes_sent(connections):
+    total = 0
+    for pc in connections:
+        for stats in (await pc.getStats()).values():
+            if stats.type == "outbound-rtp":
+                total += stats.bytesSent
+    return total
+
+
+async def measure(mode, size, slots, seconds):
+    loop = asyncio.get_running_loop()
+    parent, child = multiprocessing.Pipe()
+    remote = multiprocessing.Process(target=remote_main, args=(child, mode, size))
+    remote.start()
+
+    connections = []
+    tasks = []
+    for _ in range(size - 1 if mode == "mesh" else 1):
+        pc = RTCPeerConnection()
+        # One source per connection: senders sharing a track split its frames
+        # between them instead of each encoding the full stream
+        pc.addTrack(ToneTrack())
+        if mode == "sfu":
+            for _ in range(slots - 1):
+                pc.addTransceiver("audio", direction="recvonly")
+        drain(pc, tasks)
+        await pc.setLocalDescription(await pc.createOffer())
+        connections.append(pc)
+
+    parent.send([pc.localDescription.sdp for pc in connections])
+    answers = await loop.run_in_executor(None, parent.recv)
+    for pc, sdp in zip(connections, answers):
+        await pc.setRemoteDescription(RTCSessionDescription(sdp=sdp, type="answer"))
+
+    await asyncio.sleep(WARMUP)
+    sent_before = await bytes_sent(connections)
+    cpu_before = time.process_time()
+    wall_before = time.perf_counter()
+    await asyncio.sleep(seconds)
+    cpu = time.process_time() - cpu_before
+    wall = time.perf_counter() - wall_before
+    sent = await bytes_sent(connections) - sent_before
+
+    for pc in connections:
+        await pc.close()
+    for task in tasks:
+        task.cancel()
+    parent.send("stop")
+    remote.join(timeout=10)
+
+    return sent * 8 / 1000 / wall, cpu / wall * 100, len(connections)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Client upload and CPU: mesh vs forwarding voice")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[2, 4, 6, 8], help="room sizes to measure")
+    parser.add_argument("--seconds", type=float, default=10, help="measurement window per run")
+    parser.add_argument("--slots", type=int, default=3, help="forwarded speakers per listener")
+    args = parser.parse_args()
+
+    multiprocessing.set_start_method("spawn")
+    print(f"{'size':>4}  {'mode':<5}  {'conns':>5}  {'upload kbit/s':>13}  {'client CPU %':>12}")
+    for size in args.sizes:
+        for mode in ("mesh", "sfu"):
+            upload, cpu, conns = asyncio.run(measure(mode, size, args.slots, args.seconds))
+            print(f"{size:>4}  {mode:<5}  {conns:>5}  {upload:>13.1f}  {cpu:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -8,13 +8,76 @@ from models import network_config, User, network_config_user
 from vpnserver.genrator import generate_wireguard_keys, generate_new_network_range, get_next_subnet, generate_new_port, generate_allowed_ips
 from config import settings
 import logging
+import time
+import metrics
+from services.command_runner import get_runner
 
 logger = logging.getLogger(__name__)
 
+def run_wg(args, check=False):
+    """تنفيذ أوامر wg / wg-quick عبر command runner مع تسجيل المدة والإخفاقات في /metrics"""
+    command = metrics.command_label(args)
+    start = time.perf_counter()
+    try:
+        result = get_runner().run(args, check=check)
+    except (subprocess.CalledProcessError, OSError):
+        metrics.wg_command_failures.inc(command=command)
+        raise
+    finally:
+        metrics.wg_command_seconds.observe(time.perf_counter() - start, command=command)
+    if result.returncode != 0:
+        metrics.wg_command_failures.inc(command=command)
+    return result
+
+
+async def run_wg_async(args, check=False):
+    """نسخة غير متزامنة من run_wg لا تحجز حلقة الأحداث أثناء انتظار الأمر"""
+    command = metrics.command_label(args)
+    start = time.perf_counter()
+    try:
+        result = await get_runner().run_async(args, check=check)
+    except (subprocess.CalledProcessError, OSError):
+        metrics.wg_command_failures.inc(command=command)
+        raise
+    finally:
+        metrics.wg_command_seconds.observe(time.perf_counter() - start, command=command)
+    if result.returncode != 0:
+        metrics.wg_command_failures.inc(command=command)
+    return result
+
+
 class WiregruadVPN:
     def __init__(self):
         self.config_dir = settings.CONFIG_DIR
-        
+
+    async def kernel_peers(self):
+        """
+        الواجهات المرفوعة في النواة ومفاتيح النظراء في كل منها: {interface: set(public_key)}
+        أمران فقط مهما كان عدد الغرف (wg show interfaces / wg show all peers)
+        """
+        interfaces = (await run_wg_async(['sudo', 'wg', 'show', 'interfaces'], check=True)).stdout.split()
+        peers = {name: set() for name in interfaces}
+        output = (await run_wg_async(['sudo', 'wg', 'show', 'all', 'peers'], check=True)).stdout
+        for line in output.splitlines():
+            name, _, key = line.partition('\t')
+            if key:
+                peers.setdefault(name, set()).add(key.strip())
+        return peers
+
+    async def diagnose(self):
+        """حالة WireGuard كما تراها النواة: الواجهات وعدد النظراء في كل منها"""
+        try:
+            peers = await self.kernel_peers()
+        except FileNotFoundError:
+            return {"ok": False, "error": "WireGuard not installed on system", "interfaces": {}}
+        except subprocess.CalledProcessError as e:
+            return {"ok": False, "error": (e.stderr or str(e)).strip(), "interfaces": {}}
+        return {
+            "ok": True,
+            "interfaces": {name: len(keys) for name, keys in sorted(peers.items())},
+            "peers": sum(len(keys) for keys in peers.values()),
+        }
+
 
     async def create_network_config(self, session: AsyncSession):
         # Find available inactive network config
@@ -68,8 +131,7 @@ SaveConfig = true
             
             # Start WireGuard interface with proper error handling
             try:
-                result = subprocess.run(['sudo', 'wg-quick', 'up', config_path], 
-                                      capture_output=True, text=True, check=True)
+                result = run_wg(['sudo', 'wg-quick', 'up', config_path], check=True)
                 logger.info(f"WireGuard interface started successfully: {result.stdout}")
             except subprocess.CalledProcessError as e:
                 logger.error(f"Failed to start WireGuard interface: {e.stderr}")
@@ -91,8 +153,7 @@ SaveConfig = true
         
         # Stop WireGuard interface with error handling
         try:
-            result = subprocess.run(['sudo', 'wg-quick', 'down', config_path], 
-                                  capture_output=True, text=True, check=False)
+            result = run_wg(['sudo', 'wg-quick', 'down', config_path], check=False)
             if result.returncode != 0:
                 logger.warning(f"Failed to stop WireGuard interface: {result.stderr}")
         except FileNotFoundError:
@@ -114,8 +175,7 @@ SaveConfig = true
         
         # Stop the VPN interface if it's running
         try:
-            subprocess.run(['sudo', 'wg-quick', 'down', config_path], 
-                         capture_output=True, text=True, check=False)
+            run_wg(['sudo', 'wg-quick', 'down', config_path], check=False)
         except:
             pass
         
@@ -170,11 +230,11 @@ SaveConfig = true
         # Add peer to WireGuard interface
         try:
             public_key_str = public_key.decode() if isinstance(public_key, bytes) else public_key
-            result = subprocess.run([
+            result = run_wg([
                 'sudo', 'wg', 'set', network_name,  # Use interface name, not config path
                 'peer', public_key_str,
                 'allowed-ips', allowed_ips
-            ], capture_output=True, text=True, check=True)
+            ], check=True)
             logger.info(f"Added peer to WireGuard interface: {result.stdout}")
         except subprocess.CalledProcessError as e:
             logger.error(f"Failed to add peer to WireGuard: {e.stderr}")
@@ -213,11 +273,11 @@ SaveConfig = true
         if network_config_user_obj:
             try:
                 public_key_str = user.public_key.decode() if isinstance(user.public_key, bytes) else user.public_key
-                result = subprocess.run([
+                result = run_wg([
                     'sudo', 'wg', 'set', network_name,  # Use interface name, not config path
                     'peer', public_key_str,
                     'remove'
-                ], capture_output=True, text=True, check=True)
+                ], check=True)
                 logger.info(f"Removed peer from WireGuard interface: {result.stdout}")
             except subprocess.CalledProcessError as e:
                 logger.error(f"Failed to remove peer from WireGuard: {e.stderr}")
@@ -0,0 +1,267 @@
+# command_runner.py
+# Every wg / wg-quick / vpncmd call goes through the runner returned by
+# get_runner(). SubprocessRunner runs the real binaries; SimulatedRunner
+# keeps WireGuard interfaces, peers and SoftEther hubs in memory, with
+# configurable latency and failures, so VPN paths can be tested and
+# benchmarked on a machine without WireGuard or root.
+import asyncio
+import base64
+import hashlib
+import os
+import random
+import subprocess
+import threading
+import time
+from collections import defaultdict
+
+import tracing
+from config import settings
+
+
+def command_name(args):
+    """'wg', 'wg-quick', 'vpncmd' for an argv, without sudo or the binary's directory"""
+    args = [arg for arg in args if arg != "sudo"]
+    return os.path.basename(args[0]) if args else ""
+
+
+def describe(args):
+    """'wg-quick up', 'wg set', 'vpncmd HubCreate': enough to tell calls apart, no keys or passwords"""
+    args = [arg for arg in args if arg != "sudo"]
+    name = command_name(args)
+    if name == "vpncmd" and "/CMD" in args and args.index("/CMD") + 1 < len(args):
+        return f"vpncmd {args[args.index('/CMD') + 1]}"
+    return " ".join([name] + args[1:2])
+
+
+class CommandRunner:
+    """
+    run() blocks like subprocess.run; run_async() is the asyncio version.
+    Both return a subprocess.CompletedProcess with text stdout / stderr and
+    raise CalledProcessError for a non-zero exit when check=True. Every call
+    is a "command" span in the current trace; implementations provide
+    _run / _run_async.
+    """
+
+    def run(self, args, input=None, check=False):
+        with tracing.span("command", "client", command=describe(args)) as span:
+            result = self._run(args, input, check)
+            if span is not None:
+                span.set("command.exit_code", result.returncode)
+            return result
+
+    async def run_async(self, args, input=None, check=False):
+        with tracing.span("command", "client", command=describe(args)) as span:
+            result = await self._run_async(args, input, check)
+            if span is not None:
+                span.set("command.exit_code", result.returncode)
+            return result
+
+    def _run(self, args, input, check):
+        raise NotImplementedError
+
+    async def _run_async(self, args, input, check):
+        raise NotImplementedError
+
+    @staticmethod
+    def _checked(result, check):
+        if check and result.returncode != 0:
+            raise subprocess.CalledProcessError(result.returncode, result.args, result.stdout, result.stderr)
+        return result
+
+
+class SubprocessRunner(CommandRunner):
+    def _run(self, args, input, check):
+        return subprocess.run(args, input=input, capture_output=True, text=True, check=check)
+
+    async def _run_async(self, args, input, check):
+        proc = await asyncio.create_subprocess_exec(
+            *args,
+            stdin=asyncio.subprocess.PIPE if input is not None else None,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE
+        )
+        stdout, stderr = await proc.communicate(input.encode() if input is not None else None)
+        result = subprocess.CompletedProcess(list(args), proc.returncode, stdout.decode(), stderr.decode())
+        return self._checked(result, check)
+
+
+class SimulatedRunner(CommandRunner):
+    """
+    In-memory wg, wg-quick and vpncmd. State:
+      interfaces: name -> {"config": path, "peers": {public_key: allowed_ips}}  (up interfaces only)
+      hubs: name -> {"password", "dhcp", "securenat", "users": {username: password}}
+
+    latency: seconds per command, a number or {"wg-quick": 0.3, "wg": 0.01, ...};
+    run() sleeps it (blocking, like the real call), run_async() awaits it.
+    failure_rate: probability that a command fails with exit code 1 before
+    touching state; fail_next() queues failures for one command. All
+    randomness comes from `seed`, so runs are repeatable.
+    """
+
+    def __init__(self, latency=0.0, failure_rate=0.0, seed=0):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.interfaces = {}
+        self.hubs = {}
+        self.calls = []
+        self._forced_failures = defaultdict(list)
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def fail_next(self, command, times=1, returncode=1, stderr="simulated failure"):
+        """The next `times` calls of `command` ('wg', 'wg-quick', 'vpncmd') fail"""
+        self._forced_failures[command].extend([(returncode, stderr)] * times)
+
+    def _run(self, args, input, check):
+        delay = self._latency_for(args)
+        if delay:
+            time.sleep(delay)
+        return self._checked(self._execute(args, input), check)
+
+    async def _run_async(self, args, input, check):
+        delay = self._latency_for(args)
+        if delay:
+            await asyncio.sleep(delay)
+        return self._checked(self._execute(args, input), check)
+
+    def _latency_for(self, args):
+        if isinstance(self.latency, dict):
+            return self.latency.get(command_name(args), 0.0)
+        return self.latency
+
+    def _execute(self, args, input):
+        args = list(args)
+        argv = [arg for arg in args if arg != "sudo"]
+        command = command_name(args)
+        with self._lock:
+            self.calls.append(args)
+            if self._forced_failures[command]:
+                returncode, stderr = self._forced_failures[command].pop(0)
+                return subprocess.CompletedProcess(args, returncode, "", stderr)
+            if self.failure_rate and self._random.random() < self.failure_rate:
+                return subprocess.CompletedProcess(args, 1, "", "simulated failure")
+            handler = {"wg": self._wg, "wg-quick": self._wg_quick, "vpncmd": self._vpncmd}.get(command)
+            if handler is None:
+                raise FileNotFoundError(f"[Errno 2] No such file or directory: '{argv[0] if argv else ''}'")
+            returncode, stdout, stderr = handler(argv[1:], input)
+        return subprocess.CompletedProcess(args, returncode, stdout, stderr)
+
+    # --- wg ---
+    def _wg(self, argv, input):
+        if argv[:1] == ["genkey"]:
+            return 0, base64.b64encode(self._random.randbytes(32)).decode() + "\n", ""
+        if argv[:1] == ["pubkey"]:
+            private_key = (input or "").strip().encode()
+            return 0, base64.b64encode(hashlib.sha256(private_key).digest()).decode() + "\n", ""
+        if argv[:2] == ["show", "interfaces"]:
+            return 0, " ".join(sorted(self.interfaces)) + "\n", ""
+        if argv[:3] == ["show", "all", "peers"]:
+            lines = [f"{name}\t{key}" for name, interface in sorted(self.interfaces.items()) for key in interface["peers"]]
+            return 0, "".join(line + "\n" for line in lines), ""
+        if argv[:1] == ["show"] and argv[2:3] == ["peers"]:
+            interface = self.interfaces.get(argv[1])
+            if interface is None:
+                return 1, "", f"Unable to access interface: No such device\n"
+            return 0, "".join(key + "\n" for key in interface["peers"]), ""
+        if argv[:1] == ["show"] and len(argv) >= 2:
+            interface = self.interfaces.get(argv[1])
+            if interface is None:
+                return 1, "", f"Unable to access interface: No such device\n"
+            lines = [f"interface: {argv[1]}"]
+            for key, allowed_ips in interface["peers"].items():
+                lines += ["", f"peer: {key}", f"  allowed ips: {allowed_ips}"]
+            return 0, "\n".join(lines) + "\n", ""
+        if argv[:1] == ["set"] and len(argv) >= 4 and argv[2] == "peer":
+            interface = self.interfaces.get(argv[1])
+            if interface is None:
+                return 1, "", "Unable to modify interface: No such device\n"
+            key, options = argv[3], argv[4:]
+            if "remove" in options:
+                interface["peers"].pop(key, None)
+            else:
+                allowed = options[options.index("allowed-ips") + 1] if "allowed-ips" in options else ""
+                interface["peers"][key] = allowed
+            return 0, "", ""
+        return 1, "", f"Invalid subcommand: `{' '.join(argv)}'\n"
+
+    # --- wg-quick ---
+    def _wg_quick(self, argv, input):
+        if len(argv) != 2 or argv[0] not in ("up", "down"):
+            return 1, "", "Usage: wg-quick [ up | down ] [ CONFIG_FILE | INTERFACE ]\n"
+        action, target = argv
+        name = os.path.basename(target)[:-5] if target.endswith(".conf") else target
+        if action == "up":
+            if name in self.interfaces:
+                return 1, "", f"wg-quick: `{name}' already exists\n"
+            self.interfaces[name] = {"config": target, "peers": {}}
+            return 0, "", f"[#] ip link add {name} type wireguard\n"
+        if name not in self.interfaces:
+            return 1, "", f"wg-quick: `{name}' is not a WireGuard interface\n"
+        del self.interfaces[name]
+        return 0, "", f"[#] ip link delete dev {name}\n"
+
+    # --- vpncmd (SoftEther) ---
+    def _vpncmd(self, argv, input):
+        options = {arg.split(":", 1)[0]: arg.split(":", 1)[1] for arg in argv if arg.startswith("/") and ":" in arg}
+        if "/CMD" not in argv:
+            return 1, "", "Error: /CMD is required\n"
+        command, *params = argv[argv.index("/CMD") + 1:]
+        name = params[0] if params else ""
+        admin_hub = options.get("/ADMINHUB", "DEFAULT")
+
+        if command == "HubCreate":
+            if name in self.hubs:
+                return 1, f'Error occurred. (Error code: 28)\nThe Virtual Hub "{name}" already exists.\n', ""
+            password = (input or "").split("\n", 1)[0]
+            self.hubs[name] = {"password": password, "dhcp": False, "securenat": False, "users": {}}
+            return 0, "The command completed successfully.\n", ""
+        if command == "HubDelete":
+            if self.hubs.pop(name, None) is None:
+                return 1, "Error occurred. (Error code: 8)\nObject not found.\n", ""
+            return 0, "The command completed successfully.\n", ""
+
+        hub = self.hubs.get(admin_hub)
+        if hub is None:
+            return 1, "Error occurred. (Error code: 8)\nObject not found.\n", ""
+        if command == "DhcpEnable":
+            hub["dhcp"] = True
+        elif command == "DhcpSet":
+            hub["dhcp_options"] = {key: value for key, value in options.items() if key not in ("/ADMINHUB", "/PASSWORD", "/SERVER")}
+        elif command == "SecureNatEnable":
+            hub["securenat"] = True
+        elif command == "UserCreate":
+            if name in hub["users"]:
+                return 1, "Error occurred. (Error code: 66)\nThe user already exists.\n", ""
+            hub["users"][name] = None
+        elif command == "UserPasswordSet":
+            if name not in hub["users"]:
+                return 1, "Error occurred. (Error code: 29)\nThe user does not exist.\n", ""
+            hub["users"][name] = next((p.split(":", 1)[1] for p in params[1:] if p.startswith("/PASSWORD:")), None)
+        elif command == "UserDelete":
+            if hub["users"].pop(name, None) is None and name:
+                return 1, "Error occurred. (Error code: 29)\nThe user does not exist.\n", ""
+        elif command == "HubStatusGet":
+            return 0, (f"Virtual Hub Name|{admin_hub}\nStatus|Online\nNumber of Users|{len(hub['users'])}\n"
+                       f"SecureNAT|{'Enabled' if hub['securenat'] else 'Disabled'}\n"), ""
+        elif command == "UserList":
+            return 0, "".join(f"User Name|{user}\n" for user in hub["users"]), ""
+        else:
+            return 1, f"Error occurred. Unknown command \"{command}\".\n", ""
+        return 0, "The command completed successfully.\n", ""
+
+
+_runner = None
+
+
+def get_runner():
+    global _runner
+    if _runner is None:
+        _runner = SimulatedRunner() if settings.VPN_COMMAND_RUNNER == "simulated" else SubprocessRunner()
+    return _runner
+
+
+def set_runner(runner):
+    """Swap the runner (tests, benchmarks, the load test); returns the previous one"""
+    global _runner
+    previous, _runner = _runner, runner
+    return previous
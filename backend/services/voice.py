@@ -0,0 +1,244 @@
+import asyncio
+import collections
+import fractions
+import logging
+
+from config import settings
+
+try:
+    import numpy as np
+    from av import AudioFrame
+    from aiortc import RTCPeerConnection, RTCSessionDescription
+    from aiortc.mediastreams import MediaStreamError, MediaStreamTrack
+    FORWARDING_AVAILABLE = True
+except ImportError:
+    FORWARDING_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Peer id the clients use to address the forwarding node over signaling
+FORWARDER_PEER_ID = "sfu"
+
+SAMPLE_RATE = 48000
+TIME_BASE = fractions.Fraction(1, SAMPLE_RATE)
+# A frame whose peak is below this is treated as silence (~-36 dBFS)
+SILENCE_PEAK = 500
+# A speaker stays "active" this long after its last non-silent frame
+SPEAKER_HANGOVER = 0.5
+# How often slot assignments are recomputed
+ASSIGN_INTERVAL = 0.1
+
+
+def voice_mode_for(room_size):
+    """Mesh for small rooms, forwarding above VOICE_FORWARDING_THRESHOLD members"""
+    if FORWARDING_AVAILABLE and room_size > settings.VOICE_FORWARDING_THRESHOLD:
+        return "sfu"
+    return "mesh"
+
+
+if FORWARDING_AVAILABLE:
+    class SpeakerSlotTrack(MediaStreamTrack):
+        """
+        One outgoing audio stream to a listener. The forwarder points it at an
+        active speaker; while unassigned recv() blocks, so nothing is encoded
+        or sent for silent speakers.
+        """
+        kind = "audio"
+
+        def __init__(self):
+            super().__init__()
+            self.speaker = None
+            self._frames = collections.deque(maxlen=3)
+            self._ready = asyncio.Event()
+            self._start = None
+            self._pts = 0
+            # Two output frames: one may still be in the encoder while the other is filled
+            self._out = [None, None]
+            self._out_index = 0
+
+        def push(self, frame):
+            self._frames.append(frame)
+            self._ready.set()
+
+        def assign(self, speaker):
+            if speaker is not self.speaker:
+                self.speaker = speaker
+                self._frames.clear()
+
+        async def recv(self):
+            if self.readyState != "live":
+                raise MediaStreamError
+
+            while not self._frames:
+                self._ready.clear()
+                await self._ready.wait()
+            source = self._frames.popleft()
+
+            loop = asyncio.get_running_loop()
+            if self._start is None:
+                self._start = loop.time()
+            # Keep RTP time continuous, jumping forward across gaps left by silence
+            self._pts = max(self._pts + source.samples, int((loop.time() - self._start) * SAMPLE_RATE))
+
+            out = self._output_frame(source)
+            out.pts = self._pts
+            return out
+
+        def _output_frame(self, source):
+            out = self._out[self._out_index]
+            if out is None or out.samples != source.samples or out.layout.name != source.layout.name:
+                out = AudioFrame(format="s16", layout=source.layout.name, samples=source.samples)
+                out.sample_rate = SAMPLE_RATE
+                out.time_base = TIME_BASE
+                self._out[self._out_index] = out
+            self._out_index ^= 1
+
+            size = out.planes[0].buffer_size
+            out.planes[0].update(memoryview(source.planes[0])[:size])
+            return out
+
+    class _Member:
+        def __init__(self, username, pc):
+            self.username = username
+            self.pc = pc
+            self.slots = []
+            self.subscribers = set()
+            self.level = 0
+            self.last_voice = None
+            self.reader = None
+
+    class RoomForwarder:
+        """
+        Selective forwarding for one room. Each client keeps a single
+        RTCPeerConnection to the server; every listener receives the
+        VOICE_FORWARDED_SPEAKERS loudest active speakers, never itself,
+        and silent speakers are not forwarded at all.
+        """
+
+        def __init__(self, room_id, slots=None):
+            self.room_id = room_id
+            self.slots = slots or settings.VOICE_FORWARDED_SPEAKERS
+            self.members = {}
+            self._assign_task = None
+
+        async def handle_offer(self, username, sdp):
+            """Answer a client's offer; the offer carries one audio m-line per slot"""
+            await self.remove_member(username)
+
+            pc = RTCPeerConnection()
+            member = _Member(username, pc)
+            self.members[username] = member
+
+            @pc.on("track")
+            def on_track(track):
+                if track.kind == "audio":
+                    member.reader = asyncio.create_task(self._read_speaker(member, track))
+
+            @pc.on("connectionstatechange")
+            async def on_connectionstatechange():
+                if pc.connectionState in ("failed", "closed") and self.members.get(username) is member:
+                    await self.remove_member(username)
+
+            await pc.setRemoteDescription(RTCSessionDescription(sdp=sdp, type="offer"))
+            for transceiver in pc.getTransceivers():
+                if transceiver.kind == "audio" and len(member.slots) < self.slots:
+                    slot = SpeakerSlotTrack()
+                    member.slots.append(slot)
+                    pc.addTrack(slot)
+
+            await pc.setLocalDescription(await pc.createAnswer())
+
+            if self._assign_task is None:
+                self._assign_task = asyncio.create_task(self._assign_loop())
+            logger.info(f"Voice forwarder room {self.room_id}: {username} connected with {len(member.slots)} slots")
+            return pc.localDescription.sdp
+
+        async def remove_member(self, username):
+            member = self.members.pop(username, None)
+            if not member:
+                return
+            if member.reader:
+                member.reader.cancel()
+            for other in self.members.values():
+                other.subscribers.difference_update(member.slots)
+            for slot in member.slots:
+                slot.stop()
+            await member.pc.close()
+
+            if not self.members and self._assign_task:
+                self._assign_task.cancel()
+                self._assign_task = None
+
+        async def close(self):
+            for username in list(self.members):
+                await self.remove_member(username)
+
+        async def _read_speaker(self, member, track):
+            loop = asyncio.get_running_loop()
+            try:
+                while True:
+                    frame = await track.recv()
+                    samples = np.frombuffer(frame.planes[0], dtype=np.int16)
+                    peak = max(int(samples.max()), -int(samples.min())) if samples.size else 0
+                    member.level = peak
+                    if peak >= SILENCE_PEAK:
+                        member.last_voice = loop.time()
+                    for slot in member.subscribers:
+                        slot.push(frame)
+            except (MediaStreamError, asyncio.CancelledError):
+                pass
+
+        def _active_speakers(self, now):
+            active = [
+                m for m in self.members.values()
+                if m.last_voice is not None and now - m.last_voice <= SPEAKER_HANGOVER
+            ]
+            active.sort(key=lambda m: m.last_voice, reverse=True)
+            return active
+
+        def assign_slots(self, now):
+            """Point each listener's slots at the most recent active speakers other than itself"""
+            active = self._active_speakers(now)
+            for member in self.members.values():
+                speakers = [s for s in active if s is not member][:len(member.slots)]
+                # Keep a speaker on the slot it already occupies to avoid glitches
+                current = {slot.speaker: slot for slot in member.slots if slot.speaker in speakers}
+                free = [slot for slot in member.slots if slot.speaker not in current]
+                for speaker in speakers:
+                    if speaker not in current:
+                        free.pop(0).assign(speaker)
+                for slot in free:
+                    slot.assign(None)
+
+            for member in self.members.values():
+                member.subscribers = {
+                    slot for listener in self.members.values()
+                    for slot in listener.slots if slot.speaker is member
+                }
+
+        async def _assign_loop(self):
+            loop = asyncio.get_running_loop()
+            while True:
+                self.assign_slots(loop.time())
+                await asyncio.sleep(ASSIGN_INTERVAL)
+
+
+class VoiceForwarder:
+    """Registry of per-room forwarders"""
+
+    def __init__(self):
+        self.rooms = {}
+
+    async def handle_offer(self, room_id, username, sdp):
+        room = self.rooms.get(room_id)
+        if room is None:
+            room = self.rooms[room_id] = RoomForwarder(room_id)
+        return await room.handle_offer(username, sdp)
+
+    async def remove_member(self, room_id, username):
+        room = self.rooms.get(room_id)
+        if room is None:
+            return
+        await room.remove_member(username)
+        if not room.members:
+            del self.rooms[room_id]
@@ -2,24 +2,79 @@
 import logging
 import socketio
 
-# Configure logging
-logging.basicConfig(
-    level=logging.DEBUG,  # DEBUG level
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-)
+from config import settings
+from socket_logger import configure_root_logging
+
+# Configure logging: records go through a queue, formatting and writes happen off the event loop
+configure_root_logging()
 logger = logging.getLogger(__name__)
 
-# Create SocketIO server with full debug logging
+# Per-packet socketio/engineio logs only when asked for
 sio = socketio.AsyncServer(
     async_mode='asgi',
     cors_allowed_origins='*',
     ping_timeout=60,
-    logger=True,           # Enable socketio internal logging
-    engineio_logger=True   # Enable engineio internal logging
+    logger=settings.SOCKETIO_DEBUG_LOGS,
+    engineio_logger=settings.SOCKETIO_DEBUG_LOGS
 )
 
 NAMESPACE = "/game"
+WEBRTC_NAMESPACE = "/webrtc"
+
+
+
+class SessionIndex(dict):
+    """
+    sid -> {username, room_id}, with a reverse index by_room (room_id -> set
+    of sids) kept in step on every assignment and removal, so per-room
+    lookups (admin API, gauges) never scan all sessions. Heartbeats re-assign
+    the same room on every beat; that path only touches the dict.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.by_room = {}
+
+    def __setitem__(self, sid, entry):
+        previous = self.get(sid)
+        if previous is not None and previous.get("room_id") != entry.get("room_id"):
+            self._unlink(sid, previous)
+        super().__setitem__(sid, entry)
+        self.by_room.setdefault(entry.get("room_id"), set()).add(sid)
+
+    def __delitem__(self, sid):
+        entry = self[sid]
+        super().__delitem__(sid)
+        self._unlink(sid, entry)
+
+    def pop(self, sid, *default):
+        if sid not in self:
+            if default:
+                return default[0]
+            raise KeyError(sid)
+        entry = super().pop(sid)
+        self._unlink(sid, entry)
+        return entry
+
+    def clear(self):
+        super().clear()
+        self.by_room.clear()
+
+    def _unlink(self, sid, entry):
+        room_id = entry.get("room_id")
+        sids = self.by_room.get(room_id)
+        if sids is not None:
+            sids.discard(sid)
+            if not sids:
+                del self.by_room[room_id]
+
 
 # Session storage for keeping track of users and their rooms
-client_rooms = {}  # Maps sid to {username, room_id}
-last_heartbeat = {}  # Store last heartbeat time for each client 
\ No newline at end of file
+client_rooms = SessionIndex()  # Maps sid to {username, room_id}; client_rooms.by_room maps room_id to its sids
+last_heartbeat = {}  # Store last heartbeat time for each client
+room_player_versions = {}  # Maps room_id to the version of its player list
+pending_leaves = {}  # Maps (room_id, username) to the task that removes a disconnected player after the grace period
+webrtc_users = {}  # Maps signaling sid to the username its connect token was issued for
+webrtc_peers = {}  # Maps signaling sid to {username, room_id}
+webrtc_rooms = {}  # Maps room_id to {username: signaling sid}
+webrtc_room_modes = {}  # Maps room_id to "mesh" or "sfu"
@@ -5,10 +5,14 @@ from sqlalchemy.future import select
 import asyncio
 from services.Wiregruad import WiregruadVPN
 from config import settings
-from shared import sio, client_rooms, last_heartbeat
+from shared import sio, client_rooms, last_heartbeat, room_player_versions
 from database.database import create_session
 from models import Room, RoomPlayer, ChatMessage
-from helpers import get_players_for_room, handle_player_leave
+from helpers import (
+    get_players_for_room, handle_player_leave, emit_player_delta,
+    schedule_player_leave, cancel_player_leave, get_messages_after, has_other_session
+)
+from metrics import instrument_event
 from socket_logger import (
     log_connection, log_disconnection, log_join_event, log_leave_event,
     log_heartbeat, log_message, log_player_check, log_game_start,
@@ -16,13 +20,15 @@ from socket_logger import (
 )
 
 NAMESPACE = "/game"
+# A dropped connection keeps the player's seat this long so the client can re-join and resync
+RECONNECT_GRACE_SECONDS = settings.RECONNECT_GRACE_SECONDS
 vpn = WiregruadVPN()
 @sio.event(namespace=NAMESPACE)
+@instrument_event(NAMESPACE)
 async def connect(sid, environ):
     log_connection(sid, environ)
     log_debug("Sending server_ready event", {"sid": sid})
-    log_debug("Current client_rooms state", client_rooms)
-    log_debug("Current last_heartbeat state", last_heartbeat)
+    log_debug("Current connection counts", {"in_rooms": len(client_rooms), "tracked": len(last_heartbeat)})
     
     try:
         await sio.emit("server_ready", {
@@ -40,6 +46,7 @@ async def connect(sid, environ):
     log_debug("Connection setup completed", {"sid": sid})
 
 @sio.event(namespace="/game")
+@instrument_event(NAMESPACE)
 async def disconnect(sid):
     log_disconnection(sid, client_rooms)
 
@@ -50,16 +57,23 @@ async def disconnect(sid):
 
         await sio.leave_room(sid, str(room_id), namespace="/game")
 
-        db = await create_session()
-        try:
-            log_debug("Calling handle_player_leave", {"username": username, "room_id": room_id})
-            await handle_player_leave(username, room_id, db)
-            log_debug("Finished handle_player_leave", {"username": username, "room_id": room_id})
-        except Exception as e:
-            log_error("disconnect", sid, e)
-            await db.rollback()
-        finally:
-            await db.close()
+        if has_other_session(username, room_id, sid):
+            # The client re-joined on a new sid before this one timed out: the seat is in use
+            log_debug("Player leave skipped - joined again on another sid", {"username": username, "room_id": room_id})
+        elif RECONNECT_GRACE_SECONDS > 0:
+            log_debug("Player leave deferred for reconnect", {"username": username, "room_id": room_id})
+            schedule_player_leave(username, room_id, RECONNECT_GRACE_SECONDS)
+        else:
+            db = await create_session()
+            try:
+                log_debug("Calling handle_player_leave", {"username": username, "room_id": room_id})
+                await handle_player_leave(username, room_id, db)
+                log_debug("Finished handle_player_leave", {"username": username, "room_id": room_id})
+            except Exception as e:
+                log_error("disconnect", sid, e)
+                await db.rollback()
+            finally:
+                await db.close()
 
         del client_rooms[sid]
 
@@ -67,6 +81,7 @@ async def disconnect(sid):
         del last_heartbeat[sid]
 
 @sio.event(namespace=NAMESPACE)
+@instrument_event(NAMESPACE)
 async def join(sid, data):
     log_join_event(sid, data)
     log_debug("Join request received", {"sid": sid, "data": data})
@@ -104,19 +119,31 @@ async def join(sid, data):
         client_rooms[sid] = {'username': username, 'room_id': room_id}
         last_heartbeat[sid] = time.time()
 
-        await sio.emit('user_joined', {'username': username}, room=str(room_id), namespace=NAMESPACE)
+        # Back within the grace period, or before the old sid was even noticed as gone:
+        # the others never saw this player leave
+        resumed = cancel_player_leave(username, room_id) or has_other_session(username, room_id, sid)
+        if not resumed:
+            await emit_player_delta('player_joined', room_id, {'username': username, 'is_host': player.is_host})
 
+        # The joining client gets the full list once, with the version it reflects
         players = await get_players_for_room(db, room_id)
-        await sio.emit('update_players', {'players': players}, room=str(room_id), namespace=NAMESPACE)
-
-        log_debug("Join successful", {"sid": sid, "room_id": room_id, "username": username, "is_host": player.is_host})
-        await sio.emit('join_success', {
+        log_debug("Join successful", {"sid": sid, "room_id": room_id, "username": username,
+                                      "is_host": player.is_host, "resumed": resumed})
+        response = {
             'success': True,
             'room_id': room_id,
             'username': username,
             'is_host': player.is_host,
-            'players': players
-        }, to=sid, namespace=NAMESPACE)
+            'players': players,
+            'version': room_player_versions.get(room_id, 0),
+            'resumed': resumed
+        }
+        # A re-joining client says what it has seen and gets what it missed
+        last_message_id = data.get('last_message_id')
+        if last_message_id is not None:
+            response['messages'], response['messages_truncated'] = await get_messages_after(
+                db, room_id, int(last_message_id), settings.CHAT_RESYNC_LIMIT)
+        await sio.emit('join_success', response, to=sid, namespace=NAMESPACE)
 
     except Exception as e:
         log_error("join", sid, e)
@@ -128,19 +155,24 @@ async def join(sid, data):
         await db.close()
 
 @sio.event(namespace=NAMESPACE)
+@instrument_event(NAMESPACE)
 async def leave(sid, data):
     log_leave_event(sid, data)
-    room_id = data.get('room_id')
-    username = data.get('username')
-
-    if not room_id or not username:
+    # The seat belongs to whoever joined on this sid, not to the username in the payload
+    session = client_rooms.get(sid)
+    if not session:
+        log_debug("Leave ignored - no joined session", {"sid": sid, "data": data})
         return
+    room_id = session['room_id']
+    username = session['username']
 
     db = await create_session()
     try:
-        room_id = int(room_id)
         await sio.leave_room(sid, str(room_id), namespace=NAMESPACE)
 
+        room_result = await db.execute(select(Room).filter_by(id=room_id))
+        room = room_result.scalars().first()
+
         # جلب اللاعب
         result = await db.execute(
             select(RoomPlayer).filter_by(room_id=room_id, player_username=username)
@@ -150,7 +182,8 @@ async def leave(sid, data):
         if player:
             is_host_leaving = player.is_host  # ✅ نحتفظ بحالة المضيف قبل الحذف
             await db.delete(player)
-            await vpn.check_user_in_network_config(db, room.network_name, username=current_user.email)
+            if room and room.network_name:
+                await vpn.check_user_in_network_config(db, room.network_name, username)
             await db.flush()
         else:
             is_host_leaving = False
@@ -162,34 +195,31 @@ async def leave(sid, data):
         players_left = remaining_players_result.scalars().all()
 
         if not players_left:
-            await vpn.down_network_config(db, room.network_name)
             # حذف الغرفة إذا لم يبق أحد
-            room_result = await db.execute(select(Room).filter_by(id=room_id))
-            room = room_result.scalars().first()
             if room:
+                if room.network_name:
+                    await vpn.down_network_config(db, room.network_name)
                 await db.delete(room)
+                room_player_versions.pop(room_id, None)
                 await sio.emit('room_closed', {'room_id': room_id}, room=str(room_id), namespace=NAMESPACE)
                 await sio.emit('update_rooms', {}, namespace=NAMESPACE)
                 log_debug(f"Room {room_id} deleted after last player left")
         else:
             # ✅ إذا المضيف طلع، ننقل الملكية لأول لاعب متبقٍ
+            if is_host_leaving and room:
+                new_host = players_left[0]
+                new_host.is_host = True
+                room.owner_username = new_host.player_username
+                log_debug(f"👑 New host assigned: {new_host.player_username}")
+            else:
+                is_host_leaving = False
+            if room:
+                room.current_players = len(players_left)
+
+            # إرسال التغييرات فقط بدلاً من القائمة الكاملة
+            await emit_player_delta('player_left', room_id, {'username': username})
             if is_host_leaving:
-                room_result = await db.execute(select(Room).filter_by(id=room_id))
-                room = room_result.scalars().first()
-                if room:
-                    new_host = players_left[0]
-                    new_host.is_host = True
-                    room.owner_username = new_host.player_username
-                    await sio.emit('host_changed', {
-                        'new_host': new_host.player_username,
-                        'room_id': room_id
-                    }, room=str(room_id), namespace=NAMESPACE)
-                    log_debug(f"👑 New host assigned: {new_host.player_username}")
-
-            # إرسال التحديثات
-            players = await get_players_for_room(db, room_id)
-            await sio.emit('update_players', {'players': players}, room=str(room_id), namespace=NAMESPACE)
-            await sio.emit('user_left', {'username': username}, room=str(room_id), namespace=NAMESPACE)
+                await emit_player_delta('host_changed', room_id, {'new_host': new_host.player_username})
             await sio.emit('update_rooms', {}, namespace=NAMESPACE)
 
         await db.commit()
@@ -204,6 +234,7 @@ async def leave(sid, data):
     last_heartbeat.pop(sid, None)
 
 @sio.event(namespace=NAMESPACE)
+@instrument_event(NAMESPACE)
 async def heartbeat(sid, data):
     log_heartbeat(sid, data)
     if sid in last_heartbeat:
@@ -219,7 +250,7 @@ async def heartbeat(sid, data):
             except (ValueError, TypeError):
                 log_error("heartbeat", sid, f"Invalid room_id: {data['room_id']}")
     else:
-        log_debug(f"Heartbeat from unknown SID: {sid}", data)
+        log_debug("Heartbeat from unknown SID", {"sid": sid, "data": data})
         last_heartbeat[sid] = time.time()
         if data and 'room_id' in data and 'username' in data:
             try:
@@ -232,6 +263,39 @@ async def heartbeat(sid, data):
                 pass
 
 @sio.event(namespace=NAMESPACE)
+@instrument_event(NAMESPACE)
+async def sync_players(sid, data):
+    """
+    Sent by a client that missed a player delta (version gap). Replies with
+    players_snapshot only when the client's version is not the current one.
+    """
+    client = client_rooms.get(sid)
+    try:
+        room_id = int(data.get('room_id'))
+    except (AttributeError, ValueError, TypeError):
+        return
+    if not client or client['room_id'] != room_id:
+        return
+
+    version = room_player_versions.get(room_id, 0)
+    if data.get('version') == version:
+        return
+
+    db = await create_session()
+    try:
+        players = await get_players_for_room(db, room_id)
+        await sio.emit('players_snapshot', {
+            'room_id': room_id,
+            'players': players,
+            'version': version
+        }, to=sid, namespace=NAMESPACE)
+    except Exception as e:
+        log_error("sync_players", sid, e)
+    finally:
+        await db.close()
+
+@sio.event(namespace=NAMESPACE)
+@instrument_event(NAMESPACE)
 async def send_message(sid, data):
     log_message(sid, data)
     room_id = data.get('room_id')
@@ -263,6 +327,7 @@ async def send_message(sid, data):
         await db.refresh(chat_message)
 
         await sio.emit('new_message', {
+            'id': chat_message.id,
             'username': username,
             'message': message,
             'room_id': room_id_int,
@@ -277,6 +342,7 @@ async def send_message(sid, data):
         await db.close()
 
 @sio.event(namespace=NAMESPACE)
+@instrument_event(NAMESPACE)
 async def check_player(sid, data):
     log_player_check(sid, data)
     room_id = data.get('room_id')
@@ -304,6 +370,7 @@ async def check_player(sid, data):
         return {'exists': False}
 
 @sio.event(namespace=NAMESPACE)
+@instrument_event(NAMESPACE)
 async def start_game(sid, data):
     log_game_start(sid, data)
     room_id = data.get('room_id')
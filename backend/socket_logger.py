@@ -1,74 +1,175 @@
+import atexit
+import itertools
+import json
 import logging
+import logging.handlers
 import os
-from datetime import datetime
+import queue
+from datetime import datetime, timezone
+
+from config import settings
 
 # Create logs directory if it doesn't exist
 logs_dir = os.path.join(os.path.dirname(__file__), 'logs')
 os.makedirs(logs_dir, exist_ok=True)
+log_file = settings.SOCKET_LOG_FILE or os.path.join(logs_dir, 'socket_events.log')
+
+# Only the QueueHandler runs on the event loop: it snapshots the record and
+# puts it on a queue. Formatting and disk/console writes happen on the
+# QueueListener's thread.
+_log_queue = queue.SimpleQueue()
+
+# Fields every LogRecord has; anything else was passed through `extra`
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, logger, msg and the event's fields"""
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class ConsoleFormatter(logging.Formatter):
+    """The usual one-line console format, followed by the event's fields as key=value"""
+
+    def __init__(self):
+        super().__init__('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    def formatMessage(self, record):
+        line = super().formatMessage(record)
+        fields = [
+            f"{key}={json.dumps(value, default=str, ensure_ascii=False) if isinstance(value, (dict, list)) else value}"
+            for key, value in record.__dict__.items() if key not in _RECORD_ATTRS
+        ]
+        return f"{line} - {' '.join(fields)}" if fields else line
+
+
+class SnapshotQueueHandler(logging.handlers.QueueHandler):
+    """
+    The stock QueueHandler formats the message in the caller's thread.
+    This one only merges args and copies the structured fields, so that
+    later changes to a dict the caller passed cannot alter the record.
+    """
+
+    def prepare(self, record):
+        record = logging.makeLogRecord(record.__dict__)
+        record.msg = record.getMessage()
+        record.args = None
+        for key, value in list(record.__dict__.items()):
+            if key not in _RECORD_ATTRS and isinstance(value, dict):
+                setattr(record, key, dict(value))
+        if record.exc_info:
+            # Tracebacks are turned into text here; they cannot cross threads lazily
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+# Size-based rotation: socket_events.log, socket_events.log.1, ...
+file_handler = logging.handlers.RotatingFileHandler(
+    log_file, maxBytes=settings.SOCKET_LOG_MAX_BYTES, backupCount=settings.SOCKET_LOG_BACKUPS, encoding="utf-8")
+file_handler.setFormatter(JsonFormatter())
+file_handler.addFilter(logging.Filter('socket_events'))
+
+console_handler = logging.StreamHandler()
+console_handler.setLevel(settings.LOG_LEVEL)
+console_handler.setFormatter(ConsoleFormatter())
+
+_listener = logging.handlers.QueueListener(_log_queue, file_handler, console_handler, respect_handler_level=True)
+_listener.start()
+atexit.register(_listener.stop)
+
+queue_handler = SnapshotQueueHandler(_log_queue)
 
 # Configure logger
 socket_logger = logging.getLogger('socket_events')
-socket_logger.setLevel(logging.DEBUG)
+socket_logger.setLevel(settings.SOCKET_LOG_LEVEL)
+socket_logger.addHandler(queue_handler)
+socket_logger.propagate = False
 
-# Create file handler
-log_file = os.path.join(logs_dir, 'socket_events.log')
-file_handler = logging.FileHandler(log_file)
-file_handler.setLevel(logging.DEBUG)
 
-# Create console handler
-console_handler = logging.StreamHandler()
-console_handler.setLevel(logging.DEBUG)
+def configure_root_logging():
+    """Send every other logger through the same queue (used by shared.py instead of basicConfig)"""
+    root = logging.getLogger()
+    root.setLevel(settings.LOG_LEVEL)
+    if queue_handler not in root.handlers:
+        root.addHandler(queue_handler)
+
+
+def _log(level, message, fields):
+    # Level checked before anything is built, so disabled events cost one call
+    if socket_logger.isEnabledFor(level):
+        socket_logger.log(level, message, extra=fields)
+
 
-# Create formatter
-formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-file_handler.setFormatter(formatter)
-console_handler.setFormatter(formatter)
+_heartbeats = itertools.count()
 
-# Add handlers to logger
-socket_logger.addHandler(file_handler)
-socket_logger.addHandler(console_handler)
 
 def log_connection(sid, environ):
     """Log new socket connection"""
-    socket_logger.info(f"New connection - SID: {sid}")
-    socket_logger.debug(f"Connection environment: {environ}")
+    # Only what identifies the client; the full environ is large and may hold credentials
+    _log(logging.INFO, "New connection", {
+        "event": "connect", "sid": sid,
+        "remote_addr": environ.get("REMOTE_ADDR"),
+        "user_agent": environ.get("HTTP_USER_AGENT"),
+    })
 
 def log_disconnection(sid, client_rooms):
     """Log socket disconnection"""
-    socket_logger.info(f"Disconnection - SID: {sid}")
-    socket_logger.debug(f"Client rooms state: {client_rooms}")
+    room = client_rooms.get(sid) or {}
+    _log(logging.INFO, "Disconnection", {
+        "event": "disconnect", "sid": sid,
+        "room_id": room.get("room_id"), "username": room.get("username"),
+    })
 
 def log_join_event(sid, data):
     """Log room join event"""
-    socket_logger.info(f"Join event - SID: {sid}, Data: {data}")
+    _log(logging.INFO, "Join event", {"event": "join", "sid": sid, "data": data})
 
 def log_leave_event(sid, data):
     """Log room leave event"""
-    socket_logger.info(f"Leave event - SID: {sid}, Data: {data}")
+    _log(logging.INFO, "Leave event", {"event": "leave", "sid": sid, "data": data})
 
 def log_heartbeat(sid, data):
-    """Log heartbeat event"""
-    socket_logger.debug(f"Heartbeat - SID: {sid}, Data: {data}")
+    """Log heartbeat event; only one in HEARTBEAT_LOG_SAMPLE is written"""
+    if not socket_logger.isEnabledFor(logging.DEBUG):
+        return
+    count = next(_heartbeats)
+    if count % settings.HEARTBEAT_LOG_SAMPLE == 0:
+        socket_logger.debug("Heartbeat", extra={
+            "event": "heartbeat", "sid": sid, "data": data, "sampled_1_in": settings.HEARTBEAT_LOG_SAMPLE})
 
 def log_message(sid, data):
     """Log chat message event"""
-    socket_logger.info(f"New message - SID: {sid}, Data: {data}")
+    _log(logging.INFO, "New message", {"event": "message", "sid": sid, "data": data})
 
 def log_player_check(sid, data):
     """Log player check event"""
-    socket_logger.info(f"Player check - SID: {sid}, Data: {data}")
+    _log(logging.INFO, "Player check", {"event": "check_player", "sid": sid, "data": data})
 
 def log_game_start(sid, data):
     """Log game start event"""
-    socket_logger.info(f"Game start - SID: {sid}, Data: {data}")
+    _log(logging.INFO, "Game start", {"event": "start_game", "sid": sid, "data": data})
 
 def log_error(event_type, sid, error):
     """Log socket errors"""
-    socket_logger.error(f"Error in {event_type} - SID: {sid}, Error: {str(error)}")
+    _log(logging.ERROR, f"Error in {event_type}", {"event": event_type, "sid": sid, "error": str(error)})
 
 def log_debug(message, data=None):
     """Log debug messages"""
-    if data:
-        socket_logger.debug(f"{message} - Data: {data}")
-    else:
-        socket_logger.debug(message) 
\ No newline at end of file
+    if socket_logger.isEnabledFor(logging.DEBUG):
+        socket_logger.debug(message, extra={"data": data} if data else None)
@@ -0,0 +1,174 @@
+"""
+Tests for the admin live-state API (routers/admin.py) and the per-room
+session index (shared.SessionIndex)
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import asyncio
+import time
+from unittest.mock import patch
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+
+import database  # noqa: F401  (loads models before vpnserver.genrator)
+from database.database import get_session
+from models import Base, Room, User, network_config, network_config_user
+from config import settings
+from routers.admin import router
+from routers.friends import get_current_user
+from services.command_runner import SimulatedRunner, set_runner
+from shared import SessionIndex
+
+
+def test_session_index_tracks_rooms():
+    index = SessionIndex()
+    index["a"] = {"username": "alice", "room_id": 1}
+    index["b"] = {"username": "bob", "room_id": 1}
+    index["a"] = {"username": "alice", "room_id": 1}
+    assert index.by_room == {1: {"a", "b"}}
+
+    index["a"] = {"username": "alice", "room_id": 2}
+    assert index.by_room == {1: {"b"}, 2: {"a"}}
+
+    del index["b"]
+    assert index.pop("a")["room_id"] == 2
+    assert index.pop("missing", None) is None
+    assert index == {} and index.by_room == {}
+
+
+def _seed(url):
+    async def run():
+        engine = create_async_engine(url, poolclass=NullPool)
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        factory = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+        async with factory() as session:
+            session.add_all([
+                User(id=1, username="alice", email="alice@example.com", password_hash="x", public_key=b"ALICE="),
+                User(id=2, username="bob", email="bob@example.com", password_hash="x", public_key=b"BOB="),
+                User(id=3, username="carol", email="carol@example.com", password_hash="x", public_key=b"CAROL="),
+                network_config(id=1, network_name="wg-room-1", server_ip="10.1.0.1/24", port=51820, is_active=True),
+                network_config(id=2, network_name="wg-room-2", server_ip="10.2.0.1/24", port=51821, is_active=True),
+            ])
+            session.add_all([
+                Room(id=1, name="one", owner_username="alice", network_name="wg-room-1", current_players=2),
+                Room(id=2, name="two", owner_username="alice", network_name="wg-room-2", current_players=1),
+                Room(id=3, name="three", owner_username="bob", current_players=0),
+                network_config_user(network_config_id=1, user_id=2, allowed_ips="10.1.0.2/32"),
+                network_config_user(network_config_id=1, user_id=3, allowed_ips="10.1.0.3/32"),
+                network_config_user(network_config_id=2, user_id=1, allowed_ips="10.2.0.2/32"),
+            ])
+            await session.commit()
+        await engine.dispose()
+    asyncio.run(run())
+
+
+@pytest.fixture
+def state():
+    sessions = SessionIndex()
+    heartbeats = {}
+    pending = {}
+    voice = {}
+    with patch("routers.admin.client_rooms", sessions), \
+         patch("routers.admin.last_heartbeat", heartbeats), \
+         patch("routers.admin.pending_leaves", pending), \
+         patch("routers.admin.webrtc_rooms", voice):
+        yield sessions, heartbeats, pending, voice
+
+
+@pytest.fixture
+def runner():
+    simulated = SimulatedRunner()
+    previous = set_runner(simulated)
+    yield simulated
+    set_runner(previous)
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch, state, runner):
+    url = f"sqlite+aiosqlite:///{tmp_path / 'admin.db'}"
+    _seed(url)
+    engine = create_async_engine(url, poolclass=NullPool)
+    factory = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    async def session_override():
+        async with factory() as session:
+            yield session
+
+    user = User(id=1, username="alice")
+    app = FastAPI()
+    app.include_router(router, prefix="/admin")
+    app.dependency_overrides[get_session] = session_override
+    app.dependency_overrides[get_current_user] = lambda: user
+    monkeypatch.setattr(settings, "ADMIN_USERNAMES", ["alice"])
+    return TestClient(app)
+
+
+def test_non_admin_is_forbidden(client, monkeypatch):
+    monkeypatch.setattr(settings, "ADMIN_USERNAMES", [])
+    assert client.get("/admin/overview").status_code == 403
+
+
+def test_sessions_are_grouped_by_room_and_paginated(client, state):
+    sessions, heartbeats, pending, voice = state
+    now = time.time()
+    for sid, username, room_id, age in [("s1", "alice", 1, 1), ("s2", "bob", 1, 60), ("s3", "carol", 2, 2), ("s4", "dave", 5, 3)]:
+        sessions[sid] = {"username": username, "room_id": room_id}
+        heartbeats[sid] = now - age
+    pending[(2, "erin")] = object()
+    voice[1] = {"alice": "v1"}
+
+    first = client.get("/admin/sessions", params={"limit": 2}).json()
+    assert [room["room_id"] for room in first["rooms"]] == [1, 2] and first["next_after"] == 2
+    one = first["rooms"][0]["sessions"]
+    assert [(s["sid"], s["stale"], s["voice"]) for s in one] == [("s1", False, True), ("s2", True, False)]
+    assert first["rooms"][1]["reconnecting"] == ["erin"]
+
+    second = client.get("/admin/sessions", params={"after": 2, "limit": 2}).json()
+    assert [room["room_id"] for room in second["rooms"]] == [5] and second["next_after"] is None
+
+
+def test_rooms_report_peer_drift_against_kernel(client, state, runner):
+    sessions, _, _, _ = state
+    sessions["s1"] = {"username": "bob", "room_id": 1}
+    runner.run(["wg-quick", "up", "wg-room-1"], check=True)
+    runner.run(["wg", "set", "wg-room-1", "peer", "BOB=", "allowed-ips", "10.1.0.2/32"], check=True)
+    runner.run(["wg", "set", "wg-room-1", "peer", "STRAY=", "allowed-ips", "10.1.0.9/32"], check=True)
+
+    page = client.get("/admin/rooms", params={"limit": 2}).json()
+    one, two = page["rooms"]
+    assert page["next_after"] == 2 and one["connected_sids"] == ["s1"]
+    assert one["network"]["peers"] == 2 and one["network"]["kernel_peers"] == 2
+    assert one["network"]["missing_in_kernel"] == ["CAROL="]
+    assert one["network"]["unknown_in_kernel"] == ["STRAY="]
+    assert two["network"]["interface_up"] is False and two["network"]["missing_in_kernel"] == ["ALICE="]
+
+    last = client.get("/admin/rooms", params={"after": 2}).json()
+    assert last["rooms"][0]["network"] is None and last["next_after"] is None
+
+
+def test_overview_and_vpn(client, state, runner):
+    sessions, heartbeats, _, _ = state
+    sessions["s1"] = {"username": "bob", "room_id": 1}
+    heartbeats["s1"] = time.time() - 100
+    runner.run(["wg-quick", "up", "wg-room-1"], check=True)
+    runner.run(["wg-quick", "up", "wg-room-9"], check=True)
+
+    overview = client.get("/admin/overview").json()
+    assert overview["sessions"] == 1 and overview["heartbeats"]["stale"] == 1
+    assert overview["allocators"]["subnets"] == {"used": 2, "capacity": 254}
+    assert overview["allocators"]["ports"]["used"] == 2
+    assert overview["allocators"]["hosts"]["busiest_network"] == 2
+    assert overview["networks"] == {"active": 2, "inactive": 0} and overview["vpn_peers"] == 3
+
+    vpn = client.get("/admin/vpn").json()
+    assert vpn["ok"] and vpn["active_networks"] == 2
+    assert vpn["down_in_kernel"] == ["wg-room-2"] and vpn["not_active_in_db"] == ["wg-room-9"]
@@ -0,0 +1,104 @@
+"""
+Tests for the command runner and the in-memory wg / wg-quick / vpncmd simulator
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import subprocess
+import time
+
+import pytest
+
+import database  # noqa: F401  (loads models before vpnserver.genrator)
+from services.command_runner import SimulatedRunner, get_runner, set_runner
+from services.softether import SoftEtherVPN
+from services.Wiregruad import WiregruadVPN
+from vpnserver.genrator import generate_wireguard_keys
+
+
+@pytest.fixture
+def runner():
+    simulated = SimulatedRunner(seed=1)
+    previous = set_runner(simulated)
+    yield simulated
+    set_runner(previous)
+
+
+def test_interfaces_and_peers(runner):
+    runner.run(["sudo", "wg-quick", "up", "/etc/wg/wg-room-1.conf"], check=True)
+    runner.run(["sudo", "wg", "set", "wg-room-1", "peer", "KEY=", "allowed-ips", "10.1.0.2/32"], check=True)
+    assert runner.interfaces["wg-room-1"]["peers"] == {"KEY=": "10.1.0.2/32"}
+    assert "peer: KEY=" in runner.run(["wg", "show", "wg-room-1"]).stdout
+
+    runner.run(["sudo", "wg", "set", "wg-room-1", "peer", "KEY=", "remove"], check=True)
+    assert runner.interfaces["wg-room-1"]["peers"] == {}
+
+    runner.run(["sudo", "wg-quick", "down", "/etc/wg/wg-room-1.conf"], check=True)
+    result = runner.run(["sudo", "wg", "set", "wg-room-1", "peer", "KEY=", "allowed-ips", "10.1.0.2/32"])
+    assert result.returncode == 1 and "No such device" in result.stderr
+    with pytest.raises(subprocess.CalledProcessError):
+        runner.run(["sudo", "wg-quick", "down", "wg-room-1"], check=True)
+
+
+def test_keys_are_deterministic_per_seed(runner):
+    private_key, public_key = generate_wireguard_keys()
+    assert isinstance(private_key, bytes) and len(private_key) == 44
+    assert runner.run(["wg", "pubkey"], input=private_key.decode()).stdout.strip().encode() == public_key
+
+    set_runner(SimulatedRunner(seed=1))
+    assert generate_wireguard_keys() == (private_key, public_key)
+
+
+async def test_softether_hub_lifecycle(runner):
+    vpn = SoftEtherVPN()
+    assert await vpn.create_hub("room_1", "secret")
+    hub = runner.hubs["room_1"]
+    assert hub["password"] == "secret" and hub["dhcp"] and hub["securenat"]
+
+    assert await vpn.create_user("room_1", "ali", "pw")
+    assert runner.hubs["room_1"]["users"] == {"ali": "pw"}
+    assert "User Name|ali" in await vpn.get_user_list("room_1")
+    assert await vpn.delete_user("room_1", "ali")
+
+    assert not await vpn.create_hub("room_1")
+    assert await vpn.delete_hub("room_1")
+    assert not await vpn.delete_hub("room_1")
+
+
+async def test_injected_failures_and_latency(runner):
+    runner.fail_next("vpncmd", times=1)
+    assert not await SoftEtherVPN().create_hub("room_2")
+    assert "room_2" not in runner.hubs
+
+    runner.latency = {"wg-quick": 0.05}
+    start = time.perf_counter()
+    runner.run(["sudo", "wg-quick", "up", "wg0"], check=True)
+    assert time.perf_counter() - start >= 0.05
+
+    flaky = SimulatedRunner(failure_rate=0.5, seed=3)
+    outcomes = [flaky.run(["wg", "genkey"]).returncode for _ in range(200)]
+    assert 60 < outcomes.count(1) < 140
+
+
+async def test_kernel_peers_and_diagnose(runner):
+    vpn = WiregruadVPN()
+    assert await vpn.diagnose() == {"ok": True, "interfaces": {}, "peers": 0}
+
+    runner.run(["sudo", "wg-quick", "up", "wg-room-1"], check=True)
+    runner.run(["sudo", "wg-quick", "up", "wg-room-2"], check=True)
+    runner.run(["sudo", "wg", "set", "wg-room-1", "peer", "A=", "allowed-ips", "10.1.0.2/32"], check=True)
+    runner.run(["sudo", "wg", "set", "wg-room-1", "peer", "B=", "allowed-ips", "10.1.0.3/32"], check=True)
+    assert await vpn.kernel_peers() == {"wg-room-1": {"A=", "B="}, "wg-room-2": set()}
+    assert runner.run(["wg", "show", "wg-room-1", "peers"]).stdout.split() == ["A=", "B="]
+
+    diagnosis = await vpn.diagnose()
+    assert diagnosis["interfaces"] == {"wg-room-1": 2, "wg-room-2": 0} and diagnosis["peers"] == 2
+
+    runner.fail_next("wg", stderr="Operation not permitted")
+    assert await vpn.diagnose() == {"ok": False, "error": "Operation not permitted", "interfaces": {}}
+
+
+def test_default_runner_is_swappable(runner):
+    assert get_runner() is runner
@@ -0,0 +1,79 @@
+"""
+Tests for ETag / If-None-Match handling (http_cache.py)
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from fastapi import FastAPI
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import PlainTextResponse
+from fastapi.testclient import TestClient
+
+from http_cache import ETagMiddleware, etag_matches
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    state = {"rooms": [{"id": 1, "name": "room " * 400}]}
+
+    @app.get("/rooms/")
+    async def rooms():
+        return state
+
+    @app.post("/rooms/")
+    async def add_room():
+        state["rooms"].append({"id": len(state["rooms"]) + 1, "name": "new"})
+        return {"message": "ok"}
+
+    @app.get("/text")
+    async def text():
+        return PlainTextResponse("hello")
+
+    app.add_middleware(ETagMiddleware)
+    app.add_middleware(GZipMiddleware, minimum_size=1024)
+    return TestClient(app)
+
+
+def test_json_get_gets_etag_and_304_when_unchanged(client):
+    first = client.get("/rooms/")
+    etag = first.headers["etag"]
+    assert first.status_code == 200
+    assert first.headers["cache-control"] == "private, no-cache"
+
+    second = client.get("/rooms/", headers={"If-None-Match": etag})
+    assert second.status_code == 304
+    assert second.content == b""
+    assert second.headers["etag"] == etag
+
+
+def test_changed_resource_returns_new_body_and_etag(client):
+    etag = client.get("/rooms/").headers["etag"]
+    client.post("/rooms/")
+
+    response = client.get("/rooms/", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+    assert len(response.json()["rooms"]) == 2
+
+
+def test_etag_is_computed_before_compression(client):
+    plain = client.get("/rooms/", headers={"Accept-Encoding": "identity"})
+    gzipped = client.get("/rooms/", headers={"Accept-Encoding": "gzip"})
+    assert gzipped.headers.get("content-encoding") == "gzip"
+    assert plain.headers["etag"] == gzipped.headers["etag"]
+
+
+def test_non_json_and_non_get_are_untouched(client):
+    assert "etag" not in client.get("/text").headers
+    assert "etag" not in client.post("/rooms/").headers
+
+
+def test_etag_matches_lists_and_weak_tags():
+    assert etag_matches('"a", "b"', '"b"')
+    assert etag_matches('W/"b"', '"b"')
+    assert etag_matches("*", '"b"')
+    assert not etag_matches(None, '"b"')
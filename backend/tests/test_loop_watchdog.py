@@ -0,0 +1,70 @@
+"""
+Tests for the event-loop lag and stall watchdog
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import asyncio
+import logging
+import time
+
+import metrics
+from loop_watchdog import LoopWatchdog
+
+
+class Collect(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+def make_stall_logger():
+    stall_logger = logging.getLogger("loop_stalls_test")
+    stall_logger.handlers = []
+    stall_logger.propagate = False
+    collect = Collect()
+    stall_logger.addHandler(collect)
+    return stall_logger, collect
+
+
+def block_the_loop_for(seconds):
+    time.sleep(seconds)
+
+
+async def test_blocking_call_is_reported_with_its_stack():
+    stall_logger, collect = make_stall_logger()
+    stalls = metrics.loop_stalls.value()
+    watchdog = LoopWatchdog(interval=0.01, threshold=0.05, stall_logger=stall_logger)
+    watchdog.start()
+    try:
+        await asyncio.sleep(0.05)
+        block_the_loop_for(0.3)
+        await asyncio.sleep(0.1)
+    finally:
+        await watchdog.stop()
+
+    assert len(collect.records) == 1
+    record = collect.records[0]
+    assert record.ongoing is False
+    assert 250 <= record.blocked_ms < 1000
+    assert any("block_the_loop_for" in stack for stack in record.stacks)
+    assert metrics.loop_stalls.value() == stalls + 1
+    assert watchdog.lag_quantiles()[1.0] >= 0.25
+
+
+async def test_idle_loop_reports_nothing():
+    stall_logger, collect = make_stall_logger()
+    watchdog = LoopWatchdog(interval=0.01, threshold=0.05, stall_logger=stall_logger)
+    watchdog.start()
+    try:
+        await asyncio.sleep(0.2)
+    finally:
+        await watchdog.stop()
+
+    assert collect.records == []
+    assert watchdog.lag_quantiles()[0.5] < 0.05
@@ -0,0 +1,113 @@
+"""
+Tests for the /metrics exposition and instrumentation (metrics.py)
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import subprocess
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import metrics
+import database  # noqa: F401  (loads models before services.Wiregruad)
+from services.Wiregruad import run_wg
+from services.command_runner import SimulatedRunner, set_runner
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+
+    @app.get("/rooms/{room_id}")
+    async def room(room_id: int):
+        return {"id": room_id}
+
+    app.add_middleware(metrics.MetricsMiddleware)
+    app.include_router(metrics.router)
+    return TestClient(app)
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = metrics.Histogram("test_seconds", "test", ("op",), buckets=(0.1, 1.0))
+    try:
+        for value in (0.05, 0.5, 0.5, 3):
+            histogram.observe(value, op="a")
+        lines = histogram.render().splitlines()
+    finally:
+        metrics.REGISTRY.remove(histogram)
+
+    assert lines[1] == "# TYPE test_seconds histogram"
+    assert 'test_seconds_bucket{op="a",le="0.1"} 1' in lines
+    assert 'test_seconds_bucket{op="a",le="1"} 3' in lines
+    assert 'test_seconds_bucket{op="a",le="+Inf"} 4' in lines
+    assert 'test_seconds_sum{op="a"} 4.05' in lines
+    assert 'test_seconds_count{op="a"} 4' in lines
+
+
+def test_http_requests_are_labelled_by_route_template(client):
+    before = metrics.http_request_seconds.count(method="GET", route="/rooms/{room_id}", status="200")
+    client.get("/rooms/1")
+    client.get("/rooms/2")
+    client.get("/nowhere")
+
+    assert metrics.http_request_seconds.count(method="GET", route="/rooms/{room_id}", status="200") == before + 2
+    assert metrics.http_request_seconds.count(method="GET", route="unmatched", status="404") >= 1
+
+    response = client.get("/metrics")
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert 'http_request_duration_seconds_count{method="GET",route="/rooms/{room_id}",status="200"}' in response.text
+
+
+@pytest.mark.asyncio
+async def test_instrument_event_times_handlers_and_counts_errors():
+    @metrics.instrument_event("/test")
+    async def connect(sid, environ):
+        return environ
+
+    @metrics.instrument_event("/test")
+    async def broken(sid, data):
+        raise RuntimeError("boom")
+
+    # python-socketio passes auth as a third argument; the handler only takes two
+    assert await connect("sid", {"a": 1}, None) == {"a": 1}
+    with pytest.raises(RuntimeError):
+        await broken("sid", {})
+
+    assert metrics.sio_event_seconds.count(namespace="/test", event="connect") == 1
+    assert metrics.sio_event_errors.value(namespace="/test", event="broken") == 1
+    assert metrics.sio_event_errors.value(namespace="/test", event="connect") == 0
+
+
+def test_wireguard_failures_are_counted():
+    failures = metrics.wg_command_failures.value(command="wg-quick up")
+    calls = metrics.wg_command_seconds.count(command="wg-quick up")
+    down_failures = metrics.wg_command_failures.value(command="wg-quick down")
+    down_calls = metrics.wg_command_seconds.count(command="wg-quick down")
+    missing_failures = metrics.wg_command_failures.value(command="wg-missing down")
+    runner = SimulatedRunner()
+    previous = set_runner(runner)
+    try:
+        run_wg(["sudo", "wg-quick", "up", "/etc/wireguard/net1.conf"], check=True)
+        # already up: non-zero exit, raised because of check=True
+        with pytest.raises(subprocess.CalledProcessError):
+            run_wg(["sudo", "wg-quick", "up", "/etc/wireguard/net1.conf"], check=True)
+
+        # non-zero exit with check=False: returned, but still counted
+        runner.fail_next("wg-quick", stderr="no such interface")
+        result = run_wg(["sudo", "wg-quick", "down", "/etc/wireguard/net1.conf"], check=False)
+        assert result.returncode == 1
+        # binary not installed: counted and re-raised
+        with pytest.raises(FileNotFoundError):
+            run_wg(["sudo", "wg-missing", "down", "/etc/wireguard/net1.conf"])
+    finally:
+        set_runner(previous)
+
+    assert metrics.wg_command_failures.value(command="wg-quick up") == failures + 1
+    assert metrics.wg_command_seconds.count(command="wg-quick up") == calls + 2
+    assert metrics.wg_command_failures.value(command="wg-quick down") == down_failures + 1
+    assert metrics.wg_command_seconds.count(command="wg-quick down") == down_calls + 1
+    assert metrics.wg_command_failures.value(command="wg-missing down") == missing_failures + 1
@@ -0,0 +1,133 @@
+"""
+Tests for versioned player list deltas and the sync_players snapshot fallback
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+
+@pytest.fixture
+def versions():
+    versions = {}
+    with patch('helpers.room_player_versions', versions), \
+         patch('sio_events.room_player_versions', versions):
+        yield versions
+
+
+def test_versions_are_per_room_and_increasing(versions):
+    from helpers import bump_players_version
+
+    assert [bump_players_version(1) for _ in range(3)] == [1, 2, 3]
+    assert bump_players_version(2) == 1
+    assert versions == {1: 3, 2: 1}
+
+
+@pytest.mark.asyncio
+async def test_delta_is_broadcast_to_room_with_version(versions):
+    mock_sio = AsyncMock()
+    with patch('helpers.sio', mock_sio):
+        from helpers import emit_player_delta
+
+        await emit_player_delta('player_joined', 7, {'username': 'alice', 'is_host': False})
+        await emit_player_delta('player_left', 7, {'username': 'alice'})
+
+    first, second = mock_sio.emit.call_args_list
+    assert first.args == ('player_joined', {'username': 'alice', 'is_host': False, 'room_id': 7, 'version': 1})
+    assert second.args[1]['version'] == 2
+    assert first.kwargs == {'room': '7', 'namespace': '/game'}
+
+
+@pytest.mark.asyncio
+async def test_sync_players_sends_snapshot_only_when_behind(versions):
+    versions[1] = 5
+    mock_sio = AsyncMock()
+    db = MagicMock(close=AsyncMock())
+    players = [{'username': 'alice', 'is_host': True}]
+    with patch('sio_events.sio', mock_sio), \
+         patch('sio_events.client_rooms', {'sid_a': {'username': 'alice', 'room_id': 1}}), \
+         patch('sio_events.create_session', AsyncMock(return_value=db)), \
+         patch('sio_events.get_players_for_room', AsyncMock(return_value=players)):
+        from sio_events import sync_players
+
+        await sync_players('sid_a', {'room_id': '1', 'version': 5})
+        mock_sio.emit.assert_not_called()
+
+        await sync_players('sid_a', {'room_id': 1, 'version': 3})
+        mock_sio.emit.assert_called_once_with(
+            'players_snapshot', {'room_id': 1, 'players': players, 'version': 5},
+            to='sid_a', namespace='/game')
+        db.close.assert_awaited()
+
+
+@pytest.mark.asyncio
+async def test_sync_players_ignores_other_rooms(versions):
+    mock_sio = AsyncMock()
+    with patch('sio_events.sio', mock_sio), \
+         patch('sio_events.client_rooms', {'sid_a': {'username': 'alice', 'room_id': 1}}):
+        from sio_events import sync_players
+
+        await sync_players('sid_a', {'room_id': 2, 'version': 0})
+        await sync_players('sid_b', {'room_id': 1, 'version': 0})
+        await sync_players('sid_a', {'room_id': 'x'})
+        mock_sio.emit.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_last_player_leaving_closes_room_on_game_namespace(versions):
+    room = MagicMock(id=7, network_name=None)
+    player = MagicMock(is_host=True, player_username='alice')
+    results = [MagicMock(), MagicMock(), MagicMock()]
+    results[0].scalars.return_value.first.return_value = room
+    results[1].scalars.return_value.first.return_value = player
+    results[2].scalars.return_value.all.return_value = []
+    db = MagicMock(execute=AsyncMock(side_effect=results + [MagicMock()]), delete=AsyncMock(), commit=AsyncMock())
+    mock_sio = AsyncMock()
+    with patch('helpers.sio', mock_sio):
+        from helpers import handle_player_leave
+
+        await handle_player_leave('alice', 7, db)
+
+    closed = next(call for call in mock_sio.emit.call_args_list if call.args[0] == 'room_closed')
+    assert closed.args[1] == {'room_id': 7}
+    assert closed.kwargs == {'room': '7', 'namespace': '/game'}
+    db.commit.assert_awaited()
+
+
+@pytest.mark.asyncio
+async def test_explicit_leave_by_host_emits_delta(versions):
+    room = MagicMock(id=7, network_name='wg-room-7')
+    host = MagicMock(is_host=True, player_username='alice')
+    bob = MagicMock(is_host=False, player_username='bob')
+    results = [MagicMock(), MagicMock(), MagicMock()]
+    results[0].scalars.return_value.first.return_value = room
+    results[1].scalars.return_value.first.return_value = host
+    results[2].scalars.return_value.all.return_value = [bob]
+    db = MagicMock(execute=AsyncMock(side_effect=results), delete=AsyncMock(), flush=AsyncMock(),
+                   commit=AsyncMock(), rollback=AsyncMock(), close=AsyncMock())
+    sessions = {'sid_a': {'username': 'alice', 'room_id': 7}}
+    mock_sio = AsyncMock()
+    mock_vpn = AsyncMock()
+    with patch('helpers.sio', mock_sio), patch('sio_events.sio', mock_sio), \
+         patch('sio_events.client_rooms', sessions), \
+         patch('sio_events.vpn', mock_vpn), \
+         patch('sio_events.create_session', AsyncMock(return_value=db)):
+        from sio_events import leave
+
+        # The payload's username is not trusted; the sid's session decides who leaves
+        await leave('sid_a', {'room_id': 7, 'username': 'bob'})
+
+    mock_vpn.check_user_in_network_config.assert_awaited_once_with(db, 'wg-room-7', 'alice')
+    db.delete.assert_awaited_once_with(host)
+    db.commit.assert_awaited_once()
+    db.rollback.assert_not_awaited()
+    deltas = [call.args for call in mock_sio.emit.call_args_list if call.args[0] in ('player_left', 'host_changed')]
+    assert deltas == [
+        ('player_left', {'username': 'alice', 'room_id': 7, 'version': 1}),
+        ('host_changed', {'new_host': 'bob', 'room_id': 7, 'version': 2}),
+    ]
+    assert bob.is_host and room.owner_username == 'bob' and room.current_players == 1
+    assert sessions == {}
@@ -0,0 +1,107 @@
+"""
+Tests for the on-demand sampling profiler (profiler.py) and its admin endpoints
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import asyncio
+import threading
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import database  # noqa: F401  (loads models before vpnserver.genrator)
+import profiler
+from config import settings
+from models import User
+from routers.admin import router
+from routers.friends import get_current_user
+
+
+@pytest.fixture(autouse=True)
+def profile_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(profiler, "profile_dir", str(tmp_path))
+    return tmp_path
+
+
+def spin_in_worker(seconds):
+    end = time.monotonic() + seconds
+    while time.monotonic() < end:
+        pass
+
+
+def block_the_loop_for(seconds):
+    time.sleep(seconds)
+
+
+def test_thread_labels():
+    assert profiler.thread_label("ThreadPoolExecutor-0_3") == "ThreadPoolExecutor"
+    assert profiler.thread_label("Thread-5 (worker)") == "Thread (worker)"
+    assert profiler.thread_label("loop-watchdog") == "loop-watchdog"
+
+
+async def test_samples_loop_and_worker_threads(profile_dir):
+    sampler = profiler.SamplingProfiler()
+    assert not sampler.running
+    assert not any(thread.name == "profiler" for thread in threading.enumerate())
+
+    worker = threading.Thread(target=spin_in_worker, args=(0.4,), name="ThreadPoolExecutor-0_1")
+    profile = sampler.start(seconds=5, hz=200)
+    worker.start()
+    block_the_loop_for(0.3)
+    await asyncio.to_thread(worker.join)
+    await asyncio.to_thread(sampler.stop)
+
+    assert not sampler.running and profile.finished is not None
+    assert profile.samples > 20 and profile.status()["overhead"] < 0.5
+    lines = (profile_dir / os.path.basename(profile.path)).read_text().splitlines()
+    stacks = {line.rsplit(" ", 1)[0]: int(line.rsplit(" ", 1)[1]) for line in lines}
+    loop = [stack for stack in stacks if stack.startswith("event-loop;") and "block_the_loop_for" in stack]
+    pool = [stack for stack in stacks if stack.startswith("ThreadPoolExecutor;") and "spin_in_worker" in stack]
+    assert loop and pool
+    assert sum(stacks[stack] for stack in pool) > 20
+    # Idle threads (waiting in threading / queue / selectors) are left out by default
+    leaves = [stack.rsplit(";", 1)[-1] for stack in stacks]
+    assert not any(f"/{module}:" in leaf for leaf in leaves for module in profiler.IDLE_MODULES)
+
+
+def test_window_is_bounded_and_one_profile_at_a_time(monkeypatch):
+    monkeypatch.setattr(settings, "PROFILER_MAX_SECONDS", 1)
+    sampler = profiler.SamplingProfiler()
+    profile = sampler.start(seconds=600, hz=50)
+    assert profile.seconds == 1
+    with pytest.raises(RuntimeError):
+        sampler.start()
+    sampler._thread.join(3)
+    assert not sampler.running and profile.path
+
+
+def test_admin_endpoints(monkeypatch):
+    monkeypatch.setattr(profiler, "profiler", profiler.SamplingProfiler())
+    monkeypatch.setattr("routers.admin.profiler", profiler.profiler)
+    monkeypatch.setattr(settings, "ADMIN_USERNAMES", ["alice"])
+    app = FastAPI()
+    app.include_router(router, prefix="/admin")
+    app.dependency_overrides[get_current_user] = lambda: User(id=1, username="alice")
+    client = TestClient(app)
+
+    assert client.get("/admin/profile").json() == {"running": False}
+    assert client.get("/admin/profile/collapsed").status_code == 404
+    assert client.post("/admin/profile/stop").status_code == 409
+
+    started = client.post("/admin/profile", params={"seconds": 30, "hz": 100})
+    assert started.status_code == 202 and started.json()["running"]
+    assert client.post("/admin/profile").status_code == 409
+
+    stopped = client.post("/admin/profile/stop").json()
+    assert not stopped["running"] and stopped["file"].endswith(".collapsed")
+    collapsed = client.get("/admin/profile/collapsed")
+    assert collapsed.status_code == 200
+    assert collapsed.headers["content-disposition"].endswith('.collapsed"')
+
+    monkeypatch.setattr(settings, "ADMIN_USERNAMES", [])
+    assert client.post("/admin/profile").status_code == 403
@@ -0,0 +1,142 @@
+"""
+Tests for keeping a disconnected player's seat for a grace period and
+resyncing them when they re-join
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from shared import SessionIndex
+
+
+@pytest.fixture
+def pending():
+    pending = {}
+    with patch('helpers.pending_leaves', pending):
+        yield pending
+
+
+@pytest.mark.asyncio
+async def test_disconnect_defers_leave_until_grace_period_ends(pending):
+    handle_leave = AsyncMock()
+    db = MagicMock(close=AsyncMock())
+    with patch('sio_events.sio', AsyncMock()), \
+         patch('sio_events.client_rooms', {'sid_a': {'username': 'alice', 'room_id': 1}}), \
+         patch('sio_events.last_heartbeat', {}), \
+         patch('sio_events.RECONNECT_GRACE_SECONDS', 0.05), \
+         patch('helpers.handle_player_leave', handle_leave), \
+         patch('helpers.create_session', AsyncMock(return_value=db)):
+        from sio_events import disconnect
+
+        await disconnect('sid_a')
+        assert (1, 'alice') in pending
+        handle_leave.assert_not_called()
+
+        await asyncio.sleep(0.1)
+        handle_leave.assert_awaited_once_with('alice', 1, db)
+        assert pending == {}
+        db.close.assert_awaited()
+
+
+@pytest.mark.asyncio
+async def test_rejoin_within_grace_period_keeps_seat_and_returns_missed_messages(pending):
+    handle_leave = AsyncMock()
+    mock_sio = AsyncMock()
+    player = MagicMock(is_host=True)
+    result = MagicMock()
+    result.scalars.return_value.first.return_value = player
+    db = MagicMock(execute=AsyncMock(return_value=result), close=AsyncMock())
+    missed = [{'id': 12, 'username': 'bob', 'message': 'hi', 'created_at': '2024-01-01T00:00:00'}]
+    with patch('sio_events.sio', mock_sio), \
+         patch('sio_events.client_rooms', {}), \
+         patch('sio_events.last_heartbeat', {}), \
+         patch('sio_events.create_session', AsyncMock(return_value=db)), \
+         patch('sio_events.get_players_for_room', AsyncMock(return_value=[{'username': 'alice', 'is_host': True}])), \
+         patch('sio_events.get_messages_after', AsyncMock(return_value=(missed, False))) as messages_after, \
+         patch('sio_events.emit_player_delta', AsyncMock()) as delta, \
+         patch('helpers.handle_player_leave', handle_leave):
+        from helpers import schedule_player_leave
+        from sio_events import join
+
+        schedule_player_leave('alice', 1, 60)
+        await join('sid_b', {'room_id': '1', 'username': 'alice', 'last_message_id': 11})
+        await asyncio.sleep(0)
+
+    assert pending == {}
+    handle_leave.assert_not_called()
+    delta.assert_not_called()
+    messages_after.assert_awaited_once_with(db, 1, 11, 50)
+    event, response = mock_sio.emit.call_args.args
+    kwargs = mock_sio.emit.call_args.kwargs
+    assert event == 'join_success'
+    assert response['resumed'] is True
+    assert response['messages'] == missed
+    assert response['messages_truncated'] is False
+    assert kwargs == {'to': 'sid_b', 'namespace': '/game'}
+
+
+@pytest.mark.asyncio
+async def test_first_join_announces_player_and_skips_resync(pending):
+    mock_sio = AsyncMock()
+    result = MagicMock()
+    result.scalars.return_value.first.return_value = MagicMock(is_host=False)
+    db = MagicMock(execute=AsyncMock(return_value=result), close=AsyncMock())
+    with patch('sio_events.sio', mock_sio), \
+         patch('sio_events.client_rooms', {}), \
+         patch('sio_events.last_heartbeat', {}), \
+         patch('sio_events.create_session', AsyncMock(return_value=db)), \
+         patch('sio_events.get_players_for_room', AsyncMock(return_value=[])), \
+         patch('sio_events.get_messages_after', AsyncMock()) as messages_after, \
+         patch('sio_events.emit_player_delta', AsyncMock()) as delta:
+        from sio_events import join
+
+        await join('sid_a', {'room_id': 1, 'username': 'alice'})
+
+    delta.assert_awaited_once_with('player_joined', 1, {'username': 'alice', 'is_host': False})
+    messages_after.assert_not_called()
+    response = mock_sio.emit.call_args.args[1]
+    assert response['resumed'] is False
+    assert 'messages' not in response
+
+
+@pytest.mark.asyncio
+async def test_new_sid_joined_before_old_sid_disconnected_keeps_seat(pending):
+    sessions = SessionIndex()
+    sessions['sid_a'] = {'username': 'alice', 'room_id': 1}
+    handle_leave = AsyncMock()
+    mock_sio = AsyncMock()
+    result = MagicMock()
+    result.scalars.return_value.first.return_value = MagicMock(is_host=False)
+    db = MagicMock(execute=AsyncMock(return_value=result), close=AsyncMock())
+    with patch('sio_events.sio', mock_sio), \
+         patch('sio_events.client_rooms', sessions), \
+         patch('helpers.client_rooms', sessions), \
+         patch('sio_events.last_heartbeat', {}), \
+         patch('sio_events.RECONNECT_GRACE_SECONDS', 0.05), \
+         patch('sio_events.create_session', AsyncMock(return_value=db)), \
+         patch('sio_events.get_players_for_room', AsyncMock(return_value=[])), \
+         patch('sio_events.emit_player_delta', AsyncMock()) as delta, \
+         patch('helpers.handle_player_leave', handle_leave), \
+         patch('helpers.create_session', AsyncMock(return_value=db)):
+        from helpers import schedule_player_leave
+        from sio_events import join, disconnect
+
+        # The client reconnects on sid_b before the server notices sid_a is gone
+        await join('sid_b', {'room_id': 1, 'username': 'alice'})
+        assert mock_sio.emit.call_args.args[1]['resumed'] is True
+        await disconnect('sid_a')
+        assert pending == {}
+
+        # A leave already waiting out the grace period is dropped the same way
+        schedule_player_leave('alice', 1, 0.05)
+        await asyncio.sleep(0.1)
+
+    handle_leave.assert_not_called()
+    delta.assert_not_called()
+    assert pending == {}
+    assert sessions.by_room == {1: {'sid_b'}}
@@ -122,7 +122,8 @@ class TestSocketIOEvents:
         last_heartbeat[sid] = time.time()
         
         with patch.object(sio, 'leave_room', new_callable=AsyncMock) as mock_leave:
-            with patch('sio_events.handle_player_leave', new_callable=AsyncMock) as mock_handle_leave:
+            with patch('sio_events.handle_player_leave', new_callable=AsyncMock) as mock_handle_leave, \
+                 patch('sio_events.RECONNECT_GRACE_SECONDS', 0):
                 await sio_events.disconnect(sid)
                 
                 # Verify room leave was called
@@ -171,6 +172,7 @@ class TestSocketIOEvents:
                     assert response_data["success"] is True
                     assert response_data["room_id"] == room.id
                     assert response_data["username"] == player.player_username
+                    assert response_data["version"] >= 1
 
     @pytest.mark.asyncio
     async def test_join_event_player_not_registered(self, test_room_with_player):
@@ -280,6 +282,7 @@ class TestSocketIOEvents:
             assert args[1]["message"] == "Hello from SocketIO test!"
             assert args[1]["room_id"] == room.id
             assert "created_at" in args[1]
+            assert args[1]["id"] is not None
             assert kwargs["room"] == str(room.id)
 
     @pytest.mark.asyncio
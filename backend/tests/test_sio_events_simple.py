@@ -185,7 +185,8 @@ class TestSocketIOEventsSimple:
             with patch('sio_events.client_rooms', mock_client_rooms):
                 with patch('sio_events.last_heartbeat', mock_last_heartbeat):
                     with patch('sio_events.create_session') as mock_create_session:
-                        with patch('sio_events.handle_player_leave', new_callable=AsyncMock) as mock_handle_leave:
+                        with patch('sio_events.handle_player_leave', new_callable=AsyncMock) as mock_handle_leave, \
+                             patch('sio_events.RECONNECT_GRACE_SECONDS', 0):
                             
                             # Mock database session
                             mock_db = AsyncMock()
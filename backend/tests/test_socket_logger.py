@@ -0,0 +1,64 @@
+"""
+Tests for the queue-based socket event logging
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import json
+import logging
+from unittest.mock import patch
+
+import socket_logger
+
+
+def make_record(**fields):
+    record = socket_logger.socket_logger.makeRecord(
+        'socket_events', logging.INFO, __file__, 1, "Join event %s", ("now",), None, extra=fields)
+    return record
+
+
+def test_json_formatter_writes_message_and_fields():
+    entry = json.loads(socket_logger.JsonFormatter().format(make_record(event="join", sid="abc", data={"room_id": 1})))
+
+    assert entry["msg"] == "Join event now"
+    assert entry["level"] == "INFO"
+    assert entry["logger"] == "socket_events"
+    assert (entry["event"], entry["sid"], entry["data"]) == ("join", "abc", {"room_id": 1})
+
+
+def test_console_formatter_shows_the_event_fields():
+    record = make_record(event="leave", sid="abc", error="room gone", data={"room_id": 1})
+    line = socket_logger.ConsoleFormatter().format(record)
+
+    assert " - socket_events - INFO - Join event now - " in line
+    assert 'event=leave sid=abc error=room gone data={"room_id": 1}' in line
+    assert socket_logger.ConsoleFormatter().format(make_record()).endswith("INFO - Join event now")
+
+
+def test_queued_record_does_not_follow_later_changes():
+    data = {"room_id": 1}
+    handler = socket_logger.SnapshotQueueHandler(None)
+    record = handler.prepare(make_record(data=data))
+    data["room_id"] = 2
+
+    assert record.data == {"room_id": 1}
+    assert record.msg == "Join event now" and record.args is None
+
+
+def test_heartbeats_are_sampled_and_gated_by_level():
+    with patch.object(socket_logger.socket_logger, 'debug') as debug, \
+         patch.object(socket_logger.settings, 'HEARTBEAT_LOG_SAMPLE', 10), \
+         patch.object(socket_logger, '_heartbeats', iter(range(100))):
+        socket_logger.socket_logger.setLevel(logging.DEBUG)
+        try:
+            for _ in range(30):
+                socket_logger.log_heartbeat("sid", {})
+            assert debug.call_count == 3
+
+            socket_logger.socket_logger.setLevel(logging.INFO)
+            socket_logger.log_heartbeat("sid", {})
+            assert debug.call_count == 3
+        finally:
+            socket_logger.socket_logger.setLevel(socket_logger.settings.SOCKET_LOG_LEVEL)
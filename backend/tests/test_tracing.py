@@ -0,0 +1,183 @@
+"""
+Tests for request / event tracing spans (tracing.py)
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import asyncio
+import json
+import logging
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+import tracing
+import metrics
+from config import settings
+from services.command_runner import SimulatedRunner, describe
+
+
+@pytest.fixture
+def spans(monkeypatch):
+    collected = []
+    monkeypatch.setattr(settings, "TRACING_ENABLED", True)
+    monkeypatch.setattr(settings, "TRACE_SAMPLE_RATE", 1.0)
+    monkeypatch.setattr(tracing._exporter, "submit", collected.append)
+    return collected
+
+
+def test_children_nest_under_root(spans):
+    root, token = tracing.start_span("request", "server", root=True)
+    with tracing.span("db.query") as query:
+        with tracing.span("inner"):
+            pass
+    tracing.end_span(root, token)
+
+    inner, db, request = spans
+    assert request.parent_id is None
+    assert db.parent_id == request.span_id and inner.parent_id == db.span_id
+    assert {s.trace_id for s in spans} == {request.trace_id}
+    assert query is db and tracing.current_span() is None
+
+
+def test_unsampled_trace_records_nothing(spans, monkeypatch):
+    monkeypatch.setattr(settings, "TRACE_SAMPLE_RATE", 0.0)
+    root, token = tracing.start_span("request", root=True)
+    assert root is not None and not root.sampled
+    with tracing.span("child") as child:
+        assert child is None
+    tracing.end_span(root, token)
+    assert spans == []
+
+
+def test_disabled(spans, monkeypatch):
+    monkeypatch.setattr(settings, "TRACING_ENABLED", False)
+    assert tracing.start_span("request", root=True) == (None, None)
+
+
+def test_error_is_recorded(spans):
+    root, token = tracing.start_span("request", root=True)
+    with pytest.raises(ValueError):
+        with tracing.span("outer"):
+            raise ValueError("boom")
+    tracing.end_span(root, token)
+    assert spans[0].error == "ValueError: boom"
+
+
+def test_children_outside_a_request_record_nothing(spans):
+    with tracing.span("db.query") as query:
+        assert query is None
+    SimulatedRunner().run(["wg", "genkey"])
+    assert spans == [] and tracing.current_span() is None
+
+
+def test_incoming_traceparent_is_continued(spans, monkeypatch):
+    monkeypatch.setattr(settings, "TRACE_SAMPLE_RATE", 0.0)
+    header = "00-0af7651916cd43dd8448eb211c80319c-b7ad6b7169203331-01"
+    root, token = tracing.start_span("request", traceparent=header, root=True)
+    tracing.end_span(root, token)
+    assert root.trace_id == "0af7651916cd43dd8448eb211c80319c"
+    assert root.parent_id == "b7ad6b7169203331" and root.sampled
+    assert tracing.traceparent(root) == f"00-{root.trace_id}-{root.span_id}-01"
+
+
+def test_http_middleware_names_span_after_route(spans):
+    app = FastAPI()
+
+    @app.get("/rooms/{room_id}")
+    async def room(room_id: int):
+        with tracing.span("work"):
+            return {"id": room_id}
+
+    app.add_middleware(tracing.TracingMiddleware)
+    response = TestClient(app).get("/rooms/7")
+    assert response.status_code == 200
+
+    work, request = spans
+    assert request.name == "HTTP GET /rooms/{room_id}"
+    assert request.attributes["http.status_code"] == 200
+    assert work.parent_id == request.span_id
+
+
+def test_db_statements_are_child_spans(spans, tmp_path):
+    async def run():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'trace.db'}")
+        tracing.instrument_engine(engine)
+        root, token = tracing.start_span("request", root=True)
+        async with engine.begin() as conn:
+            await conn.execute(text("CREATE TABLE t (x INTEGER)"))
+            await conn.execute(text("INSERT INTO t VALUES (1), (2)"))
+            with pytest.raises(Exception):
+                await conn.execute(text("SELECT * FROM missing"))
+        tracing.end_span(root, token)
+        await engine.dispose()
+        return root
+
+    root = asyncio.run(run())
+    queries = [s for s in spans if s.name == "db.query"]
+    statements = [s.attributes["db.statement"] for s in queries]
+    assert "INSERT INTO t VALUES (1), (2)" in statements
+    assert all(s.parent_id == root.span_id for s in queries)
+    assert any(s.error and "missing" in s.error for s in queries)
+    insert = next(s for s in queries if s.attributes["db.statement"].startswith("INSERT"))
+    assert insert.attributes["db.rows"] == 2 and insert.attributes["db.system"] == "sqlite"
+
+
+def test_commands_are_spans_without_secrets(spans):
+    runner = SimulatedRunner()
+    root, token = tracing.start_span("request", root=True)
+    runner.run(["sudo", "wg-quick", "up", "wg-room-1"], check=True)
+    runner.run(["vpncmd", "localhost", "/SERVER", "/PASSWORD:secret", "/CMD", "HubCreate", "room1"], input="pw\npw\n")
+    tracing.end_span(root, token)
+
+    up, hub, _ = spans
+    assert up.attributes == {"command": "wg-quick up", "command.exit_code": 0}
+    assert hub.attributes["command"] == "vpncmd HubCreate"
+    assert "secret" not in json.dumps(tracing.to_otlp(spans))
+    assert describe(["sudo", "wg", "set", "wg0", "peer", "KEY="]) == "wg set"
+
+
+def test_log_records_carry_trace_id(spans):
+    tracing.install_log_correlation()
+    records = []
+    handler = logging.Handler()
+    handler.emit = records.append
+    log = logging.getLogger("test_tracing")
+    log.addHandler(handler)
+    try:
+        root, token = tracing.start_span("request", root=True)
+        log.warning("inside")
+        tracing.end_span(root, token)
+        log.warning("outside")
+    finally:
+        log.removeHandler(handler)
+    assert records[0].trace_id == root.trace_id and records[0].span_id == root.span_id
+    assert not hasattr(records[1], "trace_id")
+
+
+def test_socketio_handlers_are_root_spans(spans):
+    @metrics.instrument_event("/game")
+    async def heartbeat(sid, data):
+        with tracing.span("work"):
+            return "ok"
+
+    assert asyncio.run(heartbeat("sid1", {})) == "ok"
+    work, event = spans
+    assert event.name == "socketio /game heartbeat" and event.kind == "server"
+    assert work.parent_id == event.span_id
+
+
+def test_file_export_is_otlp_json(spans, tmp_path):
+    path = tmp_path / "traces.jsonl"
+    root, token = tracing.start_span("request", root=True, attributes={"http.status_code": 200})
+    tracing.end_span(root, token)
+    tracing.file_sink(str(path))(spans)
+
+    exported = json.loads(path.read_text())["resourceSpans"][0]["scopeSpans"][0]["spans"][0]
+    assert exported["traceId"] == root.trace_id and exported["name"] == "request"
+    assert exported["attributes"] == [{"key": "http.status_code", "value": {"intValue": "200"}}]
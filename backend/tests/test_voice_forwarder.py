@@ -0,0 +1,139 @@
+"""
+Tests for the selective-forwarding voice node (services/voice.py)
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import asyncio
+import fractions
+import pytest
+from unittest.mock import patch
+
+pytest.importorskip("aiortc")
+
+import numpy as np
+from av import AudioFrame
+from aiortc import RTCPeerConnection, RTCSessionDescription
+from aiortc.mediastreams import AudioStreamTrack, MediaStreamError
+
+from services import voice
+from services.voice import RoomForwarder, SpeakerSlotTrack, voice_mode_for
+
+
+class ToneTrack(AudioStreamTrack):
+    """Paced 20 ms frames of a 440 Hz tone"""
+
+    async def recv(self):
+        frame = await super().recv()
+        t = (frame.pts + np.arange(frame.samples)) / frame.sample_rate
+        tone = AudioFrame(format="s16", layout="mono", samples=frame.samples)
+        tone.planes[0].update((np.sin(2 * np.pi * 440 * t) * 8000).astype(np.int16).tobytes())
+        tone.pts = frame.pts
+        tone.sample_rate = frame.sample_rate
+        tone.time_base = fractions.Fraction(1, frame.sample_rate)
+        return tone
+
+
+class FakeMember:
+    def __init__(self, username, slots, last_voice=None):
+        self.username = username
+        self.slots = [SpeakerSlotTrack() for _ in range(slots)]
+        self.subscribers = set()
+        self.last_voice = last_voice
+
+
+def test_voice_mode_threshold():
+    with patch('services.voice.settings.VOICE_FORWARDING_THRESHOLD', 4):
+        assert voice_mode_for(4) == "mesh"
+        assert voice_mode_for(5) == "sfu"
+
+
+def test_assign_slots_skips_silent_and_self():
+    room = RoomForwarder(1, slots=2)
+    now = 100.0
+    room.members = {
+        "a": FakeMember("a", 2, last_voice=now - 0.1),
+        "b": FakeMember("b", 2, last_voice=now - 0.2),
+        "c": FakeMember("c", 2, last_voice=now - 0.3),
+        "silent": FakeMember("silent", 2, last_voice=now - 5),
+        "never": FakeMember("never", 2),
+    }
+    room.assign_slots(now)
+
+    def speakers(name):
+        return {slot.speaker.username for slot in room.members[name].slots if slot.speaker}
+
+    assert speakers("a") == {"b", "c"}
+    assert speakers("b") == {"a", "c"}
+    assert speakers("never") == {"a", "b"}
+    # Silent speakers have no subscribers, so their frames go nowhere
+    assert room.members["silent"].subscribers == set()
+    assert len(room.members["a"].subscribers) == 4
+
+
+def test_assign_slots_keeps_existing_speaker_on_its_slot():
+    room = RoomForwarder(1, slots=2)
+    room.members = {
+        "a": FakeMember("a", 2, last_voice=10.0),
+        "b": FakeMember("b", 2, last_voice=9.9),
+        "listener": FakeMember("listener", 2),
+    }
+    room.assign_slots(10.0)
+    listener = room.members["listener"]
+    slot_of_b = next(slot for slot in listener.slots if slot.speaker.username == "b")
+
+    room.members["c"] = FakeMember("c", 2, last_voice=10.1)
+    room.members["a"].last_voice = 9.0
+    room.assign_slots(10.2)
+
+    assert slot_of_b.speaker.username == "b"
+    assert {slot.speaker.username for slot in listener.slots} == {"b", "c"}
+
+
+@pytest.mark.asyncio
+async def test_forwarder_loopback_delivers_active_speaker():
+    room = RoomForwarder(1, slots=2)
+    clients = {}
+    try:
+        for username, track in (("speaker", ToneTrack()), ("listener", None)):
+            pc = RTCPeerConnection()
+            if track:
+                pc.addTrack(track)
+                pc.addTransceiver("audio", direction="recvonly")
+            else:
+                pc.addTransceiver("audio", direction="recvonly")
+                pc.addTransceiver("audio", direction="recvonly")
+            received = []
+
+            @pc.on("track")
+            def on_track(remote, received=received):
+                async def consume():
+                    try:
+                        while True:
+                            frame = await remote.recv()
+                            received.append(np.frombuffer(frame.planes[0], dtype=np.int16).max())
+                    except MediaStreamError:
+                        pass
+                asyncio.ensure_future(consume())
+
+            await pc.setLocalDescription(await pc.createOffer())
+            answer = await room.handle_offer(username, pc.localDescription.sdp)
+            await pc.setRemoteDescription(RTCSessionDescription(sdp=answer, type="answer"))
+            clients[username] = (pc, received)
+
+        for _ in range(60):
+            if any(level > voice.SILENCE_PEAK for level in clients["listener"][1]):
+                break
+            await asyncio.sleep(0.05)
+
+        assert any(level > voice.SILENCE_PEAK for level in clients["listener"][1])
+        listener = room.members["listener"]
+        assert [slot.speaker.username for slot in listener.slots if slot.speaker] == ["speaker"]
+        # Nobody talks to the speaker, so nothing is forwarded to it
+        assert all(slot.speaker is None for slot in room.members["speaker"].slots)
+    finally:
+        await room.close()
+        for pc, _ in clients.values():
+            await pc.close()
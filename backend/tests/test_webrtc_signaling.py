@@ -0,0 +1,263 @@
+"""
+Tests for the WebRTC signaling relay (webrtc_signaling.py)
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import database  # noqa: F401  (loads models before services)
+from config import settings
+from jose import jwt
+from models import User
+from shared import SessionIndex
+
+WEBRTC_NAMESPACE = "/webrtc"
+
+
+@pytest.fixture
+def signaling_state():
+    """Isolated copies of the shared dicts used by the signaling module"""
+    sessions = SessionIndex()
+    sessions["game_a"] = {"username": "alice", "room_id": 1}
+    sessions["game_b"] = {"username": "bob", "room_id": 1}
+    sessions["game_c"] = {"username": "carol", "room_id": 2}
+    state = {
+        "client_rooms": sessions,
+        # Signaling sids as connect() binds them from each client's access token
+        "webrtc_users": {"rtc_a": "alice", "rtc_b": "bob", "rtc_c": "carol", "rtc_d": "dave",
+                         "rtc_0": "user0", "rtc_1": "user1", "rtc_2": "user2"},
+        "webrtc_peers": {},
+        "webrtc_rooms": {},
+        "webrtc_room_modes": {},
+    }
+    with patch('webrtc_signaling.client_rooms', state["client_rooms"]), \
+         patch('webrtc_signaling.webrtc_users', state["webrtc_users"]), \
+         patch('webrtc_signaling.webrtc_peers', state["webrtc_peers"]), \
+         patch('webrtc_signaling.webrtc_rooms', state["webrtc_rooms"]), \
+         patch('webrtc_signaling.webrtc_room_modes', state["webrtc_room_modes"]):
+        yield state
+
+
+def emits_named(mock_sio, event):
+    return [c for c in mock_sio.emit.call_args_list if c.args[0] == event]
+
+
+class TestWebRTCSignaling:
+
+    @pytest.mark.asyncio
+    async def test_join_lists_existing_peers_and_announces(self, signaling_state):
+        mock_sio = AsyncMock()
+        with patch('webrtc_signaling.sio', mock_sio):
+            from webrtc_signaling import webrtc_join
+
+            await webrtc_join("rtc_a", {"room_id": 1})
+            await webrtc_join("rtc_b", {"room_id": "1"})
+
+            peers = emits_named(mock_sio, "webrtc_peers")
+            assert peers[0].args[1] == {"peers": [], "mode": "mesh"}
+            assert peers[1].args[1] == {"peers": ["alice"], "mode": "mesh"}
+            assert peers[1].kwargs["to"] == "rtc_b"
+
+            new_peer = emits_named(mock_sio, "webrtc_new_peer")[-1]
+            assert new_peer.args[1] == {"username": "bob"}
+            assert new_peer.kwargs["room"] == "webrtc:1"
+            assert new_peer.kwargs["skip_sid"] == "rtc_b"
+            assert new_peer.kwargs["namespace"] == WEBRTC_NAMESPACE
+
+            assert signaling_state["webrtc_rooms"][1] == {"alice": "rtc_a", "bob": "rtc_b"}
+
+    @pytest.mark.asyncio
+    async def test_join_rejected_when_not_room_member(self, signaling_state):
+        mock_sio = AsyncMock()
+        with patch('webrtc_signaling.sio', mock_sio):
+            from webrtc_signaling import webrtc_join
+
+            await webrtc_join("rtc_c", {"room_id": 1})
+
+            error = emits_named(mock_sio, "webrtc_error")[0]
+            assert error.args[1]["error"] == "user_not_in_room"
+            assert "rtc_c" not in signaling_state["webrtc_peers"]
+
+    @pytest.mark.asyncio
+    async def test_claimed_username_cannot_evict_member(self, signaling_state):
+        signaling_state["webrtc_users"]["rtc_m"] = "mallory"
+        mock_sio = AsyncMock()
+        with patch('webrtc_signaling.sio', mock_sio):
+            from webrtc_signaling import webrtc_join
+
+            await webrtc_join("rtc_a", {"room_id": 1})
+            await webrtc_join("rtc_m", {"room_id": 1, "username": "alice"})
+            await webrtc_join("rtc_x", {"room_id": 1, "username": "alice"})
+
+            errors = [c.args[1]["error"] for c in emits_named(mock_sio, "webrtc_error")]
+            assert errors == ["user_not_in_room", "unauthorized"]
+            assert signaling_state["webrtc_rooms"][1] == {"alice": "rtc_a"}
+            assert list(signaling_state["webrtc_peers"]) == ["rtc_a"]
+
+    @pytest.mark.asyncio
+    async def test_connect_binds_the_token_user(self, signaling_state):
+        db = MagicMock(close=AsyncMock())
+        found = MagicMock()
+        found.scalars.return_value.first.return_value = User(username="alice", email="alice@example.com")
+        missing = MagicMock()
+        missing.scalars.return_value.first.return_value = None
+        db.execute = AsyncMock(side_effect=[found, missing])
+        token = jwt.encode({"sub": "alice@example.com"}, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+        unknown = jwt.encode({"sub": "ghost@example.com"}, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+        forged = jwt.encode({"sub": "alice@example.com"}, "not-the-key", algorithm=settings.ALGORITHM)
+        with patch('webrtc_signaling.create_session', AsyncMock(return_value=db)):
+            from webrtc_signaling import connect, disconnect
+
+            assert await connect("rtc_new", {}, {"token": token}) is None
+            assert signaling_state["webrtc_users"]["rtc_new"] == "alice"
+            assert await connect("rtc_ghost", {}, {"token": unknown}) is False
+            assert await connect("rtc_forged", {}, {"token": forged}) is False
+            assert await connect("rtc_none", {}) is False
+            assert db.execute.await_count == 2
+
+            with patch('webrtc_signaling.sio', AsyncMock()):
+                await disconnect("rtc_new")
+            assert "rtc_new" not in signaling_state["webrtc_users"]
+
+    @pytest.mark.asyncio
+    async def test_offer_routed_only_to_target_sid(self, signaling_state):
+        mock_sio = AsyncMock()
+        with patch('webrtc_signaling.sio', mock_sio):
+            from webrtc_signaling import webrtc_join, webrtc_offer
+
+            await webrtc_join("rtc_a", {"room_id": 1})
+            await webrtc_join("rtc_b", {"room_id": 1})
+            mock_sio.emit.reset_mock()
+
+            # The sender cannot spoof "from"
+            await webrtc_offer("rtc_a", {"to": "bob", "from": "mallory", "sdp": "v=0"})
+
+            mock_sio.emit.assert_called_once()
+            args, kwargs = mock_sio.emit.call_args
+            assert args[0] == "webrtc_offer"
+            assert args[1] == {"sdp": "v=0", "from": "alice", "room_id": 1}
+            assert kwargs["to"] == "rtc_b"
+
+    @pytest.mark.asyncio
+    async def test_relay_to_peer_outside_room_is_rejected(self, signaling_state):
+        signaling_state["client_rooms"]["game_c2"] = {"username": "dave", "room_id": 2}
+        mock_sio = AsyncMock()
+        with patch('webrtc_signaling.sio', mock_sio):
+            from webrtc_signaling import webrtc_join, webrtc_ice_candidate
+
+            await webrtc_join("rtc_a", {"room_id": 1})
+            await webrtc_join("rtc_d", {"room_id": 2})
+            mock_sio.emit.reset_mock()
+
+            await webrtc_ice_candidate("rtc_a", {"to": "dave", "candidate": {}})
+
+            mock_sio.emit.assert_called_once()
+            assert mock_sio.emit.call_args.args[0] == "webrtc_error"
+            assert mock_sio.emit.call_args.kwargs["to"] == "rtc_a"
+
+    @pytest.mark.asyncio
+    async def test_disconnect_notifies_room(self, signaling_state):
+        mock_sio = AsyncMock()
+        with patch('webrtc_signaling.sio', mock_sio):
+            from webrtc_signaling import webrtc_join, disconnect
+
+            await webrtc_join("rtc_a", {"room_id": 1})
+            await webrtc_join("rtc_b", {"room_id": 1})
+            await disconnect("rtc_a")
+
+            left = emits_named(mock_sio, "webrtc_peer_left")[0]
+            assert left.args[1] == {"username": "alice"}
+            assert left.kwargs["room"] == "webrtc:1"
+            assert signaling_state["webrtc_rooms"][1] == {"bob": "rtc_b"}
+            assert "rtc_a" not in signaling_state["webrtc_peers"]
+
+    @pytest.mark.asyncio
+    async def test_room_switches_to_forwarding_above_threshold(self, signaling_state):
+        for index in range(3):
+            signaling_state["client_rooms"][f"game_x{index}"] = {"username": f"user{index}", "room_id": 3}
+        mock_sio = AsyncMock()
+        with patch('webrtc_signaling.sio', mock_sio), \
+             patch('webrtc_signaling.voice_mode_for', lambda size: "sfu" if size > 2 else "mesh"), \
+             patch('webrtc_signaling.settings.VOICE_FORWARDED_SPEAKERS', 3):
+            from webrtc_signaling import webrtc_join
+
+            await webrtc_join("rtc_0", {"room_id": 3})
+            await webrtc_join("rtc_1", {"room_id": 3})
+            assert not emits_named(mock_sio, "webrtc_mode")
+
+            await webrtc_join("rtc_2", {"room_id": 3})
+
+            joined = emits_named(mock_sio, "webrtc_peers")[-1]
+            assert joined.args[1] == {"peers": ["sfu"], "mode": "sfu", "slots": 3}
+            switched = emits_named(mock_sio, "webrtc_mode")[0]
+            assert switched.args[1]["mode"] == "sfu"
+            assert switched.kwargs["skip_sid"] == "rtc_2"
+            assert signaling_state["webrtc_room_modes"][3] == "sfu"
+
+    @pytest.mark.asyncio
+    async def test_offer_to_forwarder_is_answered_by_server(self, signaling_state):
+        signaling_state["webrtc_room_modes"][1] = "sfu"
+        mock_sio = AsyncMock()
+        mock_forwarder = AsyncMock()
+        mock_forwarder.handle_offer.return_value = "answer-sdp"
+        with patch('webrtc_signaling.sio', mock_sio), patch('webrtc_signaling.forwarder', mock_forwarder):
+            from webrtc_signaling import webrtc_join, webrtc_offer
+
+            await webrtc_join("rtc_a", {"room_id": 1})
+            mock_sio.emit.reset_mock()
+            await webrtc_offer("rtc_a", {"to": "sfu", "sdp": "offer-sdp"})
+
+            mock_forwarder.handle_offer.assert_awaited_once_with(1, "alice", "offer-sdp")
+            args, kwargs = mock_sio.emit.call_args
+            assert args == ("webrtc_answer", {"from": "sfu", "room_id": 1, "sdp": "answer-sdp"})
+            assert kwargs["to"] == "rtc_a"
+
+
+@pytest.mark.asyncio
+async def test_aiortc_loopback_negotiation(signaling_state):
+    """Two in-process aiortc peers negotiate through the relay with no network server"""
+    aiortc = pytest.importorskip("aiortc")
+    from aiortc.mediastreams import AudioStreamTrack
+    import webrtc_signaling
+
+    peers = {"rtc_a": aiortc.RTCPeerConnection(), "rtc_b": aiortc.RTCPeerConnection()}
+    peers["rtc_a"].addTrack(AudioStreamTrack())
+    peers["rtc_b"].addTrack(AudioStreamTrack())
+    delivered = []
+
+    async def deliver(event, data, to=None, **kwargs):
+        if event not in ("webrtc_offer", "webrtc_answer"):
+            return
+        delivered.append(event)
+        pc = peers[to]
+        description = aiortc.RTCSessionDescription(sdp=data["sdp"], type=event[len("webrtc_"):])
+        await pc.setRemoteDescription(description)
+        if event == "webrtc_offer":
+            await pc.setLocalDescription(await pc.createAnswer())
+            await webrtc_signaling.webrtc_answer(to, {"to": data["from"], "sdp": pc.localDescription.sdp})
+
+    mock_sio = AsyncMock()
+    mock_sio.emit.side_effect = deliver
+    with patch('webrtc_signaling.sio', mock_sio):
+        await webrtc_signaling.webrtc_join("rtc_a", {"room_id": 1})
+        await webrtc_signaling.webrtc_join("rtc_b", {"room_id": 1})
+
+        offerer = peers["rtc_b"]
+        await offerer.setLocalDescription(await offerer.createOffer())
+        await webrtc_signaling.webrtc_offer("rtc_b", {"to": "alice", "sdp": offerer.localDescription.sdp})
+
+        try:
+            for _ in range(100):
+                if all(pc.connectionState == "connected" for pc in peers.values()):
+                    break
+                await asyncio.sleep(0.05)
+            assert all(pc.connectionState == "connected" for pc in peers.values())
+            assert delivered == ["webrtc_offer", "webrtc_answer"]
+        finally:
+            for pc in peers.values():
+                await pc.close()
@@ -0,0 +1,346 @@
+# tracing.py
+# Lightweight request tracing. A span covers one HTTP request or Socket.IO
+# event (root), with children for every SQL statement (engine events), every
+# wg / wg-quick / vpncmd call (command runner) and password hashing. The
+# current span lives in a contextvar, so it follows the request through
+# awaits and into SQLAlchemy's greenlets; log records get its trace_id and
+# span_id.
+#
+# Sampling is decided once per trace at the root (TRACE_SAMPLE_RATE, or the
+# sampled flag of an incoming W3C traceparent). Unsampled traces still carry
+# ids for the logs but record nothing. Finished spans are queued and
+# exported by a background thread as OTLP/JSON: appended to TRACE_FILE, or
+# POSTed to TRACE_OTLP_ENDPOINT (a collector, or scripts/trace_collector.py).
+import atexit
+import contextvars
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+import urllib.request
+from contextlib import contextmanager
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+SERVICE_NAME = "gameroom-backend"
+MAX_STATEMENT_LENGTH = 300  # SQL text kept on a span; parameters are never recorded
+EXPORT_BATCH = 512
+EXPORT_INTERVAL = 1.0
+
+_current = contextvars.ContextVar("current_span", default=None)
+
+
+def _new_id(nbytes):
+    return "%0*x" % (nbytes * 2, random.getrandbits(nbytes * 8))
+
+
+class Span:
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "kind", "sampled",
+                 "start_ns", "end_ns", "attributes", "error")
+
+    def __init__(self, name, trace_id, parent_id, sampled, kind="internal", attributes=None):
+        self.trace_id = trace_id
+        self.span_id = _new_id(8)
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.sampled = sampled
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.attributes = attributes or {}
+        self.error = None
+
+    def set(self, key, value):
+        self.attributes[key] = value
+
+    def finish(self):
+        self.end_ns = time.time_ns()
+        if self.sampled:
+            _exporter.submit(self)
+
+    @property
+    def duration_ms(self):
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e6
+
+
+def current_span():
+    return _current.get()
+
+
+def _sample():
+    rate = settings.TRACE_SAMPLE_RATE
+    return rate >= 1 or (rate > 0 and random.random() < rate)
+
+
+def start_span(name, kind="internal", attributes=None, traceparent=None, root=False):
+    """
+    Starts a span and makes it current; returns (span, token) for end_span,
+    or (None, None) when tracing is off, or when this is not a root and
+    there is no sampled trace to join (callers then skip all work).
+    """
+    if not settings.TRACING_ENABLED:
+        return None, None
+    parent = None if root else _current.get()
+    if parent is None and not root and not traceparent:
+        # A child outside any request (heartbeat task, startup, scripts) would be an orphan trace
+        return None, None
+    if parent is None:
+        trace_id, parent_id, sampled = _parse_traceparent(traceparent)
+        if trace_id is None:
+            trace_id, sampled = _new_id(16), _sample()
+    elif not parent.sampled:
+        return None, None
+    else:
+        trace_id, parent_id, sampled = parent.trace_id, parent.span_id, True
+    span = Span(name, trace_id, parent_id, sampled, kind, attributes)
+    return span, _current.set(span)
+
+
+def end_span(span, token, error=None):
+    if span is None:
+        return
+    if error is not None:
+        span.error = f"{type(error).__name__}: {error}"
+    span.finish()
+    _current.reset(token)
+
+
+@contextmanager
+def span(name, kind="internal", **attributes):
+    """Child span around a block; nothing is recorded outside a sampled trace"""
+    current, token = start_span(name, kind, attributes)
+    try:
+        yield current
+    except BaseException as e:
+        end_span(current, token, e)
+        raise
+    else:
+        end_span(current, token)
+
+
+def _parse_traceparent(header):
+    """W3C traceparent: 00-<trace id>-<parent id>-<flags>"""
+    if not header:
+        return None, None, False
+    parts = header.strip().split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None, None, False
+    return parts[1], parts[2], int(parts[3], 16) & 1 == 1
+
+
+def traceparent(span):
+    return f"00-{span.trace_id}-{span.span_id}-{'01' if span.sampled else '00'}"
+
+
+# --- log records ---
+_base_record_factory = logging.getLogRecordFactory()
+
+
+def _record_factory(*args, **kwargs):
+    record = _base_record_factory(*args, **kwargs)
+    current = _current.get()
+    if current is not None:
+        record.trace_id = current.trace_id
+        record.span_id = current.span_id
+    return record
+
+
+def install_log_correlation():
+    if logging.getLogRecordFactory() is not _record_factory:
+        logging.setLogRecordFactory(_record_factory)
+
+
+# --- SQLAlchemy ---
+def instrument_engine(engine):
+    """db.query child spans for every statement run through `engine` (async or sync)"""
+    from sqlalchemy import event
+
+    sync_engine = getattr(engine, "sync_engine", engine)
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        current, token = start_span("db.query", "client", {
+            "db.system": sync_engine.dialect.name,
+            "db.statement": statement[:MAX_STATEMENT_LENGTH],
+        })
+        if current is not None:
+            context._trace_span = (current, token)
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        pending = getattr(context, "_trace_span", None)
+        if pending:
+            context._trace_span = None
+            if cursor.rowcount is not None and cursor.rowcount >= 0:
+                pending[0].set("db.rows", cursor.rowcount)
+            end_span(*pending)
+
+    @event.listens_for(sync_engine, "handle_error")
+    def handle_error(exception_context):
+        context = exception_context.execution_context
+        pending = getattr(context, "_trace_span", None) if context is not None else None
+        if pending:
+            context._trace_span = None
+            end_span(*pending, error=exception_context.original_exception)
+
+
+# --- HTTP ---
+class TracingMiddleware:
+    """Root span per HTTP request, named after the matched route template"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.TRACING_ENABLED:
+            await self.app(scope, receive, send)
+            return
+        header = None
+        for name, value in scope.get("headers", ()):
+            if name == b"traceparent":
+                header = value.decode("latin-1")
+                break
+        current, token = start_span(f"HTTP {scope['method']}", "server", {
+            "http.method": scope["method"], "http.target": scope.get("path", "")}, traceparent=header, root=True)
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                current.set("http.status_code", message["status"])
+            await send(message)
+
+        error = None
+        try:
+            await self.app(scope, receive, send_with_status)
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            route = getattr(scope.get("route"), "path", None)
+            if route:
+                current.name = f"HTTP {scope['method']} {route}"
+                current.set("http.route", route)
+            end_span(current, token, error)
+
+
+# --- export ---
+def _otlp_value(value):
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+_KINDS = {"internal": 1, "server": 2, "client": 3}
+
+
+def to_otlp(spans):
+    """One OTLP/JSON ExportTraceServiceRequest for a batch of spans"""
+    return {"resourceSpans": [{
+        "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": SERVICE_NAME}}]},
+        "scopeSpans": [{
+            "scope": {"name": "tracing"},
+            "spans": [{
+                "traceId": s.trace_id,
+                "spanId": s.span_id,
+                "parentSpanId": s.parent_id or "",
+                "name": s.name,
+                "kind": _KINDS.get(s.kind, 1),
+                "startTimeUnixNano": str(s.start_ns),
+                "endTimeUnixNano": str(s.end_ns),
+                "attributes": [{"key": k, "value": _otlp_value(v)} for k, v in s.attributes.items()],
+                "status": {"code": 2, "message": s.error} if s.error else {"code": 1},
+            } for s in spans],
+        }],
+    }]}
+
+
+class Exporter:
+    """Batches finished spans on a background thread; the request path only does a queue put"""
+
+    def __init__(self):
+        self._queue = queue.SimpleQueue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self.sink = None
+
+    def submit(self, span):
+        if self._thread is None:
+            self._start()
+        self._queue.put(span)
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="trace-exporter", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + EXPORT_INTERVAL
+            while len(batch) < EXPORT_BATCH:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+            self._export(batch)
+
+    def _export(self, batch):
+        try:
+            (self.sink or default_sink())(batch)
+        except Exception as e:
+            logger.warning(f"Dropped {len(batch)} spans: {e}")
+
+    def flush(self):
+        batch = []
+        while True:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        if batch:
+            self._export(batch)
+
+
+def file_sink(path):
+    def write(batch):
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(to_otlp(batch)) + "\n")
+    return write
+
+
+def otlp_sink(endpoint):
+    def post(batch):
+        request = urllib.request.Request(endpoint, data=json.dumps(to_otlp(batch)).encode(),
+                                         headers={"Content-Type": "application/json"}, method="POST")
+        with urllib.request.urlopen(request, timeout=5) as response:
+            response.read()
+    return post
+
+
+def default_sink():
+    if settings.TRACE_EXPORTER == "otlp":
+        return otlp_sink(settings.TRACE_OTLP_ENDPOINT)
+    path = settings.TRACE_FILE or os.path.join(os.path.dirname(__file__), "logs", "traces.jsonl")
+    return file_sink(path)
+
+
+_exporter = Exporter()
+atexit.register(_exporter.flush)
+
+
+def set_sink(sink):
+    """Where batches of finished spans go (tests); None restores the configured exporter"""
+    _exporter.flush()
+    _exporter.sink = sink
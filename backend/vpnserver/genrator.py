@@ -2,14 +2,20 @@ from sqlalchemy import create_engine, Column, Integer, String, Boolean, ForeignK
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy.orm import sessionmaker, relationship, declarative_base
-import subprocess
 import os
 from models import network_config, network_config_user
+from services.command_runner import get_runner
+
+# المجالات التي تُوزَّع منها الشبكات والمنافذ وعناوين اللاعبين (تقرأها أيضاً واجهة الإدارة لحساب الإشغال)
+SUBNET_RANGE = range(1, 255)  # 10.N.0.0/24
+PORT_RANGE = range(51820, 51900)
+HOST_RANGE = range(2, 255)  # 10.N.0.x/32، والعنوان 1 للسيرفر
 
 def generate_wireguard_keys():
-    private_key = subprocess.check_output(['wg', 'genkey']).strip()
-    public_key = subprocess.check_output(['wg', 'pubkey'], input=private_key).strip()
-    return private_key, public_key
+    runner = get_runner()
+    private_key = runner.run(['wg', 'genkey'], check=True).stdout.strip()
+    public_key = runner.run(['wg', 'pubkey'], input=private_key, check=True).stdout.strip()
+    return private_key.encode(), public_key.encode()
 
 async def generate_new_network_range(session: AsyncSession):
     # Get the last network config by ID
@@ -30,7 +36,7 @@ async def get_next_subnet(session: AsyncSession):
     network_configs = result.scalars().all()
     used = [int(n.server_ip.split('.')[1]) for n in network_configs if n.server_ip and '.' in n.server_ip]
     
-    for i in range(1, 255):
+    for i in SUBNET_RANGE:
         if i not in used:
             # Return the server IP, not the network address
             return f"10.{i}.0.1/24"
@@ -41,7 +47,7 @@ async def generate_new_port(session: AsyncSession):
     network_configs = result.scalars().all()
     used_ports = {row.port for row in network_configs if row.port}
     
-    for port in range(51820, 51900):
+    for port in PORT_RANGE:
         if port not in used_ports:
             return port
     raise Exception("No ports available.")
@@ -75,10 +81,10 @@ async def generate_allowed_ips(session: AsyncSession, server_network: str):
             continue
     
     # Start from 2 (1 is usually the server)
-    next_number = 2
+    next_number = HOST_RANGE.start
     while next_number in used_numbers or next_number == int(server_ip.split('.')[-1]):
         next_number += 1
-        if next_number >= 255:
+        if next_number >= HOST_RANGE.stop:
             raise Exception(f"No available IP in network {network_base}.x")
     
     # Return client IP as /32 (single host)
@@ -0,0 +1,225 @@
+# webrtc_signaling.py
+# Signaling relay for the desktop client's WebRTCVoiceChat. In mesh mode media
+# flows peer-to-peer and this server only routes SDP/ICE between members of a
+# room; large rooms switch to the forwarding node in services/voice.py.
+from jose import jwt, JWTError
+from sqlalchemy.future import select
+
+from config import settings
+from database.database import create_session
+from models import User
+from shared import sio, client_rooms, webrtc_users, webrtc_peers, webrtc_rooms, webrtc_room_modes, WEBRTC_NAMESPACE
+from socket_logger import log_debug, log_error
+from metrics import instrument_event
+from services.voice import VoiceForwarder, FORWARDER_PEER_ID, voice_mode_for
+
+# Server-side forwarding node used by rooms in "sfu" mode
+forwarder = VoiceForwarder()
+
+
+def _room_channel(room_id):
+    return f"webrtc:{room_id}"
+
+
+def _mode_payload(mode, peers):
+    if mode == "sfu":
+        return {'peers': [FORWARDER_PEER_ID], 'mode': mode, 'slots': settings.VOICE_FORWARDED_SPEAKERS}
+    return {'peers': peers, 'mode': mode}
+
+
+def is_room_member(username, room_id):
+    """A user may signal in a room only after joining it on the /game namespace"""
+    return any(
+        client_rooms.get(game_sid, {}).get("username") == username
+        for game_sid in client_rooms.by_room.get(room_id, ())
+    )
+
+
+async def user_from_token(token):
+    """Username for an access token issued by /auth/token, or None if it does not verify"""
+    if not token:
+        return None
+    try:
+        email = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]).get("sub")
+    except JWTError:
+        return None
+    if email is None:
+        return None
+    db = await create_session()
+    try:
+        user = (await db.execute(select(User).filter_by(email=email))).scalars().first()
+    finally:
+        await db.close()
+    return user.username if user else None
+
+
+async def _send_error(sid, error, message):
+    await sio.emit('webrtc_error', {
+        'error': error,
+        'message': message
+    }, to=sid, namespace=WEBRTC_NAMESPACE)
+
+
+async def _remove_peer(sid):
+    """Forget a signaling sid and tell the rest of its room that it left"""
+    peer = webrtc_peers.pop(sid, None)
+    if not peer:
+        return
+
+    room_id = peer['room_id']
+    username = peer['username']
+    members = webrtc_rooms.get(room_id, {})
+    if members.get(username) == sid:
+        del members[username]
+        await forwarder.remove_member(room_id, username)
+    if not members:
+        webrtc_rooms.pop(room_id, None)
+        webrtc_room_modes.pop(room_id, None)
+
+    await sio.leave_room(sid, _room_channel(room_id), namespace=WEBRTC_NAMESPACE)
+    await sio.emit('webrtc_peer_left', {'username': username},
+                   room=_room_channel(room_id), namespace=WEBRTC_NAMESPACE)
+    log_debug("WebRTC peer left", {"sid": sid, "username": username, "room_id": room_id})
+
+
+@sio.event(namespace=WEBRTC_NAMESPACE)
+@instrument_event(WEBRTC_NAMESPACE)
+async def connect(sid, environ, auth=None):
+    # The signaling identity comes from the access token, never from message payloads
+    username = await user_from_token((auth or {}).get('token'))
+    if username is None:
+        log_debug("WebRTC signaling connection refused - invalid token", {"sid": sid})
+        return False
+    webrtc_users[sid] = username
+    log_debug("WebRTC signaling connection", {"sid": sid, "username": username})
+
+
+@sio.event(namespace=WEBRTC_NAMESPACE)
+@instrument_event(WEBRTC_NAMESPACE)
+async def disconnect(sid):
+    await _remove_peer(sid)
+    webrtc_users.pop(sid, None)
+
+
+@sio.on('webrtc_join', namespace=WEBRTC_NAMESPACE)
+@instrument_event(WEBRTC_NAMESPACE)
+async def webrtc_join(sid, data):
+    username = webrtc_users.get(sid)
+    if not username:
+        await _send_error(sid, 'unauthorized', 'Connect with a valid access token')
+        return
+
+    try:
+        room_id = int(data.get('room_id'))
+    except (AttributeError, ValueError, TypeError):
+        await _send_error(sid, 'invalid_request', 'Missing or invalid room_id')
+        return
+
+    if not is_room_member(username, room_id):
+        log_debug("WebRTC join rejected - not in room", {"sid": sid, "username": username, "room_id": room_id})
+        await _send_error(sid, 'user_not_in_room', 'Join the room before starting voice')
+        return
+
+    # A reconnecting client replaces its previous signaling session
+    if sid in webrtc_peers:
+        await _remove_peer(sid)
+    members = webrtc_rooms.setdefault(room_id, {})
+    previous_sid = members.get(username)
+    if previous_sid and previous_sid != sid:
+        webrtc_peers.pop(previous_sid, None)
+        await sio.leave_room(previous_sid, _room_channel(room_id), namespace=WEBRTC_NAMESPACE)
+
+    existing = [name for name in members if name != username]
+    members[username] = sid
+    webrtc_peers[sid] = {'username': username, 'room_id': room_id}
+
+    # Rooms switch from mesh to forwarding once they grow past the threshold
+    # and stay there until the last voice member leaves
+    mode = webrtc_room_modes.get(room_id, "mesh")
+    switching = mode == "mesh" and voice_mode_for(len(members)) == "sfu"
+    if switching:
+        mode = "sfu"
+    webrtc_room_modes[room_id] = mode
+
+    await sio.enter_room(sid, _room_channel(room_id), namespace=WEBRTC_NAMESPACE)
+    await sio.emit('webrtc_peers', _mode_payload(mode, existing), to=sid, namespace=WEBRTC_NAMESPACE)
+    await sio.emit('webrtc_new_peer', {'username': username},
+                   room=_room_channel(room_id), skip_sid=sid, namespace=WEBRTC_NAMESPACE)
+    if switching:
+        await sio.emit('webrtc_mode', _mode_payload(mode, []),
+                       room=_room_channel(room_id), skip_sid=sid, namespace=WEBRTC_NAMESPACE)
+        log_debug("WebRTC room switched to forwarding", {"room_id": room_id, "members": len(members)})
+    log_debug("WebRTC peer joined", {"sid": sid, "username": username, "room_id": room_id, "mode": mode})
+
+
+async def _relay(sid, event, data, fields):
+    """Forward a signaling message to the target peer's sid only"""
+    peer = webrtc_peers.get(sid)
+    if not peer:
+        await _send_error(sid, 'not_joined', 'Send webrtc_join first')
+        return
+
+    target = (data or {}).get('to')
+    if target == FORWARDER_PEER_ID:
+        await _forward_to_server(sid, peer, event, data)
+        return
+
+    target_sid = webrtc_rooms.get(peer['room_id'], {}).get(target)
+    if not target_sid:
+        await _send_error(sid, 'peer_not_found', f'Peer {target} is not in this room')
+        return
+
+    payload = {field: data.get(field) for field in fields}
+    payload['from'] = peer['username']
+    payload['room_id'] = peer['room_id']
+    await sio.emit(event, payload, to=target_sid, namespace=WEBRTC_NAMESPACE)
+
+
+async def _forward_to_server(sid, peer, event, data):
+    """Signaling addressed to the forwarding node instead of another client"""
+    room_id = peer['room_id']
+    if webrtc_room_modes.get(room_id) != "sfu":
+        await _send_error(sid, 'peer_not_found', 'This room is not in forwarding mode')
+        return
+
+    # aiortc includes its candidates in the SDP, so only offers need handling
+    if event == 'webrtc_offer':
+        answer = await forwarder.handle_offer(room_id, peer['username'], data.get('sdp'))
+        await sio.emit('webrtc_answer', {
+            'from': FORWARDER_PEER_ID,
+            'room_id': room_id,
+            'sdp': answer
+        }, to=sid, namespace=WEBRTC_NAMESPACE)
+
+
+@sio.on('webrtc_offer', namespace=WEBRTC_NAMESPACE)
+@instrument_event(WEBRTC_NAMESPACE)
+async def webrtc_offer(sid, data):
+    try:
+        await _relay(sid, 'webrtc_offer', data, ('sdp',))
+    except Exception as e:
+        log_error("webrtc_offer", sid, e)
+
+
+@sio.on('webrtc_answer', namespace=WEBRTC_NAMESPACE)
+@instrument_event(WEBRTC_NAMESPACE)
+async def webrtc_answer(sid, data):
+    try:
+        await _relay(sid, 'webrtc_answer', data, ('sdp',))
+    except Exception as e:
+        log_error("webrtc_answer", sid, e)
+
+
+@sio.on('webrtc_ice_candidate', namespace=WEBRTC_NAMESPACE)
+@instrument_event(WEBRTC_NAMESPACE)
+async def webrtc_ice_candidate(sid, data):
+    try:
+        await _relay(sid, 'webrtc_ice_candidate', data, ('candidate', 'sdpMid', 'sdpMLineIndex'))
+    except Exception as e:
+        log_error("webrtc_ice_candidate", sid, e)
+
+
+@sio.on('webrtc_leave', namespace=WEBRTC_NAMESPACE)
+@instrument_event(WEBRTC_NAMESPACE)
+async def webrtc_leave(sid, data=None):
+    await _remove_peer(sid)
@@ -1,87 +1,278 @@
 import os
+import json
+import time
+import random
+import logging
+import threading
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from dotenv import load_dotenv
+from PyQt5.QtCore import QThread, pyqtSignal
+
+logger = logging.getLogger(__name__)
+
+# Methods that are safe to repeat after a failure mid-request (no POST/PATCH)
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "PUT", "DELETE", "OPTIONS"})
+
+
+class JitteredRetry(Retry):
+    """Exponential backoff with full jitter, so clients that failed together don't retry together"""
+
+    def get_backoff_time(self):
+        backoff = super().get_backoff_time()
+        return random.uniform(0, backoff) if backoff > 0 else 0
+
+
+_CACHE_COUNTERS = {'hit': 'hits', 'revalidated': 'revalidated', 'miss': 'misses'}
+
+
+class _CacheEntry:
+    __slots__ = ('body', 'etag', 'stored_at')
+
+    def __init__(self, body, etag, stored_at):
+        self.body = body
+        self.etag = etag
+        self.stored_at = stored_at
+
+
+class APIRequestThread(QThread):
+    """Runs one APIClient call off the GUI thread and reports back through signals"""
+    succeeded = pyqtSignal(object)
+    failed = pyqtSignal(str)
+
+    def __init__(self, client, method, endpoint, kwargs):
+        super().__init__()
+        self._client = client
+        self._method = method
+        self._endpoint = endpoint
+        self._kwargs = kwargs
+
+    def run(self):
+        try:
+            result = self._client.request(self._method, self._endpoint, **self._kwargs)
+        except Exception as e:
+            logger.warning(f"{self._method} {self._endpoint} failed: {e}")
+            self.failed.emit(str(e))
+            return
+        self.succeeded.emit(result)
+
 
 class APIClient:
     _instance = None
-    
+
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super(APIClient, cls).__new__(cls)
             cls._instance._initialized = False
         return cls._instance
-    
+
     def __init__(self):
         if self._initialized:
             return
-            
+
         # Load environment variables
         load_dotenv()
-        
+
         # Initialize base URL from environment variable
         self._base_url = os.getenv('API_BASE_URL', 'http://localhost:8000')
         self._access_token = None
+        # (connect, read) timeouts in seconds
+        self._timeout = (
+            float(os.getenv('API_CONNECT_TIMEOUT', '5')),
+            float(os.getenv('API_READ_TIMEOUT', '20')),
+        )
+        self._session = self._create_session(int(os.getenv('API_MAX_RETRIES', '3')))
+        # Requests started with request_async that haven't finished yet
+        self._pending = set()
+
+        # Opt-in GET cache: endpoint -> TTL in seconds, (endpoint, params) -> _CacheEntry
+        self._cache_ttls = {}
+        self._cache = {}
+        self._cache_lock = threading.Lock()
+        self.cache_stats = {'hits': 0, 'revalidated': 0, 'misses': 0}
         self._initialized = True
-    
+
+    def _create_session(self, max_retries):
+        """One pooled keep-alive session shared by every call"""
+        retry = JitteredRetry(
+            total=max_retries,
+            # Connection failures happen before the request is sent, so they are retried for any method
+            connect=max_retries,
+            read=max_retries,
+            status=max_retries,
+            status_forcelist=(502, 503, 504),
+            allowed_methods=IDEMPOTENT_METHODS,
+            backoff_factor=0.3,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=10, max_retries=retry)
+        session = requests.Session()
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        session.headers.update({
+            'Accept': 'application/json',
+            'Accept-Encoding': 'gzip, deflate',
+        })
+        return session
+
     def set_base_url(self, base_url):
         """Set the base URL for API requests"""
         self._base_url = base_url.rstrip('/')
-    
+
     def set_token(self, token):
         """Set the access token for authenticated requests"""
+        if token != self._access_token:
+            # Cached responses belong to the previous user
+            self.invalidate()
         self._access_token = token
-    
+
+    def set_timeout(self, connect, read):
+        """Set the connect and read timeouts (seconds) for subsequent requests"""
+        self._timeout = (connect, read)
+
     def _get_headers(self, is_form=False):
         """Get headers for API requests"""
-        headers = {
-            'Accept': 'application/json'
-        }
+        headers = {}
         if not is_form:
             headers['Content-Type'] = 'application/json'
         if self._access_token:
             headers['Authorization'] = f'Bearer {self._access_token}'
         return headers
-    
-    def get(self, endpoint, params=None):
-        """Make a GET request to the API"""
-        url = f"{self._base_url}{endpoint}"
-        response = requests.get(url, headers=self._get_headers(), params=params)
+
+    def enable_cache(self, endpoint, ttl):
+        """
+        Cache GET responses of an endpoint. Within `ttl` seconds the cached body
+        is returned without a request; after that it is revalidated with
+        If-None-Match, and a 304 costs no body. ttl=0 always revalidates.
+        """
+        self._cache_ttls[endpoint] = ttl
+
+    def invalidate(self, *prefixes):
+        """
+        Drop cached responses whose endpoint starts with any of the prefixes
+        (all of them when called without arguments). Safe to call from
+        Socket.IO handler threads.
+        """
+        with self._cache_lock:
+            for key in list(self._cache):
+                if not prefixes or key[0].startswith(prefixes):
+                    del self._cache[key]
+
+    def expire(self, *prefixes):
+        """
+        Like invalidate(), but keeps the bodies and ETags: the next GET always
+        asks the server and an unchanged resource still costs only a 304.
+        """
+        with self._cache_lock:
+            for key, entry in self._cache.items():
+                if not prefixes or key[0].startswith(prefixes):
+                    entry.stored_at = float('-inf')
+
+    def _count(self, outcome, endpoint):
+        with self._cache_lock:
+            self.cache_stats[_CACHE_COUNTERS[outcome]] += 1
+            stats = dict(self.cache_stats)
+        logger.debug(f"API cache {outcome} GET {endpoint} "
+                     f"(hits={stats['hits']}, revalidated={stats['revalidated']}, misses={stats['misses']})")
+
+    def _cached_get(self, endpoint, params, timeout):
+        ttl = self._cache_ttls[endpoint]
+        key = (endpoint, tuple(sorted((params or {}).items())))
+        with self._cache_lock:
+            entry = self._cache.get(key)
+
+        if entry and time.monotonic() - entry.stored_at < ttl:
+            self._count('hit', endpoint)
+            return json.loads(entry.body)
+
+        headers = self._get_headers()
+        if entry and entry.etag:
+            headers['If-None-Match'] = entry.etag
+        response = self._session.get(f"{self._base_url}{endpoint}", headers=headers, params=params,
+                                     timeout=timeout or self._timeout)
+
+        if response.status_code == 304 and entry:
+            entry.stored_at = time.monotonic()
+            self._count('revalidated', endpoint)
+            return json.loads(entry.body)
+
         response.raise_for_status()
+        with self._cache_lock:
+            self._cache[key] = _CacheEntry(response.content, response.headers.get('ETag'), time.monotonic())
+        self._count('miss', endpoint)
         return response.json()
-    
-    def post(self, endpoint, json=None, data=None):
-        """Make a POST request to the API"""
+
+    def request(self, method, endpoint, params=None, json=None, data=None, timeout=None):
+        """Make a request on the pooled session and return the decoded JSON body"""
+        if method == 'GET' and endpoint in self._cache_ttls:
+            return self._cached_get(endpoint, params, timeout)
+
         url = f"{self._base_url}{endpoint}"
         is_form = data is not None
-        response = requests.post(
-            url, 
+        response = self._session.request(
+            method,
+            url,
             headers=self._get_headers(is_form=is_form),
+            params=params,
             json=json if not is_form else None,
-            data=data
+            data=data,
+            timeout=timeout or self._timeout
         )
         response.raise_for_status()
+        if method != 'GET' and self._cache:
+            # A write makes cached reads of the same resource ("/friends/...") stale
+            self.invalidate('/' + endpoint.lstrip('/').split('/', 1)[0])
         return response.json()
-    
+
+    def get(self, endpoint, params=None):
+        """Make a GET request to the API"""
+        return self.request('GET', endpoint, params=params)
+
+    def post(self, endpoint, json=None, data=None):
+        """Make a POST request to the API"""
+        return self.request('POST', endpoint, json=json, data=data)
+
     def put(self, endpoint, json=None):
         """Make a PUT request to the API"""
-        url = f"{self._base_url}{endpoint}"
-        response = requests.put(url, headers=self._get_headers(), json=json)
-        response.raise_for_status()
-        return response.json()
-    
+        return self.request('PUT', endpoint, json=json)
+
     def delete(self, endpoint):
         """Make a DELETE request to the API"""
-        url = f"{self._base_url}{endpoint}"
-        response = requests.delete(url, headers=self._get_headers())
-        response.raise_for_status()
-        return response.json()
-    
+        return self.request('DELETE', endpoint)
+
     def patch(self, endpoint, json=None):
         """Make a PATCH request to the API"""
-        url = f"{self._base_url}{endpoint}"
-        response = requests.patch(url, headers=self._get_headers(), json=json)
-        response.raise_for_status()
-        return response.json()
+        return self.request('PATCH', endpoint, json=json)
+
+    def request_async(self, method, endpoint, on_success=None, on_error=None, **kwargs):
+        """
+        Run a request on a worker thread. on_success(data) / on_error(message)
+        are delivered through Qt signals, so when connected from the GUI thread
+        they run on the GUI thread and may touch widgets.
+        """
+        thread = APIRequestThread(self, method, endpoint, kwargs)
+        if on_success:
+            thread.succeeded.connect(on_success)
+        if on_error:
+            thread.failed.connect(on_error)
+        self._pending.add(thread)
+        thread.finished.connect(lambda: self._pending.discard(thread))
+        thread.finished.connect(thread.deleteLater)
+        thread.start()
+        return thread
+
+    def get_async(self, endpoint, on_success=None, on_error=None, params=None):
+        """GET without blocking the caller; see request_async"""
+        return self.request_async('GET', endpoint, on_success, on_error, params=params)
+
+    def post_async(self, endpoint, on_success=None, on_error=None, json=None, data=None):
+        """POST without blocking the caller; see request_async"""
+        return self.request_async('POST', endpoint, on_success, on_error, json=json, data=data)
+
+    def close(self):
+        """Close pooled connections"""
+        self._session.close()
 
 # Create singleton instance
-api_client = APIClient() 
\ No newline at end of file
+api_client = APIClient()
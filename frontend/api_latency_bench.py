@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+APIClient request latency over a simulated high-RTT link
+--------------------------------------------------------
+Starts a local JSON server behind a TCP proxy that adds the given round-trip
+time: one RTT to open each connection (TCP handshake, plus --tls-rtts more
+for a TLS handshake) and RTT/2 on every chunk in each direction.
+
+Compares the previous transport (module-level requests.get, a new connection
+per call) with the pooled keep-alive session in APIClient.
+
+Usage:
+    python api_latency_bench.py --rtt 100 --requests 50
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from api_client import APIClient
+
+ROOMS = {"rooms": [{"id": i, "name": f"room {i}", "current_players": i % 8, "max_players": 8}
+                   for i in range(50)]}
+
+
+class JSONHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        body = json.dumps(ROOMS).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+async def pipe(reader, writer, delay):
+    """Deliver each chunk `delay` seconds after it arrived, like a one-way link"""
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue()
+
+    async def receive():
+        try:
+            while True:
+                chunk = await reader.read(65536)
+                await queue.put((loop.time() + delay, chunk))
+                if not chunk:
+                    break
+        except ConnectionError:
+            await queue.put((loop.time(), b""))
+
+    receiver = asyncio.create_task(receive())
+    try:
+        while True:
+            due, chunk = await queue.get()
+            await asyncio.sleep(max(0, due - loop.time()))
+            if not chunk:
+                break
+            writer.write(chunk)
+            await writer.drain()
+    except ConnectionError:
+        pass
+    finally:
+        receiver.cancel()
+        writer.close()
+
+
+async def run_proxy(target_port, rtt, handshake_rtts, ready):
+    async def handle(client_reader, client_writer):
+        # Connection setup costs whole round trips before any request byte moves
+        await asyncio.sleep(rtt * handshake_rtts)
+        server_reader, server_writer = await asyncio.open_connection("127.0.0.1", target_port)
+        await asyncio.gather(
+            pipe(client_reader, server_writer, rtt / 2),
+            pipe(server_reader, client_writer, rtt / 2),
+        )
+
+    server = await asyncio.start_server(handle, "127.0.0.1", 0)
+    ready["port"] = server.sockets[0].getsockname()[1]
+    ready["event"].set()
+    async with server:
+        await server.serve_forever()
+
+
+def measure(label, call, count):
+    call()  # warm-up: first connection is paid by both transports
+    samples = []
+    for _ in range(count):
+        start = time.perf_counter()
+        call()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    print(f"{label:<32} mean {statistics.mean(samples):7.1f} ms   "
+          f"p50 {samples[len(samples) // 2]:7.1f} ms   p95 {samples[int(len(samples) * 0.95) - 1]:7.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="APIClient latency over a simulated RTT")
+    parser.add_argument("--rtt", type=float, default=100, help="round-trip time in ms")
+    parser.add_argument("--requests", type=int, default=50, help="requests per transport")
+    parser.add_argument("--tls-rtts", type=int, default=0,
+                        help="extra handshake round trips per new connection (1 for TLS 1.3, 2 for TLS 1.2)")
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), JSONHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    ready = {"event": threading.Event()}
+    threading.Thread(
+        target=lambda: asyncio.run(run_proxy(server.server_address[1], args.rtt / 1000,
+                                             1 + args.tls_rtts, ready)),
+        daemon=True
+    ).start()
+    ready["event"].wait()
+
+    base_url = f"http://127.0.0.1:{ready['port']}"
+    print(f"RTT {args.rtt:.0f} ms, {args.requests} sequential GET /rooms/")
+    measure("before: requests.get per call",
+            lambda: requests.get(f"{base_url}/rooms/", headers={"Accept": "application/json"}).json(),
+            args.requests)
+
+    client = APIClient()
+    client.set_base_url(base_url)
+    measure("after: pooled APIClient session", lambda: client.get("/rooms/"), args.requests)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark de la ruta de frames de audio de MicrophoneStreamTrack
+---------------------------------------------------------------------
+Compara la ruta anterior (np.zeros + AVAudioFrame.from_ndarray + PTS por
+time.time() en cada frame) con AudioRingBuffer + AudioFrameFactory (anillo preasignado,
+silencio reutilizable y PTS por contador de muestras).
+
+Informa, por segundo de audio (50 frames de 20 ms):
+  - KB asignados de forma transitoria (pico de tracemalloc por bloque de captura)
+  - recolecciones del GC y pausas (total / máxima)
+  - coste de CPU por frame
+
+Uso:
+    python audio_frame_bench.py --seconds 60
+"""
+
+import argparse
+import fractions
+import gc
+import sys
+import time
+import tracemalloc
+
+try:
+    import numpy as np
+    from av import AudioFrame as AVAudioFrame
+except ImportError as e:
+    print(f"Error: faltan dependencias ({e}). Instale: pip install numpy av aiortc")
+    sys.exit(1)
+
+from voice_webrtc import WEBRTC_AVAILABLE
+
+SAMPLE_RATE = 48000
+SAMPLES_PER_FRAME = 960  # 20 ms
+FRAMES_PER_SECOND = SAMPLE_RATE // SAMPLES_PER_FRAME
+CAPTURE_CHUNK = 512  # tamaño de bloque de PyAudio en WebRTCVoiceBridge
+
+
+class GCMonitor:
+    """Registra la duración de cada recolección del GC mediante gc.callbacks"""
+
+    def __init__(self):
+        self.pauses = []
+        self._started = None
+
+    def __call__(self, phase, info):
+        if phase == "start":
+            self._started = time.perf_counter()
+        elif self._started is not None:
+            self.pauses.append(time.perf_counter() - self._started)
+            self._started = None
+
+    def __enter__(self):
+        gc.callbacks.append(self)
+        return self
+
+    def __exit__(self, *exc):
+        gc.callbacks.remove(self)
+
+
+def legacy_path(chunk, start, sink):
+    """Réplica de la ruta anterior: un array y un frame nuevos por bloque"""
+    avframe = AVAudioFrame.from_ndarray(chunk.reshape(1, -1), format="s16", layout="mono")
+    avframe.sample_rate = SAMPLE_RATE
+    avframe.time_base = fractions.Fraction(1, SAMPLE_RATE)
+    avframe.pts = int((time.time() - start) * SAMPLE_RATE)
+    sink.append(avframe)
+
+    silence = np.zeros((1, SAMPLES_PER_FRAME), dtype=np.int16)
+    avframe = AVAudioFrame.from_ndarray(silence, format="s16", layout="mono")
+    avframe.sample_rate = SAMPLE_RATE
+    avframe.pts = int((time.time() - start) * SAMPLE_RATE)
+    sink.append(avframe)
+
+
+def run(label, step, seconds):
+    chunks = int(seconds * SAMPLE_RATE / CAPTURE_CHUNK)
+    chunk = (np.sin(np.arange(CAPTURE_CHUNK) / 8.0) * 8000).astype(np.int16)
+    sink = []
+
+    gc.collect()
+    tracemalloc.start()
+    peak_total = 0
+    with GCMonitor() as monitor:
+        t0 = time.perf_counter()
+        for _ in range(chunks):
+            before = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            step(chunk, sink)
+            peak_total += tracemalloc.get_traced_memory()[1] - before
+            # Simula al consumidor: el frame se entrega y se suelta
+            sink.clear()
+        elapsed = time.perf_counter() - t0
+    tracemalloc.stop()
+
+    audio_seconds = chunks * CAPTURE_CHUNK / SAMPLE_RATE
+    pauses = monitor.pauses
+    print(f"\n=== {label} ===")
+    print(f"  segundos de audio:        {audio_seconds:.1f}")
+    print(f"  KB asignados / s audio:   {peak_total / 1024 / audio_seconds:.1f}")
+    print(f"  recolecciones GC:         {len(pauses)}")
+    print(f"  pausa GC total / máxima:  {sum(pauses) * 1000:.2f} ms / {max(pauses, default=0) * 1000:.3f} ms")
+    print(f"  CPU por frame de 20 ms:   {elapsed / (audio_seconds * FRAMES_PER_SECOND) * 1e6:.1f} µs")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Microbenchmark de frames de audio WebRTC")
+    parser.add_argument("--seconds", type=float, default=30, help="segundos de audio simulados")
+    args = parser.parse_args()
+
+    if not WEBRTC_AVAILABLE:
+        print("aiortc no está disponible; no se puede medir AudioFrameFactory")
+        sys.exit(1)
+
+    from voice_webrtc import AudioFrameFactory, AudioRingBuffer
+
+    start = time.time()
+    run("antes: frame nuevo por bloque", lambda chunk, sink: legacy_path(chunk, start, sink), args.seconds)
+
+    factory = AudioFrameFactory(SAMPLE_RATE, SAMPLES_PER_FRAME)
+    ring = AudioRingBuffer(SAMPLE_RATE // 2)
+
+    def factory_path(chunk, sink):
+        ring.write(chunk)
+        while ring.available() >= SAMPLES_PER_FRAME:
+            frame, view = factory.next_slot()
+            ring.read_into(view)
+            sink.append(factory.stamp(frame))
+        sink.append(factory.stamp(factory.silence()))
+
+    run("después: AudioRingBuffer + AudioFrameFactory", factory_path, args.seconds)
+
+
+if __name__ == "__main__":
+    main()
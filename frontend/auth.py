@@ -5,7 +5,6 @@ from PyQt5.QtWidgets import QMessageBox
 from PyQt5.QtCore import QSettings, QThread, pyqtSignal
 import subprocess
 from verify import VerifyApp
-from main_app import MainApp
 from translator import Translator, _
 from api_client import api_client
 import re
@@ -132,6 +131,8 @@ class AuthApp(QtWidgets.QMainWindow):
                 try:
                     user_data = api_client.get("/auth/me")
                     user_data["access_token"] = access_token
+                    # غالباً ما تكون محملة مسبقاً عبر startup.warm_up()
+                    from main_app import MainApp
                     self.main_window = MainApp(user_data=user_data)
                     self.main_window.show()
                     self.close()
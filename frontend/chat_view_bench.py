@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Room chat cost: QTextEdit.append per message vs ChatFeed (batched QListView)
+---------------------------------------------------------------------------
+The view is first filled with --backlog messages (a long session in an
+active room), then receives messages at --rate per second for --seconds
+while a 10 ms timer measures how late the event loop runs it. Finally the
+view is scrolled from top to bottom in 100 steps, repainting each step,
+and resized once (every retained line wraps again). RSS growth is read
+from /proc, so it is only reported on Linux.
+
+Usage:
+    QT_QPA_PLATFORM=offscreen python chat_view_bench.py --backlog 20000 --rate 50 --seconds 10
+"""
+
+import argparse
+import os
+import statistics
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt5 import QtWidgets
+from PyQt5.QtCore import QTimer, QEventLoop
+from PyQt5.QtGui import QTextCursor
+
+from widgets.chat_view import ChatFeed
+
+
+def message(n):
+    return f"[12:{n // 60 % 60:02d}:{n % 60:02d}] user{n % 8}: message number {n} with some ordinary chat text"
+
+
+class LegacyChat:
+    """Previous RoomWindow._update_chat_safe"""
+
+    def __init__(self):
+        self.view = QtWidgets.QTextEdit()
+        self.view.setReadOnly(True)
+        self.view.setLineWrapMode(QtWidgets.QTextEdit.WidgetWidth)
+
+    def add(self, n):
+        self.view.append(message(n) + "<br>")
+        self.view.moveCursor(QTextCursor.End)
+
+    def retained(self):
+        return self.view.document().blockCount()
+
+
+class FeedChat:
+    def __init__(self):
+        self.view = QtWidgets.QListView()
+        self.feed = ChatFeed(self.view)
+
+    def add(self, n):
+        self.feed.add_line(message(n), message_id=n)
+
+    def retained(self):
+        return self.feed.model.rowCount()
+
+
+def rss_mb():
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except OSError:
+        return float("nan")
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+def run(label, make_chat, app, args):
+    rss = rss_mb()
+    chat = make_chat()
+    chat.view.resize(500, 400)
+    chat.view.show()
+
+    start = time.perf_counter()
+    for n in range(args.backlog):
+        chat.add(n)
+        if n % 50 == 0:
+            app.processEvents()
+    app.processEvents()
+    backlog_s = time.perf_counter() - start
+
+    # Live phase: messages at a fixed rate, loop lag sampled by a 10 ms timer
+    counter = [args.backlog]
+    lag = []
+    last = [time.perf_counter()]
+
+    def deliver():
+        chat.add(counter[0])
+        counter[0] += 1
+
+    def probe():
+        now = time.perf_counter()
+        lag.append(max(0.0, (now - last[0]) * 1000 - 10))
+        last[0] = now
+
+    sender = QTimer()
+    sender.timeout.connect(deliver)
+    sender.start(int(1000 / args.rate))
+    prober = QTimer()
+    prober.timeout.connect(probe)
+    prober.start(10)
+
+    loop = QEventLoop()
+    QTimer.singleShot(args.seconds * 1000, loop.quit)
+    cpu = time.process_time()
+    loop.exec_()
+    cpu = time.process_time() - cpu
+    sender.stop()
+    prober.stop()
+    app.processEvents()
+
+    # Scroll through everything that is retained
+    scrollbar = chat.view.verticalScrollBar()
+    steps = []
+    for step in range(101):
+        t = time.perf_counter()
+        scrollbar.setValue(scrollbar.maximum() * step // 100)
+        chat.view.viewport().repaint()
+        steps.append((time.perf_counter() - t) * 1000)
+
+    t = time.perf_counter()
+    chat.view.resize(420, 400)
+    app.processEvents()
+    chat.view.viewport().repaint()
+    resize_ms = (time.perf_counter() - t) * 1000
+
+    print(f"{label}\n"
+          f"    backlog {backlog_s:6.2f} s   live CPU {cpu / args.seconds * 100:5.1f}%   "
+          f"loop lag p95 {percentile(lag, 0.95):5.2f} ms max {max(lag):6.2f} ms\n"
+          f"    scroll step mean {statistics.mean(steps):5.2f} ms max {max(steps):6.2f} ms   "
+          f"resize {resize_ms:7.1f} ms   retained {chat.retained()} lines   RSS +{rss_mb() - rss:.0f} MB")
+    chat.view.hide()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Room chat benchmark")
+    parser.add_argument("--backlog", type=int, default=20000)
+    parser.add_argument("--rate", type=int, default=50, help="messages per second")
+    parser.add_argument("--seconds", type=int, default=10)
+    args = parser.parse_args()
+
+    app = QtWidgets.QApplication([])
+    print(f"{args.backlog} backlog messages, then {args.rate} msg/s for {args.seconds} s")
+    run("before: QTextEdit.append", LegacyChat, app, args)
+    run("after: ChatFeed + QListView", FeedChat, app, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -16,6 +16,12 @@ load_dotenv()
 # 🟡 قراءة عنوان الـ API من المتغير البيئي
 API_BASE_URL = os.getenv("API_BASE_URL")
 
+# كاش قوائم الأصدقاء: أي طلب تعديل على /friends/ يلغيه تلقائياً
+FRIENDS_CACHE_TTL = 30
+for _endpoint in ("/friends/my_friends", "/friends/pending_requests", "/friends/sent_requests"):
+    api_client.enable_cache(_endpoint, ttl=FRIENDS_CACHE_TTL)
+
+
 def log_error(msg):
     with open("log.txt", "a", encoding="utf-8") as f:
         f.write(msg + "\n")
@@ -42,7 +48,7 @@ class FriendsDialog(QDialog):
         self.accept_btn.clicked.connect(lambda: self.handle_pending_action("accept"))
         self.decline_btn.clicked.connect(lambda: self.handle_pending_action("decline"))
         self.cancel_btn.clicked.connect(self.handle_sent_action)
-        self.refresh_btn.clicked.connect(self.load_data)
+        self.refresh_btn.clicked.connect(self.refresh_data)
         
         # إضافة القوائم المنبثقة
         self.pendingList.setContextMenuPolicy(Qt.CustomContextMenu)
@@ -52,16 +58,18 @@ class FriendsDialog(QDialog):
         self.friendsList.setContextMenuPolicy(Qt.CustomContextMenu)
         self.friendsList.customContextMenuRequested.connect(self.show_friend_context_menu)
 
+    def show_error(self, message):
+        self.show_message(message, "Error")
+
     def load_friends(self):
-        try:
-            api_client.set_token(self.access_token)
-            response = api_client.get("/friends/my_friends")
-            if "friends" in response:
-                self.update_friends_list(response["friends"])
-            else:
-                self.show_message(_("ui.friends.fetch_error", "فشل في جلب قائمة الأصدقاء."), "Error")
-        except Exception as e:
-            self.show_message(str(e), "Error")
+        api_client.set_token(self.access_token)
+        api_client.get_async("/friends/my_friends", self.on_friends_loaded, self.show_error)
+
+    def on_friends_loaded(self, response):
+        if "friends" in response:
+            self.update_friends_list(response["friends"])
+        else:
+            self.show_message(_("ui.friends.fetch_error", "فشل في جلب قائمة الأصدقاء."), "Error")
 
     def update_friends_list(self, friends):
         self.friendsList.clear()
@@ -75,17 +83,25 @@ class FriendsDialog(QDialog):
             _("ui.friends.enter_username", "أدخل اسم المستخدم لصديقك:")
         )
         if ok and username:
-            try:
-                api_client.set_token(self.access_token)
-                response = api_client.post("/friends/send_request", data={"friend_username": username})
-                if response.get("message"):
-                    self.show_message(_("ui.friends.request_sent", "تم إرسال طلب الصداقة بنجاح."))
-                    self.load_friends()
-                else:
-                    error_msg = response.get("detail", _("ui.friends.request_failed", "فشل في إرسال طلب الصداقة."))
-                    self.show_message(error_msg, "Error")
-            except Exception as e:
-                self.show_message(str(e), "Error")
+            api_client.set_token(self.access_token)
+            api_client.post_async(
+                "/friends/send_request",
+                lambda response: self.on_action_done(
+                    response,
+                    _("ui.friends.request_sent", "تم إرسال طلب الصداقة بنجاح."),
+                    _("ui.friends.request_failed", "فشل في إرسال طلب الصداقة."),
+                    self.load_friends),
+                self.show_error,
+                data={"friend_username": username})
+
+    def on_action_done(self, response, success_msg, error_msg, reload_func=None):
+        """نتيجة طلب غير متزامن لإجراء على صديق أو طلب صداقة"""
+        if response.get("message"):
+            self.show_message(success_msg)
+            if reload_func:
+                reload_func()
+        else:
+            self.show_message(response.get("detail", error_msg), "Error")
 
     def remove_friend(self):
         selected_items = self.friendsList.selectedItems()
@@ -95,30 +111,31 @@ class FriendsDialog(QDialog):
 
         friend_data = selected_items[0].text().split(" (")
         friend_username = friend_data[0]
-        friend_email = friend_data[1].rstrip(")")
-        
-        try:
-            api_client.set_token(self.access_token)
-            # أولاً نحصل على قائمة الأصدقاء للحصول على الـ ID
-            friends_response = api_client.get("/friends/my_friends")
-            if "friends" in friends_response:
-                friends = friends_response["friends"]
-                friend = next((f for f in friends if f["username"] == friend_username), None)
-                
-                if friend:
-                    response = api_client.post(f"/friends/remove_friend/{friend['id']}")
-                    if response.get("message"):
-                        self.show_message(_("ui.friends.removed", "تم إزالة الصديق بنجاح."))
-                        self.load_friends()
-                    else:
-                        error_msg = response.get("detail", _("ui.friends.remove_failed", "فشل في إزالة الصديق."))
-                        self.show_message(error_msg, "Error")
-                else:
-                    self.show_message(_("ui.friends.friend_not_found", "لم يتم العثور على الصديق."), "Error")
-            else:
-                self.show_message(_("ui.friends.fetch_error", "فشل في جلب قائمة الأصدقاء."), "Error")
-        except Exception as e:
-            self.show_message(str(e), "Error")
+
+        api_client.set_token(self.access_token)
+        # أولاً نحصل على قائمة الأصدقاء للحصول على الـ ID
+        api_client.get_async("/friends/my_friends",
+                             lambda response: self.remove_friend_by_username(response, friend_username),
+                             self.show_error)
+
+    def remove_friend_by_username(self, friends_response, friend_username):
+        if "friends" not in friends_response:
+            self.show_message(_("ui.friends.fetch_error", "فشل في جلب قائمة الأصدقاء."), "Error")
+            return
+
+        friend = next((f for f in friends_response["friends"] if f["username"] == friend_username), None)
+        if not friend:
+            self.show_message(_("ui.friends.friend_not_found", "لم يتم العثور على الصديق."), "Error")
+            return
+
+        api_client.post_async(
+            f"/friends/remove_friend/{friend['id']}",
+            lambda response: self.on_action_done(
+                response,
+                _("ui.friends.removed", "تم إزالة الصديق بنجاح."),
+                _("ui.friends.remove_failed", "فشل في إزالة الصديق."),
+                self.load_friends),
+            self.show_error)
 
     def show_message(self, message, title="Info"):
         msg = QMessageBox()
@@ -138,40 +155,34 @@ class FriendsDialog(QDialog):
         self.decline_btn.setText(_("ui.friends_dialog.decline", "❌ رفض"))
         self.cancel_btn.setText(_("ui.friends_dialog.cancel", "🚫 إلغاء الطلب"))
 
+    def refresh_data(self):
+        """زر التحديث: يسأل الخادم دائماً، والقوائم غير المتغيرة تكلف 304 فقط"""
+        api_client.expire("/friends/")
+        self.load_data()
+
     def load_data(self):
         self.load_friends()
         self.load_pending_requests()
         self.load_sent_requests()
 
     def load_pending_requests(self):
-        self.pendingList.clear()
-        try:
-            api_client.set_token(self.access_token)
-            response = api_client.get("/friends/pending_requests")
-            print("pending_requests response:", response)
-            if "pending_requests" in response:
-                requests = response["pending_requests"]
-                for req in requests:
-                    item = QListWidgetItem(f"{req['username']} ({req['email']})")
-                    item.setData(QtCore.Qt.UserRole, req['request_id'])
-                    self.pendingList.addItem(item)
-        except Exception as e:
-            self.show_message(str(e), "Error")
+        api_client.set_token(self.access_token)
+        api_client.get_async("/friends/pending_requests",
+                             lambda response: self.fill_requests_list(self.pendingList, response.get("pending_requests")),
+                             self.show_error)
 
     def load_sent_requests(self):
-        self.sentList.clear()
-        try:
-            api_client.set_token(self.access_token)
-            response = api_client.get("/friends/sent_requests")
-            print("sent_requests response:", response)
-            if "sent_requests" in response:
-                requests = response["sent_requests"]
-                for req in requests:
-                    item = QListWidgetItem(f"{req['username']} ({req['email']})")
-                    item.setData(QtCore.Qt.UserRole, req['request_id'])
-                    self.sentList.addItem(item)
-        except Exception as e:
-            self.show_message(str(e), "Error")
+        api_client.set_token(self.access_token)
+        api_client.get_async("/friends/sent_requests",
+                             lambda response: self.fill_requests_list(self.sentList, response.get("sent_requests")),
+                             self.show_error)
+
+    def fill_requests_list(self, list_widget, requests):
+        list_widget.clear()
+        for req in requests or []:
+            item = QListWidgetItem(f"{req['username']} ({req['email']})")
+            item.setData(QtCore.Qt.UserRole, req['request_id'])
+            list_widget.addItem(item)
 
     def show_response_message(self, response, success_msg, error_msg, reload_func=None):
         if response.status_code == 200:
@@ -229,43 +240,37 @@ class FriendsDialog(QDialog):
             self.cancel_friend_request(request_id)
 
     def accept_friend_request(self, request_id):
-        try:
-            api_client.set_token(self.access_token)
-            response = api_client.post(f"/friends/accept_request/{request_id}")
-            if response.get("message"):
-                self.show_message(_("ui.friends.request_accepted", "تم قبول طلب الصداقة بنجاح."))
-                self.load_data()
-            else:
-                error_msg = response.get("detail", _("ui.friends.accept_failed", "فشل في قبول طلب الصداقة."))
-                self.show_message(error_msg, "Error")
-        except Exception as e:
-            self.show_message(str(e), "Error")
+        api_client.set_token(self.access_token)
+        api_client.post_async(
+            f"/friends/accept_request/{request_id}",
+            lambda response: self.on_action_done(
+                response,
+                _("ui.friends.request_accepted", "تم قبول طلب الصداقة بنجاح."),
+                _("ui.friends.accept_failed", "فشل في قبول طلب الصداقة."),
+                self.load_data),
+            self.show_error)
 
     def decline_friend_request(self, request_id):
-        try:
-            api_client.set_token(self.access_token)
-            response = api_client.post(f"/friends/decline_request/{request_id}")
-            if response.get("message"):
-                self.show_message(_("ui.friends.request_declined", "تم رفض طلب الصداقة."))
-                self.load_pending_requests()
-            else:
-                error_msg = response.get("detail", _("ui.friends.decline_failed", "فشل في رفض طلب الصداقة."))
-                self.show_message(error_msg, "Error")
-        except Exception as e:
-            self.show_message(str(e), "Error")
+        api_client.set_token(self.access_token)
+        api_client.post_async(
+            f"/friends/decline_request/{request_id}",
+            lambda response: self.on_action_done(
+                response,
+                _("ui.friends.request_declined", "تم رفض طلب الصداقة."),
+                _("ui.friends.decline_failed", "فشل في رفض طلب الصداقة."),
+                self.load_pending_requests),
+            self.show_error)
 
     def cancel_friend_request(self, request_id):
-        try:
-            api_client.set_token(self.access_token)
-            response = api_client.post(f"/friends/cancel_request/{request_id}")
-            if response.get("message"):
-                self.show_message(_("ui.friends.request_cancelled", "تم إلغاء طلب الصداقة."))
-                self.load_sent_requests()
-            else:
-                error_msg = response.get("detail", _("ui.friends.cancel_failed", "فشل في إلغاء طلب الصداقة."))
-                self.show_message(error_msg, "Error")
-        except Exception as e:
-            self.show_message(str(e), "Error")
+        api_client.set_token(self.access_token)
+        api_client.post_async(
+            f"/friends/cancel_request/{request_id}",
+            lambda response: self.on_action_done(
+                response,
+                _("ui.friends.request_cancelled", "تم إلغاء طلب الصداقة."),
+                _("ui.friends.cancel_failed", "فشل في إلغاء طلب الصداقة."),
+                self.load_sent_requests),
+            self.show_error)
 
     def search_users_dialog(self):
         search_term, ok = QInputDialog.getText(
@@ -277,26 +282,24 @@ class FriendsDialog(QDialog):
             self.search_users(search_term)
 
     def search_users(self, search_term):
-        try:
-            response = requests.get(f"{API_BASE_URL}/friends/users/search?term={search_term}", headers=self.headers)
-
-            if response.status_code == 200:
-                users = response.json()
-                if users:
-                    dialog = UserSearchResultsDialog(users, self.access_token, self)
-                    dialog.setWindowModality(QtCore.Qt.ApplicationModal)
-                    dialog.user_added.connect(self.load_data)
-                    dialog.exec_()
-                else:
-                    QMessageBox.information(self, _("ui.common.info", "معلومة"),
-                                            _("ui.friends_dialog.no_users_found", "لا يوجد مستخدمين بهذا الاسم"))
-            else:
-                self.show_response_message(response,
-                                           "",  # لا يوجد success msg
-                                           _("ui.friends_dialog.search_error", "حدث خطأ أثناء البحث"))
-        except Exception as e:
-            log_error(f"[Search Users] {e}")
-            QMessageBox.warning(self, "Error", str(e))
+        api_client.set_token(self.access_token)
+        api_client.get_async("/friends/users/search", self.show_search_results, self.on_search_error,
+                             params={"term": search_term})
+
+    def show_search_results(self, users):
+        if users:
+            dialog = UserSearchResultsDialog(users, self.access_token, self)
+            dialog.setWindowModality(QtCore.Qt.ApplicationModal)
+            dialog.user_added.connect(self.load_data)
+            dialog.exec_()
+        else:
+            QMessageBox.information(self, _("ui.common.info", "معلومة"),
+                                    _("ui.friends_dialog.no_users_found", "لا يوجد مستخدمين بهذا الاسم"))
+
+    def on_search_error(self, message):
+        log_error(f"[Search Users] {message}")
+        QMessageBox.warning(self, _("ui.common.error", "خطأ"),
+                            f"{_('ui.friends_dialog.search_error', 'حدث خطأ أثناء البحث')}\n{message}")
 
     def handle_pending_action(self, action_type):
         selected_items = self.pendingList.selectedItems()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Lobby refresh cost with many rooms: QListWidget rebuild vs RoomListModel
+------------------------------------------------------------------------
+Each refresh changes the player count of 1% of the rooms, adds 5 and
+removes 5, like a busy lobby receiving update_rooms. Both views are shown
+(offscreen) and events are processed, so layout and paint are included.
+
+Usage:
+    QT_QPA_PLATFORM=offscreen python lobby_model_bench.py --rooms 5000 --refreshes 20
+"""
+
+import argparse
+import os
+import random
+import statistics
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt5 import QtWidgets
+from PyQt5.QtCore import Qt
+
+from widgets.rooms_model import RoomListModel, RoomFilterProxyModel
+
+
+def make_room(room_id):
+    return {
+        "id": room_id,
+        "room_name": f"room {room_id}",
+        "owner_username": f"user{room_id % 997}",
+        "description": "",
+        "is_private": room_id % 7 == 0,
+        "max_players": 8,
+        "current_players": room_id % 8,
+    }
+
+
+def next_snapshot(rooms, next_id):
+    rooms = [dict(room) for room in rooms]
+    for room in random.sample(rooms, max(1, len(rooms) // 100)):
+        room["current_players"] = (room["current_players"] + 1) % 9
+    for _ in range(5):
+        rooms.pop(random.randrange(len(rooms)))
+    rooms.extend(make_room(next_id + i) for i in range(5))
+    return rooms, next_id + 5
+
+
+def legacy_refresh(widget, rooms):
+    """Previous MainApp.update_rooms_list: clear and re-create every item"""
+    widget.clear()
+    for room in rooms:
+        text = f"🏷️ {room['room_name']}\n👥 {room['current_players']}/{room['max_players']} | "
+        text += "🔒 خاصة" if room["is_private"] else "🌐 عامة"
+        text += f"\n👤 {room['owner_username']}"
+        item = QtWidgets.QListWidgetItem(text)
+        item.setData(Qt.UserRole, room["id"])
+        widget.addItem(item)
+
+
+def run(label, view, refresh, snapshots, app):
+    view.resize(400, 600)
+    view.show()
+    refresh(snapshots[0])
+    app.processEvents()
+    view.setCurrentIndex(view.model().index(100, 0))
+    selected = view.currentIndex().data(Qt.UserRole)
+    view.verticalScrollBar().setValue(view.verticalScrollBar().maximum() // 2)
+    app.processEvents()
+    scrolled = view.verticalScrollBar().value()
+
+    times = []
+    for rooms in snapshots[1:]:
+        start = time.perf_counter()
+        refresh(rooms)
+        app.processEvents()
+        times.append((time.perf_counter() - start) * 1000)
+
+    still_selected = view.currentIndex().isValid() and view.currentIndex().data(Qt.UserRole) == selected
+    print(f"{label:<34} mean {statistics.mean(times):7.2f} ms   max {max(times):7.2f} ms   "
+          f"scroll kept: {view.verticalScrollBar().value() == scrolled}   selection kept: {still_selected}")
+    view.hide()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Lobby refresh benchmark")
+    parser.add_argument("--rooms", type=int, default=5000)
+    parser.add_argument("--refreshes", type=int, default=20)
+    args = parser.parse_args()
+
+    random.seed(1)
+    app = QtWidgets.QApplication([])
+    rooms = [make_room(i) for i in range(args.rooms)]
+    snapshots = [rooms]
+    next_id = args.rooms
+    for _ in range(args.refreshes):
+        rooms, next_id = next_snapshot(rooms, next_id)
+        snapshots.append(rooms)
+
+    print(f"{args.rooms} rooms, {args.refreshes} refreshes")
+    widget = QtWidgets.QListWidget()
+    run("before: QListWidget clear/rebuild", widget, lambda rooms: legacy_refresh(widget, rooms), snapshots, app)
+
+    model = RoomListModel()
+    proxy = RoomFilterProxyModel()
+    proxy.setSourceModel(model)
+    proxy.sort(0, Qt.AscendingOrder)
+    view = QtWidgets.QListView()
+    view.setUniformItemSizes(True)
+    view.setModel(proxy)
+    run("after: RoomListModel + proxy", view, model.apply, snapshots, app)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,12 @@
 # frontend/main.py
+import time
+STARTED_AT = time.perf_counter()
+
 import sys
 import os
 import logging
-from PyQt5 import QtWidgets
+from PyQt5 import QtWidgets, QtCore
+import startup
 from auth import AuthApp
 from settings_window import SettingsWindow
 from translator import Translator, _
@@ -44,6 +48,9 @@ def initialize_application():
         raise
 
 def main():
+    # Elevate (Windows) before any window is built; the elevated copy starts over
+    startup.ensure_admin()
+
     try:
         # Initialize application
         app = initialize_application()
@@ -51,6 +58,10 @@ def main():
         # Create and show main window
         window = AuthApp()
         window.show()
+        logger.info(f"Login window shown after {(time.perf_counter() - STARTED_AT) * 1000:.0f} ms")
+
+        # Main window, Socket.IO and room/VPN modules load while the user types
+        QtCore.QTimer.singleShot(0, startup.warm_up)
         
         # Start event loop
         sys.exit(app.exec_())
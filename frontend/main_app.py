@@ -1,7 +1,6 @@
 # main_app.py
 import os
 import sys
-import ctypes
 import requests
 import subprocess
 import logging
@@ -10,11 +9,9 @@ from PyQt5.QtWidgets import QMessageBox, QDialog, QInputDialog, QListWidgetItem,
 from PyQt5.QtGui import QTextCursor
 from PyQt5.QtCore import QMetaType, QTimer, QThread, pyqtSignal, Qt
 from dialogs.room_settings_dialog import RoomSettingsDialog
-from room_window import RoomWindow    
-from settings_window import SettingsWindow
 from translator import Translator, _
 from dotenv import load_dotenv
-from dialogs.friends import FriendsDialog
+from widgets.rooms_model import RoomListModel, RoomFilterProxyModel, RoomDataRole, RoomNameRole, PlayersRole
 from api_client import api_client
 import time
 from socket_client import socket_manager
@@ -26,46 +23,19 @@ load_dotenv()
 
 # 🟡 قراءة عنوان الـ API من المتغير البيئي
 API_BASE_URL = os.getenv("API_BASE_URL")
-# --------- تشغيل كمسؤول تلقائيًا ---------
-def is_admin():
-    try:
-        return ctypes.windll.shell32.IsUserAnAdmin()
-    except:
-        return False
+# التشغيل كمسؤول يتم في startup.ensure_admin() عند بدء البرنامج
 
-if not is_admin():
-    ctypes.windll.shell32.ShellExecuteW(
-        None, "runas", sys.executable, " ".join(sys.argv), None, 1
-    )
-    sys.exit()
-# -------------------------------------------
 
 
 
 
 
 
-
-class RoomLoader(QThread):
-    rooms_loaded = pyqtSignal(list)
-    error_occurred = pyqtSignal(str)
-
-    def __init__(self, access_token):
-        super().__init__()
-        self.access_token = access_token
-
-    def run(self):
-        try:
-            api_client.set_token(self.access_token)
-            data = api_client.get("/rooms/")
-            rooms = data["rooms"]
-            self.rooms_loaded.emit(rooms)
-        except Exception as e:
-            self.error_occurred.emit(str(e))
-
 class MainApp(QtWidgets.QMainWindow):
     # Add custom signal for thread-safe room window creation
     room_creation_requested = pyqtSignal(dict)
+    # أحداث السوكيت تصل في خيط آخر؛ هذه الإشارة تنقل طلب التحديث إلى خيط الواجهة
+    rooms_refresh_requested = pyqtSignal()
     
     def __init__(self, user_data):
         super().__init__()
@@ -83,6 +53,7 @@ class MainApp(QtWidgets.QMainWindow):
         
         # Connect the thread-safe room creation signal
         self.room_creation_requested.connect(self._create_room_window)
+        self.rooms_refresh_requested.connect(self.update_rooms)
         
         # ترجمة واجهة المستخدم
         self.translate_ui()
@@ -100,52 +71,87 @@ class MainApp(QtWidgets.QMainWindow):
 
         self.current_proc = None
         self.room_win = None
-        self.last_rooms = []
 
-        # إنشاء قائمة الغرف باستخدام QListWidget
-        self.roomsWidget = QtWidgets.QListWidget()
+        # نموذج الغرف (مفهرس بمعرف الغرفة) ونموذج وسيط للتصفية والترتيب
+        self.rooms_model = RoomListModel(self)
+        self.rooms_proxy = RoomFilterProxyModel(self)
+        self.rooms_proxy.setSourceModel(self.rooms_model)
+        self.rooms_proxy.sort(0, Qt.AscendingOrder)
+
+        # شريط التصفية فوق القائمة
+        self.rooms_search = QtWidgets.QLineEdit()
+        self.rooms_search.setPlaceholderText(_("ui.main_window.search_rooms", "🔍 بحث عن غرفة أو مالك..."))
+        self.rooms_search.textChanged.connect(self.rooms_proxy.set_filter_text)
+        self.rooms_sort = QtWidgets.QComboBox()
+        self.rooms_sort.addItem(_("ui.main_window.sort_name", "الاسم"), (RoomNameRole, Qt.AscendingOrder))
+        self.rooms_sort.addItem(_("ui.main_window.sort_players", "الأكثر لاعبين"), (PlayersRole, Qt.DescendingOrder))
+        self.rooms_sort.currentIndexChanged.connect(self.on_rooms_sort_changed)
+        self.rooms_hide_full = QtWidgets.QCheckBox(_("ui.main_window.hide_full", "إخفاء الممتلئة"))
+        self.rooms_hide_full.toggled.connect(self.rooms_proxy.set_hide_full)
+        filter_bar = QtWidgets.QHBoxLayout()
+        filter_bar.addWidget(self.rooms_search, 1)
+        filter_bar.addWidget(self.rooms_sort)
+        filter_bar.addWidget(self.rooms_hide_full)
+
+        # عرض القائمة: عناصر بحجم موحد حتى يبقى التمرير سلساً مع آلاف الغرف
+        self.roomsWidget = QtWidgets.QListView()
+        self.roomsWidget.setModel(self.rooms_proxy)
         self.roomsWidget.setSelectionMode(QtWidgets.QAbstractItemView.SingleSelection)
-        self.roomsWidget.itemDoubleClicked.connect(self.on_room_item_clicked)
+        self.roomsWidget.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
+        self.roomsWidget.setUniformItemSizes(True)
+        self.roomsWidget.doubleClicked.connect(self.on_room_item_clicked)
         
         # إضافة الخصائص للقائمة
         self.roomsWidget.setSpacing(5)
         self.roomsWidget.setIconSize(QtCore.QSize(48, 48))
         self.roomsWidget.setWordWrap(True)
         self.roomsWidget.setStyleSheet("""
-            QListWidget::item { 
+            QListView::item { 
                 border: 1px solid #ccc; 
                 border-radius: 5px; 
                 padding: 10px; 
                 margin: 5px;
                 background-color:rgb(208, 107, 255);
             }
-            QListWidget::item:selected { 
+            QListView::item:selected { 
                 background-color:rgb(110, 149, 180); 
             }
-            QListWidget::item:hover { 
+            QListView::item:hover { 
                 background-color:rgb(105, 182, 255); 
             }
         """)
         
         # إضافة القائمة إلى UI
+        self.ui.roomsLayout.addLayout(filter_bar)
         self.ui.roomsLayout.addWidget(self.roomsWidget)
-        
-        # قاموس لتخزين بيانات الغرف
-        self.rooms_data = {}
 
-        # جلب عنوان السيرفر للسوكيت
+        # كاش الطلبات: قائمة الغرف تنتهي صلاحيتها مع حدث update_rooms وتُعاد
+        # مصادقتها بـ ETag، وعنوان السوكيت نادراً ما يتغير
+        api_client.enable_cache("/rooms/", ttl=15)
+        api_client.enable_cache("/rooms/status", ttl=300)
+
+        # جلب عنوان السيرفر للسوكيت (دون حجب الواجهة)
+        self.server_url = None
         api_client.set_token(self.access_token)
-        try:
-            data = api_client.get("/rooms/status")
-            self.server_url = data.get("socket_url")
-            if data.get("status") == "ok" and self.server_url:
-                socket_manager.connect(self.server_url)
-                socket_manager.on('update_rooms', lambda data: self.update_rooms())
-        except Exception as e:
-            print(f"[SocketIO] Failed to connect: {e}")
+        api_client.get_async("/rooms/status", self.on_server_status,
+                             lambda error: print(f"[SocketIO] Failed to connect: {error}"))
 
         self.load_rooms()
 
+    def on_server_status(self, data):
+        self.server_url = data.get("socket_url")
+        if data.get("status") == "ok" and self.server_url:
+            try:
+                socket_manager.connect(self.server_url)
+                socket_manager.on('update_rooms', self.on_rooms_changed_event)
+            except Exception as e:
+                print(f"[SocketIO] Failed to connect: {e}")
+
+    def on_rooms_changed_event(self, data):
+        """يُستدعى في خيط السوكيت"""
+        api_client.expire("/rooms/")
+        self.rooms_refresh_requested.emit()
+
     def translate_ui(self):
         """ترجمة عناصر واجهة المستخدم"""
         self.setWindowTitle(_("ui.main_window.title", "القائمة الرئيسية"))
@@ -156,51 +162,22 @@ class MainApp(QtWidgets.QMainWindow):
         self.btn_settings.setText(_("ui.main_window.settings", "⚙️ الإعدادات"))
 
     def load_rooms(self):
-        self.room_loader = RoomLoader(self.access_token)
-        self.room_loader.rooms_loaded.connect(self.update_rooms_list)
-        self.room_loader.error_occurred.connect(self.show_error)
-        self.room_loader.start()
+        api_client.set_token(self.access_token)
+        api_client.get_async("/rooms/", lambda data: self.update_rooms_list(data.get("rooms", [])), self.show_error)
 
     def update_rooms_list(self, rooms):
-        self.roomsWidget.clear()
-        self.rooms_data = {}
-        for room in rooms:
-            try:
-                if not isinstance(room, dict):
-                    print(f"Warning: room is not a dict, got {type(room)}")
-                    continue
-                
-                # استخراج بيانات الغرفة
-                room_id = room.get('id', room.get('room_id', ''))
-                name = room.get('name') or room.get('room_name') or 'بدون اسم'
-
-                is_private = room.get("is_private", False)
-                current_players = room.get('current_players', 0)
-                max_players = room.get('max_players', 8)
-                owner = room.get('owner_username', '')
-                
-                # إنشاء نص الغرفة
-                room_text = f"🏷️ {name}\n"
-                room_text += f"👥 {current_players}/{max_players} | "
-                room_text += "🔒 خاصة" if is_private else "🌐 عامة"
-                room_text += f"\n👤 {owner}"
-                
-                # إضافة عنصر للقائمة
-                item = QListWidgetItem(room_text)
-                item.setData(QtCore.Qt.UserRole, room_id)  # تخزين معرف الغرفة
-                
-                # تخزين بيانات الغرفة في القاموس
-                self.rooms_data[str(room_id)] = room
-                
-                self.roomsWidget.addItem(item)
-            except Exception as e:
-                print(f"Error adding room to list: {e}")
-                continue
+        """يطبق القائمة الجديدة كفرق؛ يعيد True إذا تغير شيء"""
+        inserted, updated, removed = self.rooms_model.apply(rooms)
+        return bool(inserted or updated or removed)
 
-    def on_room_item_clicked(self, item):
+    def on_rooms_sort_changed(self, index):
+        role, order = self.rooms_sort.itemData(index)
+        self.rooms_proxy.setSortRole(role)
+        self.rooms_proxy.sort(0, order)
+
+    def on_room_item_clicked(self, index):
         """معالجة النقر المزدوج على غرفة من القائمة"""
-        room_id = item.data(QtCore.Qt.UserRole)
-        room = self.rooms_data.get(str(room_id))
+        room = index.data(RoomDataRole)
         
         if room:
             self.join_room_direct(room)
@@ -235,16 +212,7 @@ class MainApp(QtWidgets.QMainWindow):
             if not room_id:
                 raise Exception("Failed to get room ID from create_room response")
             
-            # Step 2: Join the room to get VPN data
-            join_data = api_client.post("/rooms/join_room", json={"room_id": room_id})
-            print("DEBUG: join_data =", join_data)
-            
-            # Check for join errors
-            if "detail" in join_data:
-                error_msg = join_data["detail"]
-                raise Exception(f"Failed to join created room: {error_msg}")
-            
-            # Step 3: Prepare room info with VPN data from join response
+            # Step 2: نافذة الغرفة تنضم وتتصل بالـ VPN بنفسها
             room_info = {
                 "id": room_id,
                 "room_id": room_id,
@@ -254,16 +222,7 @@ class MainApp(QtWidgets.QMainWindow):
                 "max_players": s["max_players"],
                 "current_players": 1,
                 "owner_username": self.user_data["username"],
-                "vpn_info": {
-                    "network_name": join_data.get("network_name", ""),
-                    "private_key": join_data.get("private_key", ""),
-                    "public_key": join_data.get("public_key", ""),
-                    "server_public_key": join_data.get("server_public_key", ""),
-                    "server_ip": join_data.get("server_ip", ""),
-                    "port": join_data.get("port", 51820),
-                    "allowed_ips": join_data.get("allowed_ips", "")
-                },
-                "_already_joined": True  # Mark as already joined since we called join_room
+                "_join_password": s["password"]
             }
             print("DEBUG: room_info =", room_info)
             self.open_room(room_info)
@@ -287,70 +246,18 @@ class MainApp(QtWidgets.QMainWindow):
         else:
             password = ""
         
-        try:
-            api_client.set_token(self.access_token)
-            data = api_client.post("/rooms/join_room", json={"room_id": room['id'], "password": password})
-            print("DEBUG: join_room_direct data =", data)
-
-            # التعامل مع الأخطاء بناءً على محتوى dict
-            if "detail" in data:
-                error_msg = data["detail"]
-                return self.show_message(f"خطأ: {error_msg}", "خطأ")
-            
-            # إذا كان المستخدم موجود بالفعل في الغرفة
-            if data.get("message") == "You are already in this room. Using existing connection.":
-                logger.info("User already in room, using existing connection")
-                # تحديث بيانات الغرفة مع البيانات الحالية
-                room_info = {
-                    "id": room['id'],
-                    "name": room.get('name', ''),
-                    "description": room.get('description', ''),
-                    "is_private": room.get('is_private', False),
-                    "max_players": room.get('max_players', 8),
-                    "current_players": room.get('current_players', 0),
-                    "owner_username": room.get('owner_username', ''),
-                    "vpn_info": {
-                        "network_name": data.get("network_name", ""),
-                        "private_key": data.get("private_key", ""),
-                        "public_key": data.get("public_key", ""),
-                        "server_public_key": data.get("server_public_key", ""),
-                        "server_ip": data.get("server_ip", ""),
-                        "port": data.get("port", 51820),
-                        "allowed_ips": data.get("allowed_ips", "")
-                    },
-                    "_already_joined": True  # Mark as already joined
-                }
-                self.open_room(room_info)
-                return
-            
-            # تحديث بيانات الغرفة
-            vpn_info = {
-                "network_name": data.get("network_name", ""),
-                "private_key": data.get("private_key", ""),
-                "public_key": data.get("public_key", ""),
-                "server_public_key": data.get("server_public_key", ""),
-                "server_ip": data.get("server_ip", ""),
-                "port": data.get("port", 51820),
-                "allowed_ips": data.get("allowed_ips", "")
-            }
-            
-            room_info = {
-                "id": room['id'],
-                "name": room.get('name', ''),
-                "description": room.get('description', ''),
-                "is_private": room.get('is_private', False),
-                "max_players": room.get('max_players', 8),
-                "current_players": room.get('current_players', 0),
-                "owner_username": room.get('owner_username', ''),
-                "vpn_info": vpn_info,
-                "_already_joined": True  # Mark as already joined
-            }
-            
-            self.open_room(room_info)
-        except Exception as e:
-            with open("log.txt", "a", encoding="utf-8") as f:
-                f.write(f"[Join Room Error] {e}\n")
-            return self.show_message(f"خطأ في الانضمام: {e}", "خطأ")
+        # الانضمام عبر HTTP والسوكيت والـ VPN تتم داخل نافذة الغرفة وبالتوازي
+        room_info = {
+            "id": room['id'],
+            "name": room.get('name', ''),
+            "description": room.get('description', ''),
+            "is_private": room.get('is_private', False),
+            "max_players": room.get('max_players', 8),
+            "current_players": room.get('current_players', 0),
+            "owner_username": room.get('owner_username', ''),
+            "_join_password": password
+        }
+        self.open_room(room_info)
 
     def open_room(self, room_info):
         # Use thread-safe signal to ensure room window creation happens in main thread
@@ -359,6 +266,9 @@ class MainApp(QtWidgets.QMainWindow):
     @QtCore.pyqtSlot(dict)
     def _create_room_window(self, room_info):
         """Thread-safe room window creation"""
+        # نافذة الغرفة (وما تحتاجه من VPN) لا تُحمَّل إلا عند دخول غرفة
+        from room_window import RoomWindow
+
         if self.room_win:
             self.room_win.close()
 
@@ -377,23 +287,16 @@ class MainApp(QtWidgets.QMainWindow):
         self.room_win = None
 
     def update_rooms(self):
-        try:
-            api_client.set_token(self.access_token)
-            data = api_client.get("/rooms/")
-            new_rooms = data["rooms"]
-            if self.is_rooms_changed(new_rooms):
-                self.update_rooms_list(new_rooms)
-                self.last_rooms = new_rooms
-                self.notify_change()
-        except Exception:
-            pass
-
-    def is_rooms_changed(self, new_rooms):
-        return new_rooms != self.last_rooms
+        api_client.set_token(self.access_token)
+        api_client.get_async("/rooms/", self.on_rooms_refreshed)
+
+    def on_rooms_refreshed(self, data):
+        if self.update_rooms_list(data.get("rooms", [])):
+            self.notify_change()
 
     def notify_change(self):
-        QMessageBox.information(self, _("ui.messages.update", "تحديث"), 
-                               _("ui.messages.room_update", "📢 تم تحديث قائمة الغرف!"))
+        # إشعار غير مقاطع في شريط الحالة بدلاً من نافذة منبثقة
+        self.statusBar().showMessage(_("ui.messages.room_update", "📢 تم تحديث قائمة الغرف!"), 3000)
 
     def logout(self):
         if self.room_win:
@@ -407,6 +310,7 @@ class MainApp(QtWidgets.QMainWindow):
         self.show_message(message, "Error")
 
     def show_friends_dialog(self):
+        from dialogs.friends import FriendsDialog
         dlg = FriendsDialog(self.user_data, self.access_token, self)
         dlg.exec_()
 
@@ -430,13 +334,13 @@ class MainApp(QtWidgets.QMainWindow):
 
     def show_settings(self):
         """عرض نافذة الإعدادات"""
+        from settings_window import SettingsWindow
         settings_dialog = SettingsWindow(self)
         settings_dialog.exec_()
 
     def clear_rooms(self):
         """تنظيف قائمة الغرف"""
-        self.roomsWidget.clear()
-        self.rooms_data = {}
+        self.rooms_model.clear()
 
     def closeEvent(self, event):
         try:
@@ -0,0 +1,119 @@
+import logging
+import time
+
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal
+
+logger = logging.getLogger(__name__)
+
+
+class EntryPipeline(QObject):
+    """
+    Room entry as a set of stages that start as soon as the stages they
+    depend on have succeeded, so independent work (VPN bring-up, socket
+    join) overlaps instead of running back to back.
+
+    A stage is started with a callable start(pipeline); it reports back with
+    pipeline.complete(name) or pipeline.fail(name, error), which are safe to
+    call from any thread. Stages whose dependencies failed are skipped.
+    Per-stage timings are logged when every stage has settled.
+    """
+    # name, ok, error
+    stage_settled = pyqtSignal(str, bool, str)
+    # name -> {"start": ms, "end": ms, "status": str} relative to start()
+    finished = pyqtSignal(dict)
+
+    _settle = pyqtSignal(str, bool, str)
+
+    def __init__(self, label, parent=None):
+        super().__init__(parent)
+        self.label = label
+        self._stages = {}
+        self._order = []
+        self._started_at = None
+        self._timers = {}
+        # Queued onto this object's (GUI) thread whatever thread reports
+        self._settle.connect(self._on_settle)
+
+    def add(self, name, start, after=(), timeout_ms=None):
+        self._stages[name] = {"start_fn": start, "after": tuple(after), "timeout_ms": timeout_ms,
+                              "status": "pending", "start": None, "end": None, "error": ""}
+        self._order.append(name)
+
+    def start(self):
+        self._started_at = time.perf_counter()
+        self._run_ready()
+
+    def complete(self, name):
+        self._settle.emit(name, True, "")
+
+    def fail(self, name, error):
+        self._settle.emit(name, False, str(error))
+
+    def is_done(self, name):
+        return self._stages.get(name, {}).get("status") == "done"
+
+    def status(self, name):
+        return self._stages[name]["status"]
+
+    def _elapsed_ms(self):
+        return (time.perf_counter() - self._started_at) * 1000
+
+    def _run_ready(self):
+        for name in self._order:
+            stage = self._stages[name]
+            if stage["status"] != "pending":
+                continue
+            states = [self._stages[dep]["status"] for dep in stage["after"]]
+            if any(state in ("failed", "skipped") for state in states):
+                stage["status"] = "skipped"
+                stage["start"] = stage["end"] = self._elapsed_ms()
+                self.stage_settled.emit(name, False, "dependency failed")
+                continue
+            if all(state == "done" for state in states):
+                self._launch(name, stage)
+        self._check_finished()
+
+    def _launch(self, name, stage):
+        stage["status"] = "running"
+        stage["start"] = self._elapsed_ms()
+        if stage["timeout_ms"]:
+            timer = QTimer(self)
+            timer.setSingleShot(True)
+            timer.timeout.connect(lambda: self.fail(name, f"timed out after {stage['timeout_ms']} ms"))
+            timer.start(stage["timeout_ms"])
+            self._timers[name] = timer
+        try:
+            stage["start_fn"](self)
+        except Exception as e:
+            logger.exception(f"[{self.label}] stage {name} raised")
+            self.fail(name, e)
+
+    def _on_settle(self, name, ok, error):
+        stage = self._stages.get(name)
+        # Late reports (e.g. after a timeout) are ignored
+        if stage is None or stage["status"] != "running":
+            return
+        timer = self._timers.pop(name, None)
+        if timer:
+            timer.stop()
+        stage["status"] = "done" if ok else "failed"
+        stage["end"] = self._elapsed_ms()
+        stage["error"] = error
+        self.stage_settled.emit(name, ok, error)
+        self._run_ready()
+
+    def _check_finished(self):
+        if any(stage["status"] in ("pending", "running") for stage in self._stages.values()):
+            return
+        if self._started_at is None:
+            return
+        report = {name: {"start": stage["start"], "end": stage["end"], "status": stage["status"]}
+                  for name, stage in self._stages.items()}
+        parts = []
+        for name in self._order:
+            stage = self._stages[name]
+            parts.append(f"{name} {stage['end'] - stage['start']:.0f} ms "
+                         f"(+{stage['start']:.0f}, {stage['status']}{': ' + stage['error'] if stage['error'] else ''})")
+        logger.info(f"[{self.label}] total {self._elapsed_ms():.0f} ms: " + ", ".join(parts))
+        self._started_at = None
+        self.finished.emit(report)
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Time to in-room: previous sequential entry vs EntryPipeline
+-----------------------------------------------------------
+Stage latencies are simulated (defaults are typical for a fast network and
+a WireGuard bring-up). The previous flow ran the HTTP join on the UI thread,
+waited a fixed 2 s before the socket join and connected the VPN on the UI
+thread after join_success. The pipeline runs the same stages with their
+real dependencies; the VPN stage sleeps on a worker thread, like
+RoomWindow.connect_to_vpn. A 10 ms timer measures UI stalls.
+
+Usage:
+    QT_QPA_PLATFORM=offscreen python room_entry_bench.py --http 150 --join 80 --vpn 1200 --history 100
+"""
+
+import argparse
+import os
+import threading
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt5 import QtWidgets
+from PyQt5.QtCore import QTimer, QEventLoop
+
+from room_entry import EntryPipeline
+
+
+def run_sequential(app, args):
+    """Previous MainApp.join_room_direct + RoomWindow: blocking calls on the UI thread, timers for the rest"""
+    done = []
+
+    def http_join():
+        time.sleep(args.http / 1000)  # api_client.post on the UI thread
+        QTimer.singleShot(2000, socket_join)  # _delayed_join_request
+
+    def socket_join():
+        QTimer.singleShot(args.join, join_success)
+
+    def join_success():
+        time.sleep(args.vpn / 1000)  # vpn_manager.connect() on the UI thread
+        QTimer.singleShot(args.history, lambda: done.append(time.perf_counter()))
+
+    start = time.perf_counter()
+    QTimer.singleShot(0, http_join)
+    while not done:
+        app.processEvents(QEventLoop.AllEvents, 10)
+    return (done[0] - start) * 1000
+
+
+def run_pipeline(app, args):
+    entry = EntryPipeline("bench entry")
+
+    def after(ms, name):
+        return lambda pipeline: QTimer.singleShot(ms, lambda: pipeline.complete(name))
+
+    def vpn(pipeline):
+        threading.Thread(target=lambda: (time.sleep(args.vpn / 1000), pipeline.complete("vpn")), daemon=True).start()
+
+    entry.add("http_join", after(args.http, "http_join"))
+    entry.add("server_ready", after(0, "server_ready"))
+    entry.add("socket_join", after(args.join, "socket_join"), after=("http_join", "server_ready"))
+    entry.add("vpn", vpn, after=("http_join",))
+    entry.add("chat_history", after(args.history, "chat_history"), after=("socket_join",))
+    report = {}
+    entry.finished.connect(report.update)
+    entry.start()
+    while not report:
+        app.processEvents(QEventLoop.AllEvents, 10)
+    in_room = max(stage["end"] for stage in report.values())
+    return in_room, report
+
+
+def settle(app):
+    """Let the stall probe fire once more after the last stage"""
+    end = time.perf_counter() + 0.05
+    while time.perf_counter() < end:
+        app.processEvents(QEventLoop.AllEvents, 10)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Room entry benchmark")
+    parser.add_argument("--http", type=int, default=150, help="HTTP join latency, ms")
+    parser.add_argument("--join", type=int, default=80, help="socket join round trip, ms")
+    parser.add_argument("--vpn", type=int, default=1200, help="VPN bring-up, ms")
+    parser.add_argument("--history", type=int, default=100, help="chat history page, ms")
+    args = parser.parse_args()
+
+    app = QtWidgets.QApplication([])
+    stalls = []
+    last = [time.perf_counter()]
+
+    def probe():
+        now = time.perf_counter()
+        stalls.append((now - last[0]) * 1000 - 10)
+        last[0] = now
+    prober = QTimer()
+    prober.timeout.connect(probe)
+    prober.start(10)
+
+    stalls.clear()
+    last[0] = time.perf_counter()
+    legacy = run_sequential(app, args)
+    settle(app)
+    print(f"before: sequential       in room after {legacy:7.0f} ms   longest UI stall {max(stalls, default=0):7.0f} ms")
+
+    stalls.clear()
+    last[0] = time.perf_counter()
+    in_room, report = run_pipeline(app, args)
+    settle(app)
+    print(f"after:  EntryPipeline    in room after {in_room:7.0f} ms   longest UI stall {max(stalls, default=0):7.0f} ms")
+    for name, stage in report.items():
+        print(f"    {name:<13} {stage['start']:6.0f} -> {stage['end']:6.0f} ms  {stage['status']}")
+    print(f"slowest chain http_join + vpn = {args.http + args.vpn} ms")
+
+
+if __name__ == "__main__":
+    main()
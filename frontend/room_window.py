@@ -1,23 +1,40 @@
 import sys
 import os
-import socketio
 import subprocess
 import time
 import logging
+import threading
 from PyQt5 import QtWidgets, uic, QtCore
 from PyQt5.QtWidgets import QMessageBox
 from PyQt5.QtCore import QTimer, Qt, pyqtSlot
-from PyQt5.QtGui import QTextCursor
 from urllib.parse import urlparse
 from datetime import datetime
 
-from vpn_manager import VPNManager
 from api_client import api_client
+from room_entry import EntryPipeline
 from socket_client import socket_manager
+from widgets.chat_view import ChatFeed
+from widgets.players_model import PlayerListModel
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Seconds to wait for an entry stage that depends on the server
+ENTRY_STAGE_TIMEOUT_MS = 15000
+
+
+def vpn_info_from_join(data):
+    """VPN settings from a /rooms/join_room response"""
+    return {
+        "network_name": data.get("network_name", ""),
+        "private_key": data.get("private_key", ""),
+        "public_key": data.get("public_key", ""),
+        "server_public_key": data.get("server_public_key", ""),
+        "server_ip": data.get("server_ip", ""),
+        "port": data.get("port", 51820),
+        "allowed_ips": data.get("allowed_ips", "")
+    }
+
 class RoomWindow(QtWidgets.QMainWindow):
     room_closed = QtCore.pyqtSignal()
     message_received = QtCore.pyqtSignal(dict)
@@ -30,7 +47,7 @@ class RoomWindow(QtWidgets.QMainWindow):
     show_warning_signal = QtCore.pyqtSignal(str, str)
     join_response_received = QtCore.pyqtSignal(dict)
     vpn_status_signal = QtCore.pyqtSignal(str)
-    update_players_signal = QtCore.pyqtSignal(list)
+    players_snapshot = QtCore.pyqtSignal(dict)
 
     def __init__(self, room_data, user_username, access_token=None):
         super().__init__()
@@ -38,11 +55,15 @@ class RoomWindow(QtWidgets.QMainWindow):
             raise ValueError("room_data must be a dictionary")
 
         self.room_data = room_data
+        self._join_password = room_data.pop('_join_password', "")
         self.room_id = str(room_data.get("id", room_data.get("room_id", "")))
         self.user_username = user_username
         self.access_token = access_token
-        self.players = []
+        self.players_model = PlayerListModel()
         self.vpn_manager = None  # Will be created later when VPN info is available
+        self._vpn_thread = None
+        # Newest chat message shown; sent on re-join so the server returns only what was missed
+        self.last_message_id = None
         self.is_host = room_data.get('owner_username') == user_username
 
         file_path = os.path.join(os.getcwd(), 'ui', 'room_window.ui')
@@ -56,12 +77,15 @@ class RoomWindow(QtWidgets.QMainWindow):
         self.heartbeat_timer.start(30000)
 
         self.setAttribute(Qt.WA_DeleteOnClose)
+        self.start_entry()
 
     def setup_ui(self):
-        self.chat_display.setReadOnly(True)
-        self.chat_display.setLineWrapMode(QtWidgets.QTextEdit.WidgetWidth)
+        self.chat_feed = ChatFeed(self.chat_display, load_history=self.load_chat_history)
         self.chat_display.setVerticalScrollBarPolicy(QtCore.Qt.ScrollBarAlwaysOn)
-        self.list_players = self.findChild(QtWidgets.QListWidget, 'list_players')
+        self.list_players = self.findChild(QtWidgets.QListView, 'list_players')
+        self.list_players.setModel(self.players_model)
+        self.list_players.setUniformItemSizes(True)
+        self.list_players.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
         self.list_players.setVerticalScrollBarPolicy(QtCore.Qt.ScrollBarAlwaysOn)
         self.setWindowTitle(f"Room: {self.room_data.get('name', 'Unknown')}")
         if hasattr(self, 'btn_start'):
@@ -80,42 +104,108 @@ class RoomWindow(QtWidgets.QMainWindow):
             self.btn_start.clicked.connect(self.start_game)
 
         self.message_received.connect(self.on_receive_message)
-        self.player_joined.connect(self.on_user_joined)
-        self.player_left.connect(self.on_user_left)
+        self.player_joined.connect(self.on_player_joined)
+        self.player_left.connect(self.on_player_left)
         self.host_changed.connect(self.on_host_changed)
         self.room_closed_signal.connect(self.on_room_closed)
         self.update_chat_signal.connect(self._update_chat_safe)
         self.show_warning_signal.connect(self.show_warning_box)
         self.join_response_received.connect(self.handle_join_response)
         self.vpn_status_signal.connect(self.update_vpn_label)
-        self.update_players_signal.connect(self.render_players_list)
-
-        socket_manager.on('connect', self.on_socket_connect, namespace="/game")
-        socket_manager.on('disconnect', self.on_socket_disconnect, namespace="/game")
-        socket_manager.on('error', self.on_socket_error)
-        socket_manager.on('join_success', lambda data: self.join_response_received.emit(data), namespace="/game")
-        socket_manager.on('new_message', self.log_and_emit(self.message_received), namespace="/game")
-        socket_manager.on('user_joined', self.log_and_emit(self.player_joined), namespace="/game")
-        socket_manager.on('user_left', self.log_and_emit(self.player_left), namespace="/game")
-        socket_manager.on('update_players', lambda data: self.log_event('update_players', data) or self.update_players_signal.emit(data.get('players', [])), namespace="/game")
-        socket_manager.on('host_changed', self.log_and_emit(self.host_changed), namespace="/game")
-        socket_manager.on('room_closed', self.log_and_emit(self.room_closed_signal), namespace="/game")
-        socket_manager.on('game_started', self.on_game_started, namespace="/game")
-
-        # Use Qt's thread-safe signal mechanism instead of QTimer.singleShot for initial join
-        QtCore.QMetaObject.invokeMethod(
-            self,
-            "_delayed_join_request",
-            QtCore.Qt.QueuedConnection
+        self.players_snapshot.connect(self.on_players_snapshot)
+
+        # Removed again in closeEvent, so a closed window gets no more events
+        self.socket_session = socket_manager.session()
+        self.socket_session.on('connect', self.on_socket_connect, namespace="/game")
+        self.socket_session.on('disconnect', self.on_socket_disconnect, namespace="/game")
+        self.socket_session.on('error', self.on_socket_error)
+        self.socket_session.on('join_success', lambda data: self.join_response_received.emit(data), namespace="/game")
+        self.socket_session.on('new_message', self.log_and_emit(self.message_received), namespace="/game")
+        self.socket_session.on('player_joined', self.log_and_emit(self.player_joined), namespace="/game")
+        self.socket_session.on('player_left', self.log_and_emit(self.player_left), namespace="/game")
+        self.socket_session.on('players_snapshot', self.log_and_emit(self.players_snapshot), namespace="/game")
+        self.socket_session.on('host_changed', self.log_and_emit(self.host_changed), namespace="/game")
+        self.socket_session.on('room_closed', self.log_and_emit(self.room_closed_signal), namespace="/game")
+        self.socket_session.on('game_started', self.on_game_started, namespace="/game")
+
+    def start_entry(self):
+        """
+        Entry stages run as soon as what they need is there: the HTTP join and
+        the socket's server_ready in parallel, then the socket join and the VPN
+        side by side, then the chat history.
+        """
+        self.entry = EntryPipeline(f"Room {self.room_id} entry", self)
+        self.entry.add("http_join", self.http_join, timeout_ms=ENTRY_STAGE_TIMEOUT_MS)
+        self.entry.add("server_ready", lambda entry: socket_manager.when_ready(lambda: entry.complete("server_ready")),
+                       timeout_ms=ENTRY_STAGE_TIMEOUT_MS)
+        self.entry.add("socket_join", self.send_join, after=("http_join", "server_ready"),
+                       timeout_ms=ENTRY_STAGE_TIMEOUT_MS)
+        self.entry.add("vpn", self.start_vpn, after=("http_join",))
+        # Messages sent before we joined; live ones arrive from socket_join on
+        self.entry.add("chat_history", self.load_initial_history, after=("socket_join",),
+                       timeout_ms=ENTRY_STAGE_TIMEOUT_MS)
+        self.entry.stage_settled.connect(self.on_entry_stage_settled)
+        self.entry.start()
+
+    def http_join(self, entry):
+        if self.room_data.get('_already_joined'):
+            entry.complete("http_join")
+            return
+        api_client.set_token(self.access_token)
+        api_client.post_async(
+            "/rooms/join_room",
+            self.on_http_joined,
+            lambda error: entry.fail("http_join", error),
+            json={"room_id": self.room_data.get("id", self.room_id), "password": self._join_password},
         )
 
+    def on_http_joined(self, data):
+        if "detail" in data:
+            self.entry.fail("http_join", data["detail"])
+            return
+        logger.info(f"[📥 RECEIVED] join_room: {data.get('message', '')}")
+        self.room_data['vpn_info'] = vpn_info_from_join(data)
+        self.room_data['_already_joined'] = True
+        self.entry.complete("http_join")
+
+    def send_join(self, entry):
+        if not self.emit_join_request():
+            entry.fail("socket_join", "not connected to the server")
+
+    def start_vpn(self, entry):
+        # connect_to_vpn blocks on WireGuard and only reaches the UI through signals
+        self._vpn_thread = threading.Thread(target=self._vpn_worker, name="room-vpn", daemon=True)
+        self._vpn_thread.start()
+
+    def _vpn_worker(self):
+        try:
+            if self.connect_to_vpn() is False:
+                self.entry.fail("vpn", "connection failed")
+            else:
+                self.entry.complete("vpn")
+        except Exception as e:
+            logger.error(f"Error connecting VPN: {e}")
+            self.entry.fail("vpn", e)
+
+    def on_entry_stage_settled(self, name, ok, error):
+        if ok or name in ("vpn", "chat_history"):
+            # Without VPN or history the room still works; connect_to_vpn reports its own failures
+            return
+        if self.entry.status(name) == "skipped":
+            return
+        QMessageBox.critical(self, "Error", f"Failed to join room: {error}")
+        self.close()
+
     def emit_join_request(self):
         if socket_manager.connected:
             logger.info("[📤] Sending join event")
             socket_manager.emit("join", {
                 "room_id": self.room_id,
-                "username": self.user_username
+                "username": self.user_username,
+                "last_message_id": self.last_message_id
             }, namespace="/game")
+            return True
+        return False
 
     def log_event(self, name, data):
         logger.info(f"[📥 RECEIVED] {name}: {data}")
@@ -132,11 +222,13 @@ class RoomWindow(QtWidgets.QMainWindow):
 
     def on_socket_connect(self):
         logger.info("[🟢 SOCKET CONNECTED]")
-        self.emit_join_request()
+        # The first join belongs to the entry pipeline; this re-joins after a reconnect
+        if self.entry.is_done("socket_join"):
+            socket_manager.when_ready(self.emit_join_request)
 
-    def on_socket_disconnect(self):
+    def on_socket_disconnect(self, *args):
         logger.info("[🔌 SOCKET DISCONNECTED]")
-        self.add_chat_message("🔴 Disconnected from server<br>")
+        self.add_chat_message("🔴 Disconnected from server, reconnecting...<br>")
 
     def on_socket_error(self, error):
         logger.error(f"[❌ SOCKET ERROR]: {error}")
@@ -153,32 +245,37 @@ class RoomWindow(QtWidgets.QMainWindow):
     def handle_join_response(self, response):
         logger.info(f"[📥 RECEIVED] join_success: {response}")
         if not response or not response.get('success', False):
-            QMessageBox.critical(self, "Error", f"Failed to join room: {response.get('error', 'Unknown error')}")
+            error = (response or {}).get('error', 'Unknown error')
+            if not self.entry.is_done("socket_join"):
+                # on_entry_stage_settled reports the failure and closes the window
+                self.entry.fail("socket_join", error)
+                return
+            # A re-join after a reconnect is past the pipeline, so nothing else reports it
+            QMessageBox.critical(self, "Error", f"Failed to rejoin room: {error}")
             self.close()
             return
 
-        self.players = response.get('players', [])
-        
+        # Full list after every (re)join; deltas with later versions follow
+        self.players_model.reset(response.get('players', []), response.get('version'))
+        self.update_host_state()
+
+        if self.entry.is_done("socket_join"):
+            # Re-join after a reconnect: add what was said meanwhile
+            if response.get('messages_truncated'):
+                self.add_chat_message("⚠️ <span style='color: orange;'>Some messages sent while you were offline are not shown</span><br>")
+            for message in response.get('messages', []):
+                self.on_receive_message(message)
+            self.add_chat_message("🟢 Reconnected<br>")
+            return
+
         # Socket.io join only succeeds after HTTP join, so we should already have VPN data
         # No need to update VPN data from socket.io response since it doesn't contain VPN data
         host_tag = "👑 " if response.get('is_host', False) else ""
         self.add_chat_message(f"🟢 Connected as {host_tag}{self.user_username}<br>")
-        self.update_players_signal.emit(self.players)
-        
-        # Try to connect to VPN using existing VPN data
-        if self.room_data.get('vpn_info') or any(self.room_data.get(key) for key in ['network_name', 'private_key', 'server_public_key', 'server_ip']):
-            # Use Qt's thread-safe signal mechanism instead of QTimer.singleShot
-            QtCore.QMetaObject.invokeMethod(
-                self, 
-                "connect_to_vpn", 
-                QtCore.Qt.QueuedConnection
-            )
-        else:
-            self.vpn_status_signal.emit("VPN Status: No VPN network available")
-            logger.info("No VPN data available - continuing without VPN")
+        self.entry.complete("socket_join")
 
-    @pyqtSlot()
     def connect_to_vpn(self):
+        """Runs on the entry pipeline's VPN thread; returns False when a configured VPN failed to connect"""
         self.vpn_status_signal.emit("VPN Status: Checking existing connections...")
         
         # Update room_data with VPN info before connecting
@@ -204,7 +301,7 @@ class RoomWindow(QtWidgets.QMainWindow):
                 missing_fields = [field for field in required_fields if not vpn_info.get(field)]
                 self.vpn_status_signal.emit("VPN Status: No VPN network available")
                 logger.info(f"No VPN network configured for this room - missing fields: {missing_fields}")
-                return
+                return None
             
             # Create or recreate VPN manager with updated room data
             if self.vpn_manager:
@@ -214,6 +311,7 @@ class RoomWindow(QtWidgets.QMainWindow):
                 self.vpn_manager.disconnect(cleanup=True)  # Full cleanup
             
             # Create new VPN manager
+            from vpn_manager import VPNManager
             self.vpn_manager = VPNManager(self.room_data)
             
             # Log VPN configuration for debugging
@@ -238,6 +336,7 @@ class RoomWindow(QtWidgets.QMainWindow):
             tunnel_info = self.vpn_manager.get_tunnel_info()
             network_name = tunnel_info.get('network_name', 'Unknown')
             self.add_chat_message(f"🌐 Network: <span style='color: blue;'>{network_name}</span><br>")
+            return True
         else:
             # Check if it's missing VPN info or a real connection failure
             vpn_info = self.room_data.get('vpn_info', {})
@@ -268,6 +367,7 @@ To resolve:
 - Check that WireGuard is properly installed
 - Try running 'python wireguard_config.py' to configure WireGuard path"""
                 self.show_warning_signal.emit("VPN Connection Failed", error_msg)
+                return False
 
     def update_vpn_label(self, status_text):
         if hasattr(self, 'lbl_vpn_info'):
@@ -275,6 +375,9 @@ To resolve:
 
     def disconnect_vpn(self):
         try:
+            if self._vpn_thread and self._vpn_thread.is_alive():
+                # Let a connect in progress finish so its tunnel is the one cleaned up
+                self._vpn_thread.join(timeout=10)
             if self.vpn_manager:
                 logger.info("Disconnecting VPN...")
                 self.vpn_status_signal.emit("VPN Status: Disconnecting...")
@@ -297,81 +400,92 @@ To resolve:
             }, namespace="/game")
             self.chat_input.clear()
 
-    def on_receive_message(self, data):
-        logger.info(f"[📥 RECEIVED] new_message: {data}")
+    def format_chat_message(self, data):
         username = data.get('username', 'Unknown')
         message = data.get('message', '')
         timestamp = data.get('created_at', '')
         if timestamp:
             try:
                 dt = datetime.fromisoformat(timestamp)
-                formatted_time = dt.strftime("%H:%M:%S")
-                formatted_message = f"[{formatted_time}] {username}: {message}"
-            except:
-                formatted_message = f"{username}: {message}"
-        else:
-            formatted_message = f"{username}: {message}"
-        self.add_chat_message(formatted_message + "<br>")
+                return f"[{dt.strftime('%H:%M:%S')}] {username}: {message}"
+            except ValueError:
+                pass
+        return f"{username}: {message}"
+
+    def on_receive_message(self, data):
+        logger.debug(f"[📥 RECEIVED] new_message: {data}")
+        # Plain text: message bodies are never interpreted as HTML
+        self.chat_feed.add_line(self.format_chat_message(data), message_id=data.get('id'))
+        self.note_message_id(data.get('id'))
+
+    def note_message_id(self, message_id):
+        if message_id is not None and (self.last_message_id is None or message_id > self.last_message_id):
+            self.last_message_id = message_id
+
+    def load_initial_history(self, entry):
+        # No request sent (no more history, or a page already loading): nothing to wait for
+        if not self.chat_feed.load_older():
+            entry.complete("chat_history")
+
+    def load_chat_history(self, before_id, feed):
+        """Fetch one page of older messages for the chat view"""
+        params = {'limit': feed.HISTORY_PAGE}
+        if before_id is not None:
+            params['before_id'] = before_id
+        api_client.set_token(self.access_token)
+        api_client.get_async(
+            f"/rooms/{self.room_id}/messages",
+            lambda data: self.on_chat_history(feed, data),
+            lambda error: self.on_chat_history_failed(feed, error),
+            params=params,
+        )
 
-    def on_user_joined(self, data):
-        logger.info(f"[📥 RECEIVED] user_joined: {data}")
+    def on_chat_history(self, feed, data):
+        feed.history_loaded(
+            [(m.get('id'), self.format_chat_message(m)) for m in data.get('messages', [])],
+            data.get('has_more', False))
+        for message in data.get('messages', []):
+            self.note_message_id(message.get('id'))
+        self.entry.complete("chat_history")
+
+    def on_chat_history_failed(self, feed, error):
+        feed.history_failed()
+        self.entry.fail("chat_history", error)
+
+    def on_player_joined(self, data):
+        logger.info(f"[📥 RECEIVED] player_joined: {data}")
         username = data.get('username', 'Unknown')
         self.add_chat_message(f"👋 {username} joined the room<br>")
-        self.request_players_update()
+        self.apply_player_delta('player_joined', data)
 
-    def on_user_left(self, data):
-        logger.info(f"[📥 RECEIVED] user_left: {data}")
+    def on_player_left(self, data):
+        logger.info(f"[📥 RECEIVED] player_left: {data}")
         username = data.get('username', 'Unknown')
         self.add_chat_message(f"👋 {username} left the room<br>")
-        self.request_players_update()
-
-    def request_players_update(self):
-        # Use Qt's thread-safe signal mechanism instead of QTimer.singleShot
-        QtCore.QMetaObject.invokeMethod(
-            self,
-            "_send_heartbeat_delayed",
-            QtCore.Qt.QueuedConnection
-        )
-    
-    @pyqtSlot()
-    def _send_heartbeat_delayed(self):
-        """Helper method to send heartbeat from main thread"""
+        self.apply_player_delta('player_left', data)
+
+    def apply_player_delta(self, event, data):
+        if not self.players_model.apply_delta(event, data):
+            logger.info(f"Missed a player update (have v{self.players_model.version}, got v{data.get('version')}), requesting snapshot")
+            self.request_players_snapshot()
+        self.update_host_state()
+
+    def request_players_snapshot(self):
         if socket_manager.connected:
-            socket_manager.emit("heartbeat", {
-                "room_id": self.room_id,
-                "username": self.user_username
+            socket_manager.emit('sync_players', {
+                'room_id': self.room_id,
+                'version': self.players_model.version
             }, namespace="/game")
 
-    def render_players_list(self, players):
-        """Render players list in a thread-safe manner"""
-        # Ensure this runs in the main thread
-        if not QtCore.QThread.currentThread() == QtWidgets.QApplication.instance().thread():
-            QtCore.QMetaObject.invokeMethod(
-                self,
-                "_render_players_list_safe",
-                QtCore.Qt.QueuedConnection,
-                QtCore.Q_ARG(list, players)
-            )
-            return
-        
-        self._render_players_list_safe(players)
-    
-    @pyqtSlot(list)
-    def _render_players_list_safe(self, players):
-        """Thread-safe version of render_players_list"""
-        self.players = players  # تأكد من تحديثهم
-        self.list_players.clear()
-        for player in players:
-            username = player.get('username', 'Unknown')
-            is_host = player.get('is_host', False)
-            if username == self.user_username:
-                self.is_host = is_host
-                if hasattr(self, 'btn_start'):
-                    self.btn_start.setEnabled(self.is_host)
-
-            display_name = f"👑 {username}" if is_host else username
-            item = QtWidgets.QListWidgetItem(display_name)
-            self.list_players.addItem(item)
+    def on_players_snapshot(self, data):
+        logger.info(f"[📥 RECEIVED] players_snapshot: v{data.get('version')}")
+        self.players_model.reset(data.get('players', []), data.get('version'))
+        self.update_host_state()
+
+    def update_host_state(self):
+        self.is_host = self.players_model.is_host(self.user_username)
+        if hasattr(self, 'btn_start'):
+            self.btn_start.setEnabled(self.is_host)
 
     def start_game(self):
         if self.is_host:
@@ -384,7 +498,8 @@ To resolve:
     def leave_room(self):
         try:
             self.disconnect_vpn()
-            if socket_manager.connected:
+            # Nothing to leave on the server if the HTTP join never went through
+            if socket_manager.connected and self.room_data.get('_already_joined'):
                 socket_manager.emit('leave', {
                     'room_id': self.room_id,
                     'username': self.user_username
@@ -396,6 +511,7 @@ To resolve:
             self.close()
 
     def closeEvent(self, event):
+        self.socket_session.close()
         self.leave_room()
         self.heartbeat_timer.stop()
       
@@ -405,26 +521,17 @@ To resolve:
     def on_host_changed(self, data):
         logger.info(f"[📥 RECEIVED] host_changed: {data}")
         new_host = data.get('new_host', 'Unknown')
-        self.is_host = new_host == self.user_username
-        if hasattr(self, 'btn_start'):
-            self.btn_start.setEnabled(self.is_host)
         self.add_chat_message(f"👑 Host changed to: {new_host}<br>")
-        self.request_players_update()
+        self.apply_player_delta('host_changed', data)
 
 
     @pyqtSlot(str)
     def _update_chat_safe(self, html_message):
-        if hasattr(self, 'chat_display'):
-            self.chat_display.append(html_message)
-            self.chat_display.moveCursor(QTextCursor.End)
+        if hasattr(self, 'chat_feed'):
+            self.chat_feed.add_html(html_message)
 
     def add_chat_message(self, html_message):
         self.update_chat_signal.emit(html_message)
 
     def show_warning_box(self, title, message):
         QMessageBox.warning(self, title, message)
-
-    @pyqtSlot()
-    def _delayed_join_request(self):
-        """Helper method to send initial join request from main thread after 2 second delay"""
-        QTimer.singleShot(2000, self.emit_join_request)
@@ -1,6 +1,5 @@
 import os
 import json
-import pyaudio
 import wave
 import threading
 import time
@@ -14,6 +13,9 @@ import logging
 logger = logging.getLogger(__name__)
 
 class SettingsWindow(QDialog):
+    # أجهزة الصوت المكتشفة؛ تهيئة PortAudio وتعداد الأجهزة بطيئان فيُجريان مرة واحدة
+    _audio_devices = None
+
     def __init__(self, parent=None):
         super(SettingsWindow, self).__init__(parent)
         
@@ -41,13 +43,12 @@ class SettingsWindow(QDialog):
         self.settings = self.load_settings()
         self.translator = Translator.get_instance()
         
-        # تهيئة PyAudio لقوائم الأجهزة
+        # PyAudio يُهيأ عند اختبار الصوت فقط؛ القوائم تُعبأ من الأجهزة المخزنة
+        self.audio = None
         try:
-            self.audio = pyaudio.PyAudio()
             self.populate_audio_devices()
         except Exception as e:
             print(f"خطأ في تهيئة PyAudio: {e}")
-            self.audio = None
             # تعطيل مجموعة الصوت في حالة عدم توفر PyAudio
             if hasattr(self, 'groupBox_audio'):
                 self.groupBox_audio.setEnabled(False)
@@ -64,9 +65,8 @@ class SettingsWindow(QDialog):
         
     def populate_audio_devices(self):
         """تعبئة قوائم أجهزة الصوت المنسدلة"""
-        if not self.audio:
-            return
-        
+        devices = SettingsWindow.list_audio_devices()
+
         # مسح القوائم
         self.combo_microphone.clear()
         self.combo_speaker.clear()
@@ -76,19 +76,14 @@ class SettingsWindow(QDialog):
         self.combo_speaker.addItem("الجهاز الافتراضي", -1)
         
         # البحث عن أجهزة الإدخال والإخراج
-        for i in range(self.audio.get_device_count()):
-            try:
-                dev_info = self.audio.get_device_info_by_index(i)
-                
-                # إضافة أجهزة الإدخال (المايكروفونات)
-                if dev_info['maxInputChannels'] > 0:
-                    self.combo_microphone.addItem(f"{dev_info['name']}", i)
-                
-                # إضافة أجهزة الإخراج (السماعات)
-                if dev_info['maxOutputChannels'] > 0:
-                    self.combo_speaker.addItem(f"{dev_info['name']}", i)
-            except Exception as e:
-                print(f"خطأ في الحصول على معلومات الجهاز {i}: {e}")
+        for dev_info in devices:
+            # إضافة أجهزة الإدخال (المايكروفونات)
+            if dev_info['maxInputChannels'] > 0:
+                self.combo_microphone.addItem(f"{dev_info['name']}", dev_info['index'])
+
+            # إضافة أجهزة الإخراج (السماعات)
+            if dev_info['maxOutputChannels'] > 0:
+                self.combo_speaker.addItem(f"{dev_info['name']}", dev_info['index'])
         
     def translate_ui(self):
         """ترجمة عناصر واجهة المستخدم"""
@@ -259,7 +254,12 @@ class SettingsWindow(QDialog):
     
     def test_audio(self):
         """اختبار إعدادات الصوت الحالية"""
-        if not self.audio:
+        try:
+            import pyaudio
+            if self.audio is None:
+                self.audio = pyaudio.PyAudio()
+        except Exception as e:
+            print(f"خطأ في تهيئة PyAudio: {e}")
             QMessageBox.warning(self, "خطأ", "PyAudio غير متوفر، لا يمكن إجراء اختبار الصوت")
             return
         
@@ -408,6 +408,36 @@ class SettingsWindow(QDialog):
             except Exception as e:
                 print(f"خطأ في تطبيق الإعدادات: {e}")
     
+    @staticmethod
+    def list_audio_devices(refresh=False):
+        """
+        أجهزة الصوت المتاحة كقائمة قواميس (index, name, maxInputChannels,
+        maxOutputChannels, defaultSampleRate). تُحسب مرة واحدة ثم تُعاد من الذاكرة؛
+        refresh=True يعيد التعداد (مثلاً بعد توصيل جهاز جديد).
+        """
+        if SettingsWindow._audio_devices is None or refresh:
+            import pyaudio
+            audio = pyaudio.PyAudio()
+            devices = []
+            try:
+                for i in range(audio.get_device_count()):
+                    try:
+                        info = audio.get_device_info_by_index(i)
+                    except Exception as e:
+                        print(f"خطأ في الحصول على معلومات الجهاز {i}: {e}")
+                        continue
+                    devices.append({
+                        'index': i,
+                        'name': info['name'],
+                        'maxInputChannels': info['maxInputChannels'],
+                        'maxOutputChannels': info['maxOutputChannels'],
+                        'defaultSampleRate': info['defaultSampleRate'],
+                    })
+            finally:
+                audio.terminate()
+            SettingsWindow._audio_devices = devices
+        return SettingsWindow._audio_devices
+
     @staticmethod
     def get_audio_devices():
         """
@@ -1,28 +1,148 @@
+import logging
+import random
+import threading
+
 import socketio
 
+logger = logging.getLogger(__name__)
+
+
+class SocketSession:
+    """
+    Handlers registered for one owner (e.g. a room window). close() removes
+    all of them, so a closed window never receives another event.
+    """
+
+    def __init__(self, manager):
+        self._manager = manager
+        self._handlers = []
+
+    def on(self, event, handler, namespace="/game"):
+        self._manager._add_handler(event, namespace, handler)
+        self._handlers.append((event, namespace, handler))
+
+    def close(self):
+        for event, namespace, handler in self._handlers:
+            self._manager._remove_handler(event, namespace, handler)
+        self._handlers = []
+
+
 class SocketManager:
+    """
+    One persistent Socket.IO connection for the whole app. Dropped
+    connections are re-established with exponential backoff (by
+    python-socketio once connected, by _connect_loop before that), and
+    every reconnect is followed by the server's server_ready, which
+    sessions use to rejoin and resync.
+    """
+    # websocket only: no long-polling handshake and upgrade
+    TRANSPORTS = ["websocket"]
+    RECONNECT_DELAY = 0.5
+    RECONNECT_DELAY_MAX = 10
+
     def __init__(self):
-        self.socket = socketio.Client()
-        self.connected = False
+        self.socket = socketio.Client(
+            reconnection=True,
+            reconnection_attempts=0,  # forever
+            reconnection_delay=self.RECONNECT_DELAY,
+            reconnection_delay_max=self.RECONNECT_DELAY_MAX,
+            randomization_factor=0.5,
+        )
+        self.server_url = None
+        # server_ready: the server has set up this connection and accepts join
+        self.ready = False
+        self._lock = threading.Lock()
+        self._ready_callbacks = []
+        self._handlers = {}
+        self._stop = threading.Event()
+        self._connect_thread = None
+        self._add_handler("server_ready", "/game", self._on_server_ready)
+        self._add_handler("disconnect", "/game", self._on_disconnect)
+
+    @property
+    def connected(self):
+        return self.socket.connected
 
     def connect(self, server_url):
-        if not self.connected:
-            self.socket.connect(server_url, namespaces=["/game"])
-            self.connected = True
+        """Connect in the background, retrying until it succeeds or disconnect() is called"""
+        with self._lock:
+            self.server_url = server_url
+            if self.connected or (self._connect_thread and self._connect_thread.is_alive()):
+                return
+            self._stop.clear()
+            self._connect_thread = threading.Thread(target=self._connect_loop, name="socket-connect", daemon=True)
+            self._connect_thread.start()
+
+    def _connect_loop(self):
+        delay = self.RECONNECT_DELAY
+        while not self._stop.is_set():
+            try:
+                self.socket.connect(self.server_url, namespaces=["/game"], transports=self.TRANSPORTS)
+                return
+            except socketio.exceptions.ConnectionError as e:
+                logger.warning(f"[SocketIO] Connect to {self.server_url} failed, retrying in {delay:.1f} s: {e}")
+            self._stop.wait(delay * (1 + random.random() * 0.5))
+            delay = min(delay * 2, self.RECONNECT_DELAY_MAX)
 
     def disconnect(self):
+        self._stop.set()
         try:
             if self.connected:
                 self.socket.disconnect()
-                self.connected = False
         except Exception as e:
             print(f"Error in socket disconnect: {e}")
-            self.connected = False
+
+    def session(self):
+        return SocketSession(self)
 
     def on(self, event, handler, namespace="/game"):
-        self.socket.on(event, handler, namespace=namespace)
+        """Handler for the lifetime of the app; use session() for anything tied to a window"""
+        self._add_handler(event, namespace, handler)
 
     def emit(self, event, data, namespace="/game"):
         self.socket.emit(event, data, namespace=namespace)
 
-socket_manager = SocketManager()  
\ No newline at end of file
+    def when_ready(self, callback):
+        """callback() once server_ready has been received; immediately if it already was. Runs on the caller's or the socket thread."""
+        with self._lock:
+            if not self.ready:
+                self._ready_callbacks.append(callback)
+                return
+        callback()
+
+    def _add_handler(self, event, namespace, handler):
+        with self._lock:
+            handlers = self._handlers.get((event, namespace))
+            if handlers is None:
+                handlers = self._handlers[(event, namespace)] = []
+                # python-socketio keeps one handler per event; ours fans out
+                self.socket.on(event, lambda *args: self._dispatch(event, namespace, args), namespace=namespace)
+            handlers.append(handler)
+
+    def _remove_handler(self, event, namespace, handler):
+        with self._lock:
+            handlers = self._handlers.get((event, namespace), [])
+            if handler in handlers:
+                handlers.remove(handler)
+
+    def _dispatch(self, event, namespace, args):
+        with self._lock:
+            handlers = list(self._handlers.get((event, namespace), ()))
+        for handler in handlers:
+            try:
+                handler(*args)
+            except Exception:
+                logger.exception(f"[SocketIO] {event} handler failed")
+
+    def _on_server_ready(self, data=None):
+        with self._lock:
+            self.ready = True
+            callbacks, self._ready_callbacks = self._ready_callbacks, []
+        for callback in callbacks:
+            callback()
+
+    def _on_disconnect(self, *args):
+        with self._lock:
+            self.ready = False
+
+socket_manager = SocketManager()
@@ -0,0 +1,47 @@
+# startup.py
+import sys
+import ctypes
+import logging
+import importlib
+import threading
+
+logger = logging.getLogger(__name__)
+
+# وحدات ما بعد تسجيل الدخول (النافذة الرئيسية، Socket.IO، نافذة الغرفة، VPN)
+# تُستورد في الخلفية بعد ظهور نافذة الدخول بدلاً من استيرادها قبلها
+WARM_UP_MODULES = ("main_app", "room_window", "vpn_manager", "dialogs.friends")
+
+
+def is_admin():
+    try:
+        return ctypes.windll.shell32.IsUserAnAdmin()
+    except Exception:
+        return False
+
+
+def ensure_admin():
+    """إعادة تشغيل البرنامج كمسؤول (مطلوب لإدارة WireGuard) قبل تحميل أي واجهة"""
+    if sys.platform != "win32":
+        return
+    if not is_admin():
+        ctypes.windll.shell32.ShellExecuteW(
+            None, "runas", sys.executable, " ".join(sys.argv), None, 1
+        )
+        sys.exit()
+
+
+def warm_up(modules=WARM_UP_MODULES):
+    """
+    استيراد الوحدات الثقيلة في خيط خلفي بينما يكتب المستخدم بيانات الدخول.
+    إذا احتاجها خيط الواجهة قبل انتهاء التحميل فإن قفل الاستيراد ينتظر الخيط.
+    """
+    def run():
+        for name in modules:
+            try:
+                importlib.import_module(name)
+            except Exception as e:
+                logger.warning(f"Warm-up import of {name} failed: {e}")
+
+    thread = threading.Thread(target=run, name="import-warm-up", daemon=True)
+    thread.start()
+    return thread
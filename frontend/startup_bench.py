@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Client startup: import profile and time to login window
+-------------------------------------------------------
+1. Runs `python -X importtime` on the login-window import set and prints the
+   slowest top-level packages (self time summed over their submodules).
+2. Starts a fresh interpreter that builds the application like main.py and
+   shows AuthApp, and reports the wall time from process spawn until the
+   window is shown (median of --runs). "eager" additionally imports the
+   post-login modules first, which is what the old import chain did
+   (auth -> main_app -> room_window / socketio / settings_window ...).
+
+Usage:
+    python startup_bench.py --runs 5 --target-ms 1500
+Exits with status 1 when the lazy time-to-login-window misses the target.
+"""
+
+import argparse
+import collections
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+LOGIN_IMPORTS = "import main"
+EAGER_IMPORTS = "import main, main_app, room_window, vpn_manager, dialogs.friends"
+
+SHOW_LOGIN = """
+{imports}
+app = main.initialize_application()
+from auth import AuthApp
+window = AuthApp()
+window.show()
+app.processEvents()
+print("shown", flush=True)
+"""
+
+
+def child_env():
+    env = dict(os.environ)
+    env.setdefault("QT_QPA_PLATFORM", "offscreen")
+    env.setdefault("API_BASE_URL", "http://127.0.0.1:8000")
+    return env
+
+
+def import_profile(imports, top):
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", imports],
+                            cwd=HERE, env=child_env(), capture_output=True, text=True)
+    by_package = collections.Counter()
+    total = 0
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        _, self_us, _cumulative, name = [part.strip() for part in line.replace("import time:", "|").split("|")]
+        by_package[name.split(".")[0]] += int(self_us)
+        total += int(self_us)
+    print(f"`{imports}`: {total / 1000:.0f} ms of imports")
+    for package, self_us in by_package.most_common(top):
+        print(f"    {package:<24} {self_us / 1000:7.1f} ms")
+    return total / 1000
+
+
+def time_to_login(imports, runs):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        child = subprocess.Popen([sys.executable, "-c", SHOW_LOGIN.format(imports=imports)],
+                                 cwd=HERE, env=child_env(), stdout=subprocess.PIPE,
+                                 stderr=subprocess.DEVNULL, text=True)
+        for line in child.stdout:
+            if line.startswith("shown"):
+                samples.append((time.perf_counter() - start) * 1000)
+                break
+        child.kill()
+        child.wait()
+    if not samples:
+        raise SystemExit(f"login window never shown for `{imports}`")
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Startup benchmark")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--target-ms", type=float, default=1500)
+    args = parser.parse_args()
+
+    import_profile(LOGIN_IMPORTS, args.top)
+    import_profile(EAGER_IMPORTS, args.top)
+
+    lazy = time_to_login(LOGIN_IMPORTS, args.runs)
+    eager = time_to_login(EAGER_IMPORTS, args.runs)
+    print(f"time to login window: eager {eager:.0f} ms, lazy {lazy:.0f} ms "
+          f"(target {args.target_ms:.0f} ms: {'met' if lazy <= args.target_ms else 'MISSED'})")
+    sys.exit(0 if lazy <= args.target_ms else 1)
+
+
+if __name__ == "__main__":
+    main()
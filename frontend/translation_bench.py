@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Translator cost: nested-dict walk per call vs flattened, cached catalogue
+------------------------------------------------------------------------
+Every `_("key", "default")` call site in the frontend is collected from
+the source and replayed as one "full UI re-translation". Measured for both
+implementations:
+
+  * startup: constructing the translator (cold = JSON parse, warm = the
+    compiled catalogue in translations/__pycache__ is reused)
+  * language switch: set_language() followed by a full re-translation
+  * steady re-translation in the current language
+
+Output printed by either translator (e.g. missing-key reports) is
+discarded, but its cost is included.
+
+Usage:
+    python translation_bench.py --rounds 200
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import re
+import shutil
+import statistics
+import time
+
+from translator import Translator
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+CALL_RE = re.compile(r"""_\(\s*["']([\w.]+)["']\s*(?:,\s*["']([^"']*)["'])?""")
+
+
+class LegacyTranslator:
+    """Previous Translator.translate: split the key and walk nested dicts on every call"""
+
+    def __init__(self, translation_dir):
+        self.current_language = "en"
+        self.translations = {}
+        for language in ("en", "ar"):
+            with open(os.path.join(translation_dir, f"{language}.json"), encoding="utf-8") as f:
+                self.translations[language] = json.load(f)
+
+    def set_language(self, language):
+        self.current_language = language
+
+    def translate(self, key, default="", **kwargs):
+        value = self.translations[self.current_language]
+        for part in key.split('.'):
+            if isinstance(value, dict) and part in value:
+                value = value[part]
+            else:
+                print(f"missing translation key: {key} in {self.current_language}, default: {default}")
+                return default
+        if not isinstance(value, str):
+            return default
+        try:
+            return value.format(**kwargs)
+        except Exception:
+            return value
+
+
+def ui_calls():
+    calls = set()
+    for root, _dirs, files in os.walk(HERE):
+        for name in files:
+            if name.endswith(".py") and not name.endswith("_bench.py"):
+                with open(os.path.join(root, name), encoding="utf-8") as f:
+                    calls.update(CALL_RE.findall(f.read()))
+    return sorted(calls)
+
+
+def retranslate(translator, calls):
+    for key, default in calls:
+        translator.translate(key, default)
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def report(label, legacy_ms, new_ms):
+    print(f"{label:<34} before {legacy_ms:8.3f} ms   after {new_ms:8.3f} ms   x{legacy_ms / new_ms:6.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Translator benchmark")
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+
+    translation_dir = os.path.join(HERE, "translations")
+    calls = ui_calls()
+    print(f"{len(calls)} translated labels per full re-translation, {args.rounds} rounds")
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        def cold():
+            shutil.rmtree(os.path.join(translation_dir, "__pycache__"), ignore_errors=True)
+            Translator(translation_dir).set_language("ar")
+
+        legacy_start = timed(lambda: LegacyTranslator(translation_dir), 20)
+        cold_start = timed(cold, 20)
+        warm_start = timed(lambda: Translator(translation_dir).set_language("ar"), 20)
+
+        legacy = LegacyTranslator(translation_dir)
+        new = Translator(translation_dir)
+
+        def switch(translator):
+            translator.set_language("ar" if translator.current_language == "en" else "en")
+            retranslate(translator, calls)
+
+        legacy_switch = timed(lambda: switch(legacy), args.rounds)
+        new_switch = timed(lambda: switch(new), args.rounds)
+        legacy_steady = timed(lambda: retranslate(legacy, calls), args.rounds)
+        new_steady = timed(lambda: retranslate(new, calls), args.rounds)
+
+    report("startup (both languages, cold)", legacy_start, cold_start)
+    report("startup (both languages, warm)", legacy_start, warm_start)
+    report("language switch + re-translation", legacy_switch, new_switch)
+    report("re-translation", legacy_steady, new_steady)
+
+
+if __name__ == "__main__":
+    main()
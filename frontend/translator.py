@@ -1,5 +1,23 @@
 import os
+import sys
 import json
+import pickle
+
+# صيغة ملف الكتالوج المترجم؛ تُغيَّر عند تغيير طريقة التسطيح
+CATALOG_FORMAT = 1
+
+
+def flatten_translations(tree, prefix=""):
+    """تحويل شجرة الترجمة المتداخلة إلى قاموس مسطح بمفاتيح منقطة (ui.main_window.title)"""
+    flat = {}
+    for name, value in tree.items():
+        key = f"{prefix}{name}"
+        if isinstance(value, dict):
+            flat.update(flatten_translations(value, key + "."))
+        elif isinstance(value, str):
+            flat[key] = value
+    return flat
+
 
 class Translator:
     """فئة للتعامل مع ترجمة النصوص في التطبيق"""
@@ -13,63 +31,97 @@ class Translator:
             cls._instance = cls()
         return cls._instance
     
-    def __init__(self):
+    def __init__(self, translation_dir=None):
         """تهيئة المترجم"""
         # افتراضياً، نستخدم الإنجليزية
         self.current_language = "en"
-        self.translations = {"en": {}, "ar": {}}
-        self.load_translations()
-    
-    def load_translations(self):
-        """تحميل ملفات الترجمات"""
+        # لغة -> قاموس مسطح، يُحمَّل عند أول استخدام للغة
+        self.translations = {}
+        # لغة -> {مفتاح: نص جاهز} للاستدعاءات بدون متغيرات
+        self._formatted = {}
+        # المفاتيح المفقودة التي تم الإبلاغ عنها مسبقاً
+        self._reported_missing = set()
+        self.translation_dir = translation_dir or self.find_translation_dir()
+        self._use_language(self.current_language)
+
+    def find_translation_dir(self):
+        """البحث عن مسار ملفات الترجمة"""
+        possible_paths = [
+            os.path.join(os.path.dirname(os.path.abspath(__file__)), 'translations'),
+            os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'frontend', 'translations'),
+            os.path.join(os.getcwd(), 'frontend', 'translations'),
+            os.path.join(os.getcwd(), 'translations')
+        ]
+        for path in possible_paths:
+            if os.path.isdir(path):
+                print(f"Found translations directory at: {path}")
+                return path
+
+        print("Translation directory not found in any of the possible paths:")
+        for path in possible_paths:
+            print(f"  - {path}")
+        return None
+
+    def load_translations(self, language=None):
+        """تحميل ملف ترجمة لغة واحدة (أو إعادة تحميل كل اللغات المحملة) كقاموس مسطح"""
+        for lang in [language] if language else list(self.translations) or [self.current_language]:
+            self.translations[lang] = self._load_catalog(lang)
+            self._formatted[lang] = {}
+
+    def _load_catalog(self, language):
+        if not self.translation_dir:
+            return {}
+        json_file = os.path.join(self.translation_dir, f'{language}.json')
+        try:
+            stat = os.stat(json_file)
+        except OSError:
+            print(f"Translation file not found at: {json_file}")
+            return {}
+
+        # الكتالوج المترجم صالح ما دام ملف JSON لم يتغير
+        stamp = (CATALOG_FORMAT, sys.version_info[:2], stat.st_mtime_ns, stat.st_size)
+        cache_file = os.path.join(self.translation_dir, '__pycache__', f'{language}.catalog')
         try:
-            # البحث عن مسار ملفات الترجمة
-            possible_paths = [
-                os.path.join(os.path.dirname(os.path.abspath(__file__)), 'translations'),
-                os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'frontend', 'translations'),
-                os.path.join(os.getcwd(), 'frontend', 'translations'),
-                os.path.join(os.getcwd(), 'translations')
-            ]
-            
-            translation_dir = None
-            for path in possible_paths:
-                if os.path.exists(path) and os.path.isdir(path):
-                    translation_dir = path
-                    print(f"Found translations directory at: {path}")
-                    break
-            
-            if translation_dir:
-                # تحميل الترجمات الإنجليزية
-                en_file = os.path.join(translation_dir, 'en.json')
-                if os.path.exists(en_file):
-                    print(f"Loading English translation file: {en_file}")
-                    with open(en_file, 'r', encoding='utf-8') as f:
-                        self.translations["en"] = json.load(f)
-                else:
-                    print(f"English translation file not found at: {en_file}")
-                
-                # تحميل الترجمات العربية
-                ar_file = os.path.join(translation_dir, 'ar.json')
-                if os.path.exists(ar_file):
-                    print(f"Loading Arabic translation file: {ar_file}")
-                    with open(ar_file, 'r', encoding='utf-8') as f:
-                        self.translations["ar"] = json.load(f)
-                else:
-                    print(f"Arabic translation file not found at: {ar_file}")
-            else:
-                print("Translation directory not found in any of the possible paths:")
-                for path in possible_paths:
-                    print(f"  - {path}")
+            with open(cache_file, 'rb') as f:
+                cached_stamp, catalog = pickle.load(f)
+            if cached_stamp == stamp:
+                return catalog
+        except Exception:
+            pass
+
+        try:
+            print(f"Loading translation file: {json_file}")
+            with open(json_file, 'r', encoding='utf-8') as f:
+                catalog = flatten_translations(json.load(f))
         except Exception as e:
-            print(f"Error loading translation files: {e}")
-            import traceback
-            traceback.print_exc()
+            print(f"Error loading translation file {json_file}: {e}")
+            return {}
+
+        try:
+            os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+            tmp_file = f"{cache_file}.{os.getpid()}.tmp"
+            with open(tmp_file, 'wb') as f:
+                pickle.dump((stamp, catalog), f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_file, cache_file)
+        except OSError:
+            # مجلد التطبيق قد يكون للقراءة فقط؛ نكتفي بالتحميل من JSON
+            pass
+        return catalog
+
+    def _use_language(self, language):
+        if language not in self.translations:
+            self.load_translations(language)
+        self.current_language = language
+        self._catalog = self.translations[language]
+        self._cache = self._formatted[language]
     
     def set_language(self, language, force=False):
         """تغيير اللغة المستخدمة في التطبيق"""
         if language in ["en", "ar"]:
             print(f"تغيير اللغة إلى {language}")
-            self.current_language = language
+            if force:
+                self.load_translations(language)
+            self._use_language(language)
             return True
         else:
             print(f"اللغة غير مدعومة: {language}")
@@ -81,34 +133,28 @@ class Translator:
     
     def translate(self, key, default="", **kwargs):
         """ترجمة نص بناءً على مفتاح الترجمة"""
-        try:
-            # تقسيم المفتاح إلى أجزاء (مثال: ui.main_window.title)
-            parts = key.split('.')
-            
-            # البحث في شجرة الترجمة للغة الحالية
-            value = self.translations[self.current_language]
-            for part in parts:
-                if isinstance(value, dict) and part in value:
-                    value = value[part]
-                else:
-                    print(f"مفتاح الترجمة غير موجود: {key} في اللغة {self.current_language} - استخدام القيمة الافتراضية: {default}")
-                    return default
-            
-            # إذا لم تكن القيمة نصًا، أرجع القيمة الافتراضية
-            if not isinstance(value, str):
-                return default
-            
-            # استبدال المتغيرات في النص
-            try:
-                result = value.format(**kwargs)
-                return result
-            except Exception:
-                return value
-        except Exception as e:
-            print(f"خطأ في الترجمة: {e}")
+        if not kwargs:
+            cached = self._cache.get(key)
+            if cached is not None:
+                return cached
+
+        value = self._catalog.get(key)
+        if value is None:
+            if (self.current_language, key) not in self._reported_missing:
+                self._reported_missing.add((self.current_language, key))
+                print(f"مفتاح الترجمة غير موجود: {key} في اللغة {self.current_language} - استخدام القيمة الافتراضية: {default}")
             return default
 
+        # استبدال المتغيرات في النص
+        try:
+            result = value.format(**kwargs)
+        except Exception:
+            result = value
+        if not kwargs:
+            self._cache[key] = result
+        return result
+
 # اختصار للوصول السريع للمترجم
 def _(key, default="", **kwargs):
     """دالة مختصرة للترجمة"""
-    return Translator.get_instance().translate(key, default, **kwargs) 
\ No newline at end of file
+    return (Translator._instance or Translator.get_instance()).translate(key, default, **kwargs)
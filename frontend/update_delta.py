@@ -0,0 +1,204 @@
+"""
+تحديثات تفاضلية (binary delta) لملف المثبّت.
+
+الباتش يصف الملف الجديد كسلسلة عمليات: نسخ مقطع من الملف القديم أو إدراج
+بيانات جديدة، مضغوطة بـ LZMA. التطبيق (apply_patch) يعمل على جهاز المستخدم
+بمكتبات بايثون القياسية فقط؛ الإنشاء (make_patch) أداة إصدار تحتاج numpy.
+
+    python update_delta.py make old_setup.exe new_setup.exe 1.0.0-1.1.0.patch
+    python update_delta.py apply old_setup.exe 1.0.0-1.1.0.patch new_setup.exe
+"""
+
+import hashlib
+import lzma
+import os
+import struct
+import sys
+
+MAGIC = b"GRDELTA1"
+# الرأس: MAGIC | sha256 القديم | حجم الجديد | sha256 الجديد
+_HEADER = struct.Struct(">8s32sQ32s")
+_COPY = struct.Struct(">QQ")
+_INSERT = struct.Struct(">Q")
+OP_COPY = b"C"
+OP_INSERT = b"I"
+
+DEFAULT_BLOCK_SIZE = 4096
+# عدد المواضع التي تُحسب بصماتها دفعة واحدة (يحد من استهلاك الذاكرة)
+_WINDOW = 8 * 1024 * 1024
+_READ_SIZE = 1024 * 1024
+
+
+class PatchError(Exception):
+    """الباتش تالف أو لا يخص هذا الملف"""
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(_READ_SIZE), b""):
+            digest.update(block)
+    return digest.digest()
+
+
+def _weak_hashes(np, data, block_size):
+    """بصمة Adler-like لكل نافذة بطول block_size تبدأ عند كل موضع (حساب متجهي)"""
+    values = np.frombuffer(data, dtype=np.uint8).astype(np.uint64)
+    positions = np.arange(len(values), dtype=np.uint64)
+    zero = np.zeros(1, dtype=np.uint64)
+    # الحساب بباقي 2^64 (التفاف uint64) متسق بين الملفين، وهذا كل ما يلزم
+    sums = np.concatenate((zero, np.cumsum(values, dtype=np.uint64)))
+    weighted = np.concatenate((zero, np.cumsum(values * positions, dtype=np.uint64)))
+    count = len(values) - block_size + 1
+    if count <= 0:
+        return np.zeros(0, dtype=np.uint64)
+    a = sums[block_size:block_size + count] - sums[:count]
+    ends = np.arange(block_size, block_size + count, dtype=np.uint64)
+    b = ends * a - (weighted[block_size:block_size + count] - weighted[:count])
+    return (a & np.uint64(0xFFFFFFFF)) | (b << np.uint64(32))
+
+
+def _strong_hash(block):
+    return hashlib.blake2b(block, digest_size=16).digest()
+
+
+def make_patch(old, new, block_size=DEFAULT_BLOCK_SIZE):
+    """
+    ينشئ باتش يحول old إلى new (bytes). الكتل المتطابقة تُكتشف في أي موضع
+    من الملف الجديد (وليس فقط عند حدود الكتل) بأسلوب rsync.
+    """
+    import numpy as np
+
+    old_blocks = {}
+    aligned = len(old) - len(old) % block_size
+    if aligned:
+        old_weak = _weak_hashes(np, old[:aligned], block_size)[::block_size]
+        for index, weak in enumerate(old_weak.tolist()):
+            offset = index * block_size
+            old_blocks.setdefault(weak, {}).setdefault(_strong_hash(old[offset:offset + block_size]), offset)
+    known = np.fromiter(old_blocks.keys(), dtype=np.uint64, count=len(old_blocks))
+
+    ops = []
+    literal_start = 0
+    position = 0
+    for window_start in range(0, max(len(new) - block_size + 1, 0), _WINDOW):
+        chunk = new[window_start:window_start + _WINDOW + block_size - 1]
+        weak = _weak_hashes(np, chunk, block_size)
+        candidates = np.nonzero(np.isin(weak, known))[0]
+        for candidate, weak_value in zip(candidates.tolist(), weak[candidates].tolist()):
+            start = window_start + candidate
+            if start < position:
+                continue
+            offset = old_blocks[weak_value].get(_strong_hash(new[start:start + block_size]))
+            if offset is None:
+                continue
+            # تمديد التطابق بايتاً بايتاً ما دام مستمراً (على دفعات بحجم الكتلة)
+            length = block_size
+            while (start + length < len(new) and offset + length < len(old)
+                   and new[start + length] == old[offset + length]):
+                step = min(block_size, len(new) - start - length, len(old) - offset - length)
+                if new[start + length:start + length + step] == old[offset + length:offset + length + step]:
+                    length += step
+                else:
+                    length += 1
+            if start > literal_start:
+                ops.append((OP_INSERT, new[literal_start:start]))
+            if ops and ops[-1][0] == OP_COPY and ops[-1][1] + ops[-1][2] == offset:
+                ops[-1] = (OP_COPY, ops[-1][1], ops[-1][2] + length)
+            else:
+                ops.append((OP_COPY, offset, length))
+            position = literal_start = start + length
+    if literal_start < len(new):
+        ops.append((OP_INSERT, new[literal_start:]))
+
+    body = bytearray()
+    for op in ops:
+        if op[0] == OP_COPY:
+            body += OP_COPY + _COPY.pack(op[1], op[2])
+        else:
+            body += OP_INSERT + _INSERT.pack(len(op[1])) + op[1]
+    header = _HEADER.pack(MAGIC, hashlib.sha256(old).digest(), len(new), hashlib.sha256(new).digest())
+    return header + lzma.compress(bytes(body), preset=6)
+
+
+def apply_patch(old_path, patch_path, out_path):
+    """
+    يبني الملف الجديد في out_path من old_path والباتش. يتحقق من أن الملف
+    القديم هو الأصل الذي أُنشئ منه الباتش، ومن sha256 الناتج.
+    """
+    with open(patch_path, 'rb') as f:
+        header = f.read(_HEADER.size)
+        if len(header) != _HEADER.size:
+            raise PatchError("patch is truncated")
+        magic, old_digest, new_size, new_digest = _HEADER.unpack(header)
+        if magic != MAGIC:
+            raise PatchError("not an update patch")
+        try:
+            body = lzma.decompress(f.read())
+        except lzma.LZMAError as e:
+            raise PatchError(f"patch body is corrupt: {e}")
+
+    if file_sha256(old_path) != old_digest:
+        raise PatchError("installed file does not match the patch base")
+
+    digest = hashlib.sha256()
+    view = memoryview(body)
+    index = 0
+    written = 0
+    with open(old_path, 'rb') as old, open(out_path, 'wb') as out:
+        while index < len(view):
+            op = bytes(view[index:index + 1])
+            index += 1
+            if op == OP_COPY:
+                offset, length = _COPY.unpack_from(view, index)
+                index += _COPY.size
+                old.seek(offset)
+                while length:
+                    data = old.read(min(length, _READ_SIZE))
+                    if not data:
+                        raise PatchError("copy beyond the end of the base file")
+                    out.write(data)
+                    digest.update(data)
+                    length -= len(data)
+                    written += len(data)
+            elif op == OP_INSERT:
+                (length,) = _INSERT.unpack_from(view, index)
+                index += _INSERT.size
+                data = view[index:index + length]
+                if len(data) != length:
+                    raise PatchError("patch is truncated")
+                index += length
+                out.write(data)
+                digest.update(data)
+                written += length
+            else:
+                raise PatchError(f"unknown patch operation {op!r}")
+
+    if written != new_size or digest.digest() != new_digest:
+        os.remove(out_path)
+        raise PatchError("patched file failed verification")
+    return out_path
+
+
+def main(argv):
+    if len(argv) == 5 and argv[1] == "make":
+        with open(argv[2], 'rb') as f:
+            old = f.read()
+        with open(argv[3], 'rb') as f:
+            new = f.read()
+        patch = make_patch(old, new)
+        with open(argv[4], 'wb') as f:
+            f.write(patch)
+        print(f"{argv[4]}: {len(patch)} bytes ({len(patch) * 100 / max(len(new), 1):.1f}% of {len(new)}), "
+              f"sha256 {hashlib.sha256(patch).hexdigest()}")
+    elif len(argv) == 5 and argv[1] == "apply":
+        apply_patch(argv[2], argv[3], argv[4])
+        print(f"{argv[4]}: sha256 {file_sha256(argv[4]).hex()}")
+    else:
+        print(__doc__)
+        return 2
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Update download: previous 1 KB requests loop vs UpdateDownloader
+----------------------------------------------------------------
+A local HTTP server (Range support, optional throttling) serves a random
+"installer". The script measures:
+
+  * a clean full download with both implementations (wall time, CPU);
+  * a download where the server drops the connection every --drop-every
+    bytes - the old loop fails, UpdateDownloader resumes with Range;
+  * a corrupted download, which must be rejected by the SHA-256 check;
+  * a delta update: a patch from a modified "previous installer" is built
+    with update_delta.make_patch and applied through UpdateDownloader.
+
+Usage:
+    QT_QPA_PLATFORM=offscreen python update_download_bench.py --size-mb 64
+"""
+
+import argparse
+import hashlib
+import logging
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import requests
+
+from update_delta import make_patch
+from updater import UpdateDownloader
+
+
+class Files:
+    content = {}
+    drop_every = 0
+    corrupt = set()
+
+
+class RangeHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        data = Files.content.get(self.path)
+        if data is None:
+            self.send_error(404)
+            return
+        start = 0
+        header = self.headers.get("Range")
+        if header:
+            start = int(header.split("=")[1].split("-")[0])
+            if start >= len(data):
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{len(data)}")
+                self.end_headers()
+                return
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{len(data) - 1}/{len(data)}")
+        else:
+            self.send_response(200)
+        self.send_header("Content-Length", str(len(data) - start))
+        self.end_headers()
+
+        end = len(data)
+        if Files.drop_every:
+            end = min(end, start + Files.drop_every)
+        body = data[start:end]
+        if self.path in Files.corrupt:
+            body = bytes([body[0] ^ 0xFF]) + body[1:]
+        try:
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        if end < len(data):
+            # Simulated network drop: close mid-body
+            self.close_connection = True
+
+
+def legacy_download(url, dest):
+    """Previous Updater.download_update loop, without the dialog"""
+    response = requests.get(url, stream=True)
+    total_size = int(response.headers.get("content-length", 0))
+    downloaded = 0
+    with open(dest, "wb") as f:
+        for data in response.iter_content(1024):
+            downloaded += len(data)
+            f.write(data)
+    if downloaded != total_size:
+        raise IOError(f"got {downloaded} of {total_size} bytes")
+    return "ok (unverified)"
+
+
+def run_downloader(info, current, update_dir):
+    downloader = UpdateDownloader(info, current, update_dir)
+    events = []
+    downloader.progress.connect(lambda done, total: events.append(done))
+    result = {}
+    downloader.completed.connect(lambda path: result.update(path=path))
+    downloader.failed.connect(lambda error: result.update(error=error))
+    # run() directly: same code path as the thread, signals delivered synchronously
+    downloader.MAX_RETRIES = 1000
+    downloader._wait = lambda seconds: None
+    downloader.run()
+    return result, len(events)
+
+
+def timed(label, fn):
+    wall, cpu = time.perf_counter(), time.process_time()
+    try:
+        outcome = fn()
+    except Exception as e:
+        outcome = f"FAILED ({e})"
+    wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+    print(f"{label:<46} {wall:6.2f} s wall  {cpu:6.2f} s CPU   {outcome}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Update download benchmark")
+    parser.add_argument("--size-mb", type=int, default=64)
+    parser.add_argument("--drop-every", type=int, default=5 * 1024 * 1024, help="bytes per connection before a drop")
+    args = parser.parse_args()
+
+    # The per-drop resume warnings would drown the table
+    logging.disable(logging.WARNING)
+    random.seed(1)
+    old = bytearray(os.urandom(args.size_mb * 1024 * 1024))
+    new = bytearray(old)
+    for _ in range(100):
+        at = random.randrange(len(new))
+        new[at:at + 64] = os.urandom(random.randrange(1, 256))
+    old, new = bytes(old), bytes(new)
+    digest = hashlib.sha256(new).hexdigest()
+
+    t = time.perf_counter()
+    patch = make_patch(old, new)
+    print(f"installer {len(new) / 2 ** 20:.0f} MB, patch {len(patch) / 2 ** 20:.2f} MB "
+          f"(built in {time.perf_counter() - t:.1f} s)")
+    Files.content = {"/setup": new, "/patch": patch}
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), RangeHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_port}"
+    info = {"version": "1.1.0", "download_url": f"{base_url}/setup", "sha256": digest, "size": len(new),
+            "patches": {"1.0.0": {"url": f"{base_url}/patch", "sha256": hashlib.sha256(patch).hexdigest(),
+                                  "size": len(patch)}}}
+    work = tempfile.mkdtemp()
+
+    def fresh_dir():
+        return tempfile.mkdtemp(dir=work)
+
+    def verified(result):
+        if "error" in result[0]:
+            return f"FAILED ({result[0]['error']})"
+        with open(result[0]["path"], "rb") as f:
+            ok = hashlib.sha256(f.read()).hexdigest() == digest
+        return f"sha256 ok={ok}, {result[1]} progress signals"
+
+    try:
+        timed("before: full download", lambda: legacy_download(f"{base_url}/setup", os.path.join(work, "legacy")))
+        timed("after: full download", lambda: verified(run_downloader(info, "0.9.0", fresh_dir())))
+
+        Files.drop_every = args.drop_every
+        timed(f"before: drop every {args.drop_every >> 20} MB",
+              lambda: legacy_download(f"{base_url}/setup", os.path.join(work, "legacy")))
+        timed(f"after: drop every {args.drop_every >> 20} MB (Range resume)",
+              lambda: verified(run_downloader(info, "0.9.0", fresh_dir())))
+        Files.drop_every = 0
+
+        Files.corrupt = {"/setup"}
+        timed("after: corrupted body", lambda: verified(run_downloader(info, "0.9.0", fresh_dir())))
+        Files.corrupt = set()
+
+        def delta():
+            update_dir = fresh_dir()
+            with open(os.path.join(update_dir, UpdateDownloader.installer_name("1.0.0")), "wb") as f:
+                f.write(old)
+            result = verified(run_downloader(info, "1.0.0", update_dir))
+            return f"{result}, files left: {os.listdir(update_dir)}"
+        timed("after: delta update 1.0.0 -> 1.1.0", delta)
+    finally:
+        server.shutdown()
+        shutil.rmtree(work)
+
+
+if __name__ == "__main__":
+    main()
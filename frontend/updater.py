@@ -1,11 +1,24 @@
 import os
 import json
+import hashlib
+import logging
+import time
 import requests
 import subprocess
 import sys
+from urllib3.exceptions import HTTPError as TransportError
 from PyQt5.QtWidgets import QMessageBox, QProgressDialog
 from PyQt5.QtCore import Qt, QThread, pyqtSignal
 
+from update_delta import apply_patch, file_sha256
+
+logger = logging.getLogger(__name__)
+
+# المثبّت الأخير يبقى هنا ليكون أساس التحديث التفاضلي التالي
+UPDATE_DIR = 'updates'
+# (اتصال، قراءة) بالثواني
+REQUEST_TIMEOUT = (10, 30)
+
 class UpdateChecker(QThread):
     update_available = pyqtSignal(dict)
     no_update = pyqtSignal()
@@ -26,7 +39,7 @@ class UpdateChecker(QThread):
     def run(self):
         try:
             # تحميل معلومات الإصدار من السيرفر
-            response = requests.get('http://31.220.80.192:5000/version')
+            response = requests.get('http://31.220.80.192:5000/version', timeout=REQUEST_TIMEOUT)
             if response.status_code == 200:
                 server_data = response.json()
                 server_version = server_data.get('version', '0.0.0')
@@ -54,6 +67,195 @@ class UpdateChecker(QThread):
                 return -1
         return 0
 
+class DownloadCancelled(Exception):
+    pass
+
+
+class UpdateDownloader(QThread):
+    """
+    يحمّل مثبّت الإصدار الجديد في الخلفية. التحميل يُستأنف من ملف .part
+    (Range) بعد انقطاع الاتصال أو إغلاق البرنامج، ويُتحقق من sha256 المعلن في
+    معلومات الإصدار. إن وُجد باتش من الإصدار الحالي (patches) ومثبّته محفوظ في
+    UPDATE_DIR يُحمّل الباتش فقط، ويُرجع إلى التحميل الكامل عند أي خلل.
+    """
+    progress = pyqtSignal(object, object)  # المحمّل، الإجمالي (0 إن كان غير معروف)
+    status = pyqtSignal(str)
+    completed = pyqtSignal(str)  # مسار المثبّت
+    failed = pyqtSignal(str)
+
+    MIN_CHUNK = 64 * 1024
+    MAX_CHUNK = 4 * 1024 * 1024
+    # حجم القطعة يُعدّل لتستغرق كل قراءة قرابة هذا الزمن
+    TARGET_READ_SECONDS = 0.25
+    PROGRESS_INTERVAL = 0.1
+    MAX_RETRIES = 5
+
+    def __init__(self, update_info, current_version, update_dir=UPDATE_DIR):
+        super().__init__()
+        self.update_info = update_info
+        self.current_version = current_version
+        self.update_dir = update_dir
+        self.cancelled = False
+
+    def cancel(self):
+        # الملف الجزئي يبقى ليُستأنف منه لاحقاً
+        self.cancelled = True
+
+    def run(self):
+        self.session = requests.Session()
+        try:
+            self.completed.emit(self.fetch())
+        except DownloadCancelled:
+            self.failed.emit("تم إلغاء التحميل")
+        except Exception as e:
+            self.failed.emit(str(e))
+        finally:
+            self.session.close()
+
+    @staticmethod
+    def installer_name(version):
+        suffix = ".exe" if sys.platform == "win32" else ""
+        return f"GameRoom-{version}-setup{suffix}"
+
+    def fetch(self):
+        os.makedirs(self.update_dir, exist_ok=True)
+        expected = (self.update_info.get('sha256') or '').lower() or None
+        installer = os.path.join(self.update_dir, self.installer_name(self.update_info.get('version', '0.0.0')))
+
+        if expected and os.path.exists(installer) and file_sha256(installer).hex() == expected:
+            return installer
+
+        patch = (self.update_info.get('patches') or {}).get(self.current_version)
+        base = os.path.join(self.update_dir, self.installer_name(self.current_version))
+        if patch and expected and os.path.exists(base):
+            try:
+                self.status.emit("جاري تحميل التحديث...")
+                patch_file = self.download(patch['url'], installer + '.patch', patch.get('sha256'), patch.get('size'))
+                self.status.emit("جاري تطبيق التحديث...")
+                patched = apply_patch(base, patch_file, installer + '.patched')
+                os.remove(patch_file)
+                if file_sha256(patched).hex() != expected:
+                    os.remove(patched)
+                    raise ValueError("patched installer does not match the release checksum")
+                os.replace(patched, installer)
+                self.prune(installer)
+                return installer
+            except DownloadCancelled:
+                raise
+            except Exception as e:
+                logger.warning(f"Delta update from {self.current_version} failed, downloading the full installer: {e}")
+
+        self.status.emit("جاري تحميل التحديث...")
+        self.download(self.update_info['download_url'], installer, expected, self.update_info.get('size'))
+        self.prune(installer)
+        return installer
+
+    def prune(self, keep):
+        """حذف المثبّتات والملفات المؤقتة الأقدم؛ يبقى المثبّت الجديد فقط"""
+        for name in os.listdir(self.update_dir):
+            path = os.path.join(self.update_dir, name)
+            if path != keep and os.path.isfile(path):
+                try:
+                    os.remove(path)
+                except OSError as e:
+                    logger.warning(f"Could not remove old update file {path}: {e}")
+
+    def download(self, url, dest, sha256=None, size=None):
+        part = dest + '.part'
+        offset, digest = self._resume(part)
+        total = size or 0
+        failures = 0
+        while True:
+            self._check_cancelled()
+            before = offset
+            # identity: الاستئناف يعتمد على مواضع بايتات الملف نفسه لا نسخة مضغوطة منه
+            headers = {'Accept-Encoding': 'identity'}
+            if offset:
+                headers['Range'] = f"bytes={offset}-"
+            try:
+                with self.session.get(url, headers=headers, stream=True, timeout=REQUEST_TIMEOUT) as response:
+                    if response.status_code == 416 and offset:
+                        # الجزء المحفوظ لا يخص الملف الموجود على السيرفر
+                        offset, digest = self._resume(part, restart=True)
+                        continue
+                    response.raise_for_status()
+                    if offset and (response.status_code != 206 or
+                                   not response.headers.get('content-range', '').startswith(f"bytes {offset}-")):
+                        # السيرفر تجاهل Range وأرسل الملف كاملاً
+                        offset, digest = self._resume(part, restart=True)
+                    length = int(response.headers.get('content-length') or 0)
+                    if length:
+                        total = offset + length
+                    offset = self._stream(response, part, offset, total, digest)
+            except (requests.ConnectionError, requests.Timeout,
+                    requests.exceptions.ChunkedEncodingError, TransportError) as e:
+                # ما كُتب قبل الانقطاع محفوظ في الملف وفي digest
+                offset = os.path.getsize(part) if os.path.exists(part) else 0
+                logger.warning(f"Update download interrupted at {offset} bytes: {e}")
+            else:
+                if not total or offset >= total:
+                    break
+
+            failures = 0 if offset > before else failures + 1
+            if failures > self.MAX_RETRIES:
+                raise IOError(f"download stalled at {offset} of {total} bytes")
+            self._wait(min(2 ** failures, 30) if failures else 0)
+
+        if sha256 and digest.hexdigest() != sha256.lower():
+            os.remove(part)
+            raise ValueError("downloaded file does not match the release checksum")
+        os.replace(part, dest)
+        return dest
+
+    def _resume(self, part, restart=False):
+        """حجم الملف الجزئي وتجزئة محتواه، أو البدء من الصفر"""
+        digest = hashlib.sha256()
+        if restart or not os.path.exists(part):
+            open(part, 'wb').close()
+            return 0, digest
+        offset = 0
+        with open(part, 'rb') as f:
+            for block in iter(lambda: f.read(self.MAX_CHUNK), b""):
+                digest.update(block)
+                offset += len(block)
+        return offset, digest
+
+    def _stream(self, response, part, offset, total, digest):
+        chunk = self.MIN_CHUNK
+        last_emit = 0.0
+        with open(part, 'ab') as f:
+            while True:
+                self._check_cancelled()
+                started = time.monotonic()
+                data = response.raw.read(chunk)
+                if not data:
+                    break
+                f.write(data)
+                digest.update(data)
+                offset += len(data)
+
+                now = time.monotonic()
+                if now - started < self.TARGET_READ_SECONDS / 2:
+                    chunk = min(chunk * 2, self.MAX_CHUNK)
+                elif now - started > self.TARGET_READ_SECONDS * 2:
+                    chunk = max(chunk // 2, self.MIN_CHUNK)
+                if now - last_emit >= self.PROGRESS_INTERVAL:
+                    last_emit = now
+                    self.progress.emit(offset, total)
+        self.progress.emit(offset, total)
+        return offset
+
+    def _check_cancelled(self):
+        if self.cancelled:
+            raise DownloadCancelled()
+
+    def _wait(self, seconds):
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            self._check_cancelled()
+            time.sleep(0.1)
+
+
 class Updater:
     def __init__(self, parent=None):
         self.parent = parent
@@ -92,43 +294,51 @@ class Updater:
             QMessageBox.information(self.parent, "تحديث", "يمكنك تحديث البرنامج لاحقاً من الإعدادات")
 
     def download_update(self, update_info):
+        # التحميل في خيط منفصل؛ الواجهة تستقبل التقدم عبر الإشارات فقط
+        self.progress = QProgressDialog("جاري تحميل التحديث...", "إلغاء", 0, 1000, self.parent)
+        self.progress.setWindowModality(Qt.WindowModal)
+        self.progress.setWindowTitle("تحديث البرنامج")
+        self.progress.setAutoClose(False)
+        self.progress.setAutoReset(False)
+
+        self.downloader = UpdateDownloader(update_info, self.checker.current_version)
+        self.downloader.progress.connect(self.on_download_progress)
+        self.downloader.status.connect(self.progress.setLabelText)
+        self.downloader.completed.connect(self.install_update)
+        self.downloader.failed.connect(self.on_download_failed)
+        self.progress.canceled.connect(self.downloader.cancel)
+        self.progress.show()
+        self.downloader.start()
+
+    def on_download_progress(self, downloaded, total):
+        if total:
+            self.progress.setValue(int(downloaded * 1000 / total))
+        else:
+            # الحجم غير معروف: مؤشر غير محدد
+            self.progress.setMaximum(0)
+
+    def on_download_failed(self, error_msg):
+        self.progress.close()
+        if not self.downloader.cancelled:
+            QMessageBox.critical(self.parent, "خطأ", f"فشل في تحميل التحديث: {error_msg}")
+
+    def install_update(self, update_file):
+        self.progress.setValue(self.progress.maximum())
+        self.progress.close()
         try:
-            # إنشاء نافذة تقدم
-            progress = QProgressDialog("جاري تحميل التحديث...", "إلغال", 0, 100, self.parent)
-            progress.setWindowModality(Qt.WindowModal)
-            progress.setWindowTitle("تحديث البرنامج")
-            progress.show()
-
-            # تحميل الملف
-            response = requests.get(update_info['download_url'], stream=True)
-            total_size = int(response.headers.get('content-length', 0))
-            block_size = 1024
-            downloaded = 0
-
-            update_file = "update.exe" if sys.platform == "win32" else "update"
-            with open(update_file, 'wb') as f:
-                for data in response.iter_content(block_size):
-                    downloaded += len(data)
-                    f.write(data)
-                    progress.setValue(int(downloaded * 100 / total_size))
-                    if progress.wasCanceled():
-                        return
-
-            progress.setValue(100)
-            
             # تشغيل ملف التحديث
             if sys.platform == "win32":
                 subprocess.Popen([update_file, '/SILENT'])
             else:
                 os.chmod(update_file, 0o755)
-                subprocess.Popen([f"./{update_file}"])
-
-            # إغلاق البرنامج الحالي
-            QMessageBox.information(self.parent, "تحديث", "سيتم إغلاق البرنامج لتطبيق التحديث")
-            sys.exit()
-
+                subprocess.Popen([update_file])
         except Exception as e:
-            QMessageBox.critical(self.parent, "خطأ", f"فشل في تحميل التحديث: {str(e)}")
+            QMessageBox.critical(self.parent, "خطأ", f"فشل في تشغيل التحديث: {str(e)}")
+            return
+
+        # إغلاق البرنامج الحالي
+        QMessageBox.information(self.parent, "تحديث", "سيتم إغلاق البرنامج لتطبيق التحديث")
+        sys.exit()
 
     def no_update_available(self):
         if self.parent:
@@ -46,17 +46,14 @@ class VoiceChat(QtCore.QObject):
             self.audio = pyaudio.PyAudio()
             print(f"PyAudio initialized successfully")
             
-            # طباعة معلومات عن الأجهزة المتاحة
-            print(f"Audio devices available: {self.audio.get_device_count()}")
-            for i in range(self.audio.get_device_count()):
-                try:
-                    dev_info = self.audio.get_device_info_by_index(i)
-                    print(f"Device {i}: {dev_info['name']}")
-                    print(f"  Max Input Channels: {dev_info['maxInputChannels']}")
-                    print(f"  Max Output Channels: {dev_info['maxOutputChannels']}")
-                    print(f"  Default Sample Rate: {dev_info['defaultSampleRate']}")
-                except Exception as e:
-                    print(f"Error getting device info for device {i}: {e}")
+            # طباعة معلومات عن الأجهزة المتاحة (من القائمة المخزنة بدلاً من تعدادها في كل مرة)
+            devices = SettingsWindow.list_audio_devices()
+            print(f"Audio devices available: {len(devices)}")
+            for dev_info in devices:
+                print(f"Device {dev_info['index']}: {dev_info['name']}")
+                print(f"  Max Input Channels: {dev_info['maxInputChannels']}")
+                print(f"  Max Output Channels: {dev_info['maxOutputChannels']}")
+                print(f"  Default Sample Rate: {dev_info['defaultSampleRate']}")
             
             # تهيئة تيارات الصوت
             self._init_streams()
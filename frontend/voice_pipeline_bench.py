@@ -0,0 +1,723 @@
+#!/usr/bin/env python3
+"""
+Benchmark de la cadena de voz: captura -> envío -> reproducción
+---------------------------------------------------------------
+Ejecuta VoiceChat, FallbackVoiceChat y WebRTCVoiceChat sin tarjeta de sonido
+ni servidor, con 1, 4 y 8 hablantes simultáneos más un oyente silenciado, y
+mide por implementación y número de hablantes:
+
+  - latencia de extremo a extremo (p50 / p95 / máx.) desde que la muestra
+    entra al micrófono hasta que se reproduce (o se entrega, en WebRTC)
+  - jitter entre llegadas (estimador de RFC 3550)
+  - tasa de frames perdidos por par hablante -> oyente
+  - CPU del proceso (total y por flujo hablante -> oyente)
+
+Piezas sustitutas:
+  - Dispositivo nulo: un módulo `pyaudio` en memoria. La entrada entrega el
+    audio sintético al ritmo del reloj real; la salida simula la cola de
+    reproducción (write() bloquea cuando el buffer del dispositivo está
+    lleno, como PyAudio) y anota cuándo empieza a sonar cada bloque.
+  - Señalización en bucle local: para VoiceChat / FallbackVoiceChat reenvía
+    'voice_data' a los demás miembros de la sala, un hilo de entrega por
+    cliente como el cliente Socket.IO; para WebRTC reproduce el protocolo de
+    backend/webrtc_signaling.py en modo mesh (webrtc_join -> webrtc_peers,
+    reenvío de offer / answer / ice) sin red y sin servidores STUN.
+
+Correlación de marcas de tiempo: cada frame de audio (un bloque de captura de
+512 muestras a 22050 Hz, o 20 ms a 48 kHz) lleva dos tonos que codifican su
+número de secuencia módulo 1024, y sobreviven a Opus. En recepción se detectan
+los tonos y se busca el frame enviado más reciente con ese código, cuya hora
+de captura se conoce por el reloj del dispositivo nulo. Con --input se mezcla
+un WAV con las marcas; la voz puede tapar alguna y contar como pérdida.
+
+Todos los participantes comparten un proceso (y el GIL): la CPU es la de toda
+la sala, no la de un cliente. En WebRTC la latencia se mide en la entrega al
+callback de audio; la reproducción queda fuera porque la aplicación todavía
+no mezcla ni reproduce esos frames.
+
+El informe JSON (--out) se puede comparar entre versiones:
+    python voice_pipeline_bench.py --out antes.json
+    python voice_pipeline_bench.py --out despues.json --compare antes.json
+
+Uso:
+    python voice_pipeline_bench.py --speakers 1,4,8 --seconds 10
+    python voice_pipeline_bench.py --impl webrtc --speakers 4 --input voz.wav
+"""
+
+import argparse
+import contextlib
+import json
+import logging
+import os
+import platform
+import queue
+import subprocess
+import sys
+import threading
+import time
+import types
+import wave
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import numpy as np
+
+PCM_RATE = 22050  # VoiceChat / FallbackVoiceChat
+PCM_CHUNK = 512
+WEBRTC_RATE = 48000
+WEBRTC_FRAME = 960  # 20 ms, un frame de MicrophoneStreamTrack
+WEBRTC_CAPTURE_CHUNK = 512  # bloque de captura de WebRTCVoiceBridge
+
+# Código de frame: un tono en cada banda (32 x 32 = 1024 códigos). A 20 ms por
+# frame el código se repite cada 20 s; latencias mayores se confundirían.
+LOW_BAND = [400.0 + 100.0 * k for k in range(32)]
+HIGH_BAND = [4000.0 + 100.0 * k for k in range(32)]
+CODES = len(LOW_BAND) * len(HIGH_BAND)
+MARK_LEVEL = 6000
+# Un tono se considera detectado si supera este múltiplo de la mediana de su banda
+DETECTION_RATIO = 4.0
+# Cola del dispositivo de salida nulo, en bloques
+OUTPUT_BUFFER_CHUNKS = 4
+
+
+# ---------- audio sintético ----------
+
+class MarkedSource:
+    """
+    Señal continua de un hablante: el frame j (frame_samples muestras) lleva
+    el código j % CODES. Opcionalmente se mezcla con un WAV en bucle.
+    """
+
+    def __init__(self, rate, frame_samples, voice=None):
+        self.rate = rate
+        self.frame_samples = frame_samples
+        self.voice = voice
+        t = np.arange(frame_samples) / rate
+        # Cada código empieza en fase 0 para que los frames sean reproducibles
+        self._low = [np.sin(2 * np.pi * f * t) for f in LOW_BAND]
+        self._high = [np.sin(2 * np.pi * f * t) for f in HIGH_BAND]
+        self._position = 0
+        self._pending = np.zeros(0, dtype=np.int16)
+
+    def frame(self, index):
+        code = index % CODES
+        signal = self._low[code // len(HIGH_BAND)] + self._high[code % len(HIGH_BAND)]
+        samples = signal * (MARK_LEVEL / 2)
+        if self.voice is not None:
+            start = (index * self.frame_samples) % len(self.voice)
+            chunk = np.take(self.voice, np.arange(start, start + self.frame_samples), mode="wrap")
+            samples = samples + chunk * 0.5
+        return np.clip(samples, -32768, 32767).astype(np.int16)
+
+    def read(self, count):
+        """Siguientes count muestras del flujo continuo"""
+        while len(self._pending) < count:
+            index = self._position // self.frame_samples
+            self._pending = np.concatenate([self._pending, self.frame(index)])
+            self._position += self.frame_samples
+        out, self._pending = self._pending[:count], self._pending[count:]
+        return out
+
+
+class SilentSource:
+    def __init__(self, rate):
+        self.rate = rate
+
+    def read(self, count):
+        return np.zeros(count, dtype=np.int16)
+
+
+def load_voice(path, rate):
+    """WAV mono o estéreo de 16 bits, remuestreado por interpolación lineal"""
+    with wave.open(path, "rb") as f:
+        if f.getsampwidth() != 2:
+            raise ValueError("se necesita un WAV de 16 bits")
+        data = np.frombuffer(f.readframes(f.getnframes()), dtype=np.int16)
+        data = data.reshape(-1, f.getnchannels()).mean(axis=1)
+        source_rate = f.getframerate()
+    if source_rate != rate:
+        positions = np.arange(0, len(data) - 1, source_rate / rate)
+        data = np.interp(positions, np.arange(len(data)), data)
+    return data.astype(np.float64)
+
+
+class Detector:
+    """Reconoce el código de un frame por la energía de cada tono candidato"""
+
+    def __init__(self, rate, samples):
+        t = np.arange(samples) / rate
+        window = np.hanning(samples)
+        self._low = np.exp(-2j * np.pi * np.outer(LOW_BAND, t)) * window
+        self._high = np.exp(-2j * np.pi * np.outer(HIGH_BAND, t)) * window
+        self.samples = samples
+
+    def code(self, samples):
+        if len(samples) != self.samples:
+            return None
+        x = samples.astype(np.float64)
+        low = np.abs(self._low @ x)
+        high = np.abs(self._high @ x)
+        if low.max() < DETECTION_RATIO * np.median(low) or high.max() < DETECTION_RATIO * np.median(high):
+            return None
+        return int(low.argmax()) * len(HIGH_BAND) + int(high.argmax())
+
+
+# ---------- dispositivo nulo (módulo pyaudio en memoria) ----------
+
+class NullInputStream:
+    """Micrófono nulo: entrega la fuente al ritmo del reloj real"""
+
+    def __init__(self, source, rate, frames_per_buffer):
+        self.source = source
+        self.rate = rate
+        self.frames_per_buffer = frames_per_buffer
+        self.started = None
+        self.samples_read = 0
+        self.closed = False
+
+    def read(self, count, exception_on_overflow=True):
+        if self.started is None:
+            self.started = time.perf_counter()
+        self.samples_read += count
+        # Las muestras existen cuando el reloj del dispositivo llega a su final
+        ready = self.started + self.samples_read / self.rate
+        delay = ready - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        return self.source.read(count).tobytes()
+
+    def capture_time(self, sample):
+        """Hora en que la muestra número `sample` entró al micrófono"""
+        return self.started + sample / self.rate
+
+    def is_active(self):
+        return not self.closed
+
+    def stop_stream(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+
+class NullOutputStream:
+    """
+    Altavoz nulo: una cola de reproducción que consume `rate` muestras por
+    segundo. write() anota cuándo empezará a sonar el bloque y bloquea si la
+    cola supera OUTPUT_BUFFER_CHUNKS bloques, igual que PyAudio.
+    """
+
+    def __init__(self, owner, rate, frames_per_buffer):
+        self.owner = owner
+        self.rate = rate
+        self.buffer_seconds = OUTPUT_BUFFER_CHUNKS * frames_per_buffer / rate
+        self._play_end = 0.0
+        self.closed = False
+
+    def write(self, data):
+        now = time.perf_counter()
+        start = max(now, self._play_end)
+        self._play_end = start + len(data) / 2 / self.rate
+        self.owner.max_backlog = max(self.owner.max_backlog, self._play_end - now)
+        self.owner.played.append((start, bytes(data), self.owner.current_speaker))
+        backlog = self._play_end - now - self.buffer_seconds
+        if backlog > 0:
+            time.sleep(backlog)
+
+    def is_active(self):
+        return not self.closed
+
+    def stop_stream(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+
+class NullAudio:
+    """
+    Sustituto de pyaudio.PyAudio. Los streams se asignan al participante que
+    se está construyendo (NullAudio.participant), que es quien los abre.
+    """
+
+    participant = None
+
+    def __init__(self):
+        self.owner = NullAudio.participant
+
+    def get_device_count(self):
+        return 2
+
+    def get_device_info_by_index(self, index):
+        return {"index": index, "name": ["null input", "null output"][index],
+                "maxInputChannels": 1 - index, "maxOutputChannels": index,
+                "defaultSampleRate": float(PCM_RATE)}
+
+    def get_default_input_device_info(self):
+        return self.get_device_info_by_index(0)
+
+    def get_default_output_device_info(self):
+        return self.get_device_info_by_index(1)
+
+    def open(self, format=None, channels=1, rate=PCM_RATE, input=False, output=False,
+             input_device_index=None, output_device_index=None, frames_per_buffer=PCM_CHUNK):
+        if input:
+            stream = NullInputStream(self.owner.source(rate), rate, frames_per_buffer)
+            self.owner.inputs.append(stream)
+            return stream
+        return NullOutputStream(self.owner, rate, frames_per_buffer)
+
+    def terminate(self):
+        pass
+
+
+def install_null_pyaudio():
+    module = types.ModuleType("pyaudio")
+    module.paInt16 = 8
+    module.PyAudio = NullAudio
+    sys.modules["pyaudio"] = module
+
+
+# ---------- participantes y señalización en bucle local ----------
+
+class Participant:
+    def __init__(self, name, speaker, voice=None):
+        self.name = name
+        self.speaker = speaker
+        self.voice = voice
+        self.inputs = []  # streams de entrada abiertos; el último es el que se usa
+        self.played = []  # (hora de reproducción o entrega, bytes, hablante)
+        self.current_speaker = None  # hablante del bloque que se está reproduciendo
+        self.max_backlog = 0.0  # segundos máximos en cola (entrega o reproducción)
+        self.client = None
+
+    def source(self, rate):
+        if not self.speaker:
+            return SilentSource(rate)
+        frame = PCM_CHUNK if rate == PCM_RATE else WEBRTC_FRAME
+        voice = load_voice(self.voice, rate) if self.voice else None
+        return MarkedSource(rate, frame, voice)
+
+
+class LoopbackSocket:
+    """Cliente Socket.IO del lado de la aplicación conectado a LoopbackRoom"""
+
+    def __init__(self, room, participant):
+        self.room = room
+        self.participant = participant
+        self.connected = True
+        self.handlers = {}
+        self.inbox = queue.Queue()
+        self._thread = threading.Thread(target=self._deliver, daemon=True)
+        self._thread.start()
+
+    def on(self, event, handler=None, namespace=None):
+        self.handlers[event] = handler
+
+    def emit(self, event, data=None, namespace=None):
+        self.room.route(self, event, data)
+
+    def _deliver(self):
+        while True:
+            item = self.inbox.get()
+            if item is None:
+                return
+            deliver_at, event, data = item
+            if not self.connected:
+                continue  # cerrado: se descarta lo pendiente
+            wait = time.perf_counter() - deliver_at
+            self.participant.max_backlog = max(self.participant.max_backlog, wait)
+            delay = deliver_at - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            handler = self.handlers.get(event)
+            if handler:
+                handler(data)
+
+    def close(self):
+        self.connected = False
+        self.inbox.put(None)
+
+
+class LoopbackRoom:
+    """Sala en memoria: reenvía voice_data a los demás miembros"""
+
+    def __init__(self, network_delay=0.0):
+        self.members = []
+        self.network_delay = network_delay
+
+    def connect(self, participant):
+        socket = LoopbackSocket(self, participant)
+        self.members.append(socket)
+        return socket
+
+    def route(self, sender, event, data):
+        if event != "voice_data":
+            return
+        deliver_at = time.perf_counter() + self.network_delay
+        for member in self.members:
+            if member is not sender:
+                member.inbox.put((deliver_at, event, data))
+
+    def close(self):
+        for member in self.members:
+            member.close()
+
+
+class LoopbackSignaling:
+    """
+    Señalización WebRTC en memoria con el protocolo de webrtc_signaling.py
+    en modo mesh. Sustituye a WebRTCVoiceChat._connect_signaling.
+    """
+
+    def __init__(self):
+        self.chats = {}
+
+    def attach(self, chat):
+        signaling = self
+
+        class Socket:
+            def emit(self, event, data, namespace=None):
+                signaling.route(chat, event, data)
+
+            def disconnect(self):
+                pass
+
+        async def connect():
+            chat.socket = Socket()
+            chat.is_connected = True
+
+        chat._connect_signaling = connect
+
+    def route(self, chat, event, data):
+        import asyncio
+        if event == "webrtc_join":
+            existing = [name for name in self.chats if name != chat.local_id]
+            self.chats[chat.local_id] = chat
+            # Igual que el cliente: on_peers crea una conexión por participante existente
+            for peer_id in existing:
+                asyncio.run_coroutine_threadsafe(chat._create_peer_connection_for(peer_id), chat._loop)
+            return
+        target = self.chats.get(data.get("to"))
+        handler = {"webrtc_offer": "_handle_offer", "webrtc_answer": "_handle_answer",
+                   "webrtc_ice_candidate": "_handle_ice_candidate"}.get(event)
+        if target is not None and handler:
+            asyncio.run_coroutine_threadsafe(getattr(target, handler)(data), target._loop)
+
+
+# ---------- implementaciones ----------
+
+def capture_loop(participant, stream, send, stop):
+    """Hilo de captura: lee el micrófono nulo y entrega cada bloque como la aplicación"""
+    while not stop.is_set():
+        send(stream.read(stream.frames_per_buffer, exception_on_overflow=False))
+
+
+def run_voice_chat(participants, args, stop):
+    from voice_chat import VoiceChat
+
+    room = LoopbackRoom(args.network_delay / 1000)
+    for p in participants:
+        NullAudio.participant = p
+        p.client = VoiceChat(room.connect(p), 1, p.name)
+        # on_voice_data reproduce sin saber quién habla; el hablante viaja en el paquete
+        p.client.socket.on("voice_data", _tagging(p, p.client.on_voice_data))
+    for p in participants:
+        p.client.start_voice()
+        if p.speaker:
+            p.client.toggle_mute()  # arranca el hilo de grabación propio de VoiceChat
+
+    def close():
+        for p in participants:
+            p.client.stop_voice()
+        room.close()
+    return PCM_RATE, PCM_CHUNK, close
+
+
+def run_fallback(participants, args, stop):
+    from voice_webrtc import FallbackVoiceChat
+
+    room = LoopbackRoom(args.network_delay / 1000)
+    threads = []
+    for p in participants:
+        NullAudio.participant = p
+        p.client = FallbackVoiceChat(room.connect(p), 1, p.name)
+        p.client.socket.on("voice_data", _tagging(p, p.client._on_voice_data_received))
+    for p in participants:
+        p.client.start()
+        if p.speaker:
+            p.client.toggle_mute()
+            # FallbackVoiceChat no captura por sí mismo: el puente le pasa los bloques
+            NullAudio.participant = p
+            stream = NullAudio().open(rate=PCM_RATE, input=True, frames_per_buffer=PCM_CHUNK)
+            threads.append(threading.Thread(target=capture_loop, daemon=True,
+                                            args=(p, stream, p.client.add_audio_data, stop)))
+    for thread in threads:
+        thread.start()
+
+    def close():
+        for thread in threads:
+            thread.join(timeout=1)
+        for p in participants:
+            p.client.stop()
+        room.close()
+    return PCM_RATE, PCM_CHUNK, close
+
+
+def _tagging(participant, handler):
+    """Anota el hablante de cada bloque antes de pasarlo al manejador real"""
+    def wrapped(data):
+        participant.current_speaker = data.get("username")
+        handler(data)
+    return wrapped
+
+
+def run_webrtc(participants, args, stop):
+    import voice_webrtc
+    from voice_webrtc import WebRTCVoiceChat
+
+    # Sin red: sólo candidatos locales, sin consultas STUN
+    voice_webrtc.ICE_SERVERS[:] = []
+    signaling = LoopbackSignaling()
+    threads = []
+    for p in participants:
+        chat = p.client = WebRTCVoiceChat("loopback", 1, p.name)
+        signaling.attach(chat)
+        chat.is_muted = not p.speaker
+
+        def on_audio(view, peer_id, p=p):
+            p.played.append((time.perf_counter(), bytes(view), peer_id))
+        chat.set_on_audio_callback(on_audio)
+
+    # El oyente silenciado entra primero: un participante silenciado no ofrece,
+    # así que sólo recibe conexiones de quienes llegan después
+    for p in sorted(participants, key=lambda p: p.speaker):
+        p.client.start()
+        time.sleep(0.2)
+
+    for p in participants:
+        if p.speaker:
+            stream = NullInputStream(p.source(WEBRTC_RATE), WEBRTC_RATE, WEBRTC_CAPTURE_CHUNK)
+            p.inputs.append(stream)
+            threads.append(threading.Thread(target=capture_loop, daemon=True,
+                                            args=(p, stream, p.client.add_audio_data, stop)))
+    for thread in threads:
+        thread.start()
+
+    def close():
+        for thread in threads:
+            thread.join(timeout=1)
+        for p in participants:
+            p.client.stop()
+    return WEBRTC_RATE, WEBRTC_FRAME, close
+
+
+IMPLEMENTATIONS = {"voicechat": run_voice_chat, "fallback": run_fallback, "webrtc": run_webrtc}
+
+
+# ---------- medición ----------
+
+def percentile(values, q):
+    if not values:
+        return None
+    return float(np.percentile(values, q))
+
+
+def analyze(participants, rate, frame_samples, window):
+    """Empareja cada frame recibido con su captura y resume por par hablante -> oyente"""
+    detector = Detector(rate, frame_samples)
+    speakers = {p.name: p for p in participants if p.speaker}
+    start, end = window
+    latencies, jitters, expected, matched = [], [], 0, 0
+
+    for listener in participants:
+        per_speaker = {}
+        for entry in listener.played:
+            played_at, data, speaker = entry
+            if speaker not in speakers:
+                continue
+            samples = np.frombuffer(data, dtype=np.int16)
+            if len(samples) == 2 * frame_samples:  # Opus decodifica en estéreo intercalado
+                samples = samples[::2]
+            code = detector.code(samples)
+            if code is None:
+                continue
+            stream = speakers[speaker].inputs[-1]
+            # Frame enviado más reciente con ese código capturado antes de la reproducción
+            newest = int((played_at - stream.started) * rate // frame_samples)
+            index = newest - ((newest - code) % CODES)
+            if index < 0:
+                continue
+            captured = stream.capture_time(index * frame_samples)
+            if start <= captured < end:
+                per_speaker.setdefault(speaker, {})[index] = played_at - captured
+
+        for speaker in speakers:
+            if speaker == listener.name:
+                continue
+            stream = speakers[speaker].inputs[-1]
+            first = int(np.ceil((start - stream.started) * rate / frame_samples))
+            last = int(np.ceil((end - stream.started) * rate / frame_samples))
+            expected += max(0, last - first)
+            received = per_speaker.get(speaker, {})
+            matched += len(received)
+            ordered = [received[i] for i in sorted(received)]
+            latencies.extend(ordered)
+            # RFC 3550: J += (|D| - J) / 16, con D la variación de tránsito entre frames consecutivos
+            jitter = 0.0
+            for previous, current in zip(ordered, ordered[1:]):
+                jitter += (abs(current - previous) - jitter) / 16
+            if ordered:
+                jitters.append(jitter)
+
+    # Con más cola que el periodo del código, los frames se emparejarían con
+    # una vuelta equivocada: la latencia deja de ser medible (la pérdida no)
+    backlog = max(p.max_backlog for p in participants)
+    aliased = backlog > 0.9 * CODES * frame_samples / rate
+    ms = [] if aliased else [value * 1000 for value in latencies]
+    return {
+        "backlog_max_ms": backlog * 1000,
+        "latency_aliased": aliased,
+        "streams": sum(1 for s in speakers for p in participants if p.name != s),
+        "frames_expected": expected,
+        "frames_received": matched,
+        "drop_rate": 1 - matched / expected if expected else None,
+        "latency_p50_ms": percentile(ms, 50),
+        "latency_p95_ms": percentile(ms, 95),
+        "latency_max_ms": max(ms) if ms else None,
+        "jitter_ms": float(np.mean(jitters)) * 1000 if jitters else None,
+    }
+
+
+def run(impl, speakers, args):
+    participants = [Participant(f"speaker{i}", True, args.input) for i in range(speakers)]
+    participants.append(Participant("listener", False))
+    stop = threading.Event()
+
+    # VoiceChat imprime por cada bloque; ese coste cuenta, la salida no
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        rate, frame_samples, close = IMPLEMENTATIONS[impl](participants, args, stop)
+        time.sleep(args.warmup)
+
+        # El margen final deja llegar los frames capturados al final de la ventana
+        window_start = time.perf_counter()
+        cpu_start = time.process_time()
+        time.sleep(args.seconds)
+        window_end = time.perf_counter()
+        cpu = time.process_time() - cpu_start
+        time.sleep(args.drain)
+
+        stop.set()
+        close()
+
+    result = analyze(participants, rate, frame_samples, (window_start, window_end))
+    result["cpu_percent"] = cpu / args.seconds * 100
+    result["cpu_percent_per_stream"] = result["cpu_percent"] / result["streams"] if result["streams"] else None
+    return result
+
+
+def environment():
+    def version(module):
+        try:
+            return __import__(module).__version__
+        except Exception:
+            return None
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                                text=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        commit = ""
+    return {
+        "commit": commit or None,
+        "python": platform.python_version(),
+        "machine": f"{platform.system()} {platform.machine()} ({os.cpu_count()} CPU)",
+        "numpy": version("numpy"),
+        "aiortc": version("aiortc"),
+        "av": version("av"),
+    }
+
+
+def fmt(value, spec):
+    if value is None:
+        return "-".rjust(int(spec.split(".")[0]))
+    return format(value, spec)
+
+
+def print_report(results):
+    print(f"\n{'implementación':<12}{'hablantes':>10}{'p50 ms':>9}{'p95 ms':>9}{'máx ms':>9}"
+          f"{'jitter':>9}{'pérdida':>9}{'CPU %':>8}{'CPU/flujo':>10}{'cola ms':>9}")
+    for key, r in results.items():
+        impl, speakers = key.split("@")
+        drop = r["drop_rate"] * 100 if r["drop_rate"] is not None else None
+        print(f"{impl:<12}{speakers:>10}{fmt(r['latency_p50_ms'], '9.1f')}{fmt(r['latency_p95_ms'], '9.1f')}"
+              f"{fmt(r['latency_max_ms'], '9.1f')}{fmt(r['jitter_ms'], '9.2f')}{fmt(drop, '8.1f')}%"
+              f"{fmt(r['cpu_percent'], '8.1f')}{fmt(r['cpu_percent_per_stream'], '10.2f')}"
+              f"{fmt(r['backlog_max_ms'], '9.0f')}")
+    if any(r["latency_aliased"] for r in results.values()):
+        print("'-' en latencia: la cola superó el periodo de las marcas de tiempo")
+
+
+def print_comparison(base, new):
+    print(f"\n{base.get('commit')} -> {new.get('commit')}")
+    if base.get("machine") != new.get("machine"):
+        print(f"aviso: comparando {base.get('machine')} con {new.get('machine')}")
+    metrics = (("latency_p50_ms", "p50 ms"), ("latency_p95_ms", "p95 ms"), ("jitter_ms", "jitter ms"),
+               ("drop_rate", "pérdida"), ("cpu_percent", "CPU %"))
+    for key, after in new["results"].items():
+        before = base["results"].get(key)
+        if not before:
+            continue
+        changes = []
+        for metric, label in metrics:
+            if before.get(metric) is None or after.get(metric) is None:
+                continue
+            if metric == "drop_rate":
+                changes.append(f"{label} {before[metric] * 100:.1f}% -> {after[metric] * 100:.1f}%")
+            else:
+                changes.append(f"{label} {before[metric]:.1f} -> {after[metric]:.1f}")
+        print(f"  {key:<14} " + ", ".join(changes))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de la cadena de voz sin dispositivos de audio")
+    parser.add_argument("--impl", default="voicechat,fallback,webrtc", help="implementaciones separadas por comas")
+    parser.add_argument("--speakers", default="1,4,8", help="hablantes simultáneos, separados por comas")
+    parser.add_argument("--seconds", type=float, default=8.0, help="duración de la ventana medida")
+    parser.add_argument("--warmup", type=float, default=2.0, help="segundos antes de medir (negociación, colas)")
+    parser.add_argument("--drain", type=float, default=1.0, help="segundos tras la ventana para recibir lo pendiente")
+    parser.add_argument("--network-delay", type=float, default=0.0, help="ms añadidos al reenvío de voice_data")
+    parser.add_argument("--input", help="WAV de 16 bits que se mezcla con las marcas de tiempo")
+    parser.add_argument("--out", help="informe JSON")
+    parser.add_argument("--compare", help="informe JSON anterior con el que comparar")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.CRITICAL)
+    # WebRTCVoiceChat.stop() cancela la tarea principal de su hilo: no es un error
+    default_hook = threading.excepthook
+    threading.excepthook = lambda hook_args: (
+        None if hook_args.exc_type.__name__ == "CancelledError" else default_hook(hook_args))
+    install_null_pyaudio()
+    from voice_webrtc import WEBRTC_AVAILABLE
+
+    results = {}
+    for impl in args.impl.split(","):
+        if impl == "webrtc" and not WEBRTC_AVAILABLE:
+            print("aiortc no está disponible; se omite webrtc")
+            continue
+        for speakers in (int(n) for n in args.speakers.split(",")):
+            print(f"-- {impl}, {speakers} hablante(s)...", flush=True)
+            results[f"{impl}@{speakers}"] = run(impl, speakers, args)
+
+    print_report(results)
+    report = {**environment(), "seconds": args.seconds, "input": args.input, "results": results}
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\ninforme: {args.out}")
+    if args.compare:
+        with open(args.compare) as f:
+            print_comparison(json.load(f), report)
+
+
+if __name__ == "__main__":
+    main()
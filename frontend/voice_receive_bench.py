@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Medición del retraso de recepción por participante en WebRTCVoiceChat
+----------------------------------------------------------------------
+Crea N conexiones aiortc en bucle local (sin red ni señalización) que envían
+audio a 20 ms por frame, y compara el bucle de recepción anterior
+(to_ndarray().tobytes() + señal por frame + asyncio.sleep(0.01)) con
+WebRTCVoiceChat._process_audio_frames.
+
+El retraso de cada frame se estima con ReceiveLatencyProbe (reloj local
+frente al PTS del frame, relativo al frame más rápido).
+
+Uso:
+    python voice_receive_bench.py --peers 4 --seconds 10
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from voice_webrtc import WEBRTC_AVAILABLE
+
+if not WEBRTC_AVAILABLE:
+    print("aiortc no está disponible; no se puede ejecutar la medición")
+    sys.exit(1)
+
+from aiortc import RTCPeerConnection
+from aiortc.mediastreams import AudioStreamTrack, MediaStreamError
+
+from voice_webrtc import WebRTCVoiceChat, ReceiveLatencyProbe
+
+
+async def legacy_process(track, probe, loop, on_audio):
+    """Réplica del bucle de recepción anterior"""
+    while True:
+        try:
+            frame = await track.recv()
+        except MediaStreamError:
+            break
+        probe.record(frame, loop.time())
+        audio_bytes = frame.to_ndarray().tobytes()
+        on_audio(audio_bytes, "peer")
+        await asyncio.sleep(0.01)
+
+
+async def connect_loopback(on_track):
+    """Conecta dos RTCPeerConnection locales y devuelve ambas"""
+    sender = RTCPeerConnection()
+    receiver = RTCPeerConnection()
+    sender.addTrack(AudioStreamTrack())
+
+    @receiver.on("track")
+    def _on_track(track):
+        on_track(track)
+
+    await sender.setLocalDescription(await sender.createOffer())
+    await receiver.setRemoteDescription(sender.localDescription)
+    await receiver.setLocalDescription(await receiver.createAnswer())
+    await sender.setRemoteDescription(receiver.localDescription)
+    return sender, receiver
+
+
+async def run(mode, peers, seconds):
+    loop = asyncio.get_running_loop()
+    chat = WebRTCVoiceChat("http://localhost", "bench", "bench")
+    chat._loop = loop
+    chat.set_on_audio_callback(lambda data, peer_id: None)
+
+    tasks = []
+    probes = {}
+    connections = []
+    for index in range(peers):
+        peer_id = f"peer-{index}"
+
+        def on_track(track, peer_id=peer_id):
+            if mode == "legacy":
+                probe = probes[peer_id] = ReceiveLatencyProbe()
+                tasks.append(asyncio.create_task(
+                    legacy_process(track, probe, loop, chat.audio_received.emit)
+                ))
+            else:
+                tasks.append(asyncio.create_task(
+                    chat._process_audio_frames(track, peer_id, peer_id)
+                ))
+
+        connections.extend(await connect_loopback(on_track))
+
+    await asyncio.sleep(seconds)
+
+    for pc in connections:
+        await pc.close()
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+    if mode != "legacy":
+        probes = chat.receive_stats
+
+    print(f"\n=== {mode} ===")
+    for peer_id, probe in sorted(probes.items()):
+        print(f"  {peer_id}: {probe.frames} frames, retraso medio {probe.mean_ms:.2f} ms, "
+              f"máximo {probe.max_ms:.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Retraso de recepción WebRTC por participante")
+    parser.add_argument("--peers", type=int, default=4, help="conexiones simultáneas")
+    parser.add_argument("--seconds", type=float, default=10, help="duración de cada medición")
+    args = parser.parse_args()
+
+    asyncio.run(run("legacy", args.peers, args.seconds))
+    asyncio.run(run("process_audio_frames", args.peers, args.seconds))
+
+
+if __name__ == "__main__":
+    main()
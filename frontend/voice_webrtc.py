@@ -11,9 +11,11 @@ from PyQt5.QtCore import pyqtSignal
 # Intentar importar aiortc, pero no fallar si no está disponible
 try:
     import asyncio
+    import fractions
     import json
-    from aiortc import RTCPeerConnection, RTCSessionDescription, RTCIceCandidate
-    from aiortc.contrib.media import MediaStreamTrack, MediaBlackhole, MediaRecorder
+    from av import AudioFrame as AVAudioFrame
+    from aiortc import RTCPeerConnection, RTCSessionDescription, RTCIceCandidate, RTCConfiguration, RTCIceServer
+    from aiortc.contrib.media import MediaStreamTrack, MediaBlackhole, MediaRecorder, MediaRelay
     from aiortc.mediastreams import MediaStreamError, AudioStreamTrack
     WEBRTC_AVAILABLE = True
 except ImportError:
@@ -22,6 +24,11 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+# Namespace de Socket.IO del servidor de señalización (backend/webrtc_signaling.py)
+SIGNALING_NAMESPACE = "/webrtc"
+# Participante con el que se negocia en modo de reenvío ("sfu"): el nodo del servidor
+FORWARDER_PEER_ID = "sfu"
+
 # Configuración de STUN/TURN servers para facilitar conexiones NAT
 ICE_SERVERS = [
     {"urls": ["stun:stun.l.google.com:19302"]},
@@ -45,99 +52,252 @@ if WEBRTC_AVAILABLE:
             frame = await self.track.recv()
             return frame
 
+    class ReceiveLatencyProbe:
+        """
+        Estima el retraso de recepción de un participante comparando el reloj
+        local con el PTS de cada frame, relativo al frame que llegó más rápido.
+        """
+
+        def __init__(self):
+            self._origin = None
+            self.frames = 0
+            self.last_ms = 0.0
+            self.max_ms = 0.0
+            self.total_ms = 0.0
+
+        def record(self, frame, now):
+            media_time = float(frame.pts * frame.time_base)
+            delay = 0.0 if self._origin is None else now - self._origin - media_time
+            if self._origin is None or delay < 0:
+                self._origin = now - media_time
+                delay = 0.0
+
+            self.frames += 1
+            self.last_ms = delay * 1000
+            self.total_ms += self.last_ms
+            if self.last_ms > self.max_ms:
+                self.max_ms = self.last_ms
+
+        @property
+        def mean_ms(self):
+            return self.total_ms / self.frames if self.frames else 0.0
+
+    class AudioFrameFactory:
+        """
+        Fábrica de frames de audio sin asignaciones por frame.
+
+        Preasigna un anillo de AVAudioFrame (con vistas NumPy sobre sus planos)
+        y un frame de silencio reutilizable. El PTS avanza con un contador de
+        muestras en lugar del reloj de pared.
+        """
+
+        def __init__(self, sample_rate=48000, samples_per_frame=960, ring_size=4):
+            self.sample_rate = sample_rate
+            self.samples_per_frame = samples_per_frame
+            self.time_base = fractions.Fraction(1, sample_rate)
+            self._pts = 0
+
+            # Anillo de frames preasignados: cada entrada es (frame, vista int16 del plano).
+            # Debe cubrir los frames que el emisor todavía está codificando.
+            self._ring = [self._allocate() for _ in range(ring_size)]
+            self._ring_index = 0
+
+            # Frame de silencio reutilizable
+            self._silence, silence_view = self._allocate()
+            silence_view.fill(0)
+
+        def _allocate(self):
+            frame = AVAudioFrame(format="s16", layout="mono", samples=self.samples_per_frame)
+            frame.sample_rate = self.sample_rate
+            frame.time_base = self.time_base
+            view = np.frombuffer(frame.planes[0], dtype=np.int16)[:self.samples_per_frame]
+            return frame, view
+
+        def next_slot(self):
+            """Devuelve el siguiente (frame, vista) del anillo para rellenarlo"""
+            slot = self._ring[self._ring_index]
+            self._ring_index = (self._ring_index + 1) % len(self._ring)
+            return slot
+
+        def silence(self):
+            """Devuelve el frame de silencio reutilizable"""
+            return self._silence
+
+        def stamp(self, frame):
+            """Asigna el siguiente PTS según el contador de muestras"""
+            frame.pts = self._pts
+            self._pts += self.samples_per_frame
+            return frame
+
+    class AudioRingBuffer:
+        """
+        Buffer circular de muestras int16 para un único productor (hilo de
+        captura de PyAudio) y un único consumidor (bucle asyncio de WebRTC).
+
+        Cada lado sólo modifica su propio índice y las muestras se copian antes
+        de publicar el índice de escritura, así que no hace falta ningún lock.
+        """
+
+        def __init__(self, capacity):
+            self._buffer = np.zeros(capacity, dtype=np.int16)
+            self._capacity = capacity
+            self._write_pos = 0  # sólo lo modifica el productor
+            self._read_pos = 0   # sólo lo modifica el consumidor
+            self.overruns = 0    # muestras descartadas por el productor (buffer lleno)
+
+        def available(self):
+            return self._write_pos - self._read_pos
+
+        def write(self, samples):
+            """Productor: copia las muestras que quepan y las publica"""
+            count = len(samples)
+            free = self._capacity - (self._write_pos - self._read_pos)
+            if count > free:
+                self.overruns += count - free
+                count = free
+
+            start = self._write_pos % self._capacity
+            first = min(count, self._capacity - start)
+            self._buffer[start:start + first] = samples[:first]
+            if count > first:
+                self._buffer[:count - first] = samples[first:count]
+
+            self._write_pos += count
+            return count
+
+        def read_into(self, out):
+            """Consumidor: copia hasta len(out) muestras en out"""
+            count = min(len(out), self.available())
+            start = self._read_pos % self._capacity
+            first = min(count, self._capacity - start)
+            out[:first] = self._buffer[start:start + first]
+            if count > first:
+                out[first:count] = self._buffer[:count - first]
+
+            self._read_pos += count
+            return count
+
+        def skip(self, count):
+            """Consumidor: descarta las count muestras más antiguas"""
+            count = min(count, self.available())
+            self._read_pos += count
+            return count
+
+        def clear(self):
+            """Consumidor: descarta todo lo pendiente"""
+            return self.skip(self.available())
+
     class MicrophoneStreamTrack(AudioStreamTrack):
         """
         Una pista que captura audio del micrófono
         """
         kind = "audio"
-        
-        def __init__(self):
+
+        # Latencia máxima acumulada antes de descartar los frames más antiguos (~60 ms)
+        MAX_BUFFERED_FRAMES = 3
+        # Capacidad del buffer circular (~500 ms)
+        RING_CAPACITY = 24000
+        # Si el bucle se retrasa más que esto, el reloj de frames se reinicia
+        MAX_CLOCK_SLIP = 0.1
+
+        def __init__(self, loop=None):
             super().__init__()
-            self._queue = asyncio.Queue()
-            self._start = time.time()
             self._sample_rate = 48000
             self._samples_per_frame = 960  # 20ms at 48kHz
+            self._frame_duration = self._samples_per_frame / self._sample_rate
+            self._frames = AudioFrameFactory(self._sample_rate, self._samples_per_frame)
+            self._ring = AudioRingBuffer(self.RING_CAPACITY)
+
+            # Bucle consumidor y futuro que espera recv(); el productor lo despierta
+            # con call_soon_threadsafe una sola vez por frame completo
+            self._loop = loop
+            self._waiter = None
+            self._next_deadline = None
+
+            self._dropped_frames = 0
             self._active = True
             self._ended_handlers = []
             
         async def recv(self):
             """
-            Entrega frames de audio para WebRTC
+            Entrega frames de audio para WebRTC al ritmo del reloj de 20 ms
             """
             if not self._active:
-                # Si la pista fue marcada como inactiva, disparar evento 'ended'
+                # Si la pista fue marcada como inactiva, disparar evento 'ended'.
+                # MediaStreamError es el fin de pista para aiortc: el emisor y el
+                # MediaRelay dejan de leer (devolver un frame sin esperar haría
+                # girar al lector del relay sin ceder el bucle)
                 self._dispatch_ended()
-                frame = self._create_silence_frame()
-                frame.pts = None  # Indica que la pista ha terminado
-                return frame
-                
-            if self._queue.empty():
-                # Si no hay datos, generamos silencio
-                silence_frame = self._create_silence_frame()
-                return silence_frame
-            else:
-                # Obtener datos de audio de la cola
-                try:
-                    frame = await self._queue.get()
-                    return frame
-                except Exception as e:
-                    logger.error(f"Error al recibir audio: {e}")
-                    return self._create_silence_frame()
+                raise MediaStreamError
+
+            if self._loop is None:
+                self._loop = asyncio.get_running_loop()
+
+            now = self._loop.time()
+            if self._next_deadline is None or now - self._next_deadline > self.MAX_CLOCK_SLIP:
+                self._next_deadline = now
+            self._next_deadline += self._frame_duration
+
+            # Limitar la latencia: descartar lo más antiguo si el consumidor se retrasó
+            excess = self._ring.available() - self.MAX_BUFFERED_FRAMES * self._samples_per_frame
+            if excess > 0:
+                self._ring.skip(excess)
+                self._dropped_frames += excess // self._samples_per_frame
+
+            if self._ring.available() < self._samples_per_frame:
+                await self._wait_for_frame(self._next_deadline)
+
+            if self._ring.available() < self._samples_per_frame:
+                # No llegó un frame completo antes del plazo: enviar silencio
+                return self._create_silence_frame()
+
+            frame, view = self._frames.next_slot()
+            self._ring.read_into(view)
+            return self._frames.stamp(frame)
+
+        async def _wait_for_frame(self, deadline):
+            """Espera a que el productor complete un frame o a que venza el plazo"""
+            waiter = self._loop.create_future()
+            self._waiter = waiter
+
+            # Volver a comprobar tras publicar el futuro para no perder un aviso
+            if self._ring.available() >= self._samples_per_frame:
+                self._waiter = None
+                return
+
+            timer = self._loop.call_at(deadline, self._wake_waiter, waiter)
+            try:
+                await waiter
+            finally:
+                timer.cancel()
+                self._waiter = None
+
+        @staticmethod
+        def _wake_waiter(waiter):
+            if not waiter.done():
+                waiter.set_result(None)
         
         def _create_silence_frame(self):
             """
-            Crea un frame de silencio si no hay datos disponibles
+            Devuelve el frame de silencio preasignado con el siguiente PTS
             """
-            from aiortc.mediastreams import AudioFrame
-            from av import AudioFrame as AVAudioFrame
-            import av
-            
-            # Crear un frame de silencio
-            samples = np.zeros(self._samples_per_frame, dtype=np.int16)
-            avframe = AVAudioFrame.from_ndarray(
-                samples,
-                format="s16",
-                layout="mono"
-            )
-            avframe.sample_rate = self._sample_rate
-            avframe.time_base = av.Rational(1, self._sample_rate)
-            
-            # Establecer PTS (Presentation TimeStamp)
-            elapsed_time = time.time() - self._start
-            avframe.pts = int(elapsed_time * self._sample_rate)
-            
-            return AudioFrame(avframe)
+            return self._frames.stamp(self._frames.silence())
         
         def add_audio(self, audio_data):
             """
-            Añade datos de audio a la cola para ser enviados
+            Añade datos de audio para ser enviados (llamado desde el hilo de captura)
             audio_data: numpy array de audio con valores int16
             """
             if not self._active:
                 return
                 
             try:
-                from aiortc.mediastreams import AudioFrame
-                from av import AudioFrame as AVAudioFrame
-                import av
-                
-                # Convertir a frame de audio
-                avframe = AVAudioFrame.from_ndarray(
-                    audio_data,
-                    format="s16",
-                    layout="mono"
-                )
-                avframe.sample_rate = self._sample_rate
-                avframe.time_base = av.Rational(1, self._sample_rate)
-                
-                # Establecer PTS (Presentation TimeStamp)
-                elapsed_time = time.time() - self._start
-                avframe.pts = int(elapsed_time * self._sample_rate)
-                
-                # Crear AudioFrame y añadirlo a la cola
-                frame = AudioFrame(avframe)
-                asyncio.run_coroutine_threadsafe(self._queue.put(frame), asyncio.get_event_loop())
-                
+                self._ring.write(audio_data)
+
+                waiter = self._waiter
+                if waiter is not None and self._ring.available() >= self._samples_per_frame:
+                    self._waiter = None
+                    self._loop.call_soon_threadsafe(self._wake_waiter, waiter)
             except Exception as e:
                 logger.error(f"Error al añadir audio: {e}")
                 import traceback
@@ -145,20 +305,15 @@ if WEBRTC_AVAILABLE:
         
         def stop(self):
             """
-            Detiene la pista y libera recursos
+            Detiene la pista y libera recursos (desde el bucle consumidor)
             """
             logger.info("Deteniendo MicrophoneStreamTrack")
             self._active = False
-            # Limpiar la cola para no almacenar más datos
-            asyncio.run_coroutine_threadsafe(self._clear_queue(), asyncio.get_event_loop())
-        
-        async def _clear_queue(self):
-            """Vacía la cola de audio pendiente"""
-            try:
-                while not self._queue.empty():
-                    await self._queue.get()
-            except Exception as e:
-                logger.error(f"Error limpiando cola de audio: {e}")
+            # Vaciar el buffer para no enviar más datos
+            self._ring.clear()
+            waiter = self._waiter
+            if waiter is not None:
+                self._wake_waiter(waiter)
         
         def on_ended(self, callback):
             """Añade un manejador para el evento 'ended'"""
@@ -177,43 +332,68 @@ if WEBRTC_AVAILABLE:
         Implementación de chat de voz usando WebRTC
         """
         # Señales
-        audio_received = pyqtSignal(bytes, str)  # datos de audio, ID del participante
+        audio_received = pyqtSignal(bytes, str)  # no se emite por frame en WebRTC; ver audio_levels
+        audio_levels = pyqtSignal(dict)  # {participante: nivel pico 0..1}, cada LEVEL_UPDATE_INTERVAL
         participant_connected = pyqtSignal(str)
         participant_disconnected = pyqtSignal(str)
         connection_state_changed = pyqtSignal(str, str)  # participante, estado
+
+        # Frecuencia de las notificaciones de nivel hacia la UI (10 Hz)
+        LEVEL_UPDATE_INTERVAL = 0.1
         
-        def __init__(self, signaling_url, room_id, local_id):
+        def __init__(self, signaling_url, room_id, local_id, access_token=None):
             super().__init__()
             self.signaling_url = signaling_url
             self.room_id = room_id
             self.local_id = local_id
+            # El servidor toma la identidad de este token al conectar, no de los mensajes
+            self.access_token = access_token
             
             # Estado
             self.is_connected = False
             self.is_muted = True
             
-            # Pista de audio del micrófono
-            self.mic_track = MicrophoneStreamTrack()
+            # Bucle asíncrono y thread
+            self._loop = asyncio.new_event_loop()
+            self._thread = None
+            
+            # Pista de audio del micrófono (consumida en self._loop)
+            self.mic_track = MicrophoneStreamTrack(self._loop)
+            # Cada conexión recibe su propio suscriptor de la pista: si todas
+            # llamaran a mic_track.recv(), cada una se llevaría sólo 1/N de los frames.
+            # Sin buffer: un emisor retrasado salta al frame más reciente
+            self._mic_relay = MediaRelay()
             
             # Conexiones peer
             self.peer_connections: Dict[str, RTCPeerConnection] = {}
             
+            # "mesh": una conexión por participante; "sfu": una sola conexión al
+            # nodo de reenvío del servidor, con forwarded_slots pistas de entrada
+            self.voice_mode = "mesh"
+            self.forwarded_slots = 0
+            
             # Socket.IO instance for signaling
             self.socket = None  # Will be set in _connect_signaling
             
-            # Bucle asíncrono y thread
-            self._loop = asyncio.new_event_loop()
-            self._thread = None
-            
             # Audioo callbacks
             self._on_audio_callback = None
             
             # Lista de pistas activas
             self._active_tracks = {}
+            
+            # Nivel pico por participante desde la última notificación a la UI
+            self._peer_levels: Dict[str, int] = {}
+            self._levels_reported = False
+            # Retraso de recepción por participante
+            self.receive_stats: Dict[str, ReceiveLatencyProbe] = {}
         
-        def set_on_audio_callback(self, callback: Callable[[bytes, str], None]):
+        def set_on_audio_callback(self, callback: Callable[[memoryview, str], None]):
             """
-            Establece el callback para cuando se recibe audio
+            Establece el callback para cuando se recibe audio.
+            
+            Se llama en el hilo del bucle WebRTC con un memoryview de las muestras
+            s16 del frame, válido sólo durante la llamada: el mezclador o buffer
+            de jitter debe copiarlo a su propio buffer si lo conserva.
             """
             self._on_audio_callback = callback
         
@@ -247,15 +427,14 @@ if WEBRTC_AVAILABLE:
             # Notificar a otros usuarios que este usuario se ha unido
             if self.socket:
                 self.socket.emit('webrtc_join', {
-                    'room_id': self.room_id,
-                    'username': self.local_id
-                })
+                    'room_id': self.room_id
+                }, namespace=SIGNALING_NAMESPACE)
             
-            # Bucle principal
+            # Bucle principal: notificar niveles de audio a la UI a frecuencia fija
             while True:
                 try:
-                    # Esperar un poco para no saturar el sistema
-                    await asyncio.sleep(0.01)
+                    await asyncio.sleep(self.LEVEL_UPDATE_INTERVAL)
+                    self._flush_audio_levels()
                     
                 except Exception as e:
                     logger.error(f"Error en el bucle WebRTC: {e}")
@@ -271,49 +450,65 @@ if WEBRTC_AVAILABLE:
                 # Crear cliente Socket.IO
                 sio = socketio.Client()
                 
-                @sio.on('connect')
+                @sio.on('connect', namespace=SIGNALING_NAMESPACE)
                 def on_connect():
                     logger.info("WebRTC: Connected to signaling server")
                     self.is_connected = True
                 
-                @sio.on('disconnect')
+                @sio.on('disconnect', namespace=SIGNALING_NAMESPACE)
                 def on_disconnect():
                     logger.info("WebRTC: Disconnected from signaling server")
                     self.is_connected = False
                 
-                @sio.on('webrtc_offer')
+                @sio.on('webrtc_offer', namespace=SIGNALING_NAMESPACE)
                 def on_offer(data):
                     asyncio.run_coroutine_threadsafe(self._handle_offer(data), self._loop)
                 
-                @sio.on('webrtc_answer')
+                @sio.on('webrtc_answer', namespace=SIGNALING_NAMESPACE)
                 def on_answer(data):
                     asyncio.run_coroutine_threadsafe(self._handle_answer(data), self._loop)
                 
-                @sio.on('webrtc_ice_candidate')
+                @sio.on('webrtc_ice_candidate', namespace=SIGNALING_NAMESPACE)
                 def on_ice_candidate(data):
                     asyncio.run_coroutine_threadsafe(self._handle_ice_candidate(data), self._loop)
                 
-                @sio.on('webrtc_peers')
+                @sio.on('webrtc_peers', namespace=SIGNALING_NAMESPACE)
                 def on_peers(data):
+                    if data.get('mode') == "sfu":
+                        asyncio.run_coroutine_threadsafe(self._switch_to_forwarding(data), self._loop)
+                        return
                     peers = data.get('peers', [])
                     logger.info(f"WebRTC: Room has {len(peers)} other peers: {peers}")
                     for peer_id in peers:
                         asyncio.run_coroutine_threadsafe(self._create_peer_connection_for(peer_id), self._loop)
                 
-                @sio.on('webrtc_new_peer')
+                @sio.on('webrtc_mode', namespace=SIGNALING_NAMESPACE)
+                def on_mode(data):
+                    logger.info(f"WebRTC: Room switched to {data.get('mode')} mode")
+                    if data.get('mode') == "sfu":
+                        asyncio.run_coroutine_threadsafe(self._switch_to_forwarding(data), self._loop)
+                
+                @sio.on('webrtc_new_peer', namespace=SIGNALING_NAMESPACE)
                 def on_new_peer(data):
                     new_peer = data.get('username')
                     logger.info(f"WebRTC: New peer joined: {new_peer}")
                     # No need to do anything, they will initiate connection
                 
-                @sio.on('webrtc_error')
+                @sio.on('webrtc_peer_left', namespace=SIGNALING_NAMESPACE)
+                def on_peer_left(data):
+                    peer_id = data.get('username')
+                    logger.info(f"WebRTC: Peer left: {peer_id}")
+                    asyncio.run_coroutine_threadsafe(self._close_peer_connection(peer_id), self._loop)
+                
+                @sio.on('webrtc_error', namespace=SIGNALING_NAMESPACE)
                 def on_error(data):
                     error = data.get('error')
                     message = data.get('message')
                     logger.error(f"WebRTC signaling error: {error} - {message}")
                 
                 # Intentamos conectar al servidor
-                sio.connect(self.signaling_url)
+                sio.connect(self.signaling_url, namespaces=[SIGNALING_NAMESPACE],
+                            auth={'token': self.access_token})
                 self.socket = sio
                 
                 logger.info(f"Conectado al servidor de señalización: {self.signaling_url}")
@@ -341,7 +536,7 @@ if WEBRTC_AVAILABLE:
                         'from': self.local_id,
                         'to': message.get('to'),
                         'sdp': message.get('sdp')
-                    })
+                    }, namespace=SIGNALING_NAMESPACE)
                     
                 elif message_type == 'answer':
                     self.socket.emit('webrtc_answer', {
@@ -349,7 +544,7 @@ if WEBRTC_AVAILABLE:
                         'from': self.local_id,
                         'to': message.get('to'),
                         'sdp': message.get('sdp')
-                    })
+                    }, namespace=SIGNALING_NAMESPACE)
                     
                 elif message_type == 'candidate':
                     self.socket.emit('webrtc_ice_candidate', {
@@ -359,13 +554,12 @@ if WEBRTC_AVAILABLE:
                         'candidate': message.get('candidate'),
                         'sdpMid': message.get('sdpMid'),
                         'sdpMLineIndex': message.get('sdpMLineIndex')
-                    })
+                    }, namespace=SIGNALING_NAMESPACE)
                     
                 elif message_type == 'join':
                     self.socket.emit('webrtc_join', {
-                        'room_id': self.room_id,
-                        'username': self.local_id
-                    })
+                        'room_id': self.room_id
+                    }, namespace=SIGNALING_NAMESPACE)
                     
                 else:
                     logger.warning(f"Tipo de mensaje desconocido: {message_type}")
@@ -397,6 +591,36 @@ if WEBRTC_AVAILABLE:
             
             return pc
         
+        async def _switch_to_forwarding(self, data):
+            """
+            Sustituye las conexiones mesh por una única conexión al nodo de reenvío.
+            
+            La oferta lleva una línea m de audio por hueco de reenvío: la primera
+            envía el micrófono y el resto sólo reciben, así el servidor puede
+            cambiar de hablante sin renegociar.
+            """
+            if self.voice_mode == "sfu" and FORWARDER_PEER_ID in self.peer_connections:
+                return
+            
+            for peer_id in [p for p in self.peer_connections if p != FORWARDER_PEER_ID]:
+                await self._close_peer_connection(peer_id)
+            
+            self.voice_mode = "sfu"
+            self.forwarded_slots = max(1, int(data.get('slots', 1)))
+            
+            pc = self._get_or_create_peer_connection(FORWARDER_PEER_ID)
+            for _ in range(self.forwarded_slots - len(pc.getTransceivers())):
+                pc.addTransceiver("audio", direction="recvonly")
+            
+            await pc.setLocalDescription(await pc.createOffer())
+            await self._send_signaling_message({
+                "type": "offer",
+                "to": FORWARDER_PEER_ID,
+                "from": self.local_id,
+                "sdp": pc.localDescription.sdp
+            })
+            logger.info(f"WebRTC: Conectando al nodo de reenvío con {self.forwarded_slots} huecos")
+        
         async def _handle_offer(self, data):
             """
             Maneja una oferta WebRTC recibida del servidor
@@ -505,7 +729,9 @@ if WEBRTC_AVAILABLE:
                 return self.peer_connections[peer_id]
             
             # Crear nueva conexión
-            pc = RTCPeerConnection(configuration={"iceServers": ICE_SERVERS})
+            pc = RTCPeerConnection(configuration=RTCConfiguration(
+                iceServers=[RTCIceServer(**server) for server in ICE_SERVERS]
+            ))
             
             # Manejar cambios de estado de conexión
             @pc.on("connectionstatechange")
@@ -585,62 +811,83 @@ if WEBRTC_AVAILABLE:
                             import traceback
                             traceback.print_exc()
                     
-                    # Manejar procesamiento de marcos de audio
-                    async def process_audio_frames():
-                        try:
-                            while True:
-                                try:
-                                    # Recibir frame de audio
-                                    frame = await audio_track.recv()
-                                    
-                                    # Verificar si la pista ha terminado
-                                    if frame.pts is None:
-                                        logger.info(f"Fin de pista detectado para {peer_id}")
-                                        break
-                                        
-                                    # Convertir a bytes para enviar a través de la señal
-                                    # Esto depende de cómo procesamos el audio en nuestra aplicación
-                                    audio_array = frame.to_ndarray()
-                                    audio_bytes = audio_array.tobytes()
-                                    
-                                    # Enviar a través de la señal (desde el hilo principal)
-                                    if self._on_audio_callback:
-                                        # Usar QtCore.QMetaObject.invokeMethod si es necesario para seguridad entre hilos
-                                        self._on_audio_callback(audio_bytes, peer_id)
-                                    
-                                    # Emitir la señal
-                                    self.audio_received.emit(audio_bytes, peer_id)
-                                    
-                                except MediaStreamError as e:
-                                    logger.error(f"Error en flujo de medios desde {peer_id}: {e}")
-                                    break
-                                except Exception as e:
-                                    logger.error(f"Error procesando audio de {peer_id}: {e}")
-                                    
-                                # Esperar un poco para no saturar el sistema
-                                await asyncio.sleep(0.01)
-                                
-                        except Exception as e:
-                            logger.error(f"Error en bucle de procesamiento de audio: {e}")
-                        finally:
-                            # Limpiar cuando terminemos
-                            if peer_id in self._active_tracks and track_id in self._active_tracks[peer_id]:
-                                logger.info(f"Limpiando pista {track_id} para {peer_id} (procesamiento terminado)")
-                                del self._active_tracks[peer_id][track_id]
-                    
                     # Iniciar el procesamiento de audio en segundo plano
-                    asyncio.create_task(process_audio_frames())
+                    asyncio.create_task(self._process_audio_frames(audio_track, peer_id, track_id))
             
             # Guardar la conexión
             self.peer_connections[peer_id] = pc
             
-            # Añadir la pista de audio si no estamos muteados
-            if not self.is_muted:
-                pc.addTrack(self.mic_track)
+            # Añadir la pista de audio si no estamos muteados. Hacia el nodo de
+            # reenvío se añade siempre: silenciado sólo envía silencio, que el
+            # servidor no reenvía, y así no hay que renegociar al activar el micro
+            if not self.is_muted or peer_id == FORWARDER_PEER_ID:
+                pc.addTrack(self._mic_relay.subscribe(self.mic_track, buffered=False))
                 logger.info(f"Pista de micrófono añadida para {peer_id} durante la creación")
             
             return pc
         
+        async def _process_audio_frames(self, audio_track, peer_id, track_id):
+            """
+            Recibe frames de un participante y los entrega sin copias ni esperas
+            """
+            probe = self.receive_stats.setdefault(peer_id, ReceiveLatencyProbe())
+            try:
+                while True:
+                    try:
+                        # Recibir frame de audio
+                        frame = await audio_track.recv()
+                        
+                        # Verificar si la pista ha terminado
+                        if frame.pts is None:
+                            logger.info(f"Fin de pista detectado para {peer_id}")
+                            break
+
+                        probe.record(frame, self._loop.time())
+
+                        # Vista sobre las muestras s16 intercaladas del frame, sin copia
+                        channels = 1 if frame.format.is_planar else len(frame.layout.channels)
+                        nbytes = frame.samples * frame.format.bytes * channels
+                        audio_view = memoryview(frame.planes[0])[:nbytes]
+
+                        samples = np.frombuffer(audio_view, dtype=np.int16)
+                        if samples.size:
+                            peak = max(int(samples.max()), -int(samples.min()))
+                            if peak > self._peer_levels.get(peer_id, 0):
+                                self._peer_levels[peer_id] = peak
+
+                        if self._on_audio_callback:
+                            self._on_audio_callback(audio_view, peer_id)
+                        
+                    except MediaStreamError as e:
+                        logger.error(f"Error en flujo de medios desde {peer_id}: {e}")
+                        break
+                    except Exception as e:
+                        logger.error(f"Error procesando audio de {peer_id}: {e}")
+                    
+            except Exception as e:
+                logger.error(f"Error en bucle de procesamiento de audio: {e}")
+            finally:
+                logger.info(
+                    f"Recepción de {peer_id}: {probe.frames} frames, retraso medio "
+                    f"{probe.mean_ms:.1f} ms, máximo {probe.max_ms:.1f} ms"
+                )
+                # Limpiar cuando terminemos
+                if peer_id in self._active_tracks and track_id in self._active_tracks[peer_id]:
+                    logger.info(f"Limpiando pista {track_id} para {peer_id} (procesamiento terminado)")
+                    del self._active_tracks[peer_id][track_id]
+        
+        def _flush_audio_levels(self):
+            """
+            Emite los niveles pico acumulados y los reinicia. Tras un intervalo
+            con niveles se emite una vez {} para que la UI vea que todos callaron
+            """
+            if not self._peer_levels and not self._levels_reported:
+                return
+            levels = {peer_id: peak / 32768.0 for peer_id, peak in self._peer_levels.items()}
+            self._peer_levels = {}
+            self._levels_reported = bool(levels)
+            self.audio_levels.emit(levels)
+        
         def add_audio_data(self, audio_data):
             """
             Añade datos de audio para enviar (desde PyAudio)
@@ -667,6 +914,8 @@ if WEBRTC_AVAILABLE:
             # Actualizar todas las conexiones peer
             async def update_tracks():
                 for peer_id, pc in self.peer_connections.items():
+                    if peer_id == FORWARDER_PEER_ID:
+                        continue
                     # En lugar de eliminar y añadir pistas, cambiamos la dirección del transceiver
                     for transceiver in pc.getTransceivers():
                         if transceiver.kind == "audio":
@@ -728,12 +977,21 @@ if WEBRTC_AVAILABLE:
             # Clear active tracks
             self._active_tracks.clear()
             
+        async def _close_peer_connection(self, peer_id):
+            """Cierra la conexión con un participante que salió de la sala"""
+            pc = self.peer_connections.pop(peer_id, None)
+            self._active_tracks.pop(peer_id, None)
+            self._peer_levels.pop(peer_id, None)
+            if pc:
+                await pc.close()
+                self.participant_disconnected.emit(peer_id)
+            
         async def _close_all_peer_connections(self):
             """Close all peer connections cleanly"""
             close_tasks = []
             for peer_id, pc in list(self.peer_connections.items()):
                 logger.info(f"Cerrando conexión con {peer_id}")
-                close_tasks.append(pc.close())
+                close_tasks.append(asyncio.ensure_future(pc.close()))
                 
             # Wait for all connections to close (with timeout)
             if close_tasks:
@@ -1014,7 +1272,10 @@ class WebRTCVoiceBridge:
     """
     Puente entre PyAudio y WebRTC para reutilizar el código existente
     """
-    def __init__(self, socket, room_id, username):
+    # Nivel pico (0..1) a partir del cual un participante cuenta como hablando
+    SPEAKING_LEVEL = 0.02
+
+    def __init__(self, socket, room_id, username, access_token=None):
         self.socket = socket
         self.room_id = room_id
         self.username = username
@@ -1023,13 +1284,20 @@ class WebRTCVoiceBridge:
         self.is_muted = True
         self.is_connected = False
         self.is_recording = False
+
+        # Consumidores opcionales del audio recibido y de los niveles
+        self._on_audio_callback = None
+        self._on_levels_callback = None
+        # Último nivel pico por participante y quién está hablando
+        self.levels = {}
+        self.speaking = set()
         
         # URL de señalización (usar Socket.IO existente)
         self.signaling_url = "http://31.220.80.192:5000"
         
         # Cliente WebRTC o Fallback según disponibilidad
         if WEBRTC_AVAILABLE:
-            self.webrtc = WebRTCVoiceChat(self.signaling_url, room_id, username)
+            self.webrtc = WebRTCVoiceChat(self.signaling_url, room_id, username, access_token)
             self.webrtc.set_on_audio_callback(self._on_audio_received)
             
             # Connect additional signals
@@ -1039,6 +1307,9 @@ class WebRTCVoiceBridge:
             
             if hasattr(self.webrtc, 'connection_state_changed'):
                 self.webrtc.connection_state_changed.connect(self._on_connection_state_changed)
+
+            # Niveles cada LEVEL_UPDATE_INTERVAL; la conexión los entrega en el hilo de la UI
+            self.webrtc.audio_levels.connect(self._on_audio_levels)
                 
             print("✅ Usando implementación WebRTC completa")
         else:
@@ -1059,17 +1330,40 @@ class WebRTCVoiceBridge:
         self.input_device = -1
         self.output_device = -1
     
+    def set_on_audio_callback(self, callback):
+        """
+        callback(audio_data, participant_id) por cada frame recibido. Con WebRTC
+        audio_data es un memoryview válido sólo durante la llamada: quien lo
+        conserve debe copiarlo a su propio buffer
+        """
+        self._on_audio_callback = callback
+
+    def set_on_levels_callback(self, callback):
+        """
+        callback({participante: nivel pico 0..1}) a la frecuencia de audio_levels,
+        en el hilo de la UI; self.speaking tiene quién supera SPEAKING_LEVEL
+        """
+        self._on_levels_callback = callback
+
     def _on_audio_received(self, audio_data, participant_id):
         """
-        Callback cuando se recibe audio
+        Callback cuando se recibe audio (hilo del bucle WebRTC, por frame)
         """
-        print(f"📥 Recibido audio de {participant_id} ({len(audio_data) if audio_data else 'No'} bytes)")
-        
-        # Emitir el evento de socket.io para mantener compatibilidad
-        self.socket.emit('voice_data_received', {
-            'username': participant_id,
-            'data': audio_data
-        })
+        # Sin copia: el frame se entrega tal cual. La reproducción la hace WebRTC,
+        # y el servidor no tiene manejador para reenviar cada frame por Socket.IO
+        if self._on_audio_callback:
+            self._on_audio_callback(audio_data, participant_id)
+
+    def _on_audio_levels(self, levels):
+        """
+        Niveles pico agregados por WebRTCVoiceChat. Son estado de la UI: se
+        entregan sólo a set_on_levels_callback, nunca al servidor
+        """
+        # Un participante sin frames en el intervalo no aparece en levels: nivel 0
+        self.levels = dict(levels)
+        self.speaking = {peer_id for peer_id, level in levels.items() if level >= self.SPEAKING_LEVEL}
+        if self._on_levels_callback:
+            self._on_levels_callback(levels)
         
     def _on_connection_state_changed(self, participant_id, state):
         """
@@ -0,0 +1,230 @@
+import re
+
+from PyQt5.QtCore import Qt, QAbstractListModel, QModelIndex, QObject, QTimer, QEvent, QRect, QSize
+from PyQt5.QtGui import QColor, QFontMetrics, QTextDocumentFragment
+from PyQt5.QtWidgets import QAbstractItemView, QListView, QStyle
+
+MessageIdRole = Qt.UserRole
+
+_COLOR_RE = re.compile(r"color:\s*([#\w]+)")
+
+# Row layout: [message_id, text, color, size hint]
+_ID, _TEXT, _COLOR, _SIZE = range(4)
+
+
+class ChatModel(QAbstractListModel):
+    """
+    Chat lines; message_id is None for local status lines. Row heights are
+    computed here once per line and width, since QListView asks for the size
+    of every row whenever rows are inserted or removed.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._lines = []
+        self._ids = set()
+        self._metrics = None
+        self._wrap_width = 0
+        self._margin = 0
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._lines)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or index.row() >= len(self._lines):
+            return None
+        line = self._lines[index.row()]
+        if role == Qt.SizeHintRole:
+            if line[_SIZE] is None and self._metrics is not None:
+                line[_SIZE] = self._measure(line[_TEXT])
+            return line[_SIZE]
+        if role == Qt.DisplayRole:
+            return line[_TEXT]
+        if role == Qt.ForegroundRole and line[_COLOR]:
+            return QColor(line[_COLOR])
+        if role == MessageIdRole:
+            return line[_ID]
+        return None
+
+    def set_text_layout(self, font, width, margin):
+        """Wrap lines at `width` pixels; `margin` is the delegate's horizontal text margin"""
+        if self._metrics is not None and width == self._wrap_width + 2 * self._margin:
+            return
+        self._metrics = QFontMetrics(font)
+        self._margin = margin
+        self._wrap_width = max(1, width - 2 * margin)
+        if self._lines:
+            self.layoutAboutToBeChanged.emit()
+            for line in self._lines:
+                line[_SIZE] = None
+            self.layoutChanged.emit()
+
+    def _measure(self, text):
+        rect = self._metrics.boundingRect(QRect(0, 0, self._wrap_width, 0),
+                                          Qt.TextWordWrap | Qt.TextWrapAnywhere, text)
+        return QSize(self._wrap_width + 2 * self._margin, max(rect.height(), self._metrics.height()))
+
+    def _new_lines(self, lines):
+        fresh = []
+        for message_id, text, color in lines:
+            if message_id is not None:
+                if message_id in self._ids:
+                    continue
+                self._ids.add(message_id)
+            fresh.append([message_id, text, color, None])
+        return fresh
+
+    def append_lines(self, lines):
+        """lines: [(message_id, text, color)]; ids already shown are skipped"""
+        lines = self._new_lines(lines)
+        if lines:
+            first = len(self._lines)
+            self.beginInsertRows(QModelIndex(), first, first + len(lines) - 1)
+            self._lines.extend(lines)
+            self.endInsertRows()
+        return len(lines)
+
+    def prepend_lines(self, lines):
+        lines = self._new_lines(lines)
+        if lines:
+            self.beginInsertRows(QModelIndex(), 0, len(lines) - 1)
+            self._lines[:0] = lines
+            self.endInsertRows()
+        return len(lines)
+
+    def trim_front(self, keep):
+        """Drop the oldest lines so that at most `keep` remain"""
+        excess = len(self._lines) - keep
+        if excess <= 0:
+            return 0
+        self.beginRemoveRows(QModelIndex(), 0, excess - 1)
+        for line in self._lines[:excess]:
+            self._ids.discard(line[_ID])
+        del self._lines[:excess]
+        self.endRemoveRows()
+        return excess
+
+    def oldest_id(self):
+        for line in self._lines:
+            if line[_ID] is not None:
+                return line[_ID]
+        return None
+
+
+class ChatFeed(QObject):
+    """
+    Drives a QListView as the room chat. Incoming lines are queued and flushed
+    at most once per frame, the retained history is bounded, and scrolling to
+    the top asks load_history(before_id, feed) for an older page, which it
+    answers with feed.history_loaded(...) or feed.history_failed().
+    """
+    FLUSH_INTERVAL_MS = 33  # ~30 flushes per second
+    MAX_LINES = 300
+    HISTORY_PAGE = 50
+
+    def __init__(self, view: QListView, load_history=None, parent=None):
+        super().__init__(parent or view)
+        self.view = view
+        self.model = ChatModel(self)
+        self._load_history = load_history
+        self._pending = []
+        self._loading = False
+        self._has_more = True
+        # Follow new lines only while the user is at the bottom
+        self._follow = True
+
+        view.setModel(self.model)
+        view.setWordWrap(True)
+        view.setUniformItemSizes(False)
+        view.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+        view.setVerticalScrollMode(QAbstractItemView.ScrollPerPixel)
+        view.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        view.setSelectionMode(QAbstractItemView.ExtendedSelection)
+        view.viewport().installEventFilter(self)
+        self._update_text_layout()
+
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(self.FLUSH_INTERVAL_MS)
+        self._timer.timeout.connect(self.flush)
+
+        view.verticalScrollBar().valueChanged.connect(self._on_scrolled)
+        view.verticalScrollBar().rangeChanged.connect(self._on_range_changed)
+
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Resize:
+            self._update_text_layout()
+        return False
+
+    def _update_text_layout(self):
+        margin = self.view.style().pixelMetric(QStyle.PM_FocusFrameHMargin, None, self.view) + 1
+        self.model.set_text_layout(self.view.font(), self.view.viewport().width(), margin)
+
+    def add_line(self, text, color=None, message_id=None):
+        self._pending.append((message_id, text, color))
+        if not self._timer.isActive():
+            self._timer.start()
+
+    def add_html(self, html):
+        """Status lines built as HTML elsewhere in the window; only text and color are kept"""
+        text = QTextDocumentFragment.fromHtml(html).toPlainText().strip()
+        match = _COLOR_RE.search(html)
+        self.add_line(text, match.group(1) if match else None)
+
+    def flush(self):
+        if not self._pending:
+            return
+        lines, self._pending = self._pending, []
+        self.model.append_lines(lines)
+        # The view lays out once after this; _on_range_changed then keeps it at the bottom
+        # While the user reads above, the oldest rows are what they are reading: trimming
+        # waits until they are back at the bottom
+        if self._follow:
+            self._trim()
+
+    def _trim(self):
+        # Trimmed in chunks, since every removal makes the view lay out all rows again
+        if self.model.rowCount() > self.MAX_LINES + self.HISTORY_PAGE:
+            if self.model.trim_front(self.MAX_LINES):
+                # The dropped lines can be fetched again by scrolling up
+                self._has_more = True
+
+    def load_older(self):
+        """True if a page was requested; False if there is nothing more or a page is on its way"""
+        if self._load_history is None or self._loading or not self._has_more:
+            return False
+        self._loading = True
+        self._load_history(self.model.oldest_id(), self)
+        return True
+
+    def history_loaded(self, lines, has_more):
+        """lines: [(message_id, text)] oldest first"""
+        self._loading = False
+        self._has_more = has_more
+        scrollbar = self.view.verticalScrollBar()
+        was_empty = self.model.rowCount() == 0
+        old_max, old_value = scrollbar.maximum(), scrollbar.value()
+
+        if not self.model.prepend_lines([(message_id, text, None) for message_id, text in lines]):
+            return
+        self.view.doItemsLayout()
+        if was_empty:
+            self.view.scrollToBottom()
+        else:
+            # Keep the line the user was looking at in place
+            scrollbar.setValue(scrollbar.maximum() - old_max + old_value)
+
+    def history_failed(self):
+        self._loading = False
+
+    def _on_scrolled(self, value):
+        scrollbar = self.view.verticalScrollBar()
+        was_following, self._follow = self._follow, value >= scrollbar.maximum() - 2
+        if self._follow and not was_following:
+            self._trim()
+        if value == scrollbar.minimum() and scrollbar.maximum() > 0:
+            self.load_older()
+
+    def _on_range_changed(self, minimum, maximum):
+        if self._follow:
+            self.view.verticalScrollBar().setValue(maximum)
@@ -0,0 +1,105 @@
+from PyQt5.QtCore import Qt, QAbstractListModel, QModelIndex
+
+UsernameRole = Qt.UserRole
+IsHostRole = Qt.UserRole + 1
+
+
+class PlayerListModel(QAbstractListModel):
+    """
+    Room players keyed by username. A snapshot (join_success / players_snapshot)
+    sets the list and its version; player_joined / player_left / host_changed
+    deltas then change single rows. apply_delta() returns False when a delta
+    skipped a version, and the caller asks the server for a new snapshot.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._players = []
+        self._rows = {}  # username -> row
+        self.version = None
+        self.awaiting_snapshot = False
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._players)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or index.row() >= len(self._players):
+            return None
+        player = self._players[index.row()]
+        if role == Qt.DisplayRole:
+            return f"👑 {player['username']}" if player['is_host'] else player['username']
+        if role == UsernameRole:
+            return player['username']
+        if role == IsHostRole:
+            return player['is_host']
+        return None
+
+    def players(self):
+        return [dict(player) for player in self._players]
+
+    def is_host(self, username):
+        row = self._rows.get(username)
+        return row is not None and self._players[row]['is_host']
+
+    def reset(self, players, version=None):
+        self.beginResetModel()
+        self._players = [
+            {'username': player.get('username', 'Unknown'), 'is_host': bool(player.get('is_host', False))}
+            for player in players
+        ]
+        self._rows = {player['username']: row for row, player in enumerate(self._players)}
+        self.endResetModel()
+        self.version = version
+        self.awaiting_snapshot = False
+
+    def apply_delta(self, event, data):
+        version = data.get('version')
+        if self.awaiting_snapshot:
+            # The snapshot on its way will include this change
+            return True
+        if version is not None and self.version is not None:
+            if version <= self.version:
+                return True
+            if version != self.version + 1:
+                self.awaiting_snapshot = True
+                return False
+
+        if event == 'player_joined':
+            self._set_player(data.get('username', 'Unknown'), bool(data.get('is_host', False)))
+        elif event == 'player_left':
+            self._remove_player(data.get('username'))
+        elif event == 'host_changed':
+            self._set_host(data.get('new_host'))
+
+        if version is not None:
+            self.version = version
+        return True
+
+    def _set_player(self, username, is_host):
+        row = self._rows.get(username)
+        if row is None:
+            row = len(self._players)
+            self.beginInsertRows(QModelIndex(), row, row)
+            self._players.append({'username': username, 'is_host': is_host})
+            self._rows[username] = row
+            self.endInsertRows()
+        elif self._players[row]['is_host'] != is_host:
+            self._players[row]['is_host'] = is_host
+            self.dataChanged.emit(self.index(row), self.index(row))
+
+    def _remove_player(self, username):
+        row = self._rows.pop(username, None)
+        if row is None:
+            return
+        self.beginRemoveRows(QModelIndex(), row, row)
+        del self._players[row]
+        self.endRemoveRows()
+        for later in range(row, len(self._players)):
+            self._rows[self._players[later]['username']] = later
+
+    def _set_host(self, new_host):
+        for row, player in enumerate(self._players):
+            is_host = player['username'] == new_host
+            if player['is_host'] != is_host:
+                player['is_host'] = is_host
+                self.dataChanged.emit(self.index(row), self.index(row))
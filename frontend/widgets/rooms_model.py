@@ -0,0 +1,147 @@
+from PyQt5.QtCore import Qt, QAbstractListModel, QModelIndex, QSortFilterProxyModel
+from translator import _
+
+# أدوار البيانات الإضافية للغرفة
+RoomIdRole = Qt.UserRole
+RoomDataRole = Qt.UserRole + 1
+RoomNameRole = Qt.UserRole + 2
+PlayersRole = Qt.UserRole + 3
+
+
+def room_key(room):
+    return str(room.get('id', room.get('room_id', '')))
+
+
+def room_name(room):
+    return room.get('name') or room.get('room_name') or _("ui.main_window.unnamed_room", "بدون اسم")
+
+
+class RoomListModel(QAbstractListModel):
+    """
+    نموذج قائمة الغرف مفهرس بمعرف الغرفة. apply() يطبق الفرق فقط
+    (إدراج / تحديث / حذف) بدلاً من إعادة بناء القائمة، فيبقى التحديد
+    وموضع التمرير كما هما.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._rooms = []
+        self._rows = {}  # معرف الغرفة -> رقم الصف
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rooms)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or index.row() >= len(self._rooms):
+            return None
+        room = self._rooms[index.row()]
+
+        if role == Qt.DisplayRole:
+            text = f"🏷️ {room_name(room)}\n"
+            text += f"👥 {room.get('current_players', 0)}/{room.get('max_players', 8)} | "
+            text += "🔒 خاصة" if room.get("is_private", False) else "🌐 عامة"
+            text += f"\n👤 {room.get('owner_username', '')}"
+            return text
+        if role == RoomIdRole:
+            return room_key(room)
+        if role == RoomDataRole:
+            return room
+        if role == RoomNameRole:
+            return room_name(room).lower()
+        if role == PlayersRole:
+            return room.get('current_players', 0)
+        return None
+
+    def room_by_id(self, room_id):
+        row = self._rows.get(str(room_id))
+        return self._rooms[row] if row is not None else None
+
+    def apply(self, rooms):
+        """
+        يطبق قائمة غرف جديدة كاملة كفرق على النموذج.
+        يعيد (عدد المضافة، عدد المحدثة، عدد المحذوفة).
+        """
+        incoming = {}
+        for room in rooms:
+            if isinstance(room, dict):
+                incoming[room_key(room)] = room
+
+        # الحذف: من الأسفل إلى الأعلى وعلى شكل مجالات متصلة
+        removed_rows = sorted((row for key, row in self._rows.items() if key not in incoming), reverse=True)
+        index = 0
+        while index < len(removed_rows):
+            last = first = removed_rows[index]
+            index += 1
+            while index < len(removed_rows) and removed_rows[index] == first - 1:
+                first = removed_rows[index]
+                index += 1
+            self.beginRemoveRows(QModelIndex(), first, last)
+            del self._rooms[first:last + 1]
+            self.endRemoveRows()
+        if removed_rows:
+            self._rows = {room_key(room): row for row, room in enumerate(self._rooms)}
+
+        # التحديث: إشعار dataChanged للصفوف التي تغيرت بياناتها فقط
+        updated = 0
+        for key, row in self._rows.items():
+            room = incoming[key]
+            if room != self._rooms[row]:
+                self._rooms[row] = room
+                model_index = self.index(row)
+                self.dataChanged.emit(model_index, model_index)
+                updated += 1
+
+        # الإدراج: كل الغرف الجديدة في نهاية القائمة دفعة واحدة
+        new_rooms = [room for key, room in incoming.items() if key not in self._rows]
+        if new_rooms:
+            first = len(self._rooms)
+            self.beginInsertRows(QModelIndex(), first, first + len(new_rooms) - 1)
+            for offset, room in enumerate(new_rooms):
+                self._rows[room_key(room)] = first + offset
+                self._rooms.append(room)
+            self.endInsertRows()
+
+        return len(new_rooms), updated, len(removed_rows)
+
+    def clear(self):
+        self.beginResetModel()
+        self._rooms = []
+        self._rows = {}
+        self.endResetModel()
+
+
+class RoomFilterProxyModel(QSortFilterProxyModel):
+    """تصفية الغرف (نص، إخفاء الممتلئة، إخفاء الخاصة) وترتيبها على جهة العميل"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._text = ""
+        self._hide_full = False
+        self._hide_private = False
+        self.setDynamicSortFilter(True)
+        self.setSortRole(RoomNameRole)
+
+    def set_filter_text(self, text):
+        self._text = text.strip().lower()
+        self.invalidateFilter()
+
+    def set_hide_full(self, hide):
+        self._hide_full = hide
+        self.invalidateFilter()
+
+    def set_hide_private(self, hide):
+        self._hide_private = hide
+        self.invalidateFilter()
+
+    def filterAcceptsRow(self, source_row, source_parent):
+        room = self.sourceModel().index(source_row, 0, source_parent).data(RoomDataRole)
+        if room is None:
+            return False
+        if self._hide_private and room.get("is_private", False):
+            return False
+        if self._hide_full and room.get('current_players', 0) >= room.get('max_players', 8):
+            return False
+        if self._text:
+            haystack = f"{room_name(room)} {room.get('owner_username', '')} {room.get('description', '')}"
+            return self._text in haystack.lower()
+        return True